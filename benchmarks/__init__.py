@@ -0,0 +1,24 @@
+"""
+Micro-benchmarks for the pure, CPU-bound helpers on the request path.
+
+Run them (and compare against ``benchmarks/baseline.json``) with:
+
+    python -m benchmarks                      # all, fail on regressions
+    python -m benchmarks -k venue             # name filter
+    python -m benchmarks --threshold 0.1      # tighter regression gate
+    python -m benchmarks --update-baseline    # record this machine's numbers
+
+Cases are registered with ``@benchmark(name)`` in ``benchmarks/cases.py``; the
+decorated function does the setup and returns the zero-argument callable that
+is timed (one call = one op).
+"""
+from typing import Callable, Dict
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
@@ -0,0 +1,70 @@
+"""
+python -m benchmarks: run the micro-benchmarks and gate on the stored baseline.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import BENCHMARKS  # noqa: E402
+from benchmarks import cases  # noqa: E402,F401  (registers the cases)
+from benchmarks.runner import (  # noqa: E402
+    BASELINE_FILE, DEFAULT_THRESHOLD, compare, load_baseline, run_benchmark, save_baseline,
+)
+
+
+def _format_row(name: str, r: dict, cmp: dict) -> str:
+    delta = "new"
+    if cmp.get("status") != "new":
+        delta = f"{(cmp['time_ratio'] - 1) * 100:+.1f}%"
+        if cmp["status"] == "regressed":
+            delta += " REGRESSED(" + ",".join(cmp["regressed"]) + ")"
+    return f"{name:<52} {r['ns_per_op']:>14,.0f} {r['peak_bytes'] / 1024:>10.1f} {r['alloc_blocks']:>8} {delta}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Hot-path micro-benchmarks")
+    parser.add_argument("-k", dest="filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCH_THRESHOLD", DEFAULT_THRESHOLD)),
+                        help="allowed slowdown / memory growth vs baseline (0.25 = 25%%; env BENCH_THRESHOLD)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--round-time", type=float, default=0.05, help="minimum seconds per timing round")
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--json", dest="json_out", default="", help="also write results and comparison here")
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if args.filter.lower() in n.lower()]
+    if not names:
+        parser.error(f"no benchmark matches {args.filter!r}")
+
+    baseline = load_baseline(args.baseline)
+    print(f"{'benchmark':<52} {'ns/op':>14} {'peak KiB':>10} {'blocks':>8} vs baseline")
+    results, comparison = {}, {}
+    for name in names:
+        results[name] = run_benchmark(BENCHMARKS[name], args.round_time, args.rounds)
+        comparison.update(compare({name: results[name]}, baseline, args.threshold))
+        print(_format_row(name, results[name], comparison[name]), flush=True)
+
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps({"results": results, "comparison": comparison}, indent=2) + "\n",
+                                       encoding="utf-8")
+    if args.update_baseline:
+        kept = {k: v for k, v in (baseline.get("benchmarks") or {}).items() if k not in results and k in BENCHMARKS}
+        merged = {**{k: {**v} for k, v in kept.items()}, **results}
+        save_baseline(merged, args.baseline, previous=baseline)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    regressed = [n for n, c in comparison.items() if c.get("status") == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed beyond the threshold: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark cases: one per hot-path helper, fed from benchmarks.fixtures.
+"""
+from benchmarks import benchmark
+from benchmarks import fixtures
+
+
+@benchmark("process_venue_results[2000 elements]")
+def bench_process_venue_results():
+    from city_guides.providers.overpass_provider import process_venue_results
+    elements = fixtures.overpass_response()["elements"]
+    return lambda: process_venue_results(elements, limit=50)
+
+
+@benchmark("enrich_venue_data[200 venues]")
+def bench_enrich_venue_data():
+    from city_guides.src.persistence import enrich_venue_data
+    venues = fixtures.venues()
+
+    def run():
+        for v in venues:
+            enrich_venue_data(v, "Paris")
+    return run
+
+
+@benchmark("_compute_open_now[opening_hours batch]")
+def bench_compute_open_now():
+    from city_guides.src.persistence import _compute_open_now
+    hours = fixtures.opening_hours()
+    lat, lon = fixtures.CITY_CENTER
+
+    def run():
+        # tzname given, as the enriched request path does, so no timezone lookup is timed
+        for h in hours:
+            _compute_open_now(lat, lon, h, tzname="Europe/Paris")
+    return run
+
+
+@benchmark("calculate_venue_quality_score[200 venues]")
+def bench_venue_quality_score():
+    from city_guides.src.venue_quality import calculate_venue_quality_score
+    venues = fixtures.venues()
+
+    def run():
+        for v in venues:
+            calculate_venue_quality_score(v)
+    return run
+
+
+@benchmark("_rank_neighborhoods_by_relevance[150]")
+def bench_rank_neighborhoods_by_relevance():
+    from city_guides.providers.multi_provider import _rank_neighborhoods_by_relevance
+    neighborhoods = fixtures.neighborhoods()
+    return lambda: _rank_neighborhoods_by_relevance(neighborhoods, fixtures.CITY_CENTER)
+
+
+@benchmark("combine_and_score_categories[300]")
+def bench_combine_and_score_categories():
+    from city_guides.src.simple_categories import combine_and_score_categories
+    candidates = fixtures.category_candidates()
+    return lambda: combine_and_score_categories(candidates)
+
+
+@benchmark("SynthesisEnhancer.neutralize_tone[~2KB]")
+def bench_neutralize_tone():
+    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+    text = fixtures.llm_text()
+    # the uncached rewrite: neutralize_tone memoizes by text, so repeat calls would only time cache hits
+    return lambda: SynthesisEnhancer._neutralize(text, "Le Marais", "Paris", 2000)
+
+
+@benchmark("NeighborhoodDisambiguator.rank_neighborhoods[150]")
+def bench_disambiguator_rank():
+    from city_guides.src.neighborhood_disambiguator import NeighborhoodDisambiguator
+    neighborhoods = fixtures.neighborhoods()
+    return lambda: NeighborhoodDisambiguator.rank_neighborhoods(neighborhoods, "Paris", user_query="marais")
@@ -0,0 +1,201 @@
+"""
+Benchmark fixtures.
+
+Each loader returns a recorded response from ``benchmarks/fixtures/`` when one
+exists, otherwise a deterministic synthetic stand-in shaped like the real data
+(same tag mix, name scripts and field coverage), so results are comparable
+between runs and machines without network access.
+
+Record a live Overpass response for a large city (replaces the synthetic one):
+
+    python -m benchmarks.fixtures record-overpass Paris
+"""
+import argparse
+import gzip
+import json
+import random
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+OVERPASS_FIXTURE = FIXTURES_DIR / "overpass_large_city.json.gz"
+SEED = 20240601
+
+CITY_CENTER = (48.8566, 2.3522)
+
+_AMENITIES = [
+    ("restaurant", 34), ("cafe", 18), ("bar", 10), ("fast_food", 10), ("pub", 5),
+    ("ice_cream", 3), ("nightclub", 2), ("biergarten", 1),
+]
+_TOURISM = [("museum", 4), ("attraction", 5), ("viewpoint", 2), ("hotel", 6), ("gallery", 2)]
+_CUISINES = ["french", "italian", "japanese", "chinese", "indian", "lebanese", "vietnamese",
+             "pizza", "burger", "coffee_shop", "regional", "thai", "korean", "mexican"]
+_HOURS = [
+    "Mo-Fr 08:00-18:00", "Mo-Sa 12:00-14:30,19:00-22:30", "Tu-Su 10:00-18:00; Mo off",
+    "24/7", "Mo-Su 07:00-23:00", "Mo-Th 11:00-23:00; Fr-Sa 11:00-01:00; Su 12:00-22:00",
+    "We-Mo 09:30-17:30", "", "", "",
+]
+_STREETS = ["Rue de Rivoli", "Boulevard Saint-Germain", "Rue Oberkampf", "Avenue de l'Opéra",
+            "Rue des Rosiers", "Rue Mouffetard", "Quai de Valmy", "Rue de Bretagne"]
+_NAME_PARTS = ["Le", "La", "Chez", "Café", "Bistro", "Maison", "Au", "Petit", "Grand", "Vieux",
+               "Marché", "Comptoir", "Atelier", "Jardin", "Maison", "Brasserie"]
+_NAME_WORDS = ["Marais", "Lune", "Soleil", "Montmartre", "Rivoli", "Bastille", "Seine", "Louvre",
+               "Panthéon", "Voltaire", "Odéon", "Oberkampf", "Sakura", "Roma", "Mumbai", "Hanoi"]
+
+
+def _weighted(rng: random.Random, table):
+    total = sum(w for _, w in table)
+    pick = rng.uniform(0, total)
+    for value, weight in table:
+        pick -= weight
+        if pick <= 0:
+            return value
+    return table[-1][0]
+
+
+def _synthetic_overpass(count: int = 2000) -> dict:
+    rng = random.Random(SEED)
+    elements = []
+    for i in range(count):
+        tags: Dict[str, str] = {}
+        if rng.random() < 0.82:
+            tags["amenity"] = _weighted(rng, _AMENITIES)
+        else:
+            tags["tourism"] = _weighted(rng, _TOURISM)
+        if rng.random() < 0.93:  # some OSM POIs have no name
+            tags["name"] = f"{rng.choice(_NAME_PARTS)} {rng.choice(_NAME_WORDS)}"
+            if rng.random() < 0.2:
+                tags["name:en"] = tags["name"]
+        if tags.get("amenity") in ("restaurant", "fast_food", "cafe") and rng.random() < 0.7:
+            tags["cuisine"] = rng.choice(_CUISINES)
+        hours = rng.choice(_HOURS)
+        if hours:
+            tags["opening_hours"] = hours
+        if rng.random() < 0.45:
+            tags["website"] = f"https://example.org/venue/{i}"
+        if rng.random() < 0.4:
+            tags["phone"] = f"+33 1 {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}"
+        if rng.random() < 0.6:
+            tags["addr:street"] = rng.choice(_STREETS)
+            tags["addr:housenumber"] = str(rng.randint(1, 180))
+            tags["addr:postcode"] = f"750{rng.randint(1, 20):02d}"
+        for key, p in (("outdoor_seating", 0.3), ("wheelchair", 0.25), ("takeaway", 0.2)):
+            if rng.random() < p:
+                tags[key] = rng.choice(["yes", "yes", "no"])
+        if rng.random() < 0.01:
+            tags["disused:amenity"] = "restaurant"
+        lat = CITY_CENTER[0] + rng.uniform(-0.06, 0.06)
+        lon = CITY_CENTER[1] + rng.uniform(-0.09, 0.09)
+        if rng.random() < 0.75:
+            elements.append({"type": "node", "id": 100000 + i, "lat": round(lat, 7), "lon": round(lon, 7), "tags": tags})
+        else:
+            elements.append({"type": "way", "id": 500000 + i, "center": {"lat": round(lat, 7), "lon": round(lon, 7)},
+                             "tags": tags})
+    return {"version": 0.6, "generator": "benchmarks synthetic", "elements": elements}
+
+
+@lru_cache(maxsize=None)
+def overpass_response() -> dict:
+    """A ~2,000 element Overpass response for a large city"""
+    if OVERPASS_FIXTURE.exists():
+        with gzip.open(OVERPASS_FIXTURE, "rt", encoding="utf-8") as f:
+            return json.load(f)
+    return _synthetic_overpass()
+
+
+@lru_cache(maxsize=None)
+def venues(count: int = 200) -> List[dict]:
+    """Normalized venues (the shape enrich/quality scoring see) from the Overpass fixture"""
+    from city_guides.providers.overpass_provider import process_venue_results
+    out = process_venue_results(overpass_response()["elements"], limit=count)
+    for v in out:
+        tags = v["tags"]
+        if tags.get("addr:street"):
+            v["address"] = f"{tags.get('addr:housenumber', '')} {tags['addr:street']}, {tags.get('addr:postcode', '')} Paris".strip()
+    return out
+
+
+def opening_hours() -> List[str]:
+    return [v["opening_hours"] for v in venues() if v.get("opening_hours")]
+
+
+@lru_cache(maxsize=None)
+def neighborhoods(count: int = 150) -> List[dict]:
+    """OSM/GeoNames-style neighborhood candidates, mixed scripts and noise included"""
+    rng = random.Random(SEED + 1)
+    names = ["Le Marais", "Montmartre", "Saint-Germain-des-Prés", "Quartier Latin", "Belleville", "Bastille",
+             "Canal Saint-Martin", "Pigalle", "Batignolles", "Bercy", "Oberkampf", "Butte-aux-Cailles",
+             "Cité Universitaire", "Zone Industrielle Nord", "Résidence Les Pins 12", "Lotissement 4",
+             "Αγία Παρασκευή", "Δημοτική Κοινότητα Αθηναίων", "หมู่บ้านพฤกษา 40", "Старый Арбат", "新宿"]
+    out = []
+    for i in range(count):
+        name = names[i % len(names)] if i < len(names) else f"{rng.choice(names)} {rng.randint(1, 30)}"
+        entry = {
+            "name": name,
+            "source": rng.choice(["osm", "osm", "geonames", "curated"]) if i < 40 else rng.choice(["osm", "geonames"]),
+            "center": {"lat": CITY_CENTER[0] + rng.uniform(-0.08, 0.08), "lon": CITY_CENTER[1] + rng.uniform(-0.1, 0.1)},
+            "tags": {"place": rng.choice(["suburb", "neighbourhood", "quarter"])},
+        }
+        if rng.random() < 0.3:
+            entry["tags"]["name:en"] = name
+        if entry["source"] == "curated":
+            entry["curated_priority"] = 1000 - i
+        out.append(entry)
+    return out
+
+
+@lru_cache(maxsize=None)
+def category_candidates() -> List[dict]:
+    """Per-source category hits as combine_and_score_categories receives them"""
+    rng = random.Random(SEED + 2)
+    categories = ["Food & Dining", "Museums", "Nightlife", "Parks", "Shopping", "History", "Art Galleries",
+                  "Coffee", "Architecture", "Markets", "Street Art", "Wine Bars", "Live Music", "Bakeries",
+                  "Rooftops", "Riverside Walks", "Theatre", "Fashion", "Bookshops", "Jazz Clubs"]
+    sources = ["fun_facts_distinctive", "distinctive_features", "fun_facts", "city_guide", "wikipedia", "ddgs"]
+    return [{"category": rng.choice(categories), "confidence": round(rng.uniform(0.3, 1.0), 2),
+             "source": rng.choice(sources)} for _ in range(300)]
+
+
+def llm_text() -> str:
+    """A first-person, chatty LLM paragraph of the kind neutralize_tone cleans up"""
+    return (
+        "Hey there! I'm Marco and I absolutely love this part of town. In my opinion, Le Marais is one of my "
+        "favorite places in Paris. I recommend you start at Place des Vosges, where I usually grab a coffee. "
+        "We think you'll adore the falafel on Rue des Rosiers - my personal pick is L'As du Fallafel. "
+        "I've been coming here for years and I'd say the museums are our best-kept secret: the Musée Carnavalet "
+        "is free, and I'm sure you'll enjoy the Picasso museum too. Let me tell you, our evenings here are magical. "
+    ) * 4
+
+
+def record_overpass(city: str, out: Path = OVERPASS_FIXTURE) -> int:
+    """Fetch and store a live Overpass response (food, drink and sights) for ``city``"""
+    import requests
+
+    geo = requests.get("https://nominatim.openstreetmap.org/search",
+                       params={"q": city, "format": "json", "limit": 1},
+                       headers={"User-Agent": "TravelLand-benchmarks/1.0"}, timeout=20).json()
+    south, north, west, east = (float(x) for x in geo[0]["boundingbox"])
+    query = (f"[out:json][timeout:90];(node[amenity~\"restaurant|cafe|bar|pub|fast_food\"]"
+             f"({south},{west},{north},{east});node[tourism~\"museum|attraction\"]({south},{west},{north},{east}););"
+             "out center 2000;")
+    data = requests.post("https://overpass-api.de/api/interpreter", data={"data": query}, timeout=120).json()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(out, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return len(data.get("elements", []))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark fixture tools")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    rec = sub.add_parser("record-overpass", help="record a live Overpass response for a city")
+    rec.add_argument("city")
+    args = parser.parse_args(argv)
+    if args.cmd == "record-overpass":
+        print(f"recorded {record_overpass(args.city)} elements to {OVERPASS_FIXTURE}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
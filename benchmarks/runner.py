@@ -0,0 +1,154 @@
+"""
+Timing, allocation measurement and baseline comparison for benchmarks.
+
+Timing follows timeit: the op count per round is calibrated so a round takes
+at least ``round_time`` seconds, GC is off while timing, and the fastest of
+``rounds`` rounds is reported (the least disturbed by other load) along with
+the median.
+
+Run-to-run noise on shared machines is mostly whole-machine (CPU frequency,
+neighbours), so each benchmark's rounds are interleaved with rounds of a fixed
+pure-Python calibration workload, and the baseline gate compares
+``ns_per_op / calibration_ns`` rather than raw nanoseconds. That also makes a
+baseline recorded on one machine usable on a faster or slower one.
+
+Allocations are measured on a separate, untimed call under tracemalloc:
+``peak_bytes`` is the peak extra memory the op held while running and
+``alloc_blocks`` the number of blocks still alive when it returned (its result
+and anything it cached). CPython has no cheap per-op allocation counter, so
+these two stand in for Go-style allocs/op.
+"""
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.25  # fail when an op gets 25% slower (or allocates 25% more) than the baseline
+
+
+def _time_ops(fn: Callable[[], object], n: int) -> float:
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            fn()
+        return time.perf_counter_ns() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def calibration_op() -> int:
+    """Fixed mix of the work the hot paths do: dict/str churn, sorting, float math"""
+    rows = [{"name": f"venue {i}", "score": (i * 7919) % 101, "lat": i * 0.001} for i in range(200)]
+    total = 0
+    for r in sorted(rows, key=lambda r: (r["score"], r["name"])):
+        total += len(r["name"].lower().split()) + int(r["lat"] * 1000) % 7
+    return total
+
+
+def _calibrate(fn: Callable[[], object], round_time: float) -> int:
+    fn()  # warm caches and lazy imports
+    n = 1
+    while True:
+        elapsed = _time_ops(fn, n)
+        if elapsed >= round_time * 1e9 or n >= 1_000_000:
+            return n
+        n = max(n * 2, int(n * round_time * 1e9 / max(elapsed, 1) * 1.1))
+
+
+def measure_time(fn: Callable[[], object], round_time: float = 0.05, rounds: int = 9) -> Dict[str, float]:
+    n = _calibrate(fn, round_time)
+    n_cal = _calibrate(calibration_op, round_time / 2)
+    per_op, cal = [], []
+    for _ in range(rounds):
+        cal.append(_time_ops(calibration_op, n_cal) / n_cal)
+        per_op.append(_time_ops(fn, n) / n)
+    # paired per round, so a slow patch of the machine hits both sides of the ratio
+    relative = statistics.median(p / c for p, c in zip(per_op, cal))
+    return {"ns_per_op": min(per_op), "ns_per_op_median": statistics.median(per_op), "ops_per_round": n,
+            "calibration_ns": min(cal), "relative": relative}
+
+
+def measure_allocations(fn: Callable[[], object]) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        tracemalloc.stop()
+    # blocks still alive right after the op (result included), net of what existed before;
+    # the measurement's own allocations (snapshots, counters) are left out
+    own = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(own).compare_to(before.filter_traces(own), "traceback")
+    grown = sum(max(0, stat.count_diff) for stat in diff)
+    return {"alloc_blocks": grown, "peak_bytes": max(0, peak - base)}
+
+
+def run_benchmark(setup: Callable[[], Callable[[], object]], round_time: float = 0.05,
+                  rounds: int = 9) -> Dict[str, float]:
+    fn = setup()
+    result = measure_time(fn, round_time, rounds)
+    result.update(measure_allocations(fn))
+    return result
+
+
+def load_baseline(path: Path = BASELINE_FILE) -> dict:
+    if not Path(path).exists():
+        return {"benchmarks": {}}
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def save_baseline(results: Dict[str, dict], path: Path = BASELINE_FILE, previous: Optional[dict] = None) -> None:
+    entries = {}
+    for name, r in sorted(results.items()):
+        entry = {"ns_per_op": round(r["ns_per_op"]), "relative": round(r["relative"], 4),
+                 "peak_bytes": r["peak_bytes"], "alloc_blocks": r["alloc_blocks"]}
+        old = ((previous or {}).get("benchmarks") or {}).get(name) or {}
+        if "threshold" in old:  # keep hand-tuned per-benchmark thresholds
+            entry["threshold"] = old["threshold"]
+        entries[name] = entry
+    data = {
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(),
+                    "processor": platform.processor() or platform.machine()},
+        "benchmarks": entries,
+    }
+    Path(path).write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> Dict[str, dict]:
+    """Per-benchmark ratios against the baseline and whether each one regressed.
+
+    Time (calibration-relative) and peak memory are both gated; ``threshold``
+    in a baseline entry overrides the global one for noisy cases.
+    """
+    report = {}
+    for name, r in results.items():
+        base = (baseline.get("benchmarks") or {}).get(name)
+        if not base:
+            report[name] = {"status": "new"}
+            continue
+        limit = 1.0 + base.get("threshold", threshold)
+        time_ratio = r["relative"] / base["relative"] if base.get("relative") else 1.0
+        mem_ratio = r["peak_bytes"] / base["peak_bytes"] if base.get("peak_bytes") else 1.0
+        regressed = [k for k, ratio in (("time", time_ratio), ("memory", mem_ratio)) if ratio > limit]
+        report[name] = {
+            "status": "regressed" if regressed else "ok",
+            "regressed": regressed,
+            "time_ratio": round(time_ratio, 3),
+            "memory_ratio": round(mem_ratio, 3),
+        }
+    return report
@@ -9,6 +9,8 @@ import aiohttp
 from typing import List, Dict, Optional
 import logging
 
+from city_guides.providers import http_clients
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -124,7 +126,7 @@ class TravelLandRecommender:
         }
 
         try:
-            session = self.session or aiohttp.ClientSession()
+            session = self.session or http_clients.get_session()
             try:
                 async with session.post(GROQ_CHAT_URL, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
                     resp.raise_for_status()
@@ -0,0 +1,171 @@
+"""
+Per-provider circuit breakers with adaptive timeouts for the POI fan-out.
+
+Each provider keeps a rolling window of recent call outcomes. The breaker
+opens when the window's error rate or slow-call rate crosses its threshold,
+rejects calls while open, and after a cool-down lets a single probe through
+(half-open): a successful probe closes it, a failed one re-opens it with a
+longer cool-down.
+
+Timeouts adapt to the provider's observed tail latency: the p95 of recent
+calls times a headroom factor, clamped between a floor and the caller's
+ceiling. A provider that is usually fast therefore fails fast when it degrades
+instead of holding every search for the full static timeout. Timed-out calls
+count as samples of their full duration, so the timeout grows back when a
+provider settles at a slower pace, and the half-open probe always gets the
+ceiling.
+"""
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))  # outcomes kept per provider
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))  # before the rates are trusted
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", "8.0"))  # seconds
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))  # first open period (seconds)
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "600"))
+ADAPTIVE_TIMEOUT_FACTOR = float(os.getenv("ADAPTIVE_TIMEOUT_FACTOR", "2.0"))  # headroom over p95
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv("ADAPTIVE_TIMEOUT_MIN", "2.0"))  # seconds
+ADAPTIVE_TIMEOUT_SAMPLES = int(os.getenv("ADAPTIVE_TIMEOUT_SAMPLES", "50"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Error-rate / latency breaker plus adaptive timeout for one provider"""
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, slow_rate: float = BREAKER_SLOW_RATE,
+                 slow_call: float = BREAKER_SLOW_CALL, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_call = slow_call
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.trips = 0
+        self.rejected = 0
+        self.opened_at = 0.0
+        self.cooldown = cooldown
+        self.last_error: Optional[str] = None
+        self._outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)  # (ok, seconds)
+        self._latencies: Deque[float] = deque(maxlen=ADAPTIVE_TIMEOUT_SAMPLES)
+        self._probe_inflight = False
+
+    # -- admission -----------------------------------------------------------------
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether a call may go out now (claims the probe slot when half-open)"""
+        now = now or time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_inflight = False
+        if self.state == HALF_OPEN:
+            if self._probe_inflight:
+                self.rejected += 1
+                return False
+            self._probe_inflight = True
+        return True
+
+    def timeout(self, ceiling: float) -> float:
+        """Adaptive timeout: p95 of recent calls times headroom, within [floor, ceiling]"""
+        if self.state == HALF_OPEN or len(self._latencies) < self.min_calls:
+            return ceiling
+        lat = sorted(self._latencies)
+        p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+        return max(min(ADAPTIVE_TIMEOUT_MIN, ceiling), min(ceiling, p95 * ADAPTIVE_TIMEOUT_FACTOR))
+
+    # -- outcomes ------------------------------------------------------------------
+
+    def record_success(self, seconds: float, now: Optional[float] = None) -> None:
+        self._latencies.append(seconds)
+        if self.state == HALF_OPEN:
+            self._close()
+            return
+        self._outcomes.append((True, seconds))
+        self._evaluate(now)
+
+    def record_failure(self, seconds: float, error: str = "", now: Optional[float] = None,
+                       timed_out: bool = False) -> None:
+        self.last_error = error or None
+        if timed_out:
+            # the call took at least this long; without the sample the timeout could only shrink
+            self._latencies.append(seconds)
+        if self.state == HALF_OPEN:
+            self._open(now, escalate=True)
+            return
+        self._outcomes.append((False, seconds))
+        self._evaluate(now)
+
+    def abandon(self) -> None:
+        """A call was cancelled by its caller: count nothing, but free the half-open probe"""
+        self._probe_inflight = False
+
+    def _evaluate(self, now: Optional[float]) -> None:
+        if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        total = len(self._outcomes)
+        errors = sum(1 for ok, _ in self._outcomes if not ok)
+        slow = sum(1 for _, s in self._outcomes if s >= self.slow_call)
+        if errors / total >= self.error_rate or slow / total >= self.slow_rate:
+            self._open(now)
+
+    def _open(self, now: Optional[float], escalate: bool = False) -> None:
+        self.cooldown = min(self.max_cooldown, self.cooldown * 2) if escalate else self.base_cooldown
+        self.state = OPEN
+        self.opened_at = now or time.monotonic()
+        self.trips += 1
+        self._probe_inflight = False
+        self._outcomes.clear()
+
+    def _close(self) -> None:
+        self.state = CLOSED
+        self.cooldown = self.base_cooldown
+        self._probe_inflight = False
+        self._outcomes.clear()
+
+    def snapshot(self, ceiling: float = 12.0) -> Dict[str, Any]:
+        total = len(self._outcomes)
+        errors = sum(1 for ok, _ in self._outcomes if not ok)
+        out = {
+            "state": self.state,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "error_rate": round(errors / total, 2) if total else 0.0,
+            "timeout": round(self.timeout(ceiling), 2),
+            "last_error": self.last_error,
+        }
+        if self.state == OPEN:
+            out["retry_in"] = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+        return out
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """Registry accessor: one breaker per provider name"""
+    b = _breakers.get(name)
+    if b is None:
+        b = _breakers[name] = CircuitBreaker(name)
+    return b
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Breaker states for /healthz and the admin dashboard"""
+    return {name: b.snapshot() for name, b in sorted(_breakers.items())}
+
+
+def reset() -> None:
+    _breakers.clear()
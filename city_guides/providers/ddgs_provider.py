@@ -5,6 +5,10 @@
 import os
 from ddgs import DDGS
 
+# Optional JSON search endpoint used instead of the DDGS library (GET ?q=&backend=&max_results=,
+# returning a list of {title, href, body}); the load-test harness points it at a local stand-in
+DDGS_ENDPOINT = os.getenv("DDGS_ENDPOINT", "")
+
 async def ddgs_search(query, engine="google", max_results=3, timeout=5):
     """
     Search the web using DDGS (supports: google, brave, yahoo, yandex, duckduckgo).
@@ -40,9 +44,21 @@ async def ddgs_search(query, engine="google", max_results=3, timeout=5):
             except Exception:
                 return []
 
+    async def _search_endpoint():
+        from city_guides.providers import http_clients
+        params = {"q": query, "backend": engine, "max_results": str(max_results)}
+        async with http_clients.get_session() as session:
+            async with session.get(DDGS_ENDPOINT, params=params) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"search endpoint returned {resp.status}")
+                return (await resp.json())[:max_results]
+
     loop = asyncio.get_running_loop()
     try:
-        results = await asyncio.wait_for(loop.run_in_executor(ThreadPoolExecutor(), _search), timeout=timeout)
+        if DDGS_ENDPOINT:
+            results = await asyncio.wait_for(_search_endpoint(), timeout=timeout)
+        else:
+            results = await asyncio.wait_for(loop.run_in_executor(ThreadPoolExecutor(), _search), timeout=timeout)
     except asyncio.TimeoutError:
         # Search timed out; return empty list to allow graceful fallback
         try:
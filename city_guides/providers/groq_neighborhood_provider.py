@@ -58,7 +58,7 @@ class GroqNeighborhoodProvider:
             ]
             
             # Call Groq API
-            import aiohttp
+            from city_guides.providers import http_clients
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
@@ -71,7 +71,7 @@ class GroqNeighborhoodProvider:
                 "max_tokens": 500
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_clients.get_session() as session:
                 async with session.post(self.api_url, headers=headers, json=payload, timeout=15) as resp:
                     if resp.status == 200:
                         response_data = await resp.json()
@@ -0,0 +1,387 @@
+"""
+Shared HTTP client registry for providers and routes.
+
+One aiohttp ``TCPConnector`` (DNS cache, keep-alive, global and per-host
+connection limits) backs every outbound request. ``get_session()`` returns a
+``ProfiledSession`` that looks like an ``aiohttp.ClientSession`` to callers
+(``get``/``post``/``request``, ``async with``) but:
+
+- applies the upstream's profile (timeout, retries with backoff, User-Agent,
+  concurrency cap) chosen by host, unless the caller passed its own values;
+  concurrency caps are process-wide, shared by every session and loop;
+- records request counts, retries, errors and latency per host
+  (``snapshot()`` for /healthz, ``http.<host>.*`` counters in metrics);
+- ignores ``close()``: the pool lives until ``close()`` in this module is
+  called at shutdown, so ``async with get_session() as s`` is a drop-in for
+  ``async with aiohttp.ClientSession() as s``.
+
+The pool belongs to the serving event loop; see ``get_session()`` and
+``close_loop_session()`` for calls made from temporary loops.
+
+``HTTP_UPSTREAM_OVERRIDES`` (``profile=base_url,...``) sends a profile's
+traffic to another base URL, keeping the original path and query and naming
+the real host in ``X-Upstream-Host``. The load-test harness
+(``tools/load_test.py``) uses it to point the app at local stand-ins.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))  # total open connections
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "16"))
+HTTP_DNS_TTL = int(os.getenv("HTTP_DNS_TTL", "300"))  # seconds
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "30"))  # idle keep-alive (seconds)
+HTTP_LATENCY_SAMPLES = int(os.getenv("HTTP_LATENCY_SAMPLES", "200"))  # per host, for snapshot percentiles
+
+DEFAULT_USER_AGENT = "TravelLand/1.0 (+https://github.com/markcodeman/travelland)"
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+@dataclass(frozen=True)
+class HttpProfile:
+    """Request defaults for one upstream"""
+    name: str
+    hosts: Tuple[str, ...] = ()  # host suffixes this profile applies to
+    timeout: float = 15.0
+    connect_timeout: float = 5.0
+    retries: int = 1  # extra attempts for idempotent requests
+    backoff: float = 0.3  # base delay; doubles per attempt, with jitter
+    max_concurrency: int = 0  # per-host cap on top of the pool limit (0 = pool limit only)
+    user_agent: str = DEFAULT_USER_AGENT
+
+
+PROFILES: Dict[str, HttpProfile] = {p.name: p for p in (
+    HttpProfile("default"),
+    HttpProfile("wikipedia", ("wikipedia.org", "wikimedia.org", "wikidata.org"), timeout=10, retries=2),
+    # Nominatim usage policy: at most one concurrent request per application
+    HttpProfile("nominatim", ("nominatim.openstreetmap.org",), timeout=10, max_concurrency=1),
+    HttpProfile("overpass", ("overpass-api.de", "overpass.kumi.systems", "overpass.openstreetmap.ru",
+                             "overpass.private.coffee"), timeout=30, backoff=1.0, max_concurrency=4),
+    HttpProfile("geoapify", ("api.geoapify.com",), timeout=10, retries=2),
+    HttpProfile("opentripmap", ("api.opentripmap.com",), timeout=15),
+    HttpProfile("mapillary", ("graph.mapillary.com",), timeout=10, user_agent="city-guides-mapillary"),
+    HttpProfile("open-meteo", ("api.open-meteo.com",), timeout=10, retries=2),
+    HttpProfile("geonames", ("api.geonames.org", "secure.geonames.org"), timeout=10),
+    HttpProfile("media", ("pixabay.com", "api.unsplash.com"), timeout=10),
+    HttpProfile("exchange-rates", ("api.exchangerate-api.com", "restcountries.com"), timeout=10, retries=2),
+    HttpProfile("groq", ("api.groq.com",), timeout=30, retries=0),
+)}
+
+
+def _parse_overrides(raw: str) -> Dict[str, str]:
+    out = {}
+    for item in (raw or "").split(","):
+        name, sep, base = item.partition("=")
+        if sep and name.strip() and base.strip():
+            out[name.strip()] = base.strip().rstrip("/")
+    return out
+
+
+UPSTREAM_OVERRIDES: Dict[str, str] = _parse_overrides(os.getenv("HTTP_UPSTREAM_OVERRIDES", ""))
+
+
+def upstream_url(url: Any, profile: "HttpProfile") -> Any:
+    """Rewrite ``url`` onto the profile's override base URL, if one is configured"""
+    base = UPSTREAM_OVERRIDES.get(profile.name)
+    if not base:
+        return url
+    parts = urlsplit(str(url))
+    target = urlsplit(base)
+    return urlunsplit((target.scheme, target.netloc, target.path + parts.path, parts.query, ""))
+
+
+def profile_for(host: str) -> HttpProfile:
+    host = (host or "").lower()
+    for profile in PROFILES.values():
+        if any(host == h or host.endswith("." + h) for h in profile.hosts):
+            return profile
+    return PROFILES["default"]
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "retries", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies: Deque[float] = deque(maxlen=HTTP_LATENCY_SAMPLES)
+
+
+class _HostGate:
+    """Per-host concurrency cap shared by every session, loop and thread"""
+
+    def __init__(self, limit: int):
+        self._sem = threading.BoundedSemaphore(limit)
+
+    async def acquire(self) -> None:
+        delay = 0.005
+        while not self._sem.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self) -> None:
+        self._sem.release()
+
+
+_gates: Dict[str, _HostGate] = {}
+_registry_lock = threading.Lock()
+
+
+def _gate(host: str, profile: HttpProfile) -> Optional[_HostGate]:
+    if profile.max_concurrency <= 0:
+        return None
+    gate = _gates.get(host)
+    if gate is None:
+        with _registry_lock:
+            gate = _gates.setdefault(host, _HostGate(profile.max_concurrency))
+    return gate
+
+
+def _emit(name: str, ms: Optional[float] = None) -> None:
+    """Best-effort push to the shared metrics store without blocking the request"""
+    try:
+        from city_guides.src.metrics import increment, observe_latency
+        loop = asyncio.get_running_loop()
+        loop.create_task(observe_latency(name, ms) if ms is not None else increment(name))
+    except Exception:
+        pass
+
+
+class _ProfiledRequest:
+    """Awaitable / async context manager around one logical request (with retries)"""
+
+    def __init__(self, client: "ProfiledSession", method: str, url: Any, kwargs: Dict[str, Any]):
+        self._client = client
+        self._method = method.upper()
+        self._url = url
+        self._kwargs = kwargs
+        self._response: Optional[aiohttp.ClientResponse] = None
+        self._slot: Optional[_HostGate] = None
+
+    def __await__(self):
+        return self._send_detached().__await__()
+
+    async def _send_detached(self) -> aiohttp.ClientResponse:
+        # Plain `await session.get(...)`: the caller owns the response, so the
+        # concurrency slot is only held until the headers arrive
+        try:
+            return await self._send()
+        finally:
+            if self._slot is not None:
+                self._slot.release()
+                self._slot = None
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        return await self._send()
+
+    async def __aexit__(self, *exc) -> None:
+        if self._response is not None:
+            self._response.release()
+        if self._slot is not None:
+            self._slot.release()
+            self._slot = None
+
+    async def _send(self) -> aiohttp.ClientResponse:
+        host = urlsplit(str(self._url)).hostname or ""
+        profile = profile_for(host)
+        kwargs = dict(self._kwargs)
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = aiohttp.ClientTimeout(total=profile.timeout, sock_connect=profile.connect_timeout)
+        headers = kwargs.get("headers")
+        if not headers or not any(k.lower() == "user-agent" for k in headers):
+            kwargs["headers"] = {**(headers or {}), "User-Agent": profile.user_agent}
+        attempts = 1 + (profile.retries if self._method in IDEMPOTENT_METHODS else 0)
+        url = upstream_url(self._url, profile)
+        if url is not self._url:
+            kwargs["headers"] = {**kwargs["headers"], "X-Upstream-Host": host}
+
+        slot = _gate(host, profile)
+        if slot is not None:
+            await slot.acquire()
+            self._slot = slot
+        stats = self._client._stats_for(host)
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    stats.retries += 1
+                    _emit(f"http.{host}.retries")
+                    await asyncio.sleep(profile.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+                started = time.perf_counter()
+                stats.requests += 1
+                try:
+                    response = await self._client.session.request(self._method, url, **kwargs)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    stats.errors += 1
+                    _emit(f"http.{host}.errors")
+                    if attempt + 1 < attempts:
+                        continue
+                    raise
+                ms = (time.perf_counter() - started) * 1000
+                stats.latencies.append(ms)
+                _emit(f"http.{host}", ms)
+                if response.status >= 500 or response.status == 429:
+                    stats.errors += 1
+                    _emit(f"http.{host}.errors")
+                    if response.status in RETRY_STATUSES and attempt + 1 < attempts:
+                        response.release()
+                        continue
+                self._response = response
+                return response
+        except BaseException:
+            if self._slot is not None:
+                self._slot.release()
+                self._slot = None
+            raise
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+
+class ProfiledSession:
+    """ClientSession look-alike over the shared connection pool"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self._loop = asyncio.get_running_loop()
+        self.stats: Dict[str, _HostStats] = {}
+
+    def _stats_for(self, host: str) -> _HostStats:
+        stats = self.stats.get(host)
+        if stats is None:
+            stats = self.stats[host] = _HostStats()
+        return stats
+
+    def request(self, method: str, url: Any, **kwargs: Any) -> _ProfiledRequest:
+        return _ProfiledRequest(self, method, url, kwargs)
+
+    def get(self, url: Any, **kwargs: Any) -> _ProfiledRequest:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: Any, **kwargs: Any) -> _ProfiledRequest:
+        return self.request("POST", url, **kwargs)
+
+    def head(self, url: Any, **kwargs: Any) -> _ProfiledRequest:
+        return self.request("HEAD", url, **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed
+
+    async def close(self) -> None:
+        """Borrowers don't own the pool (see module-level close() and close_loop_session())"""
+
+    async def __aenter__(self) -> "ProfiledSession":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+_client: Optional[ProfiledSession] = None
+_loop_clients: Dict[asyncio.AbstractEventLoop, ProfiledSession] = {}  # temporary loops
+
+
+def _new_client() -> ProfiledSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_TTL,
+        use_dns_cache=True,
+        keepalive_timeout=HTTP_KEEPALIVE,
+    )
+    return ProfiledSession(aiohttp.ClientSession(connector=connector))
+
+
+def _discard(client: ProfiledSession) -> None:
+    """Release a session whose loop is already closed (nothing left to await on)"""
+    try:
+        connector = client.session.connector
+        client.session.detach()
+        if connector is not None:
+            connector._close()
+    except Exception:
+        logger.debug("Could not release a stale HTTP session", exc_info=True)
+
+
+def get_session() -> ProfiledSession:
+    """Shared pooled session, created on first use in the serving event loop.
+
+    Code running on a different, still-open loop (sync helpers that spin up a
+    temporary loop with run_until_complete) gets that loop's private session
+    instead: one per loop, shared by every caller on it, and like the shared
+    one it ignores ``close()``. Run ``close_loop_session()`` on the loop before
+    closing it; sessions of loops closed without it are released on the next
+    call.
+    """
+    global _client
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        for stale in [other for other in _loop_clients if other.is_closed()]:
+            _discard(_loop_clients.pop(stale))
+        if _client is not None and _client._loop.is_closed():
+            _discard(_client)
+            _client = None
+        if _client is None or _client.closed:
+            _client = _new_client()
+        if _client._loop is loop:
+            return _client
+        private = _loop_clients.get(loop)
+        if private is None or private.closed:
+            private = _loop_clients[loop] = _new_client()
+        return private
+
+
+async def close_loop_session() -> None:
+    """Close the running loop's private session (call before closing a temporary loop)"""
+    with _registry_lock:
+        private = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if private is not None and not private.closed:
+        await private.session.close()
+
+
+def serving_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The running loop the shared pool lives on (None before startup or after shutdown)"""
+    client = _client
+    if client is None or client.closed or client._loop.is_closed() or not client._loop.is_running():
+        return None
+    return client._loop
+
+
+async def close() -> None:
+    """Close the shared pool (app shutdown)"""
+    global _client
+    client, _client = _client, None
+    if client is not None and not client.closed:
+        await client.session.close()
+
+
+def snapshot() -> Dict[str, Any]:
+    """Per-host request/error/latency summary for /healthz"""
+    if _client is None:
+        return {}
+    out = {}
+    for host, stats in sorted(_client.stats.items()):
+        lat = sorted(stats.latencies)
+        out[host] = {
+            "profile": profile_for(host).name,
+            "requests": stats.requests,
+            "errors": stats.errors,
+            "retries": stats.retries,
+            "p50_ms": round(lat[len(lat) // 2], 1) if lat else None,
+            "p95_ms": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 1) if lat else None,
+        }
+    return out
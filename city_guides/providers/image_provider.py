@@ -1,38 +1,96 @@
 import os
 import json
+import asyncio
+import hashlib
 import aiohttp
 import datetime
 import threading
 from pathlib import Path
 from urllib.parse import urlparse
 import re
+from functools import lru_cache
+
+from city_guides.providers import http_clients
+
+
+@lru_cache(maxsize=None)
+def _pil():
+    """Pillow's (Image, ImageOps, features), imported on the first derivative build.
+
+    Pillow is optional: without it (None) the original download is served as-is.
+    """
+    try:
+        from PIL import Image, ImageOps, features
+    except ImportError:
+        return None
+    return Image, ImageOps, features
 
 _CACHE_FILE = Path(__file__).resolve().parents[1] / "data" / "banner_cache.json"
 _CACHE_LOCK = threading.Lock()
 _BANNERS_DIR = Path(__file__).resolve().parents[1] / "static" / "banners"
+_INCOMING_DIR = _BANNERS_DIR / ".incoming"
 
+# Local banner derivatives (BANNER_STORE_LOCAL=1): every downloaded banner is
+# resized once to these widths and saved as WebP and JPEG under a content-hashed
+# name (`<slug>-<sha256[:12]>-<width>.<ext>`), so the files can be served with
+# immutable caching and clients pick a size through `srcset`.
+BANNER_WIDTHS = sorted({int(w) for w in os.getenv("BANNER_WIDTHS", "480,960,1600").split(",") if w.strip()})
+BANNER_WEBP_QUALITY = int(os.getenv("BANNER_WEBP_QUALITY", "80"))
+BANNER_JPEG_QUALITY = int(os.getenv("BANNER_JPEG_QUALITY", "82"))
+BANNER_URL_PREFIX = "/static/banners/"
+BANNER_MIMETYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+_EXT_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
 
-def _load_cache():
+
+# Parsed banner_cache.json, reloaded only when the file's mtime changes
+_cache_data = {}
+_cache_mtime = None
+
+
+def _file_mtime():
     try:
-        if not _CACHE_FILE.exists():
-            return {}
-        with _CACHE_FILE.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+        return _CACHE_FILE.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_cache():
+    """Return the banner cache dict (callers hold _CACHE_LOCK)"""
+    global _cache_data, _cache_mtime
+    mtime = _file_mtime()
+    if mtime is None:
+        _cache_data, _cache_mtime = {}, None
+    elif mtime != _cache_mtime:
+        try:
+            with _CACHE_FILE.open("r", encoding="utf-8") as f:
+                _cache_data = json.load(f)
+        except Exception:
+            _cache_data = {}
+        _cache_mtime = mtime
+    return _cache_data
 
 
 def _write_cache(c):
+    global _cache_data, _cache_mtime
+    _cache_data = c
     try:
         _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
         tmp = _CACHE_FILE.with_suffix(".tmp")
         with tmp.open("w", encoding="utf-8") as f:
             json.dump(c, f, ensure_ascii=False, indent=2)
         tmp.replace(_CACHE_FILE)
+        _cache_mtime = _file_mtime()
     except Exception:
         pass
 
 
+def _store_record(key, rec):
+    with _CACHE_LOCK:
+        c = dict(_load_cache())
+        c[key] = rec
+        _write_cache(c)
+
+
 def _is_expired(iso_str, ttl_days):
     try:
         dt = datetime.datetime.fromisoformat(iso_str)
@@ -72,7 +130,7 @@ async def fetch_banner_from_wikipedia(city, session: aiohttp.ClientSession = Non
     # Create a session if caller didn't provide one, and ensure it's closed.
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -167,39 +225,136 @@ async def fetch_banner_from_wikipedia(city, session: aiohttp.ClientSession = Non
 
 
 async def _download_image(url, dest_path, session: aiohttp.ClientSession = None):
+    """Stream `url` to `dest_path`; returns the body's sha256 hex digest, or None on failure"""
     tmp = dest_path.with_suffix(dest_path.suffix + ".tmp")
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
-    else:
-        own_session = False
+    digest = hashlib.sha256()
     try:
         async with session.get(url, headers={"User-Agent": "TravelLand/1.0"}, timeout=12) as r:
             if r.status != 200:
-                if own_session:
-                    await session.close()
-                return False
-            _ensure_banners_dir()
+                return None
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
             with tmp.open("wb") as f:
-                while True:
-                    chunk = await r.content.read(8192)
-                    if not chunk:
-                        break
+                async for chunk in r.content.iter_chunked(64 * 1024):
+                    digest.update(chunk)
                     f.write(chunk)
         tmp.replace(dest_path)
-        if own_session:
-            await session.close()
-        return True
+        return digest.hexdigest()
     except Exception:
         try:
             if tmp.exists():
                 tmp.unlink()
         except Exception:
             pass
+        return None
+    finally:
         if own_session:
             await session.close()
-        return False
+
+
+def _save_atomic(img, path, fmt, **params):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    img.save(tmp, format=fmt, **params)
+    tmp.replace(path)
+
+
+def _build_derivatives(src, slug, content_hash):
+    """Resize a downloaded banner into the configured widths and formats (blocking; run in a thread).
+
+    Files are named after the content hash, so re-processing the same image
+    is a no-op. Returns the record fields describing the variants.
+    """
+    _ensure_banners_dir()
+    stem = f"{slug}-{content_hash[:12]}"
+    pil = _pil()
+    try:
+        if pil is None:
+            fmt = _EXT_FORMATS.get(src.suffix.lower(), "jpeg")
+            filename = f"{stem}{src.suffix.lower()}"
+            src.replace(_BANNERS_DIR / filename)
+            return {"variants": {fmt: {"0": filename}}, "local_filename": filename, "content_hash": content_hash}
+
+        Image, ImageOps, features = pil
+        formats = ["jpeg"]
+        if features.check("webp"):
+            formats.insert(0, "webp")
+        variants = {fmt: {} for fmt in formats}
+        with Image.open(src) as opened:
+            img = ImageOps.exif_transpose(opened)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            width, height = img.size
+            widths = [w for w in BANNER_WIDTHS if w < width] or [width]
+            if width <= BANNER_WIDTHS[-1] and widths[-1] != width:
+                widths.append(width)
+            for w in widths:
+                h = max(1, round(height * w / width))
+                resized = None
+                for fmt in formats:
+                    ext = "jpg" if fmt == "jpeg" else fmt
+                    filename = f"{stem}-{w}.{ext}"
+                    variants[fmt][str(w)] = filename
+                    path = _BANNERS_DIR / filename
+                    if path.exists():
+                        continue
+                    if resized is None:
+                        resized = img if w == width else img.resize((w, h), Image.LANCZOS)
+                    if fmt == "webp":
+                        _save_atomic(resized, path, "WEBP", quality=BANNER_WEBP_QUALITY, method=4)
+                    else:
+                        _save_atomic(resized, path, "JPEG", quality=BANNER_JPEG_QUALITY, optimize=True, progressive=True)
+        largest = str(widths[-1])
+        return {
+            "variants": variants,
+            "local_filename": variants["jpeg"][largest],
+            "content_hash": content_hash,
+            "width": widths[-1],
+            "height": max(1, round(height * widths[-1] / width)),
+        }
+    finally:
+        try:
+            if src.exists():
+                src.unlink()
+        except Exception:
+            pass
+
+
+def _variants_present(rec):
+    variants = rec.get("variants") or {}
+    return bool(variants) and all(
+        (_BANNERS_DIR / fn).exists() for files in variants.values() for fn in files.values()
+    )
+
+
+def _srcset(rec):
+    """{mimetype: srcset string} for a record with local variants"""
+    out = {}
+    for fmt, files in (rec.get("variants") or {}).items():
+        entries = sorted(files.items(), key=lambda kv: int(kv[0]))
+        out[BANNER_MIMETYPES.get(fmt, f"image/{fmt}")] = ", ".join(
+            f"{BANNER_URL_PREFIX}{fn} {w}w" if int(w) else f"{BANNER_URL_PREFIX}{fn}" for w, fn in entries
+        )
+    return out
+
+
+def _local_banner(rec):
+    out = {
+        "url": f"{BANNER_URL_PREFIX}{rec['local_filename']}",
+        "attribution": rec.get("attribution"),
+        "srcset": _srcset(rec),
+    }
+    if rec.get("width"):
+        out["width"] = rec["width"]
+        out["height"] = rec.get("height")
+    return out
+
+
+def is_immutable_banner(filename):
+    """True for content-hashed derivative names, which never change once written"""
+    return bool(re.search(r"-[0-9a-f]{12}(-\d+)?\.[a-z]+$", filename or ""))
 
 
 async def get_banner_for_city(city, session: aiohttp.ClientSession = None):
@@ -210,6 +365,13 @@ async def get_banner_for_city(city, session: aiohttp.ClientSession = None):
       - any other value (default): return the remote Wikimedia URL directly and do not store the file locally.
 
     Cached metadata is kept in `data/banner_cache.json` either way; TTL (days) is controlled by BANNER_CACHE_TTL_DAYS.
+    The file is parsed once and re-read only when it changes on disk; Wikipedia
+    lookups go through the shared media lookup (services/media_lookup.py).
+
+    Local banners are converted once into WebP/JPEG derivatives (BANNER_WIDTHS)
+    and returned with a `srcset` map ({mimetype: srcset}). An expired record only
+    re-checks the Wikipedia metadata; the image is re-downloaded only if its
+    remote URL changed.
     """
     if not city:
         return None
@@ -218,97 +380,69 @@ async def get_banner_for_city(city, session: aiohttp.ClientSession = None):
     store_local = os.getenv("BANNER_STORE_LOCAL", "0") == "1"
 
     with _CACHE_LOCK:
-        c = _load_cache()
-        rec = c.get(key)
-        if (
-            rec
-            and rec.get("generated_at")
-            and not _is_expired(rec.get("generated_at"), ttl)
-        ):
-            # If we stored a local filename previously and local storage is enabled, prefer it
-            if store_local and rec.get("local_filename"):
-                local_fn = rec.get("local_filename")
-                local_path = _BANNERS_DIR / local_fn
-                if local_path.exists():
-                    return {
-                        "url": f"/static/banners/{local_fn}",
-                        "attribution": rec.get("attribution"),
-                    }
-            # Otherwise, if we have a remote_url cached, return it
-            if rec.get("remote_url"):
-                return {
-                    "url": rec.get("remote_url"),
-                    "attribution": rec.get("attribution"),
-                }
+        rec = _load_cache().get(key)
+    local_ready = bool(store_local and rec and rec.get("local_filename") and _variants_present(rec))
+    if rec and rec.get("generated_at") and not _is_expired(rec.get("generated_at"), ttl):
+        # If we stored local derivatives previously and local storage is enabled, prefer them
+        if local_ready:
+            return _local_banner(rec)
+        # Otherwise, if we have a remote_url cached, return it
+        if rec.get("remote_url") and not store_local:
+            return {
+                "url": rec.get("remote_url"),
+                "attribution": rec.get("attribution"),
+            }
 
-    # Fetch remote thumbnail metadata
-    val = await fetch_banner_from_wikipedia(city, session=session)
+    # Fetch remote thumbnail metadata (cached and rate limited by the media lookup)
+    from city_guides.src.services.media_lookup import media_lookup
+    val, _ = await media_lookup.lookup(
+        'wikimedia', city, 1, lambda: fetch_banner_from_wikipedia(city, session=session), kind='banner'
+    )
     if not val:
-        return None
+        return _local_banner(rec) if local_ready else None
 
     remote_url = val.get("remote_url")
     attribution = val.get("attribution")
+    now = datetime.datetime.utcnow().isoformat()
 
     # If caller doesn't want local storage, cache remote_url and return it
     if not store_local:
-        with _CACHE_LOCK:
-            c = _load_cache()
-            c[key] = {
-                "remote_url": remote_url,
-                "attribution": attribution,
-                "generated_at": datetime.datetime.utcnow().isoformat(),
-            }
-            _write_cache(c)
+        _store_record(key, {
+            "remote_url": remote_url,
+            "attribution": attribution,
+            "generated_at": now,
+        })
         return {"url": remote_url, "attribution": attribution}
 
-    # Otherwise, download and store locally under static/banners
-    slug = _slugify(city)
-    ext = _ext_from_url(remote_url)
-    filename = f"{slug}{ext}"
-    dest_path = _BANNERS_DIR / filename
+    # Same remote image as the derivatives we already have: just refresh the record
+    if local_ready and rec.get("remote_url") == remote_url:
+        rec = dict(rec, attribution=attribution, generated_at=now)
+        _store_record(key, rec)
+        return _local_banner(rec)
 
-    # If file exists and is recent enough, reuse
-    if dest_path.exists():
-        try:
-            mtime = datetime.datetime.utcfromtimestamp(dest_path.stat().st_mtime)
-            if (datetime.datetime.utcnow() - mtime).days < ttl:
-                with _CACHE_LOCK:
-                    c = _load_cache()
-                    c[key] = {
-                        "local_filename": filename,
-                        "attribution": attribution,
-                        "generated_at": datetime.datetime.utcnow().isoformat(),
-                        "remote_url": remote_url,
-                    }
-                    _write_cache(c)
-                return {
-                    "url": f"/static/banners/{filename}",
-                    "attribution": attribution,
-                }
-        except Exception:
-            pass
-
-    ok = await _download_image(remote_url, dest_path, session=session)
-    if not ok:
+    # Otherwise, stream the original to disk and build derivatives under static/banners
+    slug = _slugify(city)
+    incoming = _INCOMING_DIR / f"{slug}-{os.urandom(4).hex()}{_ext_from_url(remote_url)}"
+    content_hash = await _download_image(remote_url, incoming, session=session)
+    if not content_hash:
         # fallback to returning remote URL
-        with _CACHE_LOCK:
-            c = _load_cache()
-            c[key] = {
-                "remote_url": remote_url,
-                "attribution": attribution,
-                "generated_at": datetime.datetime.utcnow().isoformat(),
-            }
-            _write_cache(c)
+        _store_record(key, {
+            "remote_url": remote_url,
+            "attribution": attribution,
+            "generated_at": now,
+        })
         return {"url": remote_url, "attribution": attribution}
 
-    with _CACHE_LOCK:
-        c = _load_cache()
-        c[key] = {
-            "local_filename": filename,
-            "attribution": attribution,
-            "generated_at": datetime.datetime.utcnow().isoformat(),
-            "remote_url": remote_url,
-        }
-        _write_cache(c)
+    try:
+        derived = await asyncio.to_thread(_build_derivatives, incoming, slug, content_hash)
+    except Exception:
+        return {"url": remote_url, "attribution": attribution}
 
-    return {"url": f"/static/banners/{filename}", "attribution": attribution}
+    rec = {
+        **derived,
+        "attribution": attribution,
+        "generated_at": now,
+        "remote_url": remote_url,
+    }
+    _store_record(key, rec)
+    return _local_banner(rec)
@@ -5,6 +5,8 @@ from typing import List, Dict, Optional
 import aiohttp
 from pathlib import Path
 
+from city_guides.providers import http_clients
+
 # Load environment variables from .env file (same as app.py)
 _env_paths = [
     Path(__file__).parent.parent / ".env",
@@ -50,7 +52,7 @@ async def async_search_images_near(
 
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession(headers={"User-Agent": "city-guides-mapillary"})
+        session = http_clients.get_session()
         own_session = True
         print("[DEBUG mapillary] Created internal aiohttp session for async_search_images_near")
 
@@ -123,10 +125,9 @@ async def async_enrich_venues(
 
     # Use provided session if any; otherwise create one for all calls
     own_session = False
-    import aiohttp as _aiohttp
 
     if session is None:
-        session = _aiohttp.ClientSession(headers={"User-Agent": "city-guides-mapillary"})
+        session = http_clients.get_session()
         own_session = True
         print("[DEBUG mapillary] Created internal aiohttp session for async_enrich_venues")
 
@@ -166,7 +167,7 @@ async def async_search_places(
     """
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession(headers={"User-Agent": "city-guides-mapillary"})
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -262,7 +263,7 @@ async def async_discover_map_features(
 
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession(headers={"User-Agent": "city-guides-mapillary"})
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -333,7 +334,7 @@ async def async_discover_images_in_bbox(
 
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession(headers={"User-Agent": "city-guides-mapillary"})
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -1,3 +1,4 @@
+import functools
 import logging
 import time
 import asyncio
@@ -7,6 +8,24 @@ import unicodedata
 from typing import List, Dict, Optional
 import os
 
+from city_guides.providers import circuit_breakers
+
+# Bounded memo size for name transliteration/normalization (names repeat across requests)
+NAME_CACHE_SIZE = int(os.getenv("NAME_CACHE_SIZE", "4096"))
+# Don't hold the POI fan-out on OpenTripMap xid detail lookups (details fill lazily)
+OPENTRIPMAP_SUMMARY_ONLY = os.getenv("OPENTRIPMAP_SUMMARY_ONLY", "true").lower() == "true"
+# async_discover_pois returns once these providers answer; the others get until the soft deadline
+PRIMARY_POI_PROVIDERS = frozenset(p.strip() for p in os.getenv("PRIMARY_POI_PROVIDERS", "overpass").split(",") if p.strip())
+POI_SOFT_DEADLINE = float(os.getenv("POI_SOFT_DEADLINE", "3.0"))  # seconds from fan-out start
+
+# Provider calls that outlived the soft deadline; they finish in the background so
+# their outcome still feeds the circuit breaker
+_late_provider_tasks: set = set()
+
+try:
+    from unidecode import unidecode
+except ImportError:
+    unidecode = None
 
 # Robust import for overpass_provider, always using absolute import
 overpass_provider = None
@@ -110,6 +129,7 @@ CURATED_NEIGHBORHOODS = {
 }
 
 
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
 def _norm_name(name: str) -> str:
     if not name:
         return ""
@@ -121,33 +141,21 @@ def _norm_name(name: str) -> str:
     return s
 
 
+@functools.lru_cache(maxsize=NAME_CACHE_SIZE)
 def _transliterate_name(name: str) -> str:
     """Convert non-Latin scripts to Latin approximations for English speakers."""
     if not name:
         return name
     
-    # Check if name contains non-Latin scripts
-    has_non_latin = False
-    for char in name:
-        try:
-            # Check if character is outside basic Latin range
-            if ord(char) > 0x007F:
-                has_non_latin = True
-                break
-        except:
-            pass
-    
-    if not has_non_latin:
+    # Names already in basic Latin need no transliteration
+    if name.isascii():
         return name
     
     # Try unidecode first for better transliteration
-    try:
-        from unidecode import unidecode
+    if unidecode is not None:
         result = unidecode(name)
         if result and result != name:
             return result
-    except ImportError:
-        pass
     
     # Fallback: NFKD normalization + ASCII filtering
     normalized = unicodedata.normalize('NFKD', name)
@@ -359,26 +367,48 @@ async def async_discover_pois(
 
     async def _call_provider(func, provider_name, *fargs, **fkwargs):
         print(f"[DEBUG] _call_provider calling {provider_name} with fargs={fargs}, fkwargs={fkwargs}")
+        breaker = circuit_breakers.breaker(provider_name)
+        if not breaker.allow():
+            logging.info(f"Provider {provider_name} skipped: circuit {breaker.state}")
+            return None
+        call_timeout = breaker.timeout(timeout)
         start = time.time()
         res = None
-        try:
+        settled = False  # an outcome was recorded; otherwise the probe slot is freed on the way out
+
+        async def _invoke():
             if asyncio.iscoroutinefunction(func):
                 # pass session if provider accepts it
                 try:
-                    res = await func(*fargs, session=session, **fkwargs)
+                    return await func(*fargs, session=session, **fkwargs)
                 except TypeError:
-                    res = await func(*fargs, **fkwargs)
-            else:
-                # run blocking provider in thread to avoid blocking loop
-                res = await asyncio.to_thread(func, *fargs, **fkwargs)
-                # If the result is a coroutine, await it
-                if asyncio.iscoroutine(res):
-                    res = await res
+                    return await func(*fargs, **fkwargs)
+            # run blocking provider in thread to avoid blocking loop
+            out = await asyncio.to_thread(func, *fargs, **fkwargs)
+            # If the result is a coroutine, await it
+            if asyncio.iscoroutine(out):
+                out = await out
+            return out
+
+        try:
+            res = await asyncio.wait_for(_invoke(), timeout=call_timeout)
+            settled = True
+            breaker.record_success(time.time() - start)
             return res
+        except asyncio.TimeoutError:
+            settled = True
+            breaker.record_failure(time.time() - start, f"timeout after {call_timeout:.1f}s", timed_out=True)
+            logging.warning(f"Provider {provider_name} timed out after {call_timeout:.1f}s")
+            return None
         except Exception as e:
+            settled = True
+            breaker.record_failure(time.time() - start, str(e)[:200])
             logging.warning(f"Provider {provider_name} raised: {e}")
             return None
         finally:
+            if not settled:
+                # cancelled, or destroyed with its event loop (GeneratorExit)
+                breaker.abandon()
             dur = time.time() - start
             try:
                 # Only call len() if res is not a coroutine
@@ -402,10 +432,10 @@ async def async_discover_pois(
     if overpass_provider is not None:
         if poi_type == "restaurant":
             func = getattr(overpass_provider, "async_discover_restaurants", overpass_provider.discover_restaurants)
-            provider_coros.append(_call_provider(func, "overpass", city, limit, None, local_only, bbox=bbox))
+            provider_coros.append(("overpass", _call_provider(func, "overpass", city, limit, None, local_only, bbox=bbox)))
         else:
             func = getattr(overpass_provider, "async_discover_pois", overpass_provider.discover_pois)
-            provider_coros.append(_call_provider(func, "overpass", city, poi_type, limit, local_only, bbox=bbox))
+            provider_coros.append(("overpass", _call_provider(func, "overpass", city, poi_type, limit, local_only, bbox=bbox)))
     else:
         logging.error("overpass_provider is None! Cannot fetch POIs.")
 
@@ -426,25 +456,42 @@ async def async_discover_pois(
                 "coffee": "cafes",
             }.get(poi_type, poi_type)
 
-            # prefer async function if available
+            # prefer async function if available; summary mode returns bbox results
+            # right away and fills xid details in the background
             func = getattr(opentripmap_provider, "async_discover_pois", opentripmap_provider.discover_pois)
-            provider_coros.append(_call_provider(func, "opentripmap", city, otm_kinds, limit))
+            provider_coros.append(("opentripmap", _call_provider(func, "opentripmap", city, otm_kinds, limit,
+                                                                 summary_only=OPENTRIPMAP_SUMMARY_ONLY)))
+        except Exception:
+            pass
+
+    geocode_task = []  # one shared geocode for the bbox-based providers
+
+    async def _geocode():
+        try:
+            if overpass_provider is not None and hasattr(overpass_provider, "async_geocode_city"):
+                return await overpass_provider.async_geocode_city(city, session=session)
         except Exception:
             pass
+        return None
+
+    async def _city_bbox():
+        if bbox is not None or not city:
+            return bbox
+        if not geocode_task:
+            geocode_task.append(asyncio.ensure_future(_geocode()))
+        return await asyncio.shield(geocode_task[0])
 
     # Geoapify (via overpass_provider) - only if function exists. It requires bbox input.
-    # Geocode city if bbox not provided
+    # Geocode city if bbox not provided (inside the provider call, so it runs concurrently)
     geo_func = getattr(overpass_provider, "geoapify_discover_pois", None)
     if geo_func:
-        geoapify_bbox = bbox
-        if geoapify_bbox is None and city:
-            try:
-                if overpass_provider is not None and hasattr(overpass_provider, "async_geocode_city"):
-                    geoapify_bbox = await overpass_provider.async_geocode_city(city, session=session)
-            except Exception:
-                pass
-        if geoapify_bbox:
-            provider_coros.append(_call_provider(geo_func, "geoapify", geoapify_bbox, None, poi_type, limit, session=session))
+        async def _geoapify(session=None):
+            geoapify_bbox = await _city_bbox()
+            if not geoapify_bbox:
+                return None
+            return await geo_func(geoapify_bbox, None, poi_type, limit, session=session)
+
+        provider_coros.append(("geoapify", _call_provider(_geoapify, "geoapify")))
 
     # Mapillary Places (optional) - use if token present
     try:
@@ -457,23 +504,43 @@ async def async_discover_pois(
         func = getattr(mapillary_mod, "async_discover_places", None)
         if func:
             # Geocode city if bbox not provided for Mapillary too
-            mapillary_bbox = bbox
-            if mapillary_bbox is None and city:
-                try:
-                    if overpass_provider is not None and hasattr(overpass_provider, "async_geocode_city"):
-                        mapillary_bbox = await overpass_provider.async_geocode_city(city, session=session)
-                except Exception:
-                    pass
-            if mapillary_bbox:
-                provider_coros.append(_call_provider(func, "mapillary", mapillary_bbox, poi_type, limit, session=session))
-
-    # Run all provider coroutines concurrently. Use return_exceptions=True so one failing
-    # provider does not cancel others.
-    try:
-        gather_results = await asyncio.gather(*provider_coros, return_exceptions=True)
-    except Exception as e:
-        logging.warning(f"Unexpected error during asyncio.gather: {e}")
-        gather_results = []
+            async def _mapillary(session=None):
+                mapillary_bbox = await _city_bbox()
+                if not mapillary_bbox:
+                    return None
+                return await func(mapillary_bbox, poi_type, limit, session=session)
+
+            provider_coros.append(("mapillary", _call_provider(_mapillary, "mapillary")))
+
+    # Run all providers concurrently (each bounded by its breaker's adaptive timeout).
+    # Wait for the primary providers; the rest only get until the soft deadline when a
+    # primary already produced results, and keep running in the background past it.
+    fanout_start = time.monotonic()
+    tasks = [(name, asyncio.ensure_future(coro)) for name, coro in provider_coros]
+    primary = [t for name, t in tasks if name in PRIMARY_POI_PROVIDERS]
+    secondary = [t for name, t in tasks if name not in PRIMARY_POI_PROVIDERS]
+    if primary:
+        await asyncio.wait(primary)
+    if secondary:
+        if any(not t.cancelled() and t.exception() is None and t.result() for t in primary):
+            remaining = max(0.0, POI_SOFT_DEADLINE - (time.monotonic() - fanout_start))
+            _, late = await asyncio.wait(secondary, timeout=remaining)
+        else:
+            _, late = await asyncio.wait(secondary)
+        # drop tasks whose (temporary) loop is gone so they can be collected
+        _late_provider_tasks.difference_update([t for t in _late_provider_tasks if t.get_loop().is_closed()])
+        for t in late:
+            _late_provider_tasks.add(t)
+            t.add_done_callback(_late_provider_tasks.discard)
+        if late:
+            logging.info(f"Soft deadline: returning without {[n for n, t in tasks if t in late]}")
+
+    gather_results = []
+    for name, t in tasks:
+        if not t.done() or t.cancelled():
+            continue
+        exc = t.exception()
+        gather_results.append(exc if exc is not None else t.result())
 
     # Collect results, ignoring providers that raised exceptions
     for idx, res in enumerate(gather_results):
@@ -554,6 +621,23 @@ async def async_discover_pois(
     return normalized[:limit]
 
 
+async def cancel_late_provider_tasks() -> int:
+    """Cancel the late provider calls running on the current loop and wait for them.
+
+    Call this before closing a temporary event loop (sync code that runs the
+    fan-out with run_until_complete): a call left pending there would never
+    report to its circuit breaker and, as a half-open probe, would block the
+    provider for the rest of the process.
+    """
+    loop = asyncio.get_running_loop()
+    mine = [t for t in _late_provider_tasks if t.get_loop() is loop and not t.done()]
+    for t in mine:
+        t.cancel()
+    if mine:
+        await asyncio.gather(*mine, return_exceptions=True)
+    return len(mine)
+
+
 def discover_restaurants(
     city: str,
     cuisine: Optional[str] = None,
@@ -707,51 +791,92 @@ async def async_get_neighborhoods(city: str | None = None, lat: float | None = N
     return ranked_results[:25]
 
 
+# Known tourist neighborhoods get a ranking boost (normalized names)
+TOURIST_NEIGHBORHOODS = {
+    # Athens
+    'plaka', 'monastiraki', 'kolonaki', 'psyrri', 'psiri', 'koukaki', 'thissio', 'thisio', 'theseio',
+    'exarchia', 'exarcheia', 'pangrati', 'gazi', 'gkazi', 'keramikos', 'kerameikos',
+    # Other major cities
+    'trastevere', 'monti', 'testaccio', 'el born', 'gracia', 'shoreditch', 'camden',
+    'le marais', 'montmartre', 'shibuya', 'shinjuku', 'sukhumvit', 'silom',
+    'greenwich village', 'williamsburg', 'soho', 'chelsea',
+}
+
+# Dynamic descriptions for known neighborhoods
+NEIGHBORHOOD_DESCRIPTIONS = {
+    # Athens
+    'plaka': "The 'neighborhood of the gods,' known for its historical, picturesque streets under the Acropolis",
+    'monastiraki': "A bustling, eclectic area famous for its flea market, ruins, and rooftop bars",
+    'kolonaki': "An upscale, fashionable neighborhood with high-end boutiques and cafes",
+    'psyrri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
+    'psiri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
+    'koukaki': "A popular, walkable area near the Acropolis Museum with a local vibe",
+    'thissio': "A charming, quieter area with cafes offering great views of the Acropolis",
+    'thisio': "A charming, quieter area with cafes offering great views of the Acropolis",
+    'theseio': "A charming, quieter area with cafes offering great views of the Acropolis",
+    'exarchia': "An edgy, artistic district known for its student population, street art, and bookstores",
+    'exarcheia': "An edgy, artistic district known for its student population, street art, and bookstores",
+    'pangrati': "A charming, local neighborhood near the Panathenaic Stadium with tree-lined streets",
+    'gazi': "The city's main nightlife hub, featuring restaurants and clubs",
+    'gkazi': "The city's main nightlife hub, featuring restaurants and clubs",
+    'keramikos': "Historic area with ancient cemetery and vibrant nightlife scene",
+    'kerameikos': "Historic area with ancient cemetery and vibrant nightlife scene",
+    # Rome
+    'trastevere': "Bohemian riverside neighborhood with trattorias and cobblestone streets",
+    'monti': "Vintage shopping and aperitivo culture in Rome's oldest neighborhood",
+    'testaccio': "Working-class food traditions and authentic Roman cuisine",
+    # Barcelona
+    'el born': "Trendy medieval quarter with boutiques and tapas bars",
+    'gracia': "Village atmosphere with plazas and local character",
+    # London
+    'shoreditch': "Street art and hipster nightlife hub",
+    'camden': "Alternative culture and famous markets",
+    # Paris
+    'le marais': "Historic Jewish quarter, LGBTQ+ friendly with boutiques",
+    'montmartre': "Artist hill with village atmosphere and Sacré-Cœur",
+    # Tokyo
+    'shibuya': "Youth culture, fashion, and nightlife",
+    'shinjuku': "Neon nightlife and business district",
+    # Bangkok
+    'sukhumvit': "Expat nightlife, malls, and street food",
+    'silom': "Business district by day, street food and nightlife after dark",
+    # NYC
+    'greenwich village': "Bohemian history and jazz clubs",
+    'williamsburg': "Hipster central with craft everything",
+    'soho': "Cast-iron architecture and upscale shopping",
+    'chelsea': "Art galleries and High Line park",
+}
+
+
+def _compile_substring_matcher(terms) -> re.Pattern:
+    """Compile terms into one alternation regex; ``search`` == ``any(t in s for t in terms)``."""
+    # Longest first so overlapping alternatives never shadow a longer term
+    ordered = sorted(set(terms), key=len, reverse=True)
+    return re.compile("|".join(re.escape(t) for t in ordered))
+
+
+_TOURIST_NEIGHBORHOOD_RE = _compile_substring_matcher(TOURIST_NEIGHBORHOODS)
+
+# Name patterns used by the relevance ranking; each group applies at most once
+_RESIDENTIAL_RE = _compile_substring_matcher(['village', 'community', 'housing', 'estate', 'residential'])
+# Thai patterns (ชุมชน = community, หมู่บ้าน = village)
+_THAI_RESIDENTIAL_RE = _compile_substring_matcher(['ชุมชน', 'หมู่บ้าน', 'โซน', 'แดน', 'แปลง', 'zone'])
+# Greek admin district patterns (Demotike Koinoteta = municipal community)
+_GREEK_ADMIN_RE = _compile_substring_matcher(['demotike', 'koinoteta', 'dimotiki', 'δημοτική', 'κοινότητα'])
+_BAD_PATTERN_RE = _compile_substring_matcher([
+    'industrial', 'factory', 'estate', 'corner', 'cross', 'heights',
+    'accommodation', 'staff', 'outsource', 'villas', 'apartments',
+    'private', 'pattanakarn'  # Bangkok specific suburbs
+])
+_GOOD_PATTERN_RE = _compile_substring_matcher([
+    'downtown', 'old town', 'historic', 'city centre', 'city center',
+    'district', 'quarter', 'square', 'market', 'harbor', 'harbour'
+])
+_DIGITS_RE = re.compile(r'\d')
+
+
 def _get_neighborhood_description(name_lower: str) -> str:
     """Get dynamic description for known tourist neighborhoods."""
-    NEIGHBORHOOD_DESCRIPTIONS = {
-        # Athens
-        'plaka': "The 'neighborhood of the gods,' known for its historical, picturesque streets under the Acropolis",
-        'monastiraki': "A bustling, eclectic area famous for its flea market, ruins, and rooftop bars",
-        'kolonaki': "An upscale, fashionable neighborhood with high-end boutiques and cafes",
-        'psyrri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
-        'psiri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
-        'koukaki': "A popular, walkable area near the Acropolis Museum with a local vibe",
-        'thissio': "A charming, quieter area with cafes offering great views of the Acropolis",
-        'thisio': "A charming, quieter area with cafes offering great views of the Acropolis",
-        'theseio': "A charming, quieter area with cafes offering great views of the Acropolis",
-        'exarchia': "An edgy, artistic district known for its student population, street art, and bookstores",
-        'exarcheia': "An edgy, artistic district known for its student population, street art, and bookstores",
-        'pangrati': "A charming, local neighborhood near the Panathenaic Stadium with tree-lined streets",
-        'gazi': "The city's main nightlife hub, featuring restaurants and clubs",
-        'gkazi': "The city's main nightlife hub, featuring restaurants and clubs",
-        'keramikos': "Historic area with ancient cemetery and vibrant nightlife scene",
-        'kerameikos': "Historic area with ancient cemetery and vibrant nightlife scene",
-        # Rome
-        'trastevere': "Bohemian riverside neighborhood with trattorias and cobblestone streets",
-        'monti': "Vintage shopping and aperitivo culture in Rome's oldest neighborhood",
-        'testaccio': "Working-class food traditions and authentic Roman cuisine",
-        # Barcelona
-        'el born': "Trendy medieval quarter with boutiques and tapas bars",
-        'gracia': "Village atmosphere with plazas and local character",
-        # London
-        'shoreditch': "Street art and hipster nightlife hub",
-        'camden': "Alternative culture and famous markets",
-        # Paris
-        'le marais': "Historic Jewish quarter, LGBTQ+ friendly with boutiques",
-        'montmartre': "Artist hill with village atmosphere and Sacré-Cœur",
-        # Tokyo
-        'shibuya': "Youth culture, fashion, and nightlife",
-        'shinjuku': "Neon nightlife and business district",
-        # Bangkok
-        'sukhumvit': "Expat nightlife, malls, and street food",
-        'silom': "Business district by day, street food and nightlife after dark",
-        # NYC
-        'greenwich village': "Bohemian history and jazz clubs",
-        'williamsburg': "Hipster central with craft everything",
-        'soho': "Cast-iron architecture and upscale shopping",
-        'chelsea': "Art galleries and High Line park",
-    }
     return NEIGHBORHOOD_DESCRIPTIONS.get(name_lower, "")
 
 
@@ -761,61 +886,6 @@ def _rank_neighborhoods_by_relevance(neighborhoods: list[dict], city_center: tup
     Curated neighborhoods get highest priority, followed by OSM results based on scores.
     """
     
-    # Known tourist neighborhoods get a boost (normalized names)
-    TOURIST_NEIGHBORHOODS = {
-        # Athens
-        'plaka', 'monastiraki', 'kolonaki', 'psyrri', 'psiri', 'koukaki', 'thissio', 'thisio', 'theseio',
-        'exarchia', 'exarcheia', 'pangrati', 'gazi', 'gkazi', 'keramikos', 'kerameikos',
-        # Other major cities
-        'trastevere', 'monti', 'testaccio', 'el born', 'gracia', 'shoreditch', 'camden',
-        'le marais', 'montmartre', 'shibuya', 'shinjuku', 'sukhumvit', 'silom',
-        'greenwich village', 'williamsburg', 'soho', 'chelsea',
-    }
-    
-    # Dynamic descriptions for known neighborhoods
-    NEIGHBORHOOD_DESCRIPTIONS = {
-        # Athens
-        'plaka': "The 'neighborhood of the gods,' known for its historical, picturesque streets under the Acropolis",
-        'monastiraki': "A bustling, eclectic area famous for its flea market, ruins, and rooftop bars",
-        'kolonaki': "An upscale, fashionable neighborhood with high-end boutiques and cafes",
-        'psyrri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
-        'psiri': "Known for its vibrant, edgy nightlife, trendy cafes, and artistic scene",
-        'koukaki': "A popular, walkable area near the Acropolis Museum with a local vibe",
-        'thissio': "A charming, quieter area with cafes offering great views of the Acropolis",
-        'thisio': "A charming, quieter area with cafes offering great views of the Acropolis",
-        'exarchia': "An edgy, artistic district known for its student population, street art, and bookstores",
-        'exarcheia': "An edgy, artistic district known for its student population, street art, and bookstores",
-        'pangrati': "A charming, local neighborhood near the Panathenaic Stadium with tree-lined streets",
-        'gazi': "The city's main nightlife hub, featuring restaurants and clubs",
-        'gkazi': "The city's main nightlife hub, featuring restaurants and clubs",
-        'keramikos': "Historic area with ancient cemetery and vibrant nightlife scene",
-        'kerameikos': "Historic area with ancient cemetery and vibrant nightlife scene",
-        # Rome
-        'trastevere': "Bohemian riverside neighborhood with trattorias and cobblestone streets",
-        'monti': "Vintage shopping and aperitivo culture in Rome's oldest neighborhood",
-        'testaccio': "Working-class food traditions and authentic Roman cuisine",
-        # Barcelona
-        'el born': "Trendy medieval quarter with boutiques and tapas bars",
-        'gracia': "Village atmosphere with plazas and local character",
-        # London
-        'shoreditch': "Street art and hipster nightlife hub",
-        'camden': "Alternative culture and famous markets",
-        # Paris
-        'le marais': "Historic Jewish quarter, LGBTQ+ friendly with boutiques",
-        'montmartre': "Artist hill with village atmosphere and Sacré-Cœur",
-        # Tokyo
-        'shibuya': "Youth culture, fashion, and nightlife",
-        'shinjuku': "Neon nightlife and business district",
-        # Bangkok
-        'sukhumvit': "Expat nightlife, malls, and street food",
-        'silom': "Business district by day, street food and nightlife after dark",
-        # NYC
-        'greenwich village': "Bohemian history and jazz clubs",
-        'williamsburg': "Hipster central with craft everything",
-        'soho': "Cast-iron architecture and upscale shopping",
-        'chelsea': "Art galleries and High Line park",
-    }
-    
     def calculate_score(n: dict) -> float:
         score = 100.0  # Base score
         
@@ -833,9 +903,7 @@ def _rank_neighborhoods_by_relevance(neighborhoods: list[dict], city_center: tup
             score += n.get('curated_priority', 1000)
         
         # 0.5 Known tourist neighborhoods get a big boost (check both original and transliterated)
-        if name_transliterated in TOURIST_NEIGHBORHOODS or any(t in name_transliterated for t in TOURIST_NEIGHBORHOODS):
-            score += 800
-        elif name_lower in TOURIST_NEIGHBORHOODS or any(t in name_lower for t in TOURIST_NEIGHBORHOODS):
+        if _TOURIST_NEIGHBORHOOD_RE.search(name_transliterated) or _TOURIST_NEIGHBORHOOD_RE.search(name_lower):
             score += 800
         
         # 1. Centrality - closer to city center = higher score
@@ -868,50 +936,26 @@ def _rank_neighborhoods_by_relevance(neighborhoods: list[dict], city_center: tup
         # Aggressive penalization for residential/factory patterns
         
         # Residential/housing patterns (high penalty)
-        residential_patterns = ['village', 'community', 'housing', 'estate', 'residential']
-        for pattern in residential_patterns:
-            if pattern in name_lower:
-                score -= 500
-                break
+        if _RESIDENTIAL_RE.search(name_lower):
+            score -= 500
         
-        # Thai patterns (ชุมชน = community, หมู่บ้าน = village)
-        thai_residential = ['ชุมชน', 'หมู่บ้าน', 'โซน', 'แดน', 'แปลง', 'zone']
-        for pattern in thai_residential:
-            if pattern in name:
-                score -= 400
-                break
+        if _THAI_RESIDENTIAL_RE.search(name):
+            score -= 400
         
-        # Greek admin district patterns (Demotike Koinoteta = municipal community)
-        greek_admin = ['demotike', 'koinoteta', 'dimotiki', 'δημοτική', 'κοινότητα']
-        for pattern in greek_admin:
-            if pattern in name_lower:
-                score -= 600
-                break
+        if _GREEK_ADMIN_RE.search(name_lower):
+            score -= 600
         
         # Other bad patterns (medium penalty)
-        bad_patterns = [
-            'industrial', 'factory', 'estate', 'corner', 'cross', 'heights', 
-            'accommodation', 'staff', 'outsource', 'villas', 'apartments',
-            'private', 'pattanakarn'  # Bangkok specific suburbs
-        ]
-        for pattern in bad_patterns:
-            if pattern in name_lower:
-                score -= 200
-                break
+        if _BAD_PATTERN_RE.search(name_lower):
+            score -= 200
         
         # Numbers often indicate housing estates (e.g., "Phetkasem 40")
-        if re.search(r'\d+', name):
+        if _DIGITS_RE.search(name):
             score -= 100  # Small penalty for numbered areas
         
-        # 5. Bonus for tourist-friendly keywords
-        good_patterns = [
-            'downtown', 'old town', 'historic', 'city centre', 'city center',
-            'district', 'quarter', 'square', 'market', 'harbor', 'harbour'
-        ]
-        for pattern in good_patterns:
-            if pattern in name_lower:
-                score += 80
-                break  # Only bonus once
+        # 5. Bonus for tourist-friendly keywords (only once)
+        if _GOOD_PATTERN_RE.search(name_lower):
+            score += 80
         
         return score
     
@@ -3,6 +3,8 @@ from typing import List, Dict, Optional
 import aiohttp
 import asyncio
 
+from city_guides.providers import http_clients
+
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
 
@@ -142,7 +144,7 @@ CITY_SEEDS = {
 
 async def _fetch_london_boroughs() -> List[Dict]:
     """Direct fetch for London's 32 boroughs using Nominatim + Overpass"""
-    async with aiohttp.ClientSession() as session:
+    async with http_clients.get_session() as session:
         try:
             # Step 1: Find Greater London via Nominatim
             params = {"q": "Greater London, UK", "format": "json", "limit": 3}
@@ -203,7 +205,7 @@ async def _fetch_london_boroughs() -> List[Dict]:
 
 async def _fetch_neighborhoods_nominatim(city: str) -> List[Dict]:
     """Fetch neighborhoods using Nominatim + Overpass with proper city identification"""
-    async with aiohttp.ClientSession() as session:
+    async with http_clients.get_session() as session:
         city_key = city.lower().strip()
         if "," in city_key:
             city_key = city_key.split(",")[0].strip()
@@ -299,6 +301,7 @@ def get_neighborhood_suggestions(city: str, category: Optional[str] = None) -> L
                     print(f"[DEBUG] London: returning {len(boroughs)} boroughs")
                     return boroughs[:32]
             finally:
+                loop.run_until_complete(http_clients.close_loop_session())
                 loop.close()
         except Exception as e:
             print(f"[DEBUG] London direct fetch failed: {e}")
@@ -313,6 +316,7 @@ def get_neighborhood_suggestions(city: str, category: Optional[str] = None) -> L
                 print(f"[DEBUG] {city_key}: returning {len(neighborhoods)} neighborhoods")
                 return neighborhoods[:32]
         finally:
+            loop.run_until_complete(http_clients.close_loop_session())
             loop.close()
     except Exception as e:
         print(f"[DEBUG] Nominatim+Overpass failed: {e}")
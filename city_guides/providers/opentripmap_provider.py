@@ -1,9 +1,16 @@
 import os
 import math
+import json
+import time
+import logging
+import weakref
 import aiohttp
-from typing import List, Dict
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional
 import asyncio
 
+from city_guides.providers import http_clients
 from city_guides.providers.overpass_provider import geocode_city
 
 OPENTRIPMAP_KEY = os.getenv("OPENTRIPMAP_API_KEY") or os.getenv("OPENTRIPMAP_KEY")
@@ -11,6 +18,22 @@ BASE = "https://api.opentripmap.com/0.1/en/places"
 # Prefer bbox endpoint for better spatial coverage and deterministic bounding
 OPENTRIPMAP_API_URL = f"{BASE}/bbox"
 
+# ---- XID DETAIL FETCHING ----------------------------------------------------
+# Place details rarely change, so they are cached per xid on disk (and in a
+# small in-memory LRU) and fetched concurrently under a shared rate limit.
+# Fetches run on the serving loop (the one the shared HTTP pool lives on), so
+# sync callers on temporary loops share its rate limit and background fills
+# outlive their loop.
+OTM_DETAIL_CONCURRENCY = int(os.getenv("OTM_DETAIL_CONCURRENCY", "8"))
+OTM_DETAIL_RATE = float(os.getenv("OTM_DETAIL_RATE", "8"))  # detail requests started per second
+OTM_DETAIL_TIMEOUT = float(os.getenv("OTM_DETAIL_TIMEOUT", "15"))
+OTM_DETAIL_CACHE_TTL = int(os.getenv("OTM_DETAIL_CACHE_TTL", str(30 * 86400)))  # 30 days
+OTM_DETAIL_MEMORY_SIZE = int(os.getenv("OTM_DETAIL_MEMORY_SIZE", "5000"))
+OTM_DETAIL_INLINE_WAIT = float(os.getenv("OTM_DETAIL_INLINE_WAIT", "3"))  # summary callers with no serving loop
+OTM_DETAIL_CACHE_DIR = Path(__file__).parent / ".cache" / "opentripmap_xid"
+
+logger = logging.getLogger(__name__)
+
 # London-targeted category expansions (OTM works better with broader kinds for large cities)
 # Valid OpenTripMap kinds: https://opentripmap.io/catalog
 LONDON_OTM_CATEGORIES = {
@@ -24,6 +47,256 @@ LONDON_OTM_CATEGORIES = {
 }
 
 
+class _RateLimiter:
+    """Spaces request starts at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _LoopState:
+    """Concurrency bound, rate limiter and in-flight fetches of one event loop"""
+
+    def __init__(self, concurrency: int, rate: float):
+        self.sem = asyncio.Semaphore(concurrency)
+        self.limiter = _RateLimiter(rate)
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+
+class XidDetailFetcher:
+    """Resolves OpenTripMap xid details concurrently with a persistent xid cache.
+
+    Concurrent requests for the same xid share one upstream call. `prefetch`
+    fills details in the background for summary-only callers.
+    """
+
+    def __init__(self, cache_dir: Path = OTM_DETAIL_CACHE_DIR, ttl: int = OTM_DETAIL_CACHE_TTL,
+                 concurrency: int = OTM_DETAIL_CONCURRENCY, rate: float = OTM_DETAIL_RATE,
+                 memory_size: int = OTM_DETAIL_MEMORY_SIZE):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._background: set = set()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "fetched": 0, "failed": 0}
+
+    def _path(self, xid: str) -> Path:
+        return self.cache_dir / f"{''.join(c for c in xid if c.isalnum() or c in '-_')}.json"
+
+    def _remember(self, xid: str, detail: Dict) -> None:
+        self._memory[xid] = detail
+        self._memory.move_to_end(xid)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def cached(self, xid: str) -> Optional[Dict]:
+        """Return a cached detail (memory, then disk) without any network call"""
+        detail = self._memory.get(xid)
+        if detail is not None:
+            self._memory.move_to_end(xid)
+            self.stats["memory_hits"] += 1
+            return detail
+        path = self._path(xid)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            with path.open("r", encoding="utf-8") as fh:
+                detail = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        self.stats["disk_hits"] += 1
+        self._remember(xid, detail)
+        return detail
+
+    def _store(self, xid: str, detail: Dict) -> None:
+        self._remember(xid, detail)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with self._path(xid).open("w", encoding="utf-8") as fh:
+                json.dump(detail, fh, ensure_ascii=False)
+        except OSError:
+            logger.debug("Failed to persist OpenTripMap detail for %s", xid)
+
+    def _state(self) -> _LoopState:
+        # asyncio primitives belong to the loop they are used on
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopState(self.concurrency, self.rate)
+        return state
+
+    async def _fetch(self, xid: str, session: aiohttp.ClientSession) -> Dict:
+        state = self._state()
+        async with state.sem:
+            await state.limiter.wait()
+            try:
+                async with session.get(f"{BASE}/xid/{xid}", params={"apikey": OPENTRIPMAP_KEY},
+                                       timeout=aiohttp.ClientTimeout(total=OTM_DETAIL_TIMEOUT)) as dd:
+                    if dd.status != 200:
+                        print(f"[DEBUG opentripmap] detail HTTP error for {xid}: {dd.status}")
+                        self.stats["failed"] += 1
+                        return {}
+                    detail = await dd.json()
+            except Exception as e:
+                print(f"[DEBUG opentripmap] detail Exception for {xid}: {e}")
+                self.stats["failed"] += 1
+                return {}
+        self.stats["fetched"] += 1
+        if isinstance(detail, dict) and detail:
+            self._store(xid, detail)
+            return detail
+        return {}
+
+    async def _get_one(self, xid: str, session: aiohttp.ClientSession) -> Dict:
+        inflight = self._state().inflight
+        fut = inflight.get(xid)
+        if fut is not None:
+            return await asyncio.shield(fut)
+        fut = asyncio.get_running_loop().create_future()
+        inflight[xid] = fut
+        try:
+            detail = await self._fetch(xid, session)
+            fut.set_result(detail)
+            return detail
+        except BaseException:
+            fut.cancel()
+            raise
+        finally:
+            inflight.pop(xid, None)
+
+    async def _fill(self, xids: List[str]) -> Dict[str, Dict]:
+        async with http_clients.get_session() as session:
+            return await self.get_many(xids, session)
+
+    async def get_many(self, xids: Iterable[str], session: aiohttp.ClientSession,
+                       timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """Return {xid: detail} for the given xids, fetching cache misses concurrently.
+
+        Off the serving loop the misses are fetched there (with the shared pool
+        instead of `session`). After `timeout` seconds the details not fetched yet
+        are left empty; on the serving loop they keep filling the cache.
+        """
+        out: Dict[str, Dict] = {}
+        missing = []
+        for xid in dict.fromkeys(x for x in xids if x):
+            detail = self.cached(xid)
+            if detail is not None:
+                out[xid] = detail
+            else:
+                missing.append(xid)
+        if not missing:
+            return out
+        home = http_clients.serving_loop()
+        if home is not None and home is not asyncio.get_running_loop():
+            handoff = asyncio.run_coroutine_threadsafe(self._fill(missing), home)
+            try:
+                # shielded: a caller giving up (timeout, deadline) leaves the fill running
+                fetched = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(handoff)), timeout)
+            except asyncio.TimeoutError:
+                fetched = {}
+            for xid in missing:
+                out[xid] = fetched.get(xid) or {}
+            return out
+        tasks = [asyncio.ensure_future(self._get_one(x, session)) for x in missing]
+        try:
+            await asyncio.wait(tasks, timeout=timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+        for xid, task in zip(missing, tasks):
+            done = task.done() and not task.cancelled() and task.exception() is None
+            out[xid] = task.result() if done else {}
+        return out
+
+    def prefetch(self, xids: Iterable[str]):
+        """Fill details for uncached xids in the background on the serving loop.
+
+        Returns the task (or, from another loop, its concurrent future); None
+        when there is nothing to fetch or no serving loop to run it on.
+        """
+        missing = [x for x in dict.fromkeys(xids) if x and self.cached(x) is None]
+        home = http_clients.serving_loop()
+        if not missing or not OPENTRIPMAP_KEY or home is None:
+            return None
+        if home is asyncio.get_running_loop():
+            task = asyncio.create_task(self._fill(missing))
+        else:
+            # the caller's loop may be a temporary one that closes right after this request
+            task = asyncio.run_coroutine_threadsafe(self._fill(missing), home)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+
+detail_fetcher = XidDetailFetcher()
+
+
+def _entry_from_feature(itm: Dict, detail: Optional[Dict]) -> Dict:
+    """Build a provider entry from a bbox feature and its (possibly empty) xid detail"""
+    props = itm.get("properties", {})
+    xid = props.get("xid")
+    point = itm.get("geometry", {}).get("coordinates") or []
+    detail = detail or {}
+
+    address = detail.get("address", {})
+    addr = ", ".join(
+        [
+            address.get(k, "")
+            for k in ("road", "house_number", "city", "state", "country")
+            if address.get(k)
+        ]
+    )
+    return {
+        "name": props.get("name") or "",
+        "address": addr,
+        "latitude": point[1] if len(point) > 1 else None,
+        "longitude": point[0] if len(point) > 0 else None,
+        "place_id": xid or props.get("osm_id") or "",
+        "osm_url": detail.get("url") or "",
+        "tags": (
+            ", ".join([f"{k}={v}" for k, v in (detail.get("properties", {}) or {}).items()])
+            if detail.get("properties")
+            else ""
+        ),
+        "rating": detail.get("rate") if detail.get("rate") else None,
+        "provider": "opentripmap",
+    }
+
+
+async def _entries_for_features(features: List[Dict], session: aiohttp.ClientSession, summary_only: bool) -> List[Dict]:
+    """Resolve details for bbox features.
+
+    With summary_only the bbox results are returned immediately (using any
+    cached details) and missing details are fetched in the background. With
+    no serving loop to fill them on, missing details get OTM_DETAIL_INLINE_WAIT
+    seconds inline instead.
+    """
+    xids = [f.get("properties", {}).get("xid") for f in features]
+    if summary_only:
+        details = {x: detail_fetcher.cached(x) for x in xids if x}
+        missing = [x for x, d in details.items() if d is None]
+        if missing and OPENTRIPMAP_KEY and detail_fetcher.prefetch(missing) is None:
+            details.update(await detail_fetcher.get_many(missing, session, timeout=OTM_DETAIL_INLINE_WAIT))
+    else:
+        details = await detail_fetcher.get_many(xids, session)
+    return [_entry_from_feature(f, details.get(x)) for f, x in zip(features, xids)]
+
+
 def _haversine_meters(lat1, lon1, lat2, lon2):
     R = 6371000.0
     phi1 = math.radians(lat1)
@@ -68,7 +341,8 @@ def expand_bbox_for_opentripmap(bbox, city_radius_km: float = 10.0):
     return (new_west, new_south, new_east, new_north)
 
 
-async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None) -> List[Dict]:
+async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None,
+                               summary_only: bool = False) -> List[Dict]:
     """Discover POIs via OpenTripMap. Best-effort: requires OPENTRIPMAP_API_KEY in env.
 
     Returns list of dicts with keys: name,address,latitude,longitude,osm_url,place_id
@@ -79,7 +353,7 @@ async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None,
         return []
     from city_guides.providers.overpass_provider import geocode_city
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
         print("[DEBUG opentripmap] Created internal aiohttp session for discover_restaurants")
     else:
@@ -135,68 +409,11 @@ async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None,
             print("[DEBUG opentripmap] Closed internal aiohttp session after exception")
         return []
 
-    out = []
-    for itm in j.get("features", [])[:limit]:
-        props = itm.get("properties", {})
-        xid = props.get("xid")
-        name = props.get("name") or ""
-        point = itm.get("geometry", {}).get("coordinates") or []
-        lon2 = point[0] if len(point) > 0 else None
-        lat2 = point[1] if len(point) > 1 else None
-
-        # fetch details for richer info
-        detail = {}
-        if xid:
-            try:
-                async with session.get(f"{BASE}/xid/{xid}", params={"apikey": OPENTRIPMAP_KEY}, timeout=15) as dd:
-                    if dd.status == 200:
-                        detail = await dd.json()
-                    else:
-                        print(f"[DEBUG opentripmap] discover_restaurants detail HTTP error: {dd.status}")
-                        detail = {}
-            except Exception as e:
-                print(f"[DEBUG opentripmap] discover_restaurants detail Exception: {e}")
-                detail = {}
-            await asyncio.sleep(0.05)
-
-        address = detail.get("address", {})
-        addr = ", ".join(
-            [
-                address.get(k, "")
-                for k in ("road", "house_number", "city", "state", "country")
-                if address.get(k)
-            ]
-        )
-        osm_url = ""
-        if detail.get("url"):
-            osm_url = detail.get("url")
-
-        entry = {
-            "name": name,
-            "address": addr,
-            "latitude": lat2,
-            "longitude": lon2,
-            "place_id": xid or props.get("osm_id") or "",
-            "osm_url": osm_url,
-            "tags": (
-                ", ".join(
-                    [
-                        f"{k}={v}"
-                        for k, v in (detail.get("properties", {}) or {}).items()
-                    ]
-                )
-                if detail.get("properties")
-                else ""
-            ),
-            "rating": detail.get("rate") if detail.get("rate") else None,
-            "provider": "opentripmap",
-        }
-        # optional simple cuisine match
-        if cuisine:
-            q = cuisine.lower()
-            if q not in (name or "").lower() and q not in entry["tags"].lower():
-                continue
-        out.append(entry)
+    out = await _entries_for_features(j.get("features", [])[:limit], session, summary_only)
+    # optional simple cuisine match
+    if cuisine:
+        q = cuisine.lower()
+        out = [e for e in out if q in (e["name"] or "").lower() or q in e["tags"].lower()]
 
     if own_session:
         await session.close()
@@ -204,21 +421,22 @@ async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None,
     return out
 
 
-async def discover_pois(city: str, kinds: str = "restaurants", limit: int = 50, session: aiohttp.ClientSession = None) -> List[Dict]:
+async def discover_pois(city: str, kinds: str = "restaurants", limit: int = 50, session: aiohttp.ClientSession = None,
+                        summary_only: bool = False) -> List[Dict]:
     """Discover POIs via OpenTripMap for different kinds of places.
 
     Args:
         city: City name to search in, or a bbox tuple/list `(west, south, east, north)` to call the bbox endpoint directly
         kinds: OpenTripMap kinds string (e.g., "historic", "museums", "parks")
         limit: Maximum results to return
+        summary_only: Return bbox results right away (cached details only) and fill details in the background
 
     Returns list of dicts with keys: name,address,latitude,longitude,osm_url,place_id
     """
     if not OPENTRIPMAP_KEY:
         return []
-    from overpass_provider import geocode_city
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
         print("[DEBUG opentripmap] Created internal aiohttp session for discover_pois")
     else:
@@ -258,63 +476,7 @@ async def discover_pois(city: str, kinds: str = "restaurants", limit: int = 50,
             print("[DEBUG opentripmap] Closed internal aiohttp session after exception")
         return []
 
-    out = []
-    for itm in j.get("features", [])[:limit]:
-        props = itm.get("properties", {})
-        xid = props.get("xid")
-        name = props.get("name") or ""
-        point = itm.get("geometry", {}).get("coordinates") or []
-        lon2 = point[0] if len(point) > 0 else None
-        lat2 = point[1] if len(point) > 1 else None
-
-        # fetch details for richer info
-        detail = {}
-        if xid:
-            try:
-                async with session.get(f"{BASE}/xid/{xid}", params={"apikey": OPENTRIPMAP_KEY}, timeout=15) as dd:
-                    if dd.status == 200:
-                        detail = await dd.json()
-                    else:
-                        print(f"[DEBUG opentripmap] discover_pois detail HTTP error: {dd.status}")
-                        detail = {}
-            except Exception as e:
-                print(f"[DEBUG opentripmap] discover_pois detail Exception: {e}")
-                detail = {}
-            await asyncio.sleep(0.05)
-
-        address = detail.get("address", {})
-        addr = ", ".join(
-            [
-                address.get(k, "")
-                for k in ("road", "house_number", "city", "state", "country")
-                if address.get(k)
-            ]
-        )
-        osm_url = ""
-        if detail.get("url"):
-            osm_url = detail.get("url")
-
-        entry = {
-            "name": name,
-            "address": addr,
-            "latitude": lat2,
-            "longitude": lon2,
-            "place_id": xid or props.get("osm_id") or "",
-            "osm_url": osm_url,
-            "tags": (
-                ", ".join(
-                    [
-                        f"{k}={v}"
-                        for k, v in (detail.get("properties", {}) or {}).items()
-                    ]
-                )
-                if detail.get("properties")
-                else ""
-            ),
-            "rating": detail.get("rate") if detail.get("rate") else None,
-            "provider": "opentripmap",
-        }
-        out.append(entry)
+    out = await _entries_for_features(j.get("features", [])[:limit], session, summary_only)
 
     if own_session:
         await session.close()
@@ -322,7 +484,8 @@ async def discover_pois(city: str, kinds: str = "restaurants", limit: int = 50,
     return out
 
 
-async def async_discover_pois(city: str, kinds: str = "restaurants", limit: int = 50, session: aiohttp.ClientSession = None) -> List[Dict]:
+async def async_discover_pois(city: str, kinds: str = "restaurants", limit: int = 50, session: aiohttp.ClientSession = None,
+                              summary_only: bool = False) -> List[Dict]:
     print(f"[DEBUG opentripmap discover_pois] Called with city={city}, kinds={kinds}, API key present: {bool(OPENTRIPMAP_KEY)}")
     if not OPENTRIPMAP_KEY:
         print("[DEBUG opentripmap discover_pois] No API key, returning empty")
@@ -385,7 +548,7 @@ async def async_discover_pois(city: str, kinds: str = "restaurants", limit: int
 
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -408,69 +571,18 @@ async def async_discover_pois(city: str, kinds: str = "restaurants", limit: int
             await session.close()
         return []
 
-    out = []
-    for itm in j.get("features", [])[:limit]:
-        props = itm.get("properties", {})
-        xid = props.get("xid")
-        name = props.get("name") or ""
-        point = itm.get("geometry", {}).get("coordinates") or []
-        lon2 = point[0] if len(point) > 0 else None
-        lat2 = point[1] if len(point) > 1 else None
-
-        detail = {}
-        if xid:
-            try:
-                async with session.get(f"{BASE}/xid/{xid}", params={"apikey": OPENTRIPMAP_KEY}, timeout=15) as dd:
-                    if dd.status == 200:
-                        detail = await dd.json()
-                    else:
-                        detail = {}
-            except Exception:
-                detail = {}
-            await asyncio.sleep(0.05)
-
-        address = detail.get("address", {})
-        addr = ", ".join(
-            [
-                address.get(k, "")
-                for k in ("road", "house_number", "city", "state", "country")
-                if address.get(k)
-            ]
-        )
-        osm_url = ""
-        if detail.get("url"):
-            osm_url = detail.get("url")
-
-        entry = {
-            "name": name,
-            "address": addr,
-            "latitude": lat2,
-            "longitude": lon2,
-            "place_id": xid or props.get("osm_id") or "",
-            "osm_url": osm_url,
-            "tags": (
-                ", ".join(
-                    [
-                        f"{k}={v}"
-                        for k, v in (detail.get("properties", {}) or {}).items()
-                    ]
-                )
-                if detail.get("properties")
-                else ""
-            ),
-            "rating": detail.get("rate") if detail.get("rate") else None,
-            "provider": "opentripmap",
-        }
-        out.append(entry)
+    out = await _entries_for_features(j.get("features", [])[:limit], session, summary_only)
 
     if own_session:
         await session.close()
     return out
 
 
-async def async_discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None) -> List[Dict]:
-    return await async_discover_pois(city, "restaurants", limit, session=session)
+async def async_discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None,
+                                     summary_only: bool = False) -> List[Dict]:
+    return await async_discover_pois(city, "restaurants", limit, session=session, summary_only=summary_only)
 
 
-async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None) -> List[Dict]:
-    return await discover_pois(city, "restaurants", limit, session=session)
+async def discover_restaurants(city: str, limit: int = 50, cuisine: str = None, session: aiohttp.ClientSession = None,
+                               summary_only: bool = False) -> List[Dict]:
+    return await discover_pois(city, "restaurants", limit, session=session, summary_only=summary_only)
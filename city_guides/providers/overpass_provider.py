@@ -19,6 +19,7 @@ from pathlib import Path
 import asyncio
 import re
 
+from . import http_clients
 from .utils import get_session
 
 def normalize_city_name(city: Optional[str]) -> Optional[str]:
@@ -822,7 +823,7 @@ async def async_get_neighborhoods(city: Optional[str] = None, lat: Optional[floa
     """
     own = False
     if session is None:
-        session = await aiohttp.ClientSession().__aenter__()
+        session = http_clients.get_session()
         own = True
     try:
         area_id = None
@@ -1410,7 +1411,7 @@ async def discover_restaurants(
                         try:
                             own_session = False
                             if session is None:
-                                session = aiohttp.ClientSession()
+                                session = http_clients.get_session()
                                 own_session = True
                             timeout = aiohttp.ClientTimeout(total=int(os.environ.get("OVERPASS_TIMEOUT", 20)))
                             async with session.post(base_url, data={"data": q}, headers=headers, timeout=timeout) as r:
@@ -1608,7 +1609,7 @@ async def async_discover_restaurants(city: Optional[str] = None, limit: int = 20
         headers = {"User-Agent": "CityGuides/1.0", "Accept-Language": "en"}
         own = False
         if session is None:
-            session = aiohttp.ClientSession()
+            session = http_clients.get_session()
             own = True
         area_id = None
         try:
@@ -1868,7 +1869,7 @@ async def async_discover_pois(city: Optional[str] = None, poi_type: str = "resta
     # Ensure we have an aiohttp session to use; create/close our own if not provided
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
 
     try:
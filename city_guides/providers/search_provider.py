@@ -1,10 +1,15 @@
 import aiohttp
+import asyncio
 import os
 import re
+import time
+from collections import OrderedDict
 from datetime import datetime
 from urllib.parse import quote
 from bs4 import BeautifulSoup
 
+from city_guides.providers import http_clients
+
 
 OPENTRIPMAP_KEY = os.getenv("OPENTRIPMAP_KEY")
 
@@ -22,7 +27,7 @@ async def get_restaurant_rating(name, city):
     )
 
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             async with session.post(
                 "https://api.groq.com/openai/v1/chat/completions",
                 headers={
@@ -88,6 +93,181 @@ def _get_instances_from_env():
     return [u.strip() for u in env.split(",") if u.strip()]
 
 
+# ---- SEARXNG INSTANCE POOL ---------------------------------------------------
+# Each instance keeps an EWMA latency and error rate. A query is raced against
+# the best few healthy instances and the first response with results wins;
+# failing instances back off exponentially. Results are cached per query.
+SEARX_RACE_WIDTH = int(os.getenv("SEARX_RACE_WIDTH", "3"))
+SEARX_TIMEOUT = float(os.getenv("SEARX_TIMEOUT", "5"))
+SEARX_CACHE_TTL = int(os.getenv("SEARX_CACHE_TTL", "900"))  # 15 minutes
+SEARX_CACHE_SIZE = int(os.getenv("SEARX_CACHE_SIZE", "512"))
+SEARX_BACKOFF_BASE = float(os.getenv("SEARX_BACKOFF_BASE", "30"))  # seconds, doubled per consecutive failure
+SEARX_BACKOFF_MAX = float(os.getenv("SEARX_BACKOFF_MAX", "900"))
+
+SEARX_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+}
+
+
+class _InstanceHealth:
+    __slots__ = ("latency", "error_rate", "failures", "backoff_until", "requests")
+
+    def __init__(self, latency: float):
+        self.latency = latency  # EWMA seconds; untried instances start optimistic so they get explored
+        self.error_rate = 0.0
+        self.failures = 0
+        self.backoff_until = 0.0
+        self.requests = 0
+
+
+class SearxInstancePool:
+    """Health-scored SearXNG instances raced in parallel, with a per-query TTL cache"""
+
+    ALPHA = 0.3  # EWMA weight of the newest sample
+
+    def __init__(self, instances=None, race_width: int = SEARX_RACE_WIDTH, timeout: float = SEARX_TIMEOUT,
+                 cache_ttl: int = SEARX_CACHE_TTL, cache_size: int = SEARX_CACHE_SIZE):
+        self._instances = instances
+        self.race_width = max(1, race_width)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._health = {}
+        self._cache = OrderedDict()
+        self.stats = {"queries": 0, "cache_hits": 0, "raced": 0, "exhausted": 0}
+
+    @property
+    def instances(self):
+        return self._instances if self._instances is not None else _get_instances_from_env()
+
+    def _health_for(self, inst: str) -> _InstanceHealth:
+        h = self._health.get(inst)
+        if h is None:
+            h = self._health[inst] = _InstanceHealth(self.timeout / 4)
+        return h
+
+    def score(self, inst: str) -> float:
+        """Lower is better: expected latency inflated by the error rate"""
+        h = self._health_for(inst)
+        return h.latency * (1.0 + 4.0 * h.error_rate)
+
+    def pick(self, n=None, now=None):
+        """Best n instances not in backoff (soonest-to-recover ones if all are backing off)"""
+        now = now or time.monotonic()
+        n = n or self.race_width
+        instances = self.instances
+        healthy = [i for i in instances if self._health_for(i).backoff_until <= now]
+        if not healthy:
+            return sorted(instances, key=lambda i: self._health_for(i).backoff_until)[:1]
+        return sorted(healthy, key=self.score)[:n]
+
+    def record_success(self, inst: str, latency: float) -> None:
+        h = self._health_for(inst)
+        h.requests += 1
+        h.latency = (1 - self.ALPHA) * h.latency + self.ALPHA * latency
+        h.error_rate = (1 - self.ALPHA) * h.error_rate
+        h.failures = 0
+        h.backoff_until = 0.0
+
+    def record_failure(self, inst: str, latency: float) -> None:
+        h = self._health_for(inst)
+        h.requests += 1
+        h.latency = (1 - self.ALPHA) * h.latency + self.ALPHA * max(latency, self.timeout)
+        h.error_rate = (1 - self.ALPHA) * h.error_rate + self.ALPHA
+        h.failures += 1
+        h.backoff_until = time.monotonic() + min(SEARX_BACKOFF_BASE * 2 ** (h.failures - 1), SEARX_BACKOFF_MAX)
+
+    def _cache_get(self, q: str):
+        entry = self._cache.get(q)
+        if entry is None:
+            return None
+        expires, results = entry
+        if expires < time.monotonic():
+            self._cache.pop(q, None)
+            return None
+        self._cache.move_to_end(q)
+        return results
+
+    def _cache_put(self, q: str, results) -> None:
+        self._cache[q] = (time.monotonic() + self.cache_ttl, results)
+        self._cache.move_to_end(q)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _query_instance(self, inst: str, q: str, session: aiohttp.ClientSession):
+        url = inst.rstrip("/") + "/search"
+        start = time.monotonic()
+        try:
+            async with session.get(url, params={"q": q, "format": "json"}, headers=SEARX_HEADERS,
+                                   timeout=aiohttp.ClientTimeout(total=self.timeout)) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+                j = await resp.json(content_type=None)
+            results = (j.get("results") or []) if isinstance(j, dict) else []
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.record_failure(inst, time.monotonic() - start)
+            return None
+        self.record_success(inst, time.monotonic() - start)
+        return results
+
+    async def search(self, q: str, session=None):
+        """Raw SearXNG results for a query: cached, else the first racer with results ([] if none had any)"""
+        self.stats["queries"] += 1
+        cached = self._cache_get(q)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        own_session = session is None
+        if own_session:
+            session = http_clients.get_session()
+        tasks = [asyncio.create_task(self._query_instance(inst, q, session)) for inst in self.pick()]
+        self.stats["raced"] += len(tasks)
+        winner = None
+        answered = False
+        try:
+            for fut in asyncio.as_completed(tasks):
+                results = await fut
+                if results is None:
+                    continue
+                answered = True
+                if results:
+                    winner = results
+                    break
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_session:
+                await session.close()
+
+        if winner is None and not answered:
+            self.stats["exhausted"] += 1
+            return []
+        winner = winner or []
+        self._cache_put(q, winner)
+        return winner
+
+    def snapshot(self):
+        """Per-instance health for diagnostics"""
+        now = time.monotonic()
+        return {
+            inst: {
+                "latency_ms": round(h.latency * 1000, 1),
+                "error_rate": round(h.error_rate, 3),
+                "backoff_s": max(0.0, round(h.backoff_until - now, 1)),
+                "requests": h.requests,
+            }
+            for inst, h in self._health.items()
+        }
+
+
+searx_pool = SearxInstancePool()
+
+
 def _parse_price_from_text(text):
     if not text:
         return None, None
@@ -186,7 +366,7 @@ async def searx_search_hotels(
             resp = None
             for attempt in range(3):
                 try:
-                    async with aiohttp.ClientSession() as session:
+                    async with http_clients.get_session() as session:
                         async with session.get(
                             url, params=params, headers=headers, timeout=8
                         ) as resp:
@@ -256,7 +436,7 @@ async def searx_raw_queries(city_code, check_in, check_out, adults=1, max_instan
         try:
             url = inst.rstrip("/") + "/search"
             params = {"q": query, "format": "json"}
-            async with aiohttp.ClientSession() as session:
+            async with http_clients.get_session() as session:
                 async with session.get(url, params=params, timeout=8) as resp:
                     entry = {
                         "instance": inst,
@@ -279,79 +459,23 @@ async def searx_search(query, max_results=10, city=None):
         query = f"{query} in {city}"
 
     # For food-related queries, try Overpass first for real local data
-    food_keywords = [
-        "taco",
-        "pizza",
-        "burger",
-        "sushi",
-        "asian",
-        "italian",
-        "mexican",
-        "chinese",
-        "japanese",
-        "korean",
-        "restaurant",
-        "food",
-        "eat",
-        "crepe",
-        "crepes",
-        "bakery",
-        "pastry",
-        "irish",
-        "indian",
-        "thai",
-        "vietnamese",
-        "greek",
-        "spanish",
-        "german",
-        "british",
-    ]
-    cuisine = None
+    from city_guides.src.intents import classify
+
     query_lower = query.lower()
-    if "taco" in query_lower or "mexican" in query_lower:
-        cuisine = "mexican"
-    elif "pizza" in query_lower or "italian" in query_lower:
-        cuisine = "italian"
-    elif "sushi" in query_lower or "japanese" in query_lower:
-        cuisine = "japanese"
-    elif "chinese" in query_lower:
-        cuisine = "chinese"
-    elif "korean" in query_lower:
-        cuisine = "korean"
-    elif "asian" in query_lower:
-        cuisine = "asian"
-    elif "burger" in query_lower:
-        cuisine = "american"
-    elif "french" in query_lower or "crepe" in query_lower or "crepes" in query_lower:
-        cuisine = "french"
-    elif "irish" in query_lower:
-        cuisine = "irish"
-    elif "indian" in query_lower:
-        cuisine = "indian"
-    elif "thai" in query_lower:
-        cuisine = "thai"
-    elif "vietnamese" in query_lower:
-        cuisine = "vietnamese"
-    elif "greek" in query_lower:
-        cuisine = "greek"
-    elif "spanish" in query_lower:
-        cuisine = "spanish"
-    elif "german" in query_lower:
-        cuisine = "german"
-    elif "british" in query_lower:
-        cuisine = "british"
-
-    if any(kw in query_lower for kw in food_keywords) and city:
+    matches = classify(query_lower)
+    cuisine = matches.first("cuisine")
+
+    if matches.has("food") and city:
         try:
             from . import overpass_provider
 
-            restaurants = overpass_provider.discover_restaurants(
+            restaurants = await overpass_provider.discover_restaurants(
                 city, limit=max_results, cuisine=cuisine
             )
             results = []
-            for r in restaurants:
+            for r in restaurants[:max_results]:
                 title = r["name"]
-                url = r["website"] or r["osm_url"]
+                url = r.get("website") or r["osm_url"]
                 # rating = get_restaurant_rating(title, city)  # Skip for speed
                 rating = "Rating unavailable"
                 address = r.get("address", "")
@@ -372,14 +496,8 @@ async def searx_search(query, max_results=10, city=None):
         except Exception:
             pass  # Fall back to web search
 
-    instances = _get_instances_from_env()[:5]  # try more instances
     results = []
     seen = set()
-    # Use aiohttp for async requests
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-    }
 
     # Try multiple query variations to improve results
     query_variants = [query]
@@ -444,54 +562,29 @@ async def searx_search(query, max_results=10, city=None):
             ]
         )
 
-    for q in query_variants:
-        for inst in instances:
-            try:
-                url = inst.rstrip("/") + "/search"
-                params = {"q": q, "format": "json"}
-                resp = None
-                for attempt in range(1):  # only 1 attempt for speed
-                    try:
-                        async with aiohttp.ClientSession() as session:
-                            async with session.get(
-                                url, params=params, headers=headers, timeout=5
-                            ) as resp:
-                                if resp.status == 200:
-                                    j = await resp.json()
-                                else:
-                                    continue
-                        for r in j.get("results", []):
-                            title = r.get("title", "")
-                            link = r.get("url", "") or r.get("id", "")
-                            snippet = r.get("content", "") or r.get(
-                                "snippet", "")
-                            key = (link or title).strip()
-                            if not key or key in seen:
-                                continue
-                            seen.add(key)
-                            results.append(
-                                {
-                                    "title": title,
-                                    "url": link,
-                                    "snippet": snippet,
-                                }
-                            )
-                            if len(results) >= max_results:
-                                break
-                        if len(results) >= max_results:
-                            break
-                    except Exception:
-                        continue
-            except Exception:
-                continue
-        if len(results) >= max_results:
-            break
+    # Variants are only tried while results are short; each one is raced
+    # across the healthiest instances (and cached per query)
+    async with http_clients.get_session() as session:
+        for q in query_variants:
+            for r in await searx_pool.search(q, session=session):
+                title = r.get("title", "")
+                link = r.get("url", "") or r.get("id", "")
+                snippet = r.get("content", "") or r.get("snippet", "")
+                key = (link or title).strip()
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                results.append({"title": title, "url": link, "snippet": snippet})
+                if len(results) >= max_results:
+                    break
+            if len(results) >= max_results:
+                break
     # If no results from SearXNG, try DuckDuckGo as fallback
     if not results:
-        results = duckduckgo_search(query, max_results)
+        results = await duckduckgo_search(query, max_results)
     # If still no results, try Google as last resort
     if not results:
-        results = google_search(query, max_results)
+        results = await google_search(query, max_results)
     return results
 
 
@@ -505,7 +598,7 @@ async def duckduckgo_search(query, max_results=10):
             "no_html": 1,
             "skip_disambig": 1,
         }
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             async with session.get(url, params=params, timeout=5) as resp:
                 if resp.status != 200:
                     return []
@@ -564,7 +657,7 @@ async def google_search(query, max_results=10):
             seen.add(url)
             # Fetch title and snippet
             try:
-                async with aiohttp.ClientSession() as session:
+                async with http_clients.get_session() as session:
                     async with session.get(
                         url, timeout=3, headers={"User-Agent": "Mozilla/5.0"}
                     ) as resp:
@@ -4,7 +4,8 @@ import aiohttp
 import datetime
 import threading
 from pathlib import Path
-from urllib.parse import urlencode
+
+from city_guides.providers import http_clients
 
 _CACHE_FILE = Path(__file__).resolve().parents[1] / "data" / "unsplash_cache.json"
 _CACHE_LOCK = threading.Lock()
@@ -51,7 +52,7 @@ async def fetch_unsplash_image(query, session: aiohttp.ClientSession = None):
 
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -112,7 +113,7 @@ async def trigger_unsplash_download(download_url, session: aiohttp.ClientSession
     """Trigger a download request to Unsplash to increment the download counter."""
     own_session = False
     if session is None:
-        session = aiohttp.ClientSession()
+        session = http_clients.get_session()
         own_session = True
 
     try:
@@ -124,5 +125,3 @@ async def trigger_unsplash_download(download_url, session: aiohttp.ClientSession
     finally:
         if own_session:
             await session.close()
-</path>
-</write_to_file>
\ No newline at end of file
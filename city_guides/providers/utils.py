@@ -11,13 +11,14 @@ async def get_session(session: Optional[aiohttp.ClientSession] = None):
     """Context manager for aiohttp session handling.
 
     If session is provided, yields it.
-    If not, creates a new session and closes it after use.
+    If not, yields the shared pooled session from `http_clients`.
     """
     if session is not None:
         yield session
     else:
-        async with aiohttp.ClientSession() as new_session:
-            yield new_session
+        from city_guides.providers import http_clients
+        async with http_clients.get_session() as shared:
+            yield shared
 
 
 class VenueNormalizer:
@@ -1,8 +1,8 @@
-import aiohttp
 import re
-from bs4 import BeautifulSoup
 from typing import Optional
 
+from city_guides.providers import http_clients
+
 WIKI_API_URL = "https://{lang}.wikipedia.org/api/rest_v1/page/summary/{title}"
 
 async def fetch_wikipedia_summary(title: str, lang: str = "en", city: Optional[str] = None, country: Optional[str] = None, debug_logs: Optional[list] = None) -> Optional[str]:
@@ -28,7 +28,7 @@ async def fetch_wikipedia_summary(title: str, lang: str = "en", city: Optional[s
         slug = re.sub(r"\s+", "_", search_title)
         url = WIKI_API_URL.format(lang=lang, title=slug)
         
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             try:
                 async with session.get(url, headers=headers) as resp:
                     if resp.status == 200:
@@ -83,10 +83,11 @@ def looks_like_disambiguation(text: str) -> bool:
 
 async def fetch_wikipedia_full(title: str, lang: str = "en") -> Optional[dict]:
     """Fetch full HTML and parse sections for a Wikipedia page title."""
+    from bs4 import BeautifulSoup  # imported here: bs4 (+lxml) costs ~40ms at app startup
     slug = re.sub(r"\s+", "_", title)
     url = f"https://{lang}.wikipedia.org/wiki/{slug}"
     
-    async with aiohttp.ClientSession() as session:
+    async with http_clients.get_session() as session:
         async with session.get(url) as resp:
             if resp.status == 200:
                 html = await resp.text()
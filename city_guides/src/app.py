@@ -13,16 +13,16 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 import os
 import asyncio
 import json
-import hashlib
-import re
 import time
+from typing import TYPE_CHECKING
 
 # Third-party imports
 from quart import Quart, request, jsonify
 from quart_cors import cors
-import aiohttp
 from aiohttp import ClientTimeout
-from redis import asyncio as aioredis
+
+if TYPE_CHECKING:
+    from redis import asyncio as aioredis
 
 # Load environment variables from .env file
 try:
@@ -50,18 +50,17 @@ from city_guides.src.services.learning import (
     increment_location_weight,
     detect_hemisphere_from_searches
 )
-from city_guides.src.services.pixabay import pixabay_service
+from city_guides.src.services import pixabay
 from city_guides.src.dynamic_neighborhoods import get_neighborhoods_for_city
 
 # Import modules
 from city_guides.src.persistence import (
-    build_search_cache_key,
     ensure_bbox,
     get_cost_estimates,
     _is_relevant_wikimedia_image,
     _persist_quick_guide
 )
-from city_guides.providers import multi_provider
+from city_guides.providers import http_clients, multi_provider
 from city_guides.providers.geocoding import geocode_city
 from city_guides.providers.utils import get_session
 # metrics helper (Redis-backed counters and latency samples)
@@ -70,6 +69,8 @@ from city_guides.src.marco_response_enhancer import should_call_groq, analyze_us
 from city_guides.src.neighborhood_disambiguator import NeighborhoodDisambiguator
 from city_guides.src.data.seeded_facts import get_city_fun_facts
 from city_guides.src.utils.seasonal import get_seasonal_destinations
+from city_guides.src.services import exchange_rates, near_cache, warmup, weather
+from city_guides.src import responses
 
 # Use relative paths for deployment portability
 PROJECT_ROOT = Path(__file__).parent.parent.parent
@@ -78,18 +79,21 @@ TEMPLATE_FOLDER = PROJECT_ROOT / "city_guides" / "templates"
 
 # Create Quart app instance at the very top so it is always defined before any route decorators
 app = Quart(__name__, static_folder=str(STATIC_FOLDER), static_url_path='', template_folder=str(TEMPLATE_FOLDER))
+# jsonify() serializes with orjson (see responses.py)
+app.json = responses.OrjsonProvider(app)
 
 # Configure CORS
 cors(app, allow_origin=["http://localhost:5174", "https://travelland-w0ny.onrender.com"], allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
 
 # Cleanup Pixabay service on app shutdown
 async def cleanup_pixabay():
-    """Clean up Pixabay service on shutdown"""
-    await pixabay_service.close()
+    """Clean up Pixabay service on shutdown (if anything ever created it)"""
+    if pixabay._pixabay_service is not None:
+        await pixabay._pixabay_service.close()
 
 # Global async clients
-aiohttp_session: aiohttp.ClientSession | None = None
-redis_client: aioredis.Redis | None = None
+aiohttp_session: http_clients.ProfiledSession | None = None
+redis_client: "aioredis.Redis | None" = None
 
 # Track active long-running searches (search_id -> metadata)
 active_searches = {}
@@ -107,7 +111,6 @@ DISABLE_PREWARM = os.getenv("DISABLE_PREWARM", "false").lower() == "true"
 GEOCODING_TIMEOUT = int(os.getenv("GEOCODING_TIMEOUT", "10"))
 GROQ_TIMEOUT = int(os.getenv("GROQ_TIMEOUT", "30"))
 POPULAR_CITIES = os.getenv("POPULAR_CITIES", "").split(",") if os.getenv("POPULAR_CITIES") else []
-PREWARM_RAG_CONCURRENCY = int(os.getenv("PREWARM_RAG_CONCURRENCY", "3"))
 VERBOSE_OPEN_HOURS = os.getenv("VERBOSE_OPEN_HOURS", "false").lower() == "true"
 # Constants
 PREWARM_TTL = CACHE_TTL_SEARCH
@@ -171,7 +174,7 @@ async def fetch_city_wikipedia(city: str, state: str | None = None, country: str
 
     # Fallback: use Wikipedia open search with candidates
     try:
-        async with aiohttp.ClientSession() as session:
+        async with get_session() as session:
             for title in _candidates():
                 params = {
                     "action": "opensearch",
@@ -242,6 +245,15 @@ async def _add_cors_headers(response):
         pass
     return response
 
+# Weak ETags, 304 revalidation and gzip/brotli for JSON responses
+@app.after_request
+async def _finalize_json_response(response):
+    try:
+        return await responses.finalize_response(response, request)
+    except Exception:
+        app.logger.exception('Failed to finalize JSON response')
+        return response
+
 @app.before_request
 async def _handle_options_preflight():
     # Respond to OPTIONS preflight requests with the proper CORS headers.
@@ -256,27 +268,29 @@ async def _handle_options_preflight():
 @app.before_serving
 async def startup():
     global aiohttp_session, redis_client, recommender
-    aiohttp_session = aiohttp.ClientSession(headers={"User-Agent": "city-guides-async"})
+    # One pooled session (shared connector, DNS cache, per-upstream profiles) for all outbound calls
+    aiohttp_session = http_clients.get_session()
+    # local exchange-rate table (loads the persisted copy, refreshes on a schedule)
+    exchange_rates.table.start()
     # Update recommender with shared session for connection reuse
     recommender = TravelLandRecommender(session=aiohttp_session)
     try:
+        # redis takes ~60ms to import, so only the serving process pays for it
+        from redis import asyncio as aioredis
         redis_client = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"))
         await redis_client.ping()  # type: ignore
         app.logger.info("✅ Redis connected")
-        if DEFAULT_PREWARM_CITIES and DEFAULT_PREWARM_QUERIES:
-            asyncio.create_task(prewarm_popular_searches())
-        # start background prewarm of neighborhood lists for popular cities
+        # shared near-cache tier + cross-worker invalidation
+        near_cache.bus.start(redis_client)
+        # weather cells are shared across workers (and visible to the warm-up scheduler)
+        weather.service.attach(redis_client)
+        # start the access-driven warm-up scheduler (seeded from popular cities/queries)
         try:
-            if redis_client and POPULAR_CITIES and not DISABLE_PREWARM:
-                asyncio.create_task(prewarm_neighborhoods())
+            if not DISABLE_PREWARM:
+                warmup.scheduler.start(redis_client)
+                asyncio.create_task(seed_warmup())
         except Exception:
-            app.logger.exception('starting prewarm_neighborhoods failed')
-        # start background prewarm of RAG responses for top seeded cities
-        try:
-            if redis_client and not DISABLE_PREWARM:
-                asyncio.create_task(prewarm_rag_responses())
-        except Exception:
-            app.logger.exception('starting prewarm_rag_responses failed')
+            app.logger.exception('starting warm-up scheduler failed')
         
         # Set redis client for simple_categories
         try:
@@ -291,14 +305,17 @@ async def startup():
 @app.after_serving
 async def shutdown():
     global aiohttp_session, redis_client
+    await warmup.scheduler.stop()
+    await near_cache.bus.stop()
+    await exchange_rates.table.stop()
     # Cleanup Pixabay service
     try:
         await cleanup_pixabay()
     except Exception:
         pass
     # Cleanup aiohttp and redis
-    if aiohttp_session:
-        await aiohttp_session.close()
+    await http_clients.close()
+    aiohttp_session = None
     if redis_client:
         # Some test fakes or third-party clients may not provide an async close
         # method. Call it if available and await if it returns a coroutine.
@@ -349,197 +366,130 @@ def _is_content_sparse_or_low_quality(content: str, neighborhood: str, city: str
 
     return not has_details or avg_sentence_length < 15 or len(content.strip()) < 100
 
-# --- Helper Functions ---
+# --- Warm-up pipelines ---
+# The warm-up scheduler (services/warmup.py) learns hot cache keys from request
+# traffic and calls these in-process pipelines shortly before entries expire.
+# Static env lists (DEFAULT_PREWARM_*, POPULAR_CITIES, seeded cities) only seed it.
 
-async def get_weather_async(lat, lon):
-    if lat is None or lon is None:
+async def prewarm_search_cache_entry(payload: dict, cache_key: str) -> bool:
+    """Recompute a /api/search response and store it under cache_key."""
+    if not redis_client:
+        return False
+    from city_guides.src.routes.search import build_search_response
+    result = await build_search_response(payload)
+    if not result:
+        return False
+    await redis_client.set(cache_key, responses.dumps(result), ex=PREWARM_TTL)
+    app.logger.info("Prewarmed search cache for %s / %s", payload.get('query'), payload.get('category'))
+    return True
+
+
+async def prewarm_neighborhood_entry(params: dict, cache_key: str) -> bool:
+    """Recompute the /api/neighborhoods list for params (city/lat/lon/lang) and store it."""
+    if not redis_client:
+        return False
+    lat, lon = params.get('lat'), params.get('lon')
+    neighborhoods = await multi_provider.async_get_neighborhoods(
+        city=params.get('city') or None,
+        lat=float(lat) if lat else None,
+        lon=float(lon) if lon else None,
+        lang=params.get('lang') or 'en',
+        session=aiohttp_session,
+    )
+    if not neighborhoods:
+        return False
+    # Stored with bboxes so /api/neighborhoods can serve the bytes as-is
+    neighborhoods = [ensure_bbox(n) for n in neighborhoods]
+    await redis_client.set(cache_key, responses.dumps(neighborhoods), ex=CACHE_TTL_NEIGHBORHOOD)
+    app.logger.info("Prewarmed neighborhoods for %s (%d items)", params.get('city') or f"{lat},{lon}", len(neighborhoods))
+    return True
+
+
+async def prewarm_rag_entry(params: dict, cache_key: str) -> bool:
+    """Recompute a RAG answer in-process (no HTTP round trip); build_rag_response caches it."""
+    from city_guides.src.routes.chat import build_rag_response
+    _, status = await build_rag_response(params, use_cache=False)
+    return status == 200
+
+
+async def prewarm_weather_entry(params: dict, cache_key: str) -> bool:
+    """Refetch the current weather for a grid cell; the weather service stores it under cache_key."""
+    return await weather.service.refresh(params.get('lat'), params.get('lon'))
+
+
+async def _neighborhood_warm_key(city: str, lang: str = "en") -> tuple[dict, str] | None:
+    """Geocode a city the same way /api/neighborhoods does and return (params, cache_key)."""
+    geo = await geocode_city(city)
+    if not geo or geo.get("lat") is None or geo.get("lon") is None:
         return None
+    lat, lon = str(geo["lat"]), str(geo["lon"])
+    return {'city': city, 'lat': lat, 'lon': lon, 'lang': lang}, f"neighborhoods:{lat}_{lon}:{lang}"
+
+
+async def prewarm_neighborhood(city: str, lang: str = "en") -> bool:
+    """Fetch the neighborhood list for a city and store it in redis cache (best-effort)."""
+    if not redis_client or not city:
+        return False
     try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            # include current weather and today's sunrise/sunset (small payload)
-            "current_weather": True,
-            "daily": ",".join(["sunrise", "sunset"]),
-            "temperature_unit": "celsius",
-            "windspeed_unit": "kmh",
-            "precipitation_unit": "mm",
-            "timezone": "auto",
-        }
-        # coerce boolean params to strings
-        coerced = {k: (str(v).lower() if isinstance(v, bool) else v) for k, v in params.items()}
-        async with get_session() as session:
-            async with session.get(url, params=coerced, timeout=ClientTimeout(total=10)) as resp:  # type: ignore
-                if resp.status != 200:
-                    print(f"[DEBUG app.py] get_weather_async HTTP error: {resp.status}")
-                resp.raise_for_status()
-                data = await resp.json()
-                # return a compact payload containing current weather and today's daily fields
-                return {
-                    'current_weather': data.get('current_weather'),
-                    'daily': data.get('daily'),
-                    'timezone': data.get('timezone'),
-                    'timezone_abbreviation': data.get('timezone_abbreviation'),
-                    'utc_offset_seconds': data.get('utc_offset_seconds')
-                }
-    except Exception as e:
-        print(f"[DEBUG app.py] get_weather_async Exception: {e}")
-        return None
+        resolved = await _neighborhood_warm_key(city, lang)
+        if not resolved:
+            return False
+        return await prewarm_neighborhood_entry(*resolved)
+    except Exception as exc:
+        app.logger.debug("Neighborhood prewarm failed for %s: %s", city, exc)
+        return False
 
-async def prewarm_popular_searches():
-    if not redis_client or not DEFAULT_PREWARM_CITIES or not DEFAULT_PREWARM_QUERIES:
-        return
-    sem = asyncio.Semaphore(2)
-    async def limited(city, query):
-        async with sem:
-            await prewarm_search_cache_entry(city, query)
-            try:
-                await prewarm_neighborhood(city)
-            except Exception:
-                pass
 
-    tasks = [limited(city, query) for city in DEFAULT_PREWARM_CITIES for query in DEFAULT_PREWARM_QUERIES]
-    if tasks:
-        app.logger.info("Starting prewarm for %d popular searches", len(tasks))
-        await asyncio.gather(*tasks)
+def _top_seeded_cities(top_n: int) -> list[str]:
+    """Names of the top N seeded cities (by population when the seed has it, else file order)."""
+    seed_path = Path(__file__).parent.parent / 'data' / 'seeded_cities.json'
+    if not seed_path.exists():
+        return []
+    cities = json.loads(seed_path.read_text()).get('cities', [])
+    if isinstance(cities, dict):
+        # Fun-fact seed format: {"paris": [...facts], ...}
+        return [name.title() for name in list(cities)[:top_n]]
+    cities = sorted(cities, key=lambda c: int(c.get('population', 0) or 0), reverse=True)[:top_n]
+    return [c.get('name') for c in cities if c.get('name')]
 
 
-async def prewarm_rag_responses(top_n: int | None = None):
-    """Prewarm RAG responses for top N seeded cities using configured PREWARM_QUERIES.
-    Stores responses in Redis with TTL `RAG_CACHE_TTL` (defaults to 6h via env).
-    Best-effort and rate-limited to avoid overloading the Groq API.
-    """
-    if not redis_client:
-        app.logger.info('Redis not available, skipping RAG prewarm')
-        return
-    try:
-        seed_path = Path(__file__).parent.parent / 'data' / 'seeded_cities.json'
-        if not seed_path.exists():
-            app.logger.info('No seeded_cities.json found; skipping RAG prewarm')
-            return
-        data = json.loads(seed_path.read_text())
-        cities = data.get('cities', [])
-        if not cities:
-            app.logger.info('No cities in seed; skipping RAG prewarm')
-            return
-        top_n = int(top_n or PREWARM_RAG_TOP_N)
-        # Choose top N by population (descending)
-        cities = sorted(cities, key=lambda c: int(c.get('population', 0) or 0), reverse=True)[:top_n]
-        queries = DEFAULT_PREWARM_QUERIES or ["Top food"]
-        sem = asyncio.Semaphore(int(os.getenv('PREWARM_RAG_CONCURRENCY', '4')))
-
-        async def _warm_city(city_entry):
-            async with sem:
-                city_name = city_entry.get('name')
-                lat = city_entry.get('lat')
-                lon = city_entry.get('lon')
-                for q in queries:
-                    try:
-                        # Build cache key consistent with runtime
-                        ck_input = f"{q}|{city_name}|{''}|{city_entry.get('countryCode') or ''}|{lat or ''}|{lon or ''}"
-                        ck = "rag:" + hashlib.sha256(ck_input.encode('utf-8')).hexdigest()
-                        try:
-                            existing = None
-                            if redis_client:
-                                try:
-                                    existing = await redis_client.get(ck)
-                                    if existing:
-                                        await redis_client.expire(ck, int(os.getenv('RAG_CACHE_TTL', 60 * 60 * 6)))
-                                        continue
-                                except Exception:
-                                    pass
-                        except Exception:
-                            pass
-                        # Call our internal endpoint to generate answer
-                        payload = {"query": q, "engine": "google", "max_results": 3, "city": city_name}
-                        try:
-                            async with get_session(aiohttp_session) as session:
-                                async with session.post("http://localhost:5010/api/chat/rag", json=payload, timeout=ClientTimeout(total=15)) as resp:
-                                    if resp.status != 200:
-                                        app.logger.debug('Prewarm RAG failed for %s/%s: status %s', city_name, q, resp.status)
-                                        continue
-                                    data = await resp.json()
-                        except Exception as exc:
-                            app.logger.debug('Prewarm RAG http failed for %s/%s: %s', city_name, q, exc)
-                            continue
-
-                        if data and isinstance(data, dict):
-                            ttl = int(os.getenv('RAG_CACHE_TTL', 60 * 60 * 6))
-                            try:
-                                if redis_client:
-                                    await redis_client.setex(ck, ttl, json.dumps(data))
-                                    app.logger.info('Prewarmed RAG for %s / %s', city_name, q)
-                            except Exception as exc:
-                                app.logger.debug('Failed to set RAG cache for %s/%s: %s', city_name, q, exc)
-                    except Exception as exc:
-                        app.logger.debug('Prewarm RAG exception for %s/%s: %s', city_name, q, exc)
-
-        app.logger.info('Starting RAG prewarm for %d cities', len(cities))
-        await asyncio.gather(*[_warm_city(c) for c in cities])
-    except Exception:
-        app.logger.exception('RAG prewarm failed')
+async def seed_warmup(top_n: int | None = None):
+    """Seed the warm-up scheduler from the configured popular cities and queries."""
+    from city_guides.src.routes.chat import rag_cache_key
+    from city_guides.src.routes.search import search_cache_key
 
-async def prewarm_search_cache_entry(city: str, q: str):
-    if not redis_client or not city or not q:
-        return
-    cache_key = build_search_cache_key(city, q)
-    try:
-        existing = await redis_client.get(cache_key)
-        if existing:
-            await redis_client.expire(cache_key, PREWARM_TTL)
-            return
-    except Exception:
-        pass
-    try:
-        from .persistence import _search_impl
-        result = await asyncio.to_thread(_search_impl, {"city": city, "q": q})
-        if result:
-            await redis_client.set(cache_key, json.dumps(result), ex=PREWARM_TTL)
-            app.logger.info("Prewarmed search cache for %s / %s", city, q)
-    except Exception as exc:
-        app.logger.debug("Search prewarm failed for %s/%s: %s", city, q, exc)
+    for city in DEFAULT_PREWARM_CITIES:
+        for query in DEFAULT_PREWARM_QUERIES:
+            payload = {"query": city, "category": query}
+            warmup.scheduler.seed('search', payload, search_cache_key(payload))
 
-async def prewarm_neighborhood(city: str, lang: str = "en"):
-    """Fetch neighborhood lists for a city and store them in redis cache (best-effort)."""
-    if not redis_client or not city:
-        return
-    slug = re.sub(r"[^a-z0-9]+", "_", city.lower())
-    cache_key = f"neighborhoods:{slug}:{lang}"
     try:
-        existing = await redis_client.get(cache_key)
-        if existing:
-            await redis_client.expire(cache_key, CACHE_TTL_NEIGHBORHOOD)
-            return
+        queries = DEFAULT_PREWARM_QUERIES or ["Top food"]
+        for city_name in _top_seeded_cities(int(top_n or PREWARM_RAG_TOP_N)):
+            for q in queries:
+                params = {"query": q, "engine": "google", "max_results": 3, "city": city_name}
+                warmup.scheduler.seed('rag', params, rag_cache_key(params))
     except Exception:
-        pass
-    try:
-        # Prefer async provider and pass our shared session
-        try:
-            neighborhoods = await multi_provider.async_get_neighborhoods(city=city, lang=lang, session=aiohttp_session)
-        except Exception:
-            neighborhoods = []
-        if neighborhoods:
-            await redis_client.set(cache_key, json.dumps(neighborhoods), ex=CACHE_TTL_NEIGHBORHOOD)
-            app.logger.info("Prewarmed neighborhoods for %s (%d items)", city, len(neighborhoods))
-    except Exception as exc:
-        app.logger.debug("Neighborhood prewarm failed for %s: %s", city, exc)
-
-async def prewarm_neighborhoods():
-    """Background task to cache popular city neighborhoods"""
-    if DISABLE_PREWARM:
-        return  # Skip in tests
+        app.logger.exception('Seeding RAG warm-up from seeded cities failed')
 
+    # Neighborhood keys are coordinate-based, so geocoding is charged to the shared budget
     for city in POPULAR_CITIES:
         try:
-            await prewarm_neighborhood(city)
-            app.logger.info("✓ Prewarmed: %s", city)
-        except Exception as e:
-            app.logger.exception("Prewarm failed for %s: %s", city, e)
-        try:
-            await asyncio.sleep(float(os.getenv("NEIGHBORHOOD_PREWARM_PAUSE", 1.0)))
+            async with warmup.scheduler.budget:
+                resolved = await _neighborhood_warm_key(city)
+            if resolved:
+                warmup.scheduler.seed('neighborhoods', *resolved)
+                cell = weather.snap(resolved[0]['lat'], resolved[0]['lon'])
+                if cell:
+                    warmup.scheduler.seed('weather', {'lat': cell[0], 'lon': cell[1]}, weather.cache_key(cell))
         except Exception:
-            await asyncio.sleep(1.0)
+            app.logger.debug('Seeding neighborhood warm-up failed for %s', city)
+
+
+warmup.scheduler.register('search', prewarm_search_cache_entry)
+warmup.scheduler.register('neighborhoods', prewarm_neighborhood_entry)
+warmup.scheduler.register('rag', prewarm_rag_entry)
+warmup.scheduler.register('weather', prewarm_weather_entry)
 
 # Import and register routes from routes module
 from city_guides.src.routes import register_routes  # noqa: E402
@@ -549,6 +499,14 @@ register_routes(app)
 from city_guides.src.simple_categories import register_category_routes  # noqa: E402
 register_category_routes(app)
 
+
+def __getattr__(name):
+    # `app.aioredis` resolves on demand; redis is imported by startup(), not at module import
+    if name == "aioredis":
+        from redis import asyncio as aioredis
+        return aioredis
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
     # Load environment variables from .env file manually
     env_file = PROJECT_ROOT / ".env"
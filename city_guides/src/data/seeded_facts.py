@@ -14,10 +14,11 @@ class SeededFacts:
     def __init__(self):
         self._seed_data = None
         self._seed_file = Path(__file__).resolve().parent.parent.parent.parent / "city_guides" / "data" / "seeded_cities.json"
-        self._load_seed_data()
     
     def _load_seed_data(self):
-        """Load seed data from JSON file"""
+        """Load seed data from JSON file (on first use, not at import)"""
+        if self._seed_data is not None:
+            return self._seed_data
         try:
             if self._seed_file.exists():
                 with open(self._seed_file, 'r') as f:
@@ -29,10 +30,11 @@ class SeededFacts:
         except Exception as e:
             logger.error(f"Failed to load seed data: {e}")
             self._seed_data = {'cities': {}}
+        return self._seed_data
     
     def get_city_facts(self, city: str) -> list:
         """Get fun facts for a specific city from seed data"""
-        if not self._seed_data:
+        if not self._load_seed_data():
             logger.warning("No seed data available")
             return []
         
@@ -48,13 +50,13 @@ class SeededFacts:
     
     def get_all_cities(self) -> list:
         """Get all cities available in seed data"""
-        if not self._seed_data:
+        if not self._load_seed_data():
             return []
         return list(self._seed_data.get('cities', {}).keys())
     
     def get_metadata(self) -> dict:
         """Get seed data metadata"""
-        if not self._seed_data:
+        if not self._load_seed_data():
             return {}
         return {
             'source': self._seed_data.get('source'),
@@ -6,6 +6,8 @@ import aiohttp
 from typing import List, Dict
 import logging
 
+from city_guides.providers import http_clients
+
 logger = logging.getLogger(__name__)
 
 async def fetch_neighborhoods_dynamic(city: str, lat: float, lon: float, radius: int = 5000) -> List[Dict]:
@@ -49,7 +51,7 @@ async def fetch_neighborhoods_dynamic(city: str, lat: float, lon: float, radius:
     
     for endpoint in overpass_endpoints:
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_clients.get_session() as session:
                 async with session.post(
                     endpoint,
                     data={'data': overpass_query},
@@ -140,7 +142,7 @@ async def fetch_neighborhoods_wikidata(city: str, lat: float, lon: float) -> Lis
     """
     
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             async with session.get(
                 'https://query.wikidata.org/sparql',
                 params={'query': sparql_query, 'format': 'json'},
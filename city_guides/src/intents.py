@@ -0,0 +1,239 @@
+"""
+Intent / Keyword Classifier
+
+Every keyword table used to route a query (POI type, weather, fun facts,
+parse-dream intents, Marco's intent analysis, conversation interests, the
+cuisine ladder) is registered here and compiled once, at import, into a
+single trie-shaped regex. `classify(text)` scans the text once and returns
+every table/label the text hits, so call sites ask the result instead of
+running their own `any(kw in text for kw in ...)` loops.
+
+Matching keeps the substring semantics those loops had ('bars' also counts
+as 'bar', 'cafes' as 'cafe'): the regex is a lookahead tried at every
+position, which yields the longest keyword starting there, and every
+keyword that is a prefix of it is counted too.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# table -> label -> keywords. Label order matters where callers take the
+# first hit (poi_type, cuisine, interest).
+TABLES: Dict[str, Dict[str, List[str]]] = {
+    # semantic.get_poi_type_from_query (no hit means 'restaurant')
+    'poi_type': {
+        'transport': ['bus', 'metro', 'train', 'transport', 'transit'],
+        'attractions': ['museum', 'attraction', 'landmark', 'tourist'],
+        'accommodation': ['hotel', 'hostel', 'stay', 'accommodation'],
+        'shopping': ['shop', 'store', 'market', 'mall'],
+        'activities': ['park', 'hike', 'beach', 'activity'],
+    },
+    'weather': {
+        'weather': ['weather', 'temperature', 'forecast', 'wind', 'rain', 'sunny', 'cloudy', 'humidity',
+                    'umbrella', 'jacket', 'coat', 'wear', 'outdoor'],
+    },
+    # a fun-fact request is `direct`, or `intent` together with `subject`
+    'fun_fact': {
+        'direct': ['fun fact', 'interesting fact', 'cool fact', 'crazy fact', 'amazing fact', 'unique fact',
+                   'weird fact', 'surprising fact'],
+        'intent': ['fact', 'trivia', 'did you know', 'something cool', 'something crazy', 'something amazing',
+                   'something unique', 'something weird', 'something special', 'cool thing', 'crazy thing',
+                   'interesting thing'],
+        'subject': ['fact', 'thing', 'special'],
+    },
+    # /api/parse-dream
+    'dream': {
+        'coffee': ['coffee', 'cafe', 'cafes', 'espresso', 'latte', 'cappuccino'],
+        'nightlife': ['nightlife', 'bars', 'club', 'clubs', 'party', 'drinks', 'pub', 'pubs'],
+        'beaches': ['beach', 'beaches', 'coast', 'shore', 'ocean', 'sea', 'sand'],
+        'food': ['food', 'eat', 'restaurant', 'restaurants', 'dining', 'cuisine', 'dish'],
+        'shopping': ['shop', 'shopping', 'mall', 'stores', 'boutique', 'market'],
+        'culture': ['museum', 'museums', 'art', 'culture', 'gallery', 'historical', 'monument'],
+        'nature': ['park', 'parks', 'nature', 'hiking', 'garden', 'outdoor'],
+        'romance': ['romantic', 'romance', 'couples', 'date', 'sunset'],
+        'adventure': ['adventure', 'adventurous', 'extreme', 'thrill'],
+        'relaxation': ['relax', 'relaxing', 'spa', 'peaceful', 'quiet'],
+    },
+    # MarcoResponseEnhancer.analyze_user_intent; later labels win the intent type
+    'marco': {
+        'venue': ['restaurant', 'cafe', 'coffee', 'bar', 'pub', 'food', 'eat', 'drink', 'shop', 'store', 'museum',
+                  'park', 'attraction', 'pizza', 'taco', 'burger', 'sushi', 'italian', 'chinese', 'mexican',
+                  'thai', 'indian', 'french', 'japanese', 'korean', 'vietnamese', 'mediterranean', 'american',
+                  'breakfast', 'lunch', 'dinner', 'snacks', 'dessert', 'bakery', 'ice cream', 'hotel',
+                  'accommodation', 'hostel'],
+        'transport': ['bus', 'metro', 'train', 'transport', 'transit', 'subway', 'tram', 'ferry', 'station', 'stop',
+                      'terminal', 'public transport'],
+        'attraction': ['museum', 'attraction', 'landmark', 'tourist', 'sightseeing', 'monument', 'gallery',
+                       'theatre', 'cinema', 'park', 'beach'],
+        'neighborhood': ['neighborhood', 'area', 'district', 'explore', 'walk around', 'stroll', 'discover', 'find'],
+        'followup': ['explored', 'found', 'visited', 'tried', 'been to', 'saw', 'discovered'],
+    },
+    # semantic.analyze_any_query / prompt selection
+    'query': {
+        'venue': ['restaurant', 'cafe', 'coffee', 'bar', 'pub', 'food', 'eat', 'drink', 'shop', 'store', 'museum',
+                  'park', 'attraction', 'pizza', 'taco', 'burger', 'sushi', 'italian', 'chinese', 'mexican',
+                  'thai', 'indian', 'french', 'japanese', 'korean', 'vietnamese', 'mediterranean', 'american',
+                  'breakfast', 'lunch', 'dinner', 'snacks', 'dessert', 'bakery', 'ice cream'],
+        'neighborhood': ['neighborhood', 'area', 'district', 'explore', 'walk around', 'stroll'],
+        'venue_ui': ['coffee', 'food', 'restaurant', 'bar', 'pub', 'cafe', 'eat', 'drink'],
+        'transport': ['transport', 'bus', 'public transit', 'subway', 'metro', 'train', 'tram'],
+    },
+    # services/conversations.py
+    'interest': {
+        'coffee': ['coffee', 'cafe', 'espresso', 'latte', 'cappuccino', 'brew'],
+        'food': ['food', 'restaurant', 'eat', 'dining', 'cuisine', 'breakfast', 'lunch', 'dinner'],
+        'bars': ['bar', 'pub', 'drinks', 'nightlife', 'cocktail', 'beer', 'wine'],
+        'attractions': ['museum', 'park', 'attraction', 'sightseeing', 'landmark', 'tourist'],
+        'transport': ['bus', 'metro', 'train', 'transport', 'subway', 'taxi'],
+        'shopping': ['shop', 'market', 'mall', 'store', 'boutique'],
+        'dark': ['dark', 'black', 'strong', 'bold'],
+        'outdoor': ['outdoor', 'patio', 'terrace', 'garden', 'outside'],
+        'budget': ['cheap', 'budget', 'affordable', 'inexpensive', 'price'],
+        'atmosphere': ['cozy', 'romantic', 'lively', 'quiet', 'vibe', 'ambiance'],
+    },
+    'specific': {
+        'dark_coffee': ['dark', 'black', 'strong', 'bold', 'espresso'],
+        'outdoor_seating': ['outdoor', 'patio', 'terrace', 'garden', 'outside seating'],
+        'budget_friendly': ['budget', 'cheap', 'affordable', 'inexpensive', 'under $'],
+        'cozy_atmosphere': ['cozy', 'romantic', 'quiet', 'intimate', 'peaceful'],
+        'quick_service': ['quick', 'fast', 'takeaway', 'takeout', 'grab and go'],
+        'accessible': ['wheelchair', 'accessible', 'disabled', 'mobility'],
+    },
+    # search_provider.searx_search: the first cuisine hit is passed to Overpass
+    'cuisine': {
+        'mexican': ['taco', 'mexican'],
+        'italian': ['pizza', 'italian'],
+        'japanese': ['sushi', 'japanese'],
+        'chinese': ['chinese'],
+        'korean': ['korean'],
+        'asian': ['asian'],
+        'american': ['burger'],
+        'french': ['french', 'crepe', 'crepes'],
+        'irish': ['irish'],
+        'indian': ['indian'],
+        'thai': ['thai'],
+        'vietnamese': ['vietnamese'],
+        'greek': ['greek'],
+        'spanish': ['spanish'],
+        'german': ['german'],
+        'british': ['british'],
+    },
+    'food': {
+        'food': ['taco', 'pizza', 'burger', 'sushi', 'asian', 'italian', 'mexican', 'chinese', 'japanese', 'korean',
+                 'restaurant', 'food', 'eat', 'crepe', 'crepes', 'bakery', 'pastry', 'irish', 'indian', 'thai',
+                 'vietnamese', 'greek', 'spanish', 'german', 'british'],
+    },
+}
+
+CLASSIFY_CACHE_SIZE = 2048
+_CACHEABLE_CHARS = 500  # longer texts (venue descriptions, snippets) are scanned uncached
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex matching the longest of `words` at the current position"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # greedy: the longer keyword is tried before stopping at this one
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def _compile(tables: Dict[str, Dict[str, List[str]]]):
+    owners: Dict[str, List[Tuple[str, str]]] = {}
+    for table, labels in tables.items():
+        for label, keywords in labels.items():
+            for kw in keywords:
+                pairs = owners.setdefault(kw, [])
+                if (table, label) not in pairs:
+                    pairs.append((table, label))
+    # the regex reports the longest keyword at a position; the shorter ones
+    # starting there are exactly its keyword prefixes
+    prefixes = {kw: tuple(p for p in owners if kw.startswith(p)) for kw in owners}
+    pattern = re.compile(f'(?=({_trie_pattern(owners)}))')
+    return pattern, prefixes, owners
+
+
+_PATTERN, _PREFIXES, _OWNERS = _compile(TABLES)
+
+
+class Classification:
+    """Keywords found in one text, grouped by table and label"""
+
+    __slots__ = ('keywords', '_hits')
+
+    def __init__(self, keywords: FrozenSet[str]):
+        self.keywords = keywords
+        hits: Dict[str, Dict[str, None]] = {}
+        for kw in keywords:
+            for table, label in _OWNERS[kw]:
+                hits.setdefault(table, {})[label] = None
+        self._hits = hits
+
+    def labels(self, table: str) -> List[str]:
+        """Labels of `table` that matched, in table order"""
+        hit = self._hits.get(table)
+        if not hit:
+            return []
+        return [label for label in TABLES[table] if label in hit]
+
+    def first(self, table: str, default: Optional[str] = None) -> Optional[str]:
+        labels = self.labels(table)
+        return labels[0] if labels else default
+
+    def has(self, table: str, label: Optional[str] = None) -> bool:
+        hit = self._hits.get(table)
+        if not hit:
+            return False
+        return label is None or label in hit
+
+    def matched(self, table: str, label: str) -> List[str]:
+        """Keywords of one label that occur in the text, in table order"""
+        if not self.has(table, label):
+            return []
+        return [kw for kw in TABLES[table][label] if kw in self.keywords]
+
+    def __repr__(self):
+        return f"Classification({ {t: self.labels(t) for t in self._hits} })"
+
+
+def _scan(text: str) -> Classification:
+    found = set()
+    for m in _PATTERN.finditer(text):
+        found.update(_PREFIXES[m.group(1)])
+    return Classification(frozenset(found))
+
+
+_scan_cached = lru_cache(maxsize=CLASSIFY_CACHE_SIZE)(_scan)
+
+
+def keyword_spans(text: str, table: str) -> List[Tuple[int, int, str, str]]:
+    """(start, end, label, keyword) for every keyword of `table` found in `text`"""
+    spans = []
+    for m in _PATTERN.finditer((text or '').lower()):
+        start = m.start(1)
+        for kw in _PREFIXES[m.group(1)]:
+            for owner, label in _OWNERS[kw]:
+                if owner == table:
+                    spans.append((start, start + len(kw), label, kw))
+    return spans
+
+
+def classify(text: str) -> Classification:
+    """Every table/label `text` matches, from one pass over the text (case-insensitive)"""
+    text = (text or '').lower()
+    if len(text) > _CACHEABLE_CHARS:
+        return _scan(text)
+    # the same query is classified by several call sites per request
+    return _scan_cached(text)
@@ -6,6 +6,7 @@ generic fallbacks and provide more specific, helpful responses.
 """
 
 from typing import List, Dict, Any
+from .intents import TABLES, classify
 from .venue_quality import filter_high_quality_venues
 
 
@@ -42,29 +43,11 @@ class MarcoResponseEnhancer:
             "i'm ready to help you find",
         ]
         
-        self.venue_keywords = [
-            'restaurant', 'cafe', 'coffee', 'bar', 'pub', 'food', 'eat', 'drink',
-            'shop', 'store', 'museum', 'park', 'attraction', 'pizza', 'taco', 
-            'burger', 'sushi', 'italian', 'chinese', 'mexican', 'thai', 'indian',
-            'french', 'japanese', 'korean', 'vietnamese', 'mediterranean', 
-            'american', 'breakfast', 'lunch', 'dinner', 'snacks', 'dessert', 
-            'bakery', 'ice cream', 'hotel', 'accommodation', 'hotel', 'hostel'
-        ]
-        
-        self.transport_keywords = [
-            'bus', 'metro', 'train', 'transport', 'transit', 'subway', 'tram',
-            'ferry', 'station', 'stop', 'terminal', 'public transport'
-        ]
-        
-        self.attraction_keywords = [
-            'museum', 'attraction', 'landmark', 'tourist', 'sightseeing', 
-            'monument', 'gallery', 'theatre', 'cinema', 'park', 'beach'
-        ]
-        
-        self.neighborhood_keywords = [
-            'neighborhood', 'area', 'district', 'explore', 'walk around', 
-            'stroll', 'explore', 'discover', 'find'
-        ]
+        # keyword tables live in intents.TABLES['marco'] (one compiled matcher)
+        self.venue_keywords = TABLES['marco']['venue']
+        self.transport_keywords = TABLES['marco']['transport']
+        self.attraction_keywords = TABLES['marco']['attraction']
+        self.neighborhood_keywords = TABLES['marco']['neighborhood']
 
     def is_generic_response(self, response: str) -> bool:
         """Check if a response is generic and should be enhanced."""
@@ -103,38 +86,17 @@ class MarcoResponseEnhancer:
             'is_followup': False
         }
         
-        # Check for venue-specific requests
-        venue_matches = [kw for kw in self.venue_keywords if kw in query_lower]
-        if venue_matches:
-            intent['type'] = 'venue'
-            intent['is_venue_request'] = True
-            intent['specific_keywords'] = venue_matches
-        
-        # Check for transport requests
-        transport_matches = [kw for kw in self.transport_keywords if kw in query_lower]
-        if transport_matches:
-            intent['type'] = 'transport'
-            intent['is_transport_request'] = True
-            intent['specific_keywords'] = transport_matches
-        
-        # Check for attraction requests
-        attraction_matches = [kw for kw in self.attraction_keywords if kw in query_lower]
-        if attraction_matches:
-            intent['type'] = 'attraction'
-            intent['is_attraction_request'] = True
-            intent['specific_keywords'] = attraction_matches
-        
-        # Check for neighborhood requests
-        neighborhood_matches = [kw for kw in self.neighborhood_keywords if kw in query_lower]
-        if neighborhood_matches:
-            intent['type'] = 'neighborhood'
-            intent['is_neighborhood_request'] = True
-            intent['specific_keywords'] = neighborhood_matches
-        
+        # One pass over the query; later types take precedence
+        matches = classify(query_lower)
+        for kind, flag in (('venue', 'is_venue_request'), ('transport', 'is_transport_request'),
+                           ('attraction', 'is_attraction_request'), ('neighborhood', 'is_neighborhood_request')):
+            if matches.has('marco', kind):
+                intent['type'] = kind
+                intent[flag] = True
+                intent['specific_keywords'] = matches.matched('marco', kind)
+
         # Check for follow-up patterns
-        followup_patterns = ['explored', 'found', 'visited', 'tried', 'been to', 'saw', 'discovered']
-        if any(pattern in query_lower for pattern in followup_patterns):
-            intent['is_followup'] = True
+        intent['is_followup'] = matches.has('marco', 'followup')
         
         return intent
 
@@ -149,20 +111,17 @@ class MarcoResponseEnhancer:
             # If no high-quality venues, use all venues but warn
             high_quality_venues = venues[:10]
         
-        query_lower = query.lower()
+        query_keywords = set(classify(query).matched('marco', 'venue'))
         
         # Sort venues by relevance
         scored_venues = []
         for venue in high_quality_venues:
             score = 0
-            venue_lower = (venue.get('name', '') + ' ' + venue.get('description', '')).lower()
+            venue_text = venue.get('name', '') + ' ' + venue.get('description', '')
             
             # Boost score for keyword matches
-            for keyword in self.venue_keywords:
-                if keyword in query_lower and keyword in venue_lower:
-                    score += 2
-                elif keyword in venue_lower:
-                    score += 0.5
+            for keyword in classify(venue_text).matched('marco', 'venue'):
+                score += 2 if keyword in query_keywords else 0.5
             
             # Boost score for quality
             quality_score = venue.get('quality_score', 0)
@@ -8,7 +8,9 @@ separated from app.py and routes.py to avoid circular import issues.
 import json
 import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Optional
 import re
@@ -34,9 +36,9 @@ try:
 except ImportError:
     from snippet_filters import looks_like_ddgs_disambiguation_text
 try:
-    from city_guides.src.venue_quality import filter_high_quality_venues, calculate_venue_quality_score, enhance_chinese_venue_processing
+    from city_guides.src.venue_quality import enhance_chinese_venue_processing, select_quality_venues
 except ImportError:
-    from venue_quality import filter_high_quality_venues, calculate_venue_quality_score, enhance_chinese_venue_processing
+    from venue_quality import enhance_chinese_venue_processing, select_quality_venues
 
 
 async def _persist_quick_guide(out_obj: Dict, city_name: str, neighborhood_name: str, file_path: Path) -> None:
@@ -72,17 +74,21 @@ async def _persist_quick_guide(out_obj: Dict, city_name: str, neighborhood_name:
             out_obj['source_url'] = None
             out_obj['confidence'] = out_obj.get('confidence', 'low')
 
-        # Neutralize tone on quick_guide before persisting (async-safe)
+        # Neutralize tone on quick_guide before persisting (async-safe); skipped when the
+        # caller already neutralized it with the current rules
         try:
             se = get_synthesis_enhancer()
             qg = out_obj.get('quick_guide') or ''
-            if hasattr(se, 'neutralize_tone'):
+            version = getattr(se, 'NEUTRALIZER_VERSION', None)
+            if hasattr(se, 'neutralize_tone') and (version is None or out_obj.get('neutralized') != version):
                 neutral = se.neutralize_tone
                 if asyncio.iscoroutinefunction(neutral):
                     qg_clean = await neutral(qg, neighborhood_name, city_name)
                 else:
                     qg_clean = await asyncio.to_thread(neutral, qg, neighborhood_name, city_name)
                 out_obj['quick_guide'] = qg_clean
+                if version is not None:
+                    out_obj['neutralized'] = version
         except Exception:
             # Proceed even if neutralization fails
             pass
@@ -103,15 +109,19 @@ async def _persist_quick_guide(out_obj: Dict, city_name: str, neighborhood_name:
         logging.exception('Failed to persist quick_guide: %s', e)
 
 
-def build_search_cache_key(city: str, q: str, neighborhood: Dict | None = None) -> str:
-    """Build cache key for search results"""
+def build_search_cache_key(city: str, q: str, neighborhood: Dict | None = None, limit: int | None = None,
+                           state: str = "", country: str = "") -> str:
+    """Build cache key for search results (limit/state/country keep e.g. Portland OR and ME apart)"""
     import hashlib
     
     nh_key = ""
     if neighborhood:
         nh_id = neighborhood.get("id", "")
         nh_key = f":{nh_id}"
-    raw = f"search:{(city or '').strip().lower()}:{(q or '').strip().lower()}{nh_key}"
+    scope = ""
+    if limit is not None or state or country:
+        scope = f":{limit}:{(state or '').strip().lower()}:{(country or '').strip().lower()}"
+    raw = f"search:{(city or '').strip().lower()}:{(q or '').strip().lower()}{nh_key}{scope}"
     return "travelland:" + hashlib.sha1(raw.encode()).hexdigest()
 
 
@@ -535,7 +545,7 @@ def enrich_venue_data(venue: Dict, city: str = "") -> Dict:
     }
 
 
-def format_venue_for_display(poi: Dict) -> Dict:
+def format_venue_for_display(poi: Dict, city: str = "") -> Dict:
     """Format venue for frontend display"""
     address = poi.get('address', '')
 
@@ -547,13 +557,14 @@ def format_venue_for_display(poi: Dict) -> Dict:
         display_address = address
         coordinates = f"{poi.get('lat')},{poi.get('lon')}"
 
+    enrichment = venue_enrichment_cache.get(poi, city)
     return {
         'id': poi.get('id'),
         'city': '',  # Will be set by caller
         'name': poi.get('name', 'Unknown'),
-        'budget': determine_budget(poi.get('tags', {})),
-        'price_range': determine_price_range(poi.get('tags', {})),
-        'description': generate_description(poi),
+        'budget': enrichment['budget'],
+        'price_range': enrichment['price_range'],
+        'description': enrichment['display_description'],
         'tags': poi.get('tags', ''),
         'address': display_address,
         'latitude': poi.get('lat'),
@@ -565,9 +576,10 @@ def format_venue_for_display(poi: Dict) -> Dict:
         'phone': poi.get('phone'),
         'rating': None,  # OSM doesn't have ratings
         'opening_hours': poi.get('opening_hours'),
-        'opening_hours_pretty': _humanize_opening_hours(poi.get('opening_hours')),
-        'open_now': _compute_open_now(poi.get('lat'), poi.get('lon'), poi.get('opening_hours'))[0],
+        'opening_hours_pretty': enrichment['opening_hours_pretty'],
+        'open_now': _compute_open_now(poi.get('lat'), poi.get('lon'), poi.get('opening_hours'), enrichment['tz'])[0],
         'quality_score': poi.get('quality_score', 0),
+        'category_flags': enrichment['flags'],
     }
 
 
@@ -601,8 +613,37 @@ def _humanize_opening_hours(opening_hours_str: Optional[str]) -> Optional[str]:
     return "; ".join(pretty_parts) if pretty_parts else None
 
 
-def _compute_open_now(lat, lon, opening_hours_str):
-    """Best-effort server-side opening_hours check."""
+_tz_finder = None
+_tz_lock = threading.Lock()
+
+
+def _timezone_for(lat, lon) -> Optional[str]:
+    """Best-effort IANA timezone name for a coordinate.
+
+    The TimezoneFinder instance is created once (it loads its polygon data on
+    init). Falls back to DEFAULT_TZ (useful on hosts like Render that run in
+    UTC) when timezonefinder is unavailable or finds nothing.
+    """
+    global _tz_finder
+    tzname = None
+    try:
+        if lat and lon:
+            with _tz_lock:
+                if _tz_finder is None:
+                    from timezonefinder import TimezoneFinder
+                    _tz_finder = TimezoneFinder()
+                tzname = _tz_finder.timezone_at(lat=float(lat), lng=float(lon))
+    except Exception:
+        tzname = None
+    return tzname or os.getenv("DEFAULT_TZ") or None
+
+
+def _compute_open_now(lat, lon, opening_hours_str, tzname: Optional[str] = None):
+    """Best-effort server-side opening_hours check.
+
+    Pass `tzname` (e.g. from a venue's precomputed enrichment) to skip the
+    timezone lookup.
+    """
     if not opening_hours_str:
         return (None, None)
 
@@ -615,20 +656,8 @@ def _compute_open_now(lat, lon, opening_hours_str):
         return (True, None)
 
     # Determine timezone (best-effort)
-    tzname = None
-    try:
-        from timezonefinder import TimezoneFinder
-        tf = TimezoneFinder()
-        tzname = tf.timezone_at(lat=float(lat), lng=float(lon)) if lat and lon else None
-    except Exception:
-        tzname = None
-
-        # If timezonefinder isn't available or didn't find a timezone, allow an
-        # explicit override via DEFAULT_TZ (useful on hosts like Render that run in UTC).
-        if not tzname:
-            tz_env = os.getenv("DEFAULT_TZ")
-            if tz_env:
-                tzname = tz_env
+    if tzname is None:
+        tzname = _timezone_for(lat, lon)
 
     from datetime import datetime, time
 
@@ -712,6 +741,180 @@ def _compute_open_now(lat, lon, opening_hours_str):
     return (False, None)
 
 
+# === Precomputed venue enrichment ===
+# Derived venue fields (budget, descriptions, humanized hours, parsed tags,
+# timezone and category flags) are computed once when a venue is first seen
+# and kept in a bounded per-process cache keyed by provider/id/city. The
+# request path only tests the flag bitmask and computes the time-dependent
+# open_now.
+
+VENUE_ENRICHMENT_CACHE_SIZE = int(os.getenv("VENUE_ENRICHMENT_CACHE_SIZE", "20000"))
+
+VENUE_FLAG_TRANSPORT = 1 << 0
+VENUE_FLAG_SHOPPING = 1 << 1
+VENUE_FLAG_NIGHTLIFE = 1 << 2
+VENUE_FLAG_HISTORIC = 1 << 3
+VENUE_FLAG_FOOD = 1 << 4
+
+# Search categories that are narrowed with a category flag in _search_impl
+CATEGORY_FLAGS = {
+    "public transport": VENUE_FLAG_TRANSPORT,
+    "shopping": VENUE_FLAG_SHOPPING,
+    "nightlife": VENUE_FLAG_NIGHTLIFE,
+    "historic": VENUE_FLAG_HISTORIC,
+    "historic sites": VENUE_FLAG_HISTORIC,
+}
+
+
+def _substring_matcher(terms):
+    """Compile 'any(term in text)' into one regex search (longest terms first)"""
+    return re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)))
+
+
+_TRANSPORT_KEYS = ("railway", "station", "bus_station", "ferry_terminal", "public_transport")
+_SHOP_RE = _substring_matcher(["shop=", "boutique", "mall", "store", "retail"])
+_FOOD_RE = _substring_matcher(["restaurant", "cafe", "food", "cuisine", "couscous", "kitchen"])
+_NIGHTLIFE_EXCLUDED_RE = _substring_matcher([
+    "library", "bookcase", "education.library", "public_bookcase",
+    "employment", "government", "office", "administration",
+    "social_facility", "community_centre", "townhall",
+    "embassy", "consulate", "courthouse", "police",
+    "post_office", "bank", "atm", "clinic", "hospital",
+])
+_NIGHTLIFE_AMENITY_RE = _substring_matcher([
+    "amenity=bar", "amenity=pub", "amenity=nightclub",
+    "amenity=biergarten", "amenity=stripclub",
+    "bar=yes", "pub=yes",
+])
+_NIGHTLIFE_NAME_RE = _substring_matcher(["bar", "pub", "tavern", "biergarten", "brewery", "cocktail", "lounge", "club"])
+_NIGHTLIFE_BAD_NAME_RE = _substring_matcher(["library", "office", "employment", "government"])
+_BEVERAGE_RE = _substring_matcher(["bar", "pub", "biergarten", "cocktail", "beer", "wine", "drinks", "nightclub", "club", "lounge"])
+_HISTORIC_RE = _substring_matcher([
+    "historic", "monument", "memorial", "castle", "palace",
+    "museum", "gallery", "cathedral", "church", "temple",
+    "ruins", "archaeological", "heritage", "landmark",
+    "tourism=attraction", "tourism=museum", "tourism=gallery",
+    "building=cathedral", "building=church", "building=castle",
+    "historic=monument", "historic=castle", "historic=ruins",
+])
+_HISTORIC_GARBAGE_RE = _substring_matcher([
+    "traffic", "sign", "construction", "speed limit",
+    "kebab", "burger", "fast food", "driveway", "parking",
+    "regulatory", "maxspeed", "construction--",
+])
+
+
+def parse_venue_tags(raw_tags) -> Dict:
+    """Normalize dict / 'k=v,flag' string / list tags into a dict"""
+    if isinstance(raw_tags, dict):
+        return dict(raw_tags)
+    if isinstance(raw_tags, str):
+        items = [t.strip() for t in raw_tags.split(",") if t.strip()]
+    elif isinstance(raw_tags, list):
+        items = [str(t).strip() for t in raw_tags if t]
+    else:
+        return {}
+    parsed = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        parsed[key] = value if sep else "yes"
+    return parsed
+
+
+def compute_category_flags(tags, name: str = "") -> int:
+    """Category bitmask equivalent to the per-category filters of _search_impl"""
+    tags_str = str(tags).lower()
+    name = (name or "").lower()
+    flags = 0
+    try:
+        # Transport keeps the original membership semantics (dict keys / substrings)
+        if any(k in tags for k in _TRANSPORT_KEYS):
+            flags |= VENUE_FLAG_TRANSPORT
+    except TypeError:
+        pass
+    is_food = bool(_FOOD_RE.search(tags_str))
+    if is_food:
+        flags |= VENUE_FLAG_FOOD
+    if _SHOP_RE.search(tags_str) and not is_food:
+        flags |= VENUE_FLAG_SHOPPING
+    if not _NIGHTLIFE_EXCLUDED_RE.search(tags_str):
+        strong_name = _NIGHTLIFE_NAME_RE.search(name) and not _NIGHTLIFE_BAD_NAME_RE.search(name)
+        if (_NIGHTLIFE_AMENITY_RE.search(tags_str) or strong_name) and _BEVERAGE_RE.search(tags_str):
+            flags |= VENUE_FLAG_NIGHTLIFE
+    if _HISTORIC_RE.search(tags_str) and not (_HISTORIC_GARBAGE_RE.search(name) or _HISTORIC_GARBAGE_RE.search(tags_str)):
+        flags |= VENUE_FLAG_HISTORIC
+    return flags
+
+
+def _build_venue_enrichment(venue: Dict, city: str) -> Dict:
+    tags = venue.get("tags", {})
+    enriched = enrich_venue_data(venue, city)
+    opening_hours = venue.get("opening_hours") or enriched.get("opening_hours")
+    enriched.update({
+        "budget": determine_budget(tags),
+        "price_range": determine_price_range(tags),
+        "display_description": generate_description(venue),
+        "opening_hours_pretty": _humanize_opening_hours(opening_hours),
+        "tag_dict": parse_venue_tags(tags),
+        "flags": compute_category_flags(tags, venue.get("name", "")),
+        # Only venues with hours need a timezone for open_now ('' = unresolved, don't retry)
+        "tz": (_timezone_for(venue.get("lat"), venue.get("lon")) or "") if opening_hours else None,
+    })
+    return enriched
+
+
+class VenueEnrichmentCache:
+    """Bounded LRU of derived venue fields, shared by the search worker threads"""
+
+    def __init__(self, maxsize: int = VENUE_ENRICHMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _fingerprint(venue: Dict) -> int:
+        # Refetched venues whose data changed get re-enriched
+        return hash((venue.get("name"), venue.get("type"), venue.get("opening_hours"), str(venue.get("tags"))))
+
+    def get(self, venue: Dict, city: str = "") -> Dict:
+        """Return the enrichment for a venue, computing it on first sight"""
+        vid = venue.get("id")
+        if not vid or self.maxsize <= 0:
+            return _build_venue_enrichment(venue, city)
+        key = (venue.get("provider", ""), vid, city)
+        fingerprint = self._fingerprint(venue)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+        enrichment = _build_venue_enrichment(venue, city)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[key] = (fingerprint, enrichment)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return enrichment
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+venue_enrichment_cache = VenueEnrichmentCache()
+
+
+def filter_venues_by_category(venues: list, category: str) -> list:
+    """Keep venues whose precomputed flags match a flagged category (others pass through)"""
+    flag = CATEGORY_FLAGS.get(category)
+    if not flag:
+        return venues
+    return [v for v in venues if v.get("category_flags", 0) & flag]
+
+
 def calculate_search_radius(neighborhood_name, bbox):
     """Calculate appropriate search radius based on context"""
     if neighborhood_name:
@@ -793,6 +996,10 @@ def get_currency_for_country(country: str) -> Optional[str]:
     """Return the primary currency code (ISO 4217) for a given country name using restcountries API."""
     if not country:
         return None
+    from city_guides.src.services.exchange_rates import table as currency_table
+    code = currency_table.currency_for_country(country)
+    if code:
+        return code
     try:
         import requests
         url = f"https://restcountries.com/v3.1/name/{requests.utils.requote_uri(country)}"
@@ -810,6 +1017,7 @@ def get_currency_for_country(country: str) -> Optional[str]:
             if isinstance(cur_obj, dict) and cur_obj:
                 # return first currency code
                 for code in cur_obj.keys():
+                    currency_table.remember_country(country, code)
                     return code
     except Exception:
         pass
@@ -840,6 +1048,9 @@ def get_currency_name(code: str) -> Optional[str]:
     }
     if code in names:
         return names[code]
+    from city_guides.src.services.exchange_rates import table as currency_table
+    if currency_table.currency_name(code):
+        return currency_table.currency_name(code)
     # try RestCountries API to resolve name
     try:
         import requests
@@ -1456,6 +1667,8 @@ def _search_impl(payload):
             else:
                 print("[SEARCH DEBUG] Failed to geocode city")
         finally:
+            from city_guides.providers.http_clients import close_loop_session
+            loop.run_until_complete(close_loop_session())
             loop.close()
     except Exception as e:
         print(f"[SEARCH DEBUG] Geocoding error: {e}")
@@ -1604,8 +1817,8 @@ def _search_impl(payload):
                     if not address.startswith("📍"):
                         address = f"📍 {address}"
                     
-                    # Enrich venue with human-readable context
-                    enriched_data = enrich_venue_data(venue, city)
+                    # Derived fields are computed once per venue and cached
+                    enriched_data = venue_enrichment_cache.get(venue, city)
                     
                     formatted_venue = {
                         "id": venue.get("id", ""),
@@ -1616,9 +1829,13 @@ def _search_impl(payload):
                         "cuisine": enriched_data.get("cuisine", ""),
                         "price_level": enriched_data.get("price_level", ""),
                         "price_indicator": enriched_data.get("price_indicator", ""),
-                        "features": enriched_data.get("features", []),
+                        "features": list(enriched_data.get("features", [])),
                         "opening_hours": enriched_data.get("opening_hours"),
+                        "opening_hours_pretty": enriched_data.get("opening_hours_pretty"),
+                        "open_now": _compute_open_now(lat, lon, enriched_data.get("opening_hours"), enriched_data.get("tz"))[0],
+                        "tz": enriched_data.get("tz"),  # lets cached results recompute open_now without a lookup
                         "phone": enriched_data.get("phone"),
+                        "category_flags": enriched_data.get("flags", 0),
                         "lat": venue.get("lat"),
                         "lon": venue.get("lon"),
                         "provider": venue.get("provider", ""),
@@ -1660,106 +1877,10 @@ def _search_impl(payload):
                 formatted_venues = loop.run_until_complete(get_venues_with_images())
                 print(f"[SEARCH DEBUG] Found {len(formatted_venues)} venues")
                 
-                # Filter for public transport venues if category is public transport
-                if q == "public transport":
-                    transport_venues = []
-                    for venue in formatted_venues:
-                        tags_str = venue.get("tags", "")
-                        # Check if the tags string contains transport-related keywords
-                        if "railway" in tags_str or "station" in tags_str or "bus_station" in tags_str or "ferry_terminal" in tags_str or "public_transport" in tags_str:
-                            transport_venues.append(venue)
-                    result["venues"] = transport_venues
-                    print(f"[SEARCH DEBUG] Filtered to {len(transport_venues)} transport venues")
-                elif q == "shopping":
-                    # Filter for shopping venues - shops, boutiques, malls
-                    shopping_venues = []
-                    for venue in formatted_venues:
-                        tags = venue.get("tags", {})
-                        tags_str = str(tags).lower()
-                        # Check for shop-related tags and exclude food
-                        is_shop = any(keyword in tags_str for keyword in ["shop=", "boutique", "mall", "store", "retail"])
-                        is_food = any(keyword in tags_str for keyword in ["restaurant", "cafe", "food", "cuisine", "couscous", "kitchen"])
-                        if is_shop and not is_food:
-                            shopping_venues.append(venue)
-                    result["venues"] = shopping_venues
-                    print(f"[SEARCH DEBUG] Filtered to {len(shopping_venues)} shopping venues")
-                elif q == "nightlife":
-                    # Filter for nightlife venues - bars, pubs, clubs, lounges
-                    nightlife_venues = []
-                    for venue in formatted_venues:
-                        tags = venue.get("tags", {})
-                        tags_str = str(tags).lower()
-                        name = venue.get("name", "").lower()
-                        
-                        # STRICT filtering - exclude obvious non-nightlife
-                        excluded_types = [
-                            "library", "bookcase", "education.library", "public_bookcase",
-                            "employment", "government", "office", "administration",
-                            "social_facility", "community_centre", "townhall",
-                            "embassy", "consulate", "courthouse", "police",
-                            "post_office", "bank", "atm", "clinic", "hospital"
-                        ]
-                        if any(bad in tags_str for bad in excluded_types):
-                            continue
-                        
-                        # Must have explicit nightlife amenity tags
-                        nightlife_amenities = [
-                            "amenity=bar", "amenity=pub", "amenity=nightclub",
-                            "amenity=biergarten", "amenity=stripclub",
-                            "bar=yes", "pub=yes"
-                        ]
-                        has_nightlife_amenity = any(tag in tags_str for tag in nightlife_amenities)
-                        
-                        # OR have strong name indicators + beverage keywords
-                        strong_name_indicators = [
-                            "bar", "pub", "tavern", "biergarten", "brewery",
-                            "cocktail", "lounge", "club"
-                        ]
-                        has_strong_name = any(ind in name for ind in strong_name_indicators)
-                        
-                        # Require amenity tag OR (strong name + not excluded)
-                        if has_nightlife_amenity or (has_strong_name and not any(bad in name for bad in ["library", "office", "employment", "government"])):
-                            # Additional check: must have beverage/entertainment related tags
-                            beverage_keywords = ["bar", "pub", "biergarten", "cocktail", "beer", "wine", "drinks", "nightclub", "club", "lounge"]
-                            if any(kw in tags_str for kw in beverage_keywords):
-                                nightlife_venues.append(venue)
-                    
-                    result["venues"] = nightlife_venues
-                    print(f"[SEARCH DEBUG] Filtered to {len(nightlife_venues)} nightlife venues (strict mode)")
-                elif q in ["historic", "historic sites"]:
-                    # Filter for actual historic sites - monuments, museums, castles, etc.
-                    historic_venues = []
-                    for venue in formatted_venues:
-                        tags = venue.get("tags", {})
-                        tags_str = str(tags).lower()
-                        name = venue.get("name", "").lower()
-                        
-                        # STRICT filtering - must have actual historic/tourism tags
-                        historic_indicators = [
-                            "historic", "monument", "memorial", "castle", "palace",
-                            "museum", "gallery", "cathedral", "church", "temple",
-                            "ruins", "archaeological", "heritage", "landmark",
-                            "tourism=attraction", "tourism=museum", "tourism=gallery",
-                            "building=cathedral", "building=church", "building=castle",
-                            "historic=monument", "historic=castle", "historic=ruins"
-                        ]
-                        
-                        # Must have at least one historic indicator
-                        has_historic = any(ind in tags_str for ind in historic_indicators)
-                        
-                        # Exclude garbage like traffic signs, construction, random shops
-                        garbage_indicators = [
-                            "traffic", "sign", "construction", "speed limit",
-                            "kebab", "burger", "fast food", "driveway", "parking",
-                            "regulatory", "maxspeed", "construction--"
-                        ]
-                        is_garbage = any(garb in name or garb in tags_str for garb in garbage_indicators)
-                        
-                        if has_historic and not is_garbage:
-                            historic_venues.append(venue)
-                    
-                    result["venues"] = historic_venues
-                    print(f"[SEARCH DEBUG] Filtered to {len(historic_venues)} historic venues (strict mode)")
+                # Category-specific narrowing uses the precomputed flag bitmask
+                if q in CATEGORY_FLAGS:
+                    result["venues"] = filter_venues_by_category(formatted_venues, q)
+                    print(f"[SEARCH DEBUG] Filtered to {len(result['venues'])} {q} venues")
                 else:
                     result["venues"] = formatted_venues
                 
@@ -1777,40 +1898,29 @@ def _search_impl(payload):
                 if neighborhood:
                     threshold = min(threshold, 0.4)  # lower to 0.4 for neighborhood-level searches
 
-                # Filter using the selected threshold
-                high_quality_venues = filter_high_quality_venues(result["venues"], min_score=threshold)
-                result["debug_info"]["quality_filtered"] = len(result["venues"]) - len(high_quality_venues)
-                result["debug_info"]["quality_threshold"] = threshold
-
-                # Fallback: if too few venues remain, include top-scoring remaining venues until we reach the requested limit
+                # Filter using the selected threshold; if too few venues remain, top up with the
+                # best-scoring remaining venues until we reach the requested limit (one scoring pass)
                 MIN_VENUES = min(limit, 15)  # Use requested limit or at least try to get 15
-                fallback_included = False
-                if len(high_quality_venues) < MIN_VENUES:
-                    # Ensure quality scores exist for all venues
-                    for v in result["venues"]:
-                        if 'quality_score' not in v:
-                            v['quality_score'] = calculate_venue_quality_score(v)
-
-                    existing_ids = set(v.get('id') for v in high_quality_venues)
-                    remaining = [v for v in result["venues"] if v.get('id') not in existing_ids]
-                    remaining_sorted = sorted(remaining, key=lambda x: x.get('quality_score', 0), reverse=True)
-
-                    to_add = []
-                    for v in remaining_sorted:
-                        if len(high_quality_venues) + len(to_add) >= MIN_VENUES:
-                            break
-                        to_add.append(v)
+                high_quality_venues, to_add = select_quality_venues(result["venues"], min_score=threshold, minimum=MIN_VENUES)
+                result["debug_info"]["quality_filtered"] = len(result["venues"]) - len(high_quality_venues) + len(to_add)
+                result["debug_info"]["quality_threshold"] = threshold
 
-                    if to_add:
-                        fallback_included = True
-                        high_quality_venues.extend(to_add)
-                        result["debug_info"]["fallback_included"] = True
-                        result["debug_info"]["fallback_added"] = [ {"id": v.get("id"), "name": v.get("name"), "quality_score": v.get("quality_score")} for v in to_add ]
+                if to_add:
+                    result["debug_info"]["fallback_included"] = True
+                    result["debug_info"]["fallback_added"] = [ {"id": v.get("id"), "name": v.get("name"), "quality_score": v.get("quality_score")} for v in to_add ]
 
                 result["venues"] = high_quality_venues
                 result["debug_info"]["venues_found"] = len(result["venues"])
                 
             finally:
+                # Late secondary providers must not outlive this loop (their breaker probe would leak)
+                try:
+                    from city_guides.providers.multi_provider import cancel_late_provider_tasks
+                    loop.run_until_complete(cancel_late_provider_tasks())
+                except Exception as e:
+                    print(f"[SEARCH DEBUG] Failed to cancel late provider calls: {e}")
+                from city_guides.providers.http_clients import close_loop_session
+                loop.run_until_complete(close_loop_session())
                 loop.close()
                 
         except Exception as e:
@@ -1825,11 +1935,13 @@ def _search_impl(payload):
         try:
             print(f"[SEARCH DEBUG] Generating city-wide Wikipedia quick guide for {city}")
             
+            from city_guides.providers import http_clients
+
             async def get_city_guide():
                 # Simple Wikipedia API call with proper User-Agent
                 url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{city.replace(' ', '_')}"
                 headers = {"User-Agent": "TravelLand/1.0 (travel-guide-app; https://github.com/example/travelland)"}
-                async with aiohttp.ClientSession() as session:
+                async with http_clients.get_session() as session:
                     async with session.get(url, timeout=aiohttp.ClientTimeout(total=10), headers=headers) as resp:
                         if resp.status == 200:
                             data = await resp.json()
@@ -1840,12 +1952,17 @@ def _search_impl(payload):
                                 if city_image_search:
                                     try:
                                         image_info = await city_image_search(city, session=session)
-                                        if image_info and image_info.get('image_url'):
+                                        image_url = image_info and (image_info.get('url') or image_info.get('image_url'))
+                                        if image_url:
                                             city_image = {
-                                                'url': image_info['image_url'],
+                                                'url': image_url,
                                                 'attribution': image_info.get('attribution'),
                                                 'source': 'wikipedia'
                                             }
+                                            if image_info.get('srcset'):
+                                                city_image['srcset'] = image_info['srcset']
+                                                city_image['width'] = image_info.get('width')
+                                                city_image['height'] = image_info.get('height')
                                     except Exception as e:
                                         print(f"[SEARCH DEBUG] Failed to fetch city image: {e}")
                                 
@@ -1868,6 +1985,7 @@ def _search_impl(payload):
                 else:
                     print("[SEARCH DEBUG] No Wikipedia results for city")
             finally:
+                loop.run_until_complete(http_clients.close_loop_session())
                 loop.close()
                 
         except Exception as e:
@@ -1895,6 +2013,10 @@ __all__ = [
     'format_venue_for_display',
     '_humanize_opening_hours',
     '_compute_open_now',
+    'parse_venue_tags',
+    'compute_category_flags',
+    'filter_venues_by_category',
+    'venue_enrichment_cache',
     'calculate_search_radius',
     'get_country_for_city',
     'get_provider_links',
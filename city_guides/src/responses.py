@@ -0,0 +1,191 @@
+# JSON response layer - orjson serialization, pre-serialized cache bodies,
+# weak ETags and gzip/brotli negotiation
+#
+# `app.json` is an OrjsonProvider, so every jsonify() goes through orjson.
+# Routes that cache a payload in Redis store the serialized bytes (`dumps`) and
+# serve a hit with `json_response(raw)`, which skips json.loads and the re-dump;
+# `RawJSON.value` parses lazily for the few callers that need the object.
+#
+# `finalize_response` runs as an after_request hook: it tags JSON bodies with a
+# weak ETag derived from a content hash, answers a matching If-None-Match on
+# GET/HEAD with 304 and compresses larger bodies with brotli (when installed)
+# or gzip according to Accept-Encoding.
+
+import gzip
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
+
+from quart import current_app
+from quart.json.provider import DefaultJSONProvider
+from werkzeug.http import parse_accept_header
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements, stdlib fallback keeps dev setups working
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RESPONSE_COMPRESS_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESS_MIN_SIZE", "1024"))  # bytes
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+RESPONSE_COMPRESS_CACHE_SIZE = int(os.getenv("RESPONSE_COMPRESS_CACHE_SIZE", "256"))  # compressed bodies kept per process
+RESPONSE_COMPRESS_CACHE_MAX_BODY = int(os.getenv("RESPONSE_COMPRESS_CACHE_MAX_BODY", str(512 * 1024)))
+
+JSON_MIMETYPE = 'application/json'
+
+# Fallback for types neither serializer handles natively (dates, Decimal, Markup)
+_default = DefaultJSONProvider.default
+
+if orjson is not None:
+    # Datetimes go through quart's default so they keep the RFC 822 format jsonify used
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class RawJSON:
+    """Already-serialized JSON (e.g. a Redis cache hit); parsed only if `.value` is read"""
+
+    __slots__ = ('body', '_value', '_parsed')
+
+    def __init__(self, body: Union[bytes, str]):
+        self.body = body.encode('utf-8') if isinstance(body, str) else bytes(body)
+        self._value = None
+        self._parsed = False
+
+    @property
+    def value(self) -> Any:
+        if not self._parsed:
+            self._value = loads(self.body)
+            self._parsed = True
+        return self._value
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Quart JSON provider backed by orjson (falls back to stdlib json)"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj.value if isinstance(obj, RawJSON) else obj)
+        body = obj.body if isinstance(obj, RawJSON) else dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def json_response(obj: Any, status: int = 200):
+    """Build a JSON response from an object, a RawJSON or pre-serialized bytes"""
+    if isinstance(obj, RawJSON):
+        body = obj.body
+    elif isinstance(obj, (bytes, bytearray)):
+        body = bytes(obj)
+    else:
+        body = dumps(obj)
+    return current_app.response_class(body, status=status, mimetype=JSON_MIMETYPE)
+
+
+def etag_for(body: bytes) -> str:
+    """Weak ETag for a response body (weak: the same entity may be sent gzip/br/identity)"""
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(etag: str, if_none_match: Optional[str]) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header value"""
+    if not if_none_match:
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick 'br' or 'gzip' from an Accept-Encoding header (None for identity)"""
+    if not accept_encoding:
+        return None
+    accept = parse_accept_header(accept_encoding)
+    if brotli is not None and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+_compressed: 'OrderedDict[Tuple[str, str], bytes]' = OrderedDict()
+
+
+def compress(body: bytes, encoding: str, etag: Optional[str] = None) -> bytes:
+    """Compress a body; results for hot bodies are memoized by (ETag, encoding)"""
+    key = (etag or etag_for(body), encoding)
+    hit = _compressed.get(key)
+    if hit is not None:
+        _compressed.move_to_end(key)
+        return hit
+    if encoding == 'br':
+        data = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+    if len(body) <= RESPONSE_COMPRESS_CACHE_MAX_BODY and RESPONSE_COMPRESS_CACHE_SIZE > 0:
+        _compressed[key] = data
+        while len(_compressed) > RESPONSE_COMPRESS_CACHE_SIZE:
+            _compressed.popitem(last=False)
+    return data
+
+
+async def finalize_response(response, request):
+    """after_request hook: weak ETag, 304 revalidation and compression for JSON bodies"""
+    if response.mimetype != JSON_MIMETYPE or response.status_code != 200:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+
+    body = await response.get_data()
+    etag = etag_for(body)
+    response.headers['ETag'] = etag
+    response.vary.add('Accept-Encoding')
+
+    if request.method in ('GET', 'HEAD') and etag_matches(etag, request.headers.get('If-None-Match')):
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+
+    if len(body) < RESPONSE_COMPRESS_MIN_SIZE:
+        return response
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        response.set_data(compress(body, encoding, etag))
+        response.headers['Content-Encoding'] = encoding
+    return response
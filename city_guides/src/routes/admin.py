@@ -2,16 +2,36 @@
 Admin routes: Health checks, metrics, and smoke tests
 """
 import os
+import hmac
 import time
 import asyncio
-from quart import Blueprint, jsonify
+from quart import Blueprint, jsonify, request
 
 # Import dependencies from parent app
 from city_guides.src.metrics import get_metrics as get_metrics_dict
-from city_guides.providers import multi_provider
+from city_guides.providers import circuit_breakers, http_clients, multi_provider
+from city_guides.src.services import (
+    answer_cache, embeddings, exchange_rates, ingestion, near_cache, quick_guides, warmup, weather,
+)
+from city_guides.src.services.media_lookup import media_lookup
 
 bp = Blueprint('admin', __name__)
 
+# Admin actions (bulk rebuilds etc.) require this token; without one only local requests may run them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def admin_denied():
+    """None when the current request may run an admin action, else a (response, status) to return"""
+    if ADMIN_TOKEN:
+        auth = request.headers.get('Authorization', '')
+        sent = auth[7:] if auth.startswith('Bearer ') else request.headers.get('X-Admin-Token', '')
+        if hmac.compare_digest(sent.encode(), ADMIN_TOKEN.encode()):
+            return None
+    elif request.remote_addr in ('127.0.0.1', '::1'):
+        return None
+    return jsonify({'error': 'admin token required'}), 403
+
 
 @bp.route('/healthz')
 async def healthz():
@@ -25,7 +45,18 @@ async def healthz():
         'ready': bool(aiohttp_session is not None),
         'redis': bool(redis_client is not None),
         'geoapify': bool(os.getenv('GEOAPIFY_API_KEY')),
-        'geonames': bool(os.getenv('GEONAMES_USERNAME'))
+        'geonames': bool(os.getenv('GEONAMES_USERNAME')),
+        'quick_guide_regeneration': dict(quick_guides.regeneration_queue.stats),
+        'warmup': warmup.scheduler.snapshot(),
+        'media': media_lookup.snapshot(),
+        'http': http_clients.snapshot(),
+        'providers': circuit_breakers.snapshot(),
+        'near_cache': near_cache.snapshot(),
+        'exchange_rates': exchange_rates.table.snapshot(),
+        'rag_answer_cache': answer_cache.cache.snapshot(),
+        'weather': weather.service.snapshot(),
+        'ingestion': ingestion.pipeline.snapshot(),
+        'embeddings': embeddings.service.snapshot(),
     }
     return jsonify(status)
 
@@ -83,6 +114,11 @@ async def admin():
                 <div id="health-data" class="json-data" style="display: none;"></div>
             </div>
             
+            <div class="card">
+                <h2>🔌 Provider Circuit Breakers</h2>
+                <div id="breakers-content" class="loading">Loading provider status...</div>
+            </div>
+            
             <div class="card">
                 <h2>📊 System Metrics</h2>
                 <div id="metrics-content" class="loading">Loading metrics...</div>
@@ -227,6 +263,37 @@ async def admin():
                 return html;
             }
 
+            function escapeHtml(text) {
+                const div = document.createElement('div');
+                div.textContent = String(text);
+                return div.innerHTML;
+            }
+
+            function formatBreakers(providers) {
+                const names = Object.keys(providers || {});
+                if (!names.length) {
+                    return '<div class="loading">No provider calls yet</div>';
+                }
+                const classes = { closed: 'ok', half_open: 'warning', open: 'error' };
+                let html = '<div class="metrics">';
+                names.forEach(name => {
+                    const b = providers[name];
+                    html += `<div class="metric"><div><strong>${name}</strong></div>`;
+                    html += `<div class="status ${classes[b.state] || 'warning'}">${b.state.toUpperCase()}</div>`;
+                    html += `<div class="label">trips: ${b.trips} · rejected: ${b.rejected}</div>`;
+                    html += `<div class="label">error rate: ${Math.round(b.error_rate * 100)}% · timeout: ${b.timeout}s</div>`;
+                    if (b.retry_in !== undefined) {
+                        html += `<div class="label">retry in ${b.retry_in}s</div>`;
+                    }
+                    if (b.last_error) {
+                        html += `<div class="label error">${escapeHtml(b.last_error)}</div>`;
+                    }
+                    html += '</div>';
+                });
+                html += '</div>';
+                return html;
+            }
+
             function formatMetrics(data) {
                 if (data.error) {
                     return '<div class="error">Error loading metrics: ' + data.error + '</div>';
@@ -292,6 +359,7 @@ async def admin():
                     element.innerHTML = '<div class="error">Error: ' + data.error + '</div>';
                 } else {
                     element.innerHTML = formatHealth(data);
+                    document.getElementById('breakers-content').innerHTML = formatBreakers(data.providers);
                     dataElement.textContent = JSON.stringify(data, null, 2);
                     dataElement.style.display = 'block';
                 }
@@ -3,30 +3,59 @@ Chat routes: RAG-powered chat endpoint with Marco AI
 """
 import os
 import time
-import json
 import hashlib
 import re
 import random
-from quart import Blueprint, request, jsonify
+from quart import Blueprint, request
 
+from city_guides.src.intents import classify
 from city_guides.src.metrics import increment, observe_latency
+from city_guides.src.services import answer_cache, conversations, warmup, weather
+from city_guides.src.responses import RawJSON, dumps, json_response, loads
 from city_guides.src.marco_response_enhancer import should_call_groq, analyze_user_intent
 
 bp = Blueprint('chat', __name__)
 
 
+# Request fields that determine the RAG answer (and therefore its cache key)
+_RAG_WARM_FIELDS = ('query', 'engine', 'max_results', 'city', 'state', 'country', 'lat', 'lon')
+
+
+def _rag_warm_params(data: dict) -> dict:
+    return {k: data[k] for k in _RAG_WARM_FIELDS if data.get(k) is not None}
+
+
+def rag_cache_key(data: dict) -> str:
+    """Redis key for a RAG answer (query + location fields)"""
+    ck_input = f"{(data.get('query') or '').strip()}|{data.get('city', '')}|{data.get('state', '')}|{data.get('country', '')}|{data.get('lat')}|{data.get('lon')}"
+    return "rag:" + hashlib.sha256(ck_input.encode('utf-8')).hexdigest()
+
+
 @bp.route("/api/chat/rag", methods=["POST"])
 async def api_chat_rag():
     """
     RAG chat endpoint: Accepts a user query, runs DDGS web search, synthesizes an answer with Groq, and returns a unified AI response.
-    Request JSON: {"query": "...", "engine": "google" (optional), "max_results": 8 (optional), "city": "...", "lat": ..., "lon": ...}
-    Response JSON: {"answer": "..."}
+    Request JSON: {"query": "...", "engine": "google" (optional), "max_results": 8 (optional), "city": "...", "lat": ..., "lon": ...,
+                   "conversation_id": "..." (optional; "new" starts one)}
+    Response JSON: {"answer": "...", "conversation_id": "..." (when a conversation is used)}
+    """
+    data = await request.get_json(force=True)
+    payload, status = await build_rag_response(data)
+    return json_response(payload, status)
+
+
+async def build_rag_response(data: dict, use_cache: bool = True) -> tuple[dict | RawJSON, int]:
+    """Run the RAG pipeline in-process and return (payload, status).
+
+    Shared by the /api/chat/rag route and the warm-up scheduler; with
+    use_cache=False the Redis lookup is skipped and the answer is recomputed
+    and re-cached. Cache hits come back as RawJSON (the stored bytes).
     """
     try:
         from city_guides.src.app import app, redis_client, recommender, ddgs_search
         from city_guides.src.routes.search import fetch_city_wikipedia
         
-        data = await request.get_json(force=True)
+        data = data or {}
         query = (data.get("query") or "").strip()
         engine = data.get("engine", "google")
         # Default to a small number of web snippets to improve latency and prompt size
@@ -43,7 +72,14 @@ async def api_chat_rag():
         lat = data.get("lat")
         lon = data.get("lon")
         if not query:
-            return jsonify({"error": "Missing query"}), 400
+            return {"error": "Missing query"}, 400
+        # Server-side conversation state replaces the client-sent transcript
+        conversation = None
+        if 'conversation_id' in data:
+            conversation_id = conversations.normalize_id(data.get('conversation_id'))
+            if conversation_id is None:
+                return {"error": "Invalid conversation_id"}, 400
+            conversation = await conversations.store.load(conversation_id)
         # Track request count
         try:
             await increment('rag.requests')
@@ -54,18 +90,11 @@ async def api_chat_rag():
         full_query = query
         
         # Check if user is asking for a fun fact - use seeded data first
-        # Must have BOTH: (1) fact-seeking intent AND (2) specific fact keywords
-        fact_intent_keywords = ['fact', 'trivia', 'did you know', 'something cool', 'something crazy', 
-                                'something amazing', 'something unique', 'something weird', 'something special',
-                                'cool thing', 'crazy thing', 'interesting thing']
-        has_fact_intent = any(kw in query.lower() for kw in fact_intent_keywords)
-        
-        # Also check for direct fun fact patterns
-        direct_patterns = ['fun fact', 'interesting fact', 'cool fact', 'crazy fact', 'amazing fact', 
-                          'unique fact', 'weird fact', 'surprising fact']
-        has_direct_pattern = any(kw in query.lower() for kw in direct_patterns)
-        
-        is_fun_fact_query = has_direct_pattern or (has_fact_intent and any(kw in query.lower() for kw in ['fact', 'thing', 'special']))
+        # Must have BOTH: (1) fact-seeking intent AND (2) specific fact keywords,
+        # or a direct pattern like 'fun fact'
+        intents = classify(query)
+        is_fun_fact_query = intents.has('fun_fact', 'direct') or (
+            intents.has('fun_fact', 'intent') and intents.has('fun_fact', 'subject'))
         if is_fun_fact_query and city:
             try:
                 from city_guides.src.data.seeded_facts import get_city_fun_facts
@@ -73,30 +102,51 @@ async def api_chat_rag():
                 if facts:
                     selected_fact = random.choice(facts)
                     answer = f"Here's an interesting fact about {city}: {selected_fact}"
-                    return jsonify({"answer": answer})
+                    if conversation is not None:
+                        await conversations.store.record_turn(conversation, query, answer)
+                        return {"answer": answer, "conversation_id": conversation.id}, 200
+                    return {"answer": answer}, 200
             except Exception as e:
                 app.logger.debug(f'Fun facts lookup failed for {city}: {e}')
                 # Continue to normal flow if seeded data not available
         
         # Compute a cache key for this query+city and try Redis cache to avoid repeating long work
+        # current conditions for weather questions (cached per grid cell by the weather service)
+        conditions = None
+        if intents.has('weather') and lat is not None and lon is not None:
+            conditions = weather.summarize(await weather.service.get(lat, lon))
+
         cache_key = None
         try:
-            if redis_client:
-                ck_input = f"{query}|{city}|{state}|{country}|{lat}|{lon}"
-                cache_key = "rag:" + hashlib.sha256(ck_input.encode('utf-8')).hexdigest()
-                cached = await redis_client.get(cache_key)
+            # answers that depend on earlier turns or on the current weather are not shared through the cache
+            if redis_client and not (conversation and conversation.turns) and conditions is None:
+                cache_key = rag_cache_key(data)
+                if use_cache:
+                    # Let the warm-up scheduler learn which answers are hot
+                    warmup.scheduler.record_request('rag', _rag_warm_params(data), cache_key)
+                cached, tier = None, None
+                if use_cache:
+                    cached = await redis_client.get(cache_key)
+                    if cached:
+                        tier = 'exact'
+                        answer_cache.cache.record_exact_hit()
+                        await warmup.scheduler.record_hit('rag', cache_key)
+                    else:
+                        # paraphrases of an answered query (canonical form, then similarity)
+                        cached, tier = await answer_cache.cache.lookup(redis_client, data)
                 if cached:
-                    app.logger.info('RAG cache hit for key %s', cache_key)
+                    app.logger.info('RAG cache hit (%s) for key %s', tier, cache_key)
                     try:
                         # metrics: cache hit
                         await increment('rag.cache_hit')
+                        await increment(f'rag.cache_hit.{tier}')
                     except Exception:
                         pass
-                    try:
-                        cached_parsed = json.loads(cached)
-                        return jsonify(cached_parsed)
-                    except Exception:
-                        app.logger.debug('Failed to parse cached RAG response for %s', cache_key)
+                    if conversation is not None:
+                        payload = loads(cached)
+                        await conversations.store.record_turn(conversation, query, payload.get('answer', ''))
+                        return {**payload, "conversation_id": conversation.id}, 200
+                    return RawJSON(cached), 200
         except Exception:
             app.logger.exception('Redis cache lookup failed')
 
@@ -117,6 +167,11 @@ async def api_chat_rag():
             snippet = f"{r.get('title','')}: {r.get('body','')}"
             if snippet.strip():
                 context_snippets.append(snippet)
+        if conditions:
+            context_snippets.insert(0, (
+                f"Current weather{' in ' + city if city else ''}: {weather.describe(conditions['weathercode'])}, "
+                f"{conditions['temperature_c']}°C / {conditions['temperature_f']}°F, "
+                f"wind {conditions['wind_kmh']} km/h"))
 
         # Fallback context when DDGS is unavailable or empty
         if not context_snippets and city:
@@ -201,8 +256,11 @@ async def api_chat_rag():
             {"role": "system", "content": system_prompt},
         ]
         
-        # Add conversation history (up to last 6 messages to stay within token limits)
-        if conversation_history and isinstance(conversation_history, list):
+        # Add conversation history: the stored summary + last few turns, or (up to) the
+        # last 6 client-sent messages to stay within token limits
+        if conversation is not None:
+            messages.extend(conversation.prompt_messages())
+        elif conversation_history and isinstance(conversation_history, list):
             for msg in conversation_history[-6:]:
                 if isinstance(msg, dict) and 'role' in msg and 'content' in msg:
                     messages.append({"role": msg['role'], "content": msg['content']})
@@ -225,7 +283,7 @@ async def api_chat_rag():
                     await increment('rag.groq_fail')
                 except Exception:
                     pass
-                return jsonify({"error": "Groq API call failed"}), 502
+                return {"error": "Groq API call failed"}, 502
             try:
                 answer = groq_resp["choices"][0]["message"]["content"]
             except Exception:
@@ -235,7 +293,7 @@ async def api_chat_rag():
                     await increment('rag.no_answer')
                 except Exception:
                     pass
-                return jsonify({"error": "No answer generated"}), 502
+                return {"error": "No answer generated"}, 502
         else:
             # If we shouldn't call Groq, use a simple fallback answer
             answer = f"I found some information about {city}. Let me know what specific details you're looking for!"
@@ -249,18 +307,27 @@ async def api_chat_rag():
             pass
         # Cache the result for repeated queries to improve latency on hot paths
         try:
-            if redis_client and cache_key:
+            if redis_client and cache_key and not (conversation and conversation.turns):
                 ttl = int(os.getenv('RAG_CACHE_TTL', 60 * 60 * 6))  # default 6 hours
-                await redis_client.setex(cache_key, ttl, json.dumps(result_payload))
+                raw = dumps(result_payload)
+                await redis_client.setex(cache_key, ttl, raw)
+                await answer_cache.cache.store(redis_client, data, raw, ttl)
+                warmup.scheduler.mark_organic(cache_key)
                 app.logger.info('Cached RAG response %s (ttl=%s)', cache_key, ttl)
         except Exception:
             app.logger.exception('Failed to cache RAG response')
 
-        return jsonify(result_payload)
+        if conversation is not None:
+            try:
+                await conversations.store.record_turn(conversation, query, result_payload["answer"])
+            except Exception:
+                app.logger.exception('Failed to store conversation %s', conversation.id)
+            result_payload = {**result_payload, "conversation_id": conversation.id}
+        return result_payload, 200
     except Exception as e:
         from city_guides.src.app import app
         import traceback
-        return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
+        return {"error": str(e), "trace": traceback.format_exc()}, 500
 
 
 def register(app):
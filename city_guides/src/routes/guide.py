@@ -8,7 +8,6 @@ from pathlib import Path
 import os
 import asyncio
 import json
-import hashlib
 import re
 import time
 from typing import Callable, Awaitable, Any
@@ -17,6 +16,9 @@ from quart import Blueprint, request, jsonify, current_app as app
 import aiohttp
 from aiohttp import ClientTimeout
 
+from city_guides.src.services import quick_guides, warmup
+from city_guides.src.responses import dumps, json_response
+
 # Configuration constants
 CACHE_TTL_SEARCH = int(os.getenv("CACHE_TTL_SEARCH", "1800"))  # 30 minutes
 PREWARM_TTL = CACHE_TTL_SEARCH
@@ -26,6 +28,21 @@ POPULAR_CITIES = os.getenv("POPULAR_CITIES", "").split(",") if os.getenv("POPULA
 # Blueprint creation
 guide = Blueprint('guide', __name__)
 
+
+def _quick_guide_regenerator(app_obj):
+    """Return a coroutine function that rebuilds one guide through the full pipeline in-process."""
+    async def _regenerate(city: str, neighborhood: str) -> None:
+        cache_file = quick_guides.guide_path(city, neighborhood)
+        before = quick_guides.load_entry(cache_file)
+        payload = {'city': city, 'neighborhood': neighborhood}
+        async with app_obj.test_request_context('/api/generate_quick_guide', method='POST', json=payload):
+            await generate_quick_guide(skip_cache=True)
+        after = quick_guides.load_entry(cache_file)
+        if before and (not after or after.get('generated_at') == before.get('generated_at')):
+            # Pipeline did not persist a new guide (e.g. validation fallback); record the attempt
+            quick_guides.mark_attempted(cache_file, before)
+    return _regenerate
+
 def register(app):
     """Register the guide blueprint with the app"""
     app.register_blueprint(guide)
@@ -69,18 +86,19 @@ async def get_neighborhoods():
     cache_key = f"neighborhoods:{slug}:{lang}"
 
     if redis_client:
+        warmup.scheduler.record_request('neighborhoods', {'city': city, 'lat': lat, 'lon': lon, 'lang': lang}, cache_key)
         try:
             raw = await redis_client.get(cache_key)
+            if isinstance(raw, str):
+                raw = raw.encode('utf-8')
             if raw:
-                try:
-                    parsed = json.loads(raw)
-                    if isinstance(parsed, list) and len(parsed) == 0:
-                        app.logger.debug("Empty cached neighborhoods for %s; treating as miss", cache_key)
-                    else:
-                        parsed = [ensure_bbox(n) for n in parsed]
-                        return jsonify({"cached": True, "neighborhoods": parsed})
-                except Exception:
-                    app.logger.debug("Failed to parse cached neighborhoods for %s; refetching", cache_key)
+                if raw.strip() == b'[]':
+                    app.logger.debug("Empty cached neighborhoods for %s; treating as miss", cache_key)
+                else:
+                    # Cached lists already carry bboxes, so the stored bytes are spliced
+                    # into the response without a parse/re-dump round trip
+                    await warmup.scheduler.record_hit('neighborhoods', cache_key)
+                    return json_response(b'{"cached":true,"neighborhoods":' + raw + b'}')
         except Exception:
             app.logger.exception("redis get failed for neighborhoods")
 
@@ -118,14 +136,15 @@ async def get_neighborhoods():
         except Exception:
             app.logger.exception("geocode fallback failed for %s", city)
 
+    data = [ensure_bbox(n) for n in data]
+
     if redis_client:
         try:
-            await redis_client.set(cache_key, json.dumps(data), ex=CACHE_TTL_NEIGHBORHOOD)
+            await redis_client.set(cache_key, dumps(data), ex=CACHE_TTL_NEIGHBORHOOD)
+            warmup.scheduler.mark_organic(cache_key)
         except Exception:
             app.logger.exception("redis set failed for neighborhoods")
 
-    data = [ensure_bbox(n) for n in data]
-
     return jsonify({"cached": False, "neighborhoods": data})
 
 @guide.route('/api/reverse_lookup', methods=['POST'])
@@ -377,157 +396,31 @@ async def generate_quick_guide(skip_cache=False, disable_quality_check=False):
     if not city or not neighborhood:
         return jsonify({'error': 'city and neighborhood required'}), 400
 
-    def slug(s):
-        return re.sub(r'[^a-z0-9_-]', '_', s.lower().replace(' ', '_'))
-
-    cache_dir = Path(__file__).parent / 'data' / 'neighborhood_quick_guides' / slug(city)
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    cache_file = cache_dir / (slug(neighborhood) + '.json')
-
-    # Return cached if exists (unless skip_cache is True)
-    if cache_file.exists() and not skip_cache:
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            resp = {
-                'quick_guide': data.get('quick_guide'),
-                'source': data.get('source', 'cache'),
-                'cached': True,
-                'source_url': data.get('source_url'),
-            }
-            if data.get('generated_at'):
-                resp['generated_at'] = data.get('generated_at')
-
-            # Skip cache quality check if disabled
-            if not disable_quality_check:
-                # EARLY: If raw cached content looks like DDGS disambiguation/promotional UI, replace before neutralization
-                try:
-                    from city_guides.src.snippet_filters import looks_like_ddgs_disambiguation_text
-                    raw_q = data.get('quick_guide') or ''
-                    src = data.get('source') or ''
-                    if src in ('ddgs', 'synthesized') and (looks_like_ddgs_disambiguation_text(raw_q) or 'missing:' in raw_q.lower()):
-                        app.logger.info('Replacing raw cached %s quick_guide for %s/%s due to disambiguation/promotional content (early replacement)', src, city, neighborhood)
-                        try:
-                            from city_guides.src.synthesis_enhancer import SynthesisEnhancer
-                            new_para = SynthesisEnhancer.generate_neighborhood_paragraph(neighborhood, city)
-                            resp['quick_guide'] = new_para
-                            resp['source'] = 'synthesized'
-                            resp['source_url'] = None
-                            try:
-                                with open(cache_file, 'w', encoding='utf-8') as f:
-                                    json.dump({'quick_guide': resp['quick_guide'], 'source': resp['source'], 'generated_at': time.time(), 'source_url': None}, f, ensure_ascii=False, indent=2)
-                            except Exception:
-                                app.logger.exception('Failed to persist synthesized replacement for cached disambiguation (early)')
-                        except Exception:
-                            app.logger.exception('Failed to synthesize replacement for cached disambiguation (early)')
-                            try:
-                                cache_file.unlink()
-                            except Exception:
-                                pass
-                        return jsonify(resp)
-                except Exception:
-                    app.logger.exception('Failed to validate raw cached quick_guide')
-
-                # Neutralize cached quick_guide tone before returning (remove first-person/promotional voice)
-                try:
-                    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
-                    resp['quick_guide'] = SynthesisEnhancer.neutralize_tone(resp.get('quick_guide') or '', neighborhood=neighborhood, city=city, max_length=400)
-                except Exception:
-                    app.logger.exception('Failed to neutralize cached quick_guide')
-
-                # If cached content is a simple 'X is a neighborhood in Y.' from data-first, try geo enrichment
-                try:
-                    if resp.get('source') == 'data-first' and re.match(r'^.+ is a neighborhood in .+\.$', (resp.get('quick_guide') or '')):
-                        try:
-                            from city_guides.src.geo_enrichment import enrich_neighborhood, build_enriched_quick_guide
-                            enrichment = await enrich_neighborhood(city, neighborhood, session=aiohttp_session)
-                            pois = enrichment.get('pois') if enrichment else None
-                            if enrichment and (enrichment.get('text') or (pois is not None and len(pois) > 0)):
-                                resp['quick_guide'] = build_enriched_quick_guide(neighborhood, city, enrichment)
-                                resp['source'] = 'geo-enriched'
-                                resp['confidence'] = 'medium'
-                                try:
-                                    with open(cache_file, 'w', encoding='utf-8') as f:
-                                        json.dump({'quick_guide': resp['quick_guide'], 'source': resp['source'], 'generated_at': time.time(), 'source_url': None, 'confidence': resp['confidence']}, f, ensure_ascii=False, indent=2)
-                                except Exception:
-                                    app.logger.exception('Failed to persist geo-enriched replacement for cached entry')
-                                return jsonify(resp)
-                        except Exception:
-                            app.logger.exception('Geo enrichment for cached entry failed')
-                except Exception:
-                    app.logger.exception('Failed to attempt geo-enrichment on cached quick_guide')
-
-                # Compute confidence for cached snippet (backfill if missing)
-                try:
-                    cached_src = data.get('source') or ''
-                    cached_conf = data.get('confidence')
-                    if not cached_conf:
-                        if cached_src == 'wikipedia':
-                            resp['confidence'] = 'high'
-                        elif cached_src == 'ddgs':
-                            resp['confidence'] = 'medium'
-                        elif cached_src == 'synthesized':
-                            # conservative: synthesized cached snippets without recorded evidence are low confidence
-                            resp['confidence'] = 'low'
-                        else:
-                            resp['confidence'] = 'low'
-                except Exception:
-                    resp['confidence'] = 'low' 
-
-            # If cached content is a DDGS/synthesized hit that looks like a disambiguation or promotional snippet,
-            # replace it immediately with a synthesized neutral paragraph and return that (avoid falling-through returns)
-            from city_guides.src.snippet_filters import looks_like_ddgs_disambiguation_text
-            src = data.get('source') or ''
-            quick_text = resp.get('quick_guide') or ''
-            if src in ('ddgs', 'synthesized') and (looks_like_ddgs_disambiguation_text(quick_text) or 'missing:' in quick_text.lower()):
-                app.logger.info('Replacing cached %s quick_guide for %s/%s due to disambiguation/promotional content', src, city, neighborhood)
-                try:
-                    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
-                    new_para = SynthesisEnhancer.generate_neighborhood_paragraph(neighborhood, city)
-                    resp['quick_guide'] = new_para
-                    resp['source'] = 'synthesized'
-                    resp['source_url'] = None
-                    resp['confidence'] = 'low'
-                    try:
-                        with open(cache_file, 'w', encoding='utf-8') as f:
-                            json.dump({'quick_guide': resp['quick_guide'], 'source': resp['source'], 'generated_at': time.time(), 'source_url': None, 'confidence': resp['confidence']}, f, ensure_ascii=False, indent=2)
-                    except Exception:
-                        app.logger.exception('Failed to persist synthesized replacement for cached disambiguation')
-                    return jsonify(resp)
-                except Exception:
-                    app.logger.exception('Failed to synthesize replacement for cached disambiguation')
-                    try:
-                        cache_file.unlink()
-                    except Exception:
-                        pass
-                    # fall through to regeneration
-            # Keep synthesized content even if low confidence - it's better than the basic fallback
+    from city_guides.src.app import (
+        aiohttp_session,
+        ddgs_search,
+        NeighborhoodDisambiguator,
+        _persist_quick_guide,
+        _is_relevant_wikimedia_image,
+        geocode_city,
+        get_cost_estimates,
+        get_session,
+    )
+
+    cache_file = quick_guides.guide_path(city, neighborhood)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Cache hits return immediately; stale, legacy or low-confidence entries are
+    # regenerated by the bounded background worker instead of on the request path.
+    if not skip_cache:
+        entry = quick_guides.load_entry(cache_file)
+        if entry:
+            resp = quick_guides.to_response(entry, city, neighborhood)
+            if not disable_quality_check and quick_guides.needs_regeneration(entry):
+                if quick_guides.regeneration_queue.schedule(city, neighborhood, _quick_guide_regenerator(app._get_current_object())):
+                    app.logger.info('Scheduled background regeneration of quick_guide for %s/%s', city, neighborhood)
             return jsonify(resp)
 
-            # If the cached content is from Wikipedia, run a stricter relevance check
-            try:
-                if data.get('source') == 'wikipedia':
-                    text = (data.get('quick_guide') or '').lower()
-                    # Expanded blacklist of event/article keywords
-                    blacklist = [
-                        'fire', 'wildfire', 'hurricane', 'earthquake', 'storm', 'flood', 'tornado', 'volcano',
-                        'massacre', 'riot', 'disaster', 'album', 'song', 'single', 'born', 'died', 'surname', 'battle'
-                    ]
-                    # Quick relevance: accept cached wikipedia if it mentions the city or neighborhood, or looks like a locality description
-                    if city.lower() in text or neighborhood.lower() in text or any(k in text for k in ['neighborhood', 'neighbourhood', 'district', 'suburb', 'municipality', 'borough', 'locality']):
-                        return jsonify(resp)
-                    # If it looks like an event/article and doesn't mention the city/neighborhood, ignore cache and regenerate
-                    if any(b in text for b in blacklist) and (city.lower() not in text and neighborhood.lower() not in text):
-                        app.logger.info("Ignoring cached wikipedia quick_guide for %s/%s due to likely unrelated event/article", city, neighborhood)
-                    else:
-                        return jsonify(resp)
-                else:
-                    return jsonify(resp)
-            except Exception:
-                return jsonify(resp)
-        except Exception:
-            pass
-
     # Validate city/neighborhood combination using our disambiguator
     try:
         is_valid, confidence, suggested = NeighborhoodDisambiguator.validate_neighborhood(neighborhood, city)
@@ -889,7 +782,7 @@ async def generate_quick_guide(skip_cache=False, disable_quality_check=False):
             data_dir = Path(__file__).parent.parent / 'data'
             for p in data_dir.glob('city_info_*'):
                 name = p.name.lower()
-                if slug(city) in name or city.lower().split(',')[0] in name:
+                if quick_guides.slug(city) in name or city.lower().split(',')[0] in name:
                     try:
                         with open(p, 'r', encoding='utf-8') as f:
                             cj = json.load(f)
@@ -1157,31 +1050,19 @@ async def generate_quick_guide(skip_cache=False, disable_quality_check=False):
     
     # Try Pixabay first for high-quality images
     try:
-        pixabay_key = os.getenv("PIXABAY_KEY")
-        if pixabay_key:
-            search_query = f"{neighborhood} {city}" if neighborhood else city
-            async with get_session() as session:
-                async with session.get(
-                    "https://pixabay.com/api/",
-                    params={
-                        "key": pixabay_key,
-                        "q": search_query,
-                        "per_page": 3,
-                        "image_type": "photo",
-                        "orientation": "horizontal"
-                    }
-                ) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        for hit in data.get("hits", []):
-                            mapillary_images.append({
-                                "id": hit["id"],
-                                "url": hit["webformatURL"],
-                                "provider": "pixabay",
-                                "attribution": f"Photo by {hit['user']} on Pixabay",
-                                "source_url": hit["pageURL"]
-                            })
-                            app.logger.info(f"Added Pixabay image: {hit['pageURL']}")
+        from city_guides.src.services.media_lookup import search_photos
+        search_query = f"{neighborhood} {city}" if neighborhood else city
+        photos, served_by = await search_photos('pixabay', search_query, 3, session=aiohttp_session)
+        for photo in photos.get('photos', []):
+            provider = photo.get('provider') or served_by
+            mapillary_images.append({
+                "id": photo["id"],
+                "url": photo["url"],
+                "provider": provider,
+                "attribution": f"Photo by {photo['user']} on {provider.title()}",
+                "source_url": photo["links"].get(provider) or photo["links"].get("pixabay")
+            })
+            app.logger.info(f"Added {provider} image: {photo['links'].get(provider)}")
     except Exception as e:
         app.logger.debug(f"Pixabay fetch failed: {e}")
     
@@ -1299,10 +1180,12 @@ async def generate_quick_guide(skip_cache=False, disable_quality_check=False):
         try:
             from city_guides.src.synthesis_enhancer import SynthesisEnhancer
             out['quick_guide'] = SynthesisEnhancer.neutralize_tone(out.get('quick_guide') or '', neighborhood=neighborhood, city=city)
+            out['neutralized'] = SynthesisEnhancer.NEUTRALIZER_VERSION
         except Exception:
             app.logger.exception('Failed to neutralize quick_guide before persist')
 
-        # Persist using module-level helper
+        # Persist using module-level helper, tagged with store version and quality metadata
+        quick_guides.annotate(out, city, neighborhood)
         await _persist_quick_guide(out, city, neighborhood, cache_file)
 
     except Exception:
@@ -1313,6 +1196,50 @@ async def generate_quick_guide(skip_cache=False, disable_quality_check=False):
         resp['mapillary_images'] = mapillary_images
     return jsonify(resp)
 
+# city -> running background bulk regeneration (one per city; the reference keeps it alive)
+_bulk_jobs: 'dict[str, asyncio.Task]' = {}
+
+
+@guide.route('/api/quick_guides/regenerate', methods=['POST'])
+async def regenerate_quick_guides():
+    """Bulk-regenerate every stored quick guide for a city under a rate budget.
+    POST payload: { city: "City Name", neighborhoods?: [...], concurrency?: int, rate?: float, wait?: bool }
+    With wait=false (default) the rebuild runs in the background and 202 is returned.
+    Admin action: see routes.admin.admin_denied.
+    """
+    from city_guides.src.routes.admin import admin_denied
+
+    denied = admin_denied()
+    if denied:
+        return denied
+    payload = await request.get_json(silent=True) or {}
+    city = (payload.get('city') or '').strip()
+    if not city:
+        return jsonify({'error': 'city required'}), 400
+    running = _bulk_jobs.get(city)
+    if running is not None and not running.done():
+        return jsonify({'city': city, 'status': 'running'}), 409
+    neighborhoods = payload.get('neighborhoods') or quick_guides.list_city_guides(city)
+    try:
+        concurrency = int(payload.get('concurrency') or quick_guides.QUICK_GUIDE_BULK_CONCURRENCY)
+        rate = float(payload.get('rate') or quick_guides.QUICK_GUIDE_BULK_RATE)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency and rate must be numeric'}), 400
+
+    job = quick_guides.regenerate_city(
+        city,
+        _quick_guide_regenerator(app._get_current_object()),
+        neighborhoods=neighborhoods,
+        concurrency=concurrency,
+        rate=rate,
+    )
+    if payload.get('wait'):
+        return jsonify(await job)
+    task = _bulk_jobs[city] = asyncio.create_task(job)
+    task.add_done_callback(lambda t: _bulk_jobs.pop(city, None) if _bulk_jobs.get(city) is t else None)
+    return jsonify({'city': city, 'total': len(neighborhoods), 'status': 'started'}), 202
+
+
 def _is_content_sparse_or_low_quality(content: str, neighborhood: str, city: str) -> bool:
     """Check if content lacks specifics and should trigger Groq/other enhancements."""
     if not content or len(content.strip()) < 50:
@@ -1345,198 +1272,6 @@ def _is_content_sparse_or_low_quality(content: str, neighborhood: str, city: str
 
     return not has_details or avg_sentence_length < 15 or len(content.strip()) < 100
 
-# --- Helper Functions ---
-
-async def get_weather_async(lat, lon):
-    if lat is None or lon is None:
-        return None
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            # include current weather and today's sunrise/sunset (small payload)
-            "current_weather": True,
-            "daily": ",".join(["sunrise", "sunset"]),
-            "temperature_unit": "celsius",
-            "windspeed_unit": "kmh",
-            "precipitation_unit": "mm",
-            "timezone": "auto",
-        }
-        # coerce boolean params to strings
-        coerced = {k: (str(v).lower() if isinstance(v, bool) else v) for k, v in params.items()}
-        async with get_session() as session:
-            async with session.get(url, params=coerced, timeout=ClientTimeout(total=10)) as resp:  # type: ignore
-                if resp.status != 200:
-                    print(f"[DEBUG app.py] get_weather_async HTTP error: {resp.status}")
-                resp.raise_for_status()
-                data = await resp.json()
-                # return a compact payload containing current weather and today's daily fields
-                return {
-                    'current_weather': data.get('current_weather'),
-                    'daily': data.get('daily'),
-                    'timezone': data.get('timezone'),
-                    'timezone_abbreviation': data.get('timezone_abbreviation'),
-                    'utc_offset_seconds': data.get('utc_offset_seconds')
-                }
-    except Exception as e:
-        print(f"[DEBUG app.py] get_weather_async Exception: {e}")
-        return None
-
-async def prewarm_popular_searches():
-    if not redis_client or not DEFAULT_PREWARM_CITIES or not DEFAULT_PREWARM_QUERIES:
-        return
-    sem = asyncio.Semaphore(2)
-    async def limited(city, query):
-        async with sem:
-            await prewarm_search_cache_entry(city, query)
-            try:
-                await prewarm_neighborhood(city)
-            except Exception:
-                pass
-
-    tasks = [limited(city, query) for city in DEFAULT_PREWARM_CITIES for query in DEFAULT_PREWARM_QUERIES]
-    if tasks:
-        app.logger.info("Starting prewarm for %d popular searches", len(tasks))
-        await asyncio.gather(*tasks)
-
-
-async def prewarm_rag_responses(top_n: int | None = None):
-    """Prewarm RAG responses for top N seeded cities using configured PREWARM_QUERIES.
-    Stores responses in Redis with TTL `RAG_CACHE_TTL` (defaults to 6h via env).
-    Best-effort and rate-limited to avoid overloading the Groq API.
-    """
-    if not redis_client:
-        app.logger.info('Redis not available, skipping RAG prewarm')
-        return
-    try:
-        seed_path = Path(__file__).parent.parent / 'data' / 'seeded_cities.json'
-        if not seed_path.exists():
-            app.logger.info('No seeded_cities.json found; skipping RAG prewarm')
-            return
-        data = json.loads(seed_path.read_text())
-        cities = data.get('cities', [])
-        if not cities:
-            app.logger.info('No cities in seed; skipping RAG prewarm')
-            return
-        top_n = int(top_n or PREWARM_RAG_TOP_N)
-        # Choose top N by population (descending)
-        cities = sorted(cities, key=lambda c: int(c.get('population', 0) or 0), reverse=True)[:top_n]
-        queries = DEFAULT_PREWARM_QUERIES or ["Top food"]
-        sem = asyncio.Semaphore(int(os.getenv('PREWARM_RAG_CONCURRENCY', '4')))
-
-        async def _warm_city(city_entry):
-            async with sem:
-                city_name = city_entry.get('name')
-                lat = city_entry.get('lat')
-                lon = city_entry.get('lon')
-                for q in queries:
-                    try:
-                        # Build cache key consistent with runtime
-                        ck_input = f"{q}|{city_name}|{''}|{city_entry.get('countryCode') or ''}|{lat or ''}|{lon or ''}"
-                        ck = "rag:" + hashlib.sha256(ck_input.encode('utf-8')).hexdigest()
-                        try:
-                            existing = None
-                            if redis_client:
-                                try:
-                                    existing = await redis_client.get(ck)
-                                    if existing:
-                                        await redis_client.expire(ck, int(os.getenv('RAG_CACHE_TTL', 60 * 60 * 6)))
-                                        continue
-                                except Exception:
-                                    pass
-                        except Exception:
-                            pass
-                        # Call our internal endpoint to generate answer
-                        payload = {"query": q, "engine": "google", "max_results": 3, "city": city_name}
-                        try:
-                            async with get_session(aiohttp_session) as session:
-                                async with session.post("http://localhost:5010/api/chat/rag", json=payload, timeout=ClientTimeout(total=15)) as resp:
-                                    if resp.status != 200:
-                                        app.logger.debug('Prewarm RAG failed for %s/%s: status %s', city_name, q, resp.status)
-                                        continue
-                                    data = await resp.json()
-                        except Exception as exc:
-                            app.logger.debug('Prewarm RAG http failed for %s/%s: %s', city_name, q, exc)
-                            continue
-
-                        if data and isinstance(data, dict):
-                            ttl = int(os.getenv('RAG_CACHE_TTL', 60 * 60 * 6))
-                            try:
-                                if redis_client:
-                                    await redis_client.setex(ck, ttl, json.dumps(data))
-                                    app.logger.info('Prewarmed RAG for %s / %s', city_name, q)
-                            except Exception as exc:
-                                app.logger.debug('Failed to set RAG cache for %s/%s: %s', city_name, q, exc)
-                    except Exception as exc:
-                        app.logger.debug('Prewarm RAG exception for %s/%s: %s', city_name, q, exc)
-
-        app.logger.info('Starting RAG prewarm for %d cities', len(cities))
-        await asyncio.gather(*[_warm_city(c) for c in cities])
-    except Exception:
-        app.logger.exception('RAG prewarm failed')
-
-async def prewarm_search_cache_entry(city: str, q: str):
-    if not redis_client or not city or not q:
-        return
-    cache_key = build_search_cache_key(city, q)
-    try:
-        existing = await redis_client.get(cache_key)
-        if existing:
-            await redis_client.expire(cache_key, PREWARM_TTL)
-            return
-    except Exception:
-        pass
-    try:
-        from .persistence import _search_impl
-        result = await asyncio.to_thread(_search_impl, {"city": city, "q": q})
-        if result:
-            await redis_client.set(cache_key, json.dumps(result), ex=PREWARM_TTL)
-            app.logger.info("Prewarmed search cache for %s / %s", city, q)
-    except Exception as exc:
-        app.logger.debug("Search prewarm failed for %s/%s: %s", city, q, exc)
-
-async def prewarm_neighborhood(city: str, lang: str = "en"):
-    """Fetch neighborhood lists for a city and store them in redis cache (best-effort)."""
-    if not redis_client or not city:
-        return
-    slug = re.sub(r"[^a-z0-9]+", "_", city.lower())
-    cache_key = f"neighborhoods:{slug}:{lang}"
-    try:
-        existing = await redis_client.get(cache_key)
-        if existing:
-            await redis_client.expire(cache_key, CACHE_TTL_NEIGHBORHOOD)
-            return
-    except Exception:
-        pass
-    try:
-        # Prefer async provider and pass our shared session
-        try:
-            neighborhoods = await multi_provider.async_get_neighborhoods(city=city, lang=lang, session=aiohttp_session)
-        except Exception:
-            neighborhoods = []
-        if neighborhoods:
-            await redis_client.set(cache_key, json.dumps(neighborhoods), ex=CACHE_TTL_NEIGHBORHOOD)
-            app.logger.info("Prewarmed neighborhoods for %s (%d items)", city, len(neighborhoods))
-    except Exception as exc:
-        app.logger.debug("Neighborhood prewarm failed for %s: %s", city, exc)
-
-async def prewarm_neighborhoods():
-    """Background task to cache popular city neighborhoods"""
-    if DISABLE_PREWARM:
-        return  # Skip in tests
-
-    for city in POPULAR_CITIES:
-        try:
-            await prewarm_neighborhood(city)
-            app.logger.info("✓ Prewarmed: %s", city)
-        except Exception as e:
-            app.logger.exception("Prewarm failed for %s: %s", city, e)
-        try:
-            await asyncio.sleep(float(os.getenv("NEIGHBORHOOD_PREWARM_PAUSE", 1.0)))
-        except Exception:
-            await asyncio.sleep(1.0)
-
 # --- Utility Functions ---
 
 async def _get_countries():
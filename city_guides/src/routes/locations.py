@@ -11,9 +11,13 @@ from quart import Blueprint, request, jsonify, current_app
 from aiohttp import ClientTimeout
 from city_guides.providers.geocoding import geocode_city
 from city_guides.providers.utils import get_session
+from city_guides.src.responses import dumps, json_response
 
 locations_bp = Blueprint('locations', __name__)
 
+# GeoNames city lists change rarely; cache the serialized response per country/state
+CACHE_TTL_CITIES = int(os.getenv("CACHE_TTL_CITIES", "86400"))  # 24 hours
+
 
 async def _get_countries():
     """Get list of countries from GeoNames."""
@@ -256,6 +260,16 @@ async def api_cities():
             current_app.logger.exception('Failed to load seeded cities fallback')
         return jsonify([])
     
+    from city_guides.src.app import redis_client
+    cache_key = f"cities:{country_code.upper()}:{state_code.upper()}"
+    if redis_client:
+        try:
+            raw = await redis_client.get(cache_key)
+            if raw:
+                return json_response(raw)
+        except Exception:
+            current_app.logger.exception('redis get failed for cities')
+
     try:
         async with get_session() as session:
             # Search for cities in the state/province
@@ -335,7 +349,13 @@ async def api_cities():
                             "lng": c.get('lon') or c.get('lng') or ''
                         } for c in cities_data]
                 
-                return jsonify(cities)
+                body = dumps(cities)
+                if redis_client and cities:
+                    try:
+                        await redis_client.set(cache_key, body, ex=CACHE_TTL_CITIES)
+                    except Exception:
+                        current_app.logger.exception('redis set failed for cities')
+                return json_response(body)
                 
     except Exception:
         current_app.logger.exception('Failed to fetch cities from GeoNames')
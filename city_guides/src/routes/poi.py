@@ -9,11 +9,7 @@ import unicodedata
 from quart import Blueprint, request, jsonify
 
 from city_guides.src.data.seeded_facts import get_city_fun_facts
-from city_guides.src.services.location import (
-    city_mappings,
-    region_mappings,
-    levenshtein_distance
-)
+from city_guides.src.services import gazetteer
 
 bp = Blueprint('poi', __name__)
 
@@ -103,7 +99,8 @@ async def get_fun_fact():
 async def parse_dream():
     """Parse natural language travel dreams into structured location data.
     Accepts queries like "Paris cafes", "Tokyo nightlife", "Barcelona beaches"
-    Returns: { city, country, state, neighborhood, intent, confidence }
+    Returns: { city, country, state, neighborhood, intent, confidence, spans }
+    where spans are the place / intent phrases found in the query
     """
     try:
         from city_guides.src.app import app
@@ -128,63 +125,12 @@ async def parse_dream():
             'confidence': 'low'
         }
         
-        # Common neighborhood mappings
-        neighborhood_mappings = {
-            'brooklyn': {'city': 'New York', 'neighborhood': 'Brooklyn', 'country': 'US', 'state': 'NY'},
-            'manhattan': {'city': 'New York', 'neighborhood': 'Manhattan', 'country': 'US', 'state': 'NY'},
-            'shoreditch': {'city': 'London', 'neighborhood': 'Shoreditch', 'country': 'GB'},
-            'camden': {'city': 'London', 'neighborhood': 'Camden', 'country': 'GB'},
-            'soho': {'city': 'London', 'neighborhood': 'Soho', 'country': 'GB'},
-            'copacabana': {'city': 'Rio de Janeiro', 'neighborhood': 'Copacabana', 'country': 'BR', 'state': 'RJ'},
-            'ipanema': {'city': 'Rio de Janeiro', 'neighborhood': 'Ipanema', 'country': 'BR', 'state': 'RJ'},
-            'santa teresa': {'city': 'Rio de Janeiro', 'neighborhood': 'Santa Teresa', 'country': 'BR', 'state': 'RJ'},
-            'leblon': {'city': 'Rio de Janeiro', 'neighborhood': 'Leblon', 'country': 'BR', 'state': 'RJ'},
-            'alfama': {'city': 'Lisbon', 'neighborhood': 'Alfama', 'country': 'PT'},
-            'baixa': {'city': 'Lisbon', 'neighborhood': 'Baixa', 'country': 'PT'},
-            'chiado': {'city': 'Lisbon', 'neighborhood': 'Chiado', 'country': 'PT'},
-            'bairro alto': {'city': 'Lisbon', 'neighborhood': 'Bairro Alto', 'country': 'PT'},
-            'belém': {'city': 'Lisbon', 'neighborhood': 'Belém', 'country': 'PT'},
-        }
-        
-        # Intent keywords
-        intent_keywords = {
-            'coffee': ['coffee', 'cafe', 'cafes', 'espresso', 'latte', 'cappuccino'],
-            'nightlife': ['nightlife', 'bars', 'club', 'clubs', 'party', 'drinks', 'pub', 'pubs'],
-            'beaches': ['beach', 'beaches', 'coast', 'shore', 'ocean', 'sea', 'sand'],
-            'food': ['food', 'eat', 'restaurant', 'restaurants', 'dining', 'cuisine', 'dish'],
-            'shopping': ['shop', 'shopping', 'mall', 'stores', 'boutique', 'market'],
-            'culture': ['museum', 'museums', 'art', 'culture', 'gallery', 'historical', 'monument'],
-            'nature': ['park', 'parks', 'nature', 'hiking', 'garden', 'outdoor'],
-            'romance': ['romantic', 'romance', 'couples', 'date', 'sunset'],
-            'adventure': ['adventure', 'adventurous', 'extreme', 'thrill'],
-            'relaxation': ['relax', 'relaxing', 'spa', 'peaceful', 'quiet'],
-        }
-        
-        # Parse the query
-        query_lower = query.lower()
-        
-        def find_best_match(query, options, max_distance=2):
-            """Find best fuzzy match from options"""
-            best_match = None
-            best_score = float('inf')
-            
-            for option in options:
-                distance = levenshtein_distance(query, option)
-                if distance <= max_distance and distance < best_score:
-                    best_score = distance
-                    best_match = option
-            
-            return best_match
-        
-        # Combine all searchable locations
-        all_regions = list(region_mappings.keys())
-        all_cities = list(city_mappings.keys())
-        all_neighborhoods = list(neighborhood_mappings.keys())
+        # Find place and intent spans in the query (gazetteer n-gram lookup)
+        entities = gazetteer.extract(query)
         
-        # Try fuzzy matching for regions first
-        region_match = find_best_match(query_lower, all_regions)
-        if region_match:
-            mapping = region_mappings[region_match]
+        # Regions are the loosest match; an explicit city or neighborhood refines them
+        if entities['region']:
+            mapping = entities['region']['data']
             result.update(mapping)
             result['cityName'] = mapping['city']
             result['countryName'] = mapping['countryName']
@@ -192,29 +138,21 @@ async def parse_dream():
                 result['region'] = mapping['region']
             result['confidence'] = 'medium'
         
-        # Check for explicit neighborhoods first
-        neighborhood_match = find_best_match(query_lower, all_neighborhoods)
-        if neighborhood_match:
-            hood_data = neighborhood_mappings[neighborhood_match]
+        if entities['city']:
+            city_data = entities['city']['data']
+            result.update(city_data)
+            result['cityName'] = city_data['city']
+            result['confidence'] = entities['city']['confidence']
+        
+        if entities['neighborhood']:
+            hood_data = entities['neighborhood']['data']
             result.update(hood_data)
             result['neighborhoodName'] = hood_data['neighborhood']
             result['cityName'] = hood_data['city']
-            result['confidence'] = 'high'
-        
-        # If no neighborhood found, check for cities
-        if not result['city']:
-            city_match = find_best_match(query_lower, all_cities)
-            if city_match:
-                city_data = city_mappings[city_match]
-                result.update(city_data)
-                result['cityName'] = city_data['city']
-                result['confidence'] = 'high'
+            result['confidence'] = entities['neighborhood']['confidence']
         
         # Extract intent
-        detected_intent = []
-        for intent, keywords in intent_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                detected_intent.append(intent)
+        detected_intent = entities['intents']
         
         if detected_intent:
             result['intent'] = ', '.join(detected_intent)
@@ -223,6 +161,7 @@ async def parse_dream():
                 result['confidence'] = 'very_high'
             elif result['city']:
                 result['confidence'] = 'medium'
+        result['spans'] = entities['spans']
         
         # If no city found, try to extract using AI as fallback
         if not result['city']:
@@ -247,34 +186,6 @@ async def parse_dream():
             except Exception as e:
                 app.logger.warning(f"AI parsing fallback failed: {e}")
         
-        # Final fallback: try simple city name extraction
-        if not result['city']:
-            words = query.lower().split()
-            # Check multi-word regions first
-            query_lower = query.lower()
-            for region_name, mapping in region_mappings.items():
-                if region_name in query_lower:
-                    result.update(mapping)
-                    result['cityName'] = mapping['city']
-                    result['countryName'] = mapping['countryName']
-                    if 'region' in mapping:
-                        result['region'] = mapping['region']
-                    result['confidence'] = 'low'
-                    break
-            
-            # If still no city, check single words
-            if not result['city']:
-                for word in words:
-                    if word in city_mappings:
-                        mapping = city_mappings[word]
-                        result.update(mapping)
-                        result['cityName'] = mapping['city']
-                        result['countryName'] = mapping['countryName']
-                        if 'stateName' in mapping:
-                            result['stateName'] = mapping['stateName']
-                        result['confidence'] = 'low'
-                        break
-        
         # Clean up result
         if not result['city']:
             return jsonify({'error': 'no_location_detected', 'query': query}), 400
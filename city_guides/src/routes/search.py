@@ -2,15 +2,21 @@
 Search routes: Main venue and place search endpoint
 """
 import os
-import json
 import asyncio
 import unicodedata
 from quart import Blueprint, request, jsonify
 from aiohttp import ClientTimeout
-import aiohttp
+
+from city_guides.providers import http_clients
+from city_guides.src.services import warmup
+from city_guides.src.responses import dumps, json_response, loads
 
 bp = Blueprint('search', __name__, url_prefix='/api')
 
+# Cache /api/search results in Redis (keyed on city + category + neighborhood + limit + state/country);
+# open_now and the fun fact are recomputed on every hit
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+
 
 async def fetch_city_wikipedia(city: str, state: str | None = None, country: str | None = None) -> tuple[str, str] | None:
     """Return (summary, url) for the given city using Wikipedia."""
@@ -55,7 +61,7 @@ async def fetch_city_wikipedia(city: str, state: str | None = None, country: str
 
     # Fallback: use Wikipedia open search with candidates
     try:
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             for title in _candidates():
                 params = {
                     "action": "opensearch",
@@ -82,15 +88,109 @@ async def fetch_city_wikipedia(city: str, state: str | None = None, country: str
     return None
 
 
+def search_cache_key(payload: dict) -> str:
+    """Redis key for a /api/search payload (city + category + neighborhood + limit + state/country)"""
+    from city_guides.src.persistence import build_search_cache_key
+
+    normalized = unicodedata.normalize('NFKD', (payload.get("query") or "").strip())
+    city = ''.join(c for c in normalized if c.isalnum() or c.isspace()).strip()
+    q = (payload.get("category") or payload.get("intent") or "").strip().lower()
+    neighborhood = payload.get("neighborhood")
+    if neighborhood and not isinstance(neighborhood, dict):
+        neighborhood = {"id": str(neighborhood)}
+    try:
+        limit = int(payload.get('limit', 10))  # as _search_impl reads it
+    except Exception:
+        limit = 10
+    state = (payload.get("state") or payload.get("stateName") or "").strip()
+    country = (payload.get("country") or payload.get("countryName") or "").strip()
+    return build_search_cache_key(city, q, neighborhood or None, limit=limit, state=state, country=country)
+
+
+def refresh_live_fields(result: dict, city: str) -> dict:
+    """Recompute the time-dependent parts of a search result: venue open_now and the fun fact.
+
+    Applied to fresh and cached results alike, so a cached body never serves a
+    stale open/closed flag or the same fun fact for the whole cache TTL. Uses
+    each venue's stored `tz`; venues without one keep their open_now.
+    """
+    from city_guides.src.app import app
+    from city_guides.src.persistence import _compute_open_now
+    from city_guides.src.data.seeded_facts import get_city_fun_facts
+
+    if not isinstance(result, dict):
+        return result
+    for venue in result.get('venues') or []:
+        if not isinstance(venue, dict) or not venue.get('opening_hours') or 'tz' not in venue:
+            continue
+        venue['open_now'] = _compute_open_now(venue.get('lat'), venue.get('lon'), venue['opening_hours'],
+                                              venue['tz'] or '')[0]
+
+    try:
+        seeded_facts = get_city_fun_facts(city)
+        if seeded_facts:
+            import random
+            result['fun_facts'] = [random.choice(seeded_facts)]
+            result['fun_fact'] = result['fun_facts'][0]
+    except Exception as e:
+        app.logger.debug(f'Failed to get fun facts for {city}: {e}')
+    return result
+
+
+async def build_search_response(payload: dict) -> dict:
+    """Run the search pipeline in-process (venues, categories, fun facts, Wikipedia fallback).
+
+    Shared by the /api/search route and the warm-up scheduler.
+    """
+    from city_guides.src.app import app, WIKI_CITY_AVAILABLE
+    from city_guides.src.persistence import _search_impl
+
+    normalized = unicodedata.normalize('NFKD', (payload.get("query") or "").strip())
+    city = ''.join(c for c in normalized if c.isalnum() or c.isspace()).strip()
+    state_name = (payload.get("state") or payload.get("stateName") or "").strip()
+    country_name = (payload.get("country") or payload.get("countryName") or "").strip()
+
+    # Use the search implementation from persistence
+    result = await asyncio.to_thread(_search_impl, payload)
+
+    # Add categories to the search result
+    if isinstance(result, dict):
+        try:
+            from city_guides.src.simple_categories import get_dynamic_categories
+            categories = await get_dynamic_categories(city, state_name, country_name)
+            result['categories'] = categories
+        except Exception as e:
+            import traceback
+            app.logger.error(f'Failed to get categories for {city}: {e}')
+            app.logger.error(traceback.format_exc())
+            result['categories'] = []
+
+    # Add fun facts from seeded data (and current open_now flags)
+    refresh_live_fields(result, city)
+
+    # If no quick_guide/summary provided by upstream providers, supplement with Wikipedia summary
+    if WIKI_CITY_AVAILABLE and isinstance(result, dict):
+        has_quick = bool((result.get('quick_guide') or '').strip())
+        has_summary = bool((result.get('summary') or '').strip())
+        if not has_quick and not has_summary:
+            try:
+                wiki_data = await fetch_city_wikipedia(city, state_name or None, country_name or None)
+                if wiki_data:
+                    summary, url = wiki_data
+                    result['quick_guide'] = summary
+                    result['source'] = 'wikipedia'
+                    result['cached'] = False
+                    result['source_url'] = url
+            except Exception:
+                app.logger.exception('Wikipedia city fallback failed for %s', city)
+
+    return result
+
+
 @bp.route("/search", methods=["POST"])
 async def search():
     """Search for venues and places in a city"""
-    from city_guides.src.app import (
-        app, redis_client, WIKI_CITY_AVAILABLE, 
-        fetch_wikipedia_summary, PREWARM_TTL
-    )
-    from city_guides.src.persistence import build_search_cache_key, _search_impl
-    from city_guides.src.data.seeded_facts import get_city_fun_facts
+    from city_guides.src.app import app, redis_client, PREWARM_TTL
     
     print("[SEARCH ROUTE] Search request received")
     payload = await request.get_json(silent=True) or {}
@@ -101,66 +201,37 @@ async def search():
     # Keep alphanumeric and spaces, remove other punctuation
     city = ''.join(c for c in normalized if c.isalnum() or c.isspace()).strip()
     q = (payload.get("category") or payload.get("intent") or "").strip().lower()
-    neighborhood = payload.get("neighborhood")
-    state_name = (payload.get("state") or payload.get("stateName") or "").strip()
-    country_name = (payload.get("country") or payload.get("countryName") or "").strip()
-    should_cache = False  # disabled for testing
+    should_cache = SEARCH_CACHE_ENABLED and redis_client is not None
     
     if not city:
         return jsonify({"error": "city required"}), 400
+
+    cache_key = search_cache_key(payload) if should_cache else None
+    if cache_key:
+        warmup.scheduler.record_request('search', payload, cache_key)
+        try:
+            raw = await redis_client.get(cache_key)
+            if raw:
+                await warmup.scheduler.record_hit('search', cache_key)
+                # open_now and the fun fact depend on the time of the request, not of the fill
+                body = await asyncio.to_thread(lambda: dumps(refresh_live_fields(loads(raw), city)))
+                return json_response(body)
+        except Exception:
+            app.logger.exception("Failed to read cached search result")
     
     try:
-        # Use the search implementation from persistence
-        result = await asyncio.to_thread(_search_impl, payload)
+        result = await build_search_response(payload)
 
-        # Add categories to the search result
-        if isinstance(result, dict):
-            try:
-                from city_guides.src.simple_categories import get_dynamic_categories
-                categories = await get_dynamic_categories(city, state_name, country_name)
-                result['categories'] = categories
-            except Exception as e:
-                import traceback
-                app.logger.error(f'Failed to get categories for {city}: {e}')
-                app.logger.error(traceback.format_exc())
-                result['categories'] = []
-
-        # Add fun facts from seeded data
-        if isinstance(result, dict):
-            try:
-                seeded_facts = get_city_fun_facts(city)
-                if seeded_facts:
-                    import random
-                    result['fun_facts'] = [random.choice(seeded_facts)]
-                    result['fun_fact'] = result['fun_facts'][0]
-            except Exception as e:
-                app.logger.debug(f'Failed to get fun facts for {city}: {e}')
-
-        # If no quick_guide/summary provided by upstream providers, supplement with Wikipedia summary
-        if WIKI_CITY_AVAILABLE and isinstance(result, dict):
-            has_quick = bool((result.get('quick_guide') or '').strip())
-            has_summary = bool((result.get('summary') or '').strip())
-            if not has_quick and not has_summary:
-                try:
-                    wiki_data = await fetch_city_wikipedia(city, state_name or None, country_name or None)
-                    if wiki_data:
-                        summary, url = wiki_data
-                        result['quick_guide'] = summary
-                        result['source'] = 'wikipedia'
-                        result['cached'] = False
-                        result['source_url'] = url
-                except Exception:
-                    app.logger.exception('Wikipedia city fallback failed for %s', city)
-
-        if should_cache and redis_client:
-            cache_key = build_search_cache_key(city, q, neighborhood)
+        body = dumps(result)
+        if cache_key:
             try:
-                await redis_client.set(cache_key, json.dumps(result), ex=PREWARM_TTL)
+                await redis_client.set(cache_key, body, ex=PREWARM_TTL)
+                warmup.scheduler.mark_organic(cache_key)
                 app.logger.info("Cached search result for %s/%s", city, q)
             except Exception:
                 app.logger.exception("Failed to cache search result")
         
-        return jsonify(result)
+        return json_response(body)
         
     except Exception as e:
         app.logger.exception('Search failed')
@@ -11,6 +11,7 @@ from city_guides.src.services.location import (
 )
 from city_guides.src.services.learning import (
     get_location_weight,
+    load_location_weights,
     detect_hemisphere_from_searches
 )
 from city_guides.src.utils.seasonal import get_seasonal_destinations
@@ -50,6 +51,9 @@ async def location_suggestions():
         # Seasonal recommendations (current month)
         current_month = datetime.now().month
         
+        # Shared learning weights for every candidate (near-cache hits once warm)
+        await load_location_weights(list(city_mappings) + list(region_mappings))
+        
         user_hemisphere = detect_hemisphere_from_searches()
         current_seasonal = get_seasonal_destinations(current_month, user_hemisphere)
         
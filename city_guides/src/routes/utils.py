@@ -2,53 +2,14 @@
 Utility routes: Weather, synthesis, and logging
 """
 from quart import Blueprint, request, jsonify
-from aiohttp import ClientTimeout
 
 from city_guides.providers.geocoding import geocode_city
-from city_guides.providers.utils import get_session
+from city_guides.src.services import weather as weather_service
 from city_guides.src.services.learning import increment_location_weight
 
 bp = Blueprint('utils', __name__)
 
 
-async def get_weather_async(lat, lon):
-    """Fetch weather data from Open-Meteo API"""
-    if lat is None or lon is None:
-        return None
-    try:
-        url = "https://api.open-meteo.com/v1/forecast"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            # include current weather and today's sunrise/sunset (small payload)
-            "current_weather": True,
-            "daily": ",".join(["sunrise", "sunset"]),
-            "temperature_unit": "celsius",
-            "windspeed_unit": "kmh",
-            "precipitation_unit": "mm",
-            "timezone": "auto",
-        }
-        # coerce boolean params to strings
-        coerced = {k: (str(v).lower() if isinstance(v, bool) else v) for k, v in params.items()}
-        async with get_session() as session:
-            async with session.get(url, params=coerced, timeout=ClientTimeout(total=10)) as resp:
-                if resp.status != 200:
-                    print(f"[DEBUG app.py] get_weather_async HTTP error: {resp.status}")
-                resp.raise_for_status()
-                data = await resp.json()
-                # return a compact payload containing current weather and today's daily fields
-                return {
-                    'current_weather': data.get('current_weather'),
-                    'daily': data.get('daily'),
-                    'timezone': data.get('timezone'),
-                    'timezone_abbreviation': data.get('timezone_abbreviation'),
-                    'utc_offset_seconds': data.get('utc_offset_seconds')
-                }
-    except Exception as e:
-        print(f"[DEBUG app.py] get_weather_async Exception: {e}")
-        return None
-
-
 @bp.route("/api/weather", methods=["POST"])
 async def weather():
     """Get weather data for a location"""
@@ -64,7 +25,7 @@ async def weather():
             return jsonify({"error": "geocode_failed"}), 400
         lat = result['lat']
         lon = result['lon']
-    weather_data = await get_weather_async(lat, lon)
+    weather_data = await weather_service.service.get(lat, lon)
     if weather_data is None:
         return jsonify({"error": "weather_fetch_failed"}), 500
     return jsonify({"lat": lat, "lon": lon, "city": city, "weather": weather_data})
@@ -122,7 +83,7 @@ async def log_suggestion_success():
         suggestion = payload.get('suggestion', '').strip().lower()
         
         if suggestion:
-            increment_location_weight(suggestion)
+            await increment_location_weight(suggestion)
         
         return jsonify({'success': True})
         
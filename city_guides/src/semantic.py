@@ -1,6 +1,5 @@
 import os
 import aiohttp
-from bs4 import BeautifulSoup
 import math
 import re
 import logging
@@ -29,6 +28,9 @@ from pathlib import Path
 
 from city_guides.providers import search_provider
 from city_guides.providers.utils import get_session
+from city_guides.src.intents import classify
+from city_guides.src.services.conversations import ConversationState, detect_specific_intents
+from city_guides.src.services import embeddings
 
 # Import Wikipedia provider
 try:
@@ -59,18 +61,16 @@ def analyze_any_query(query, available_venues, conversation_history):
 
     # 3. Check for specific intent patterns
     query_lower = query.lower()
+    intents = classify(query_lower)
 
     # Follow-up patterns (user mentions they've explored/found things)
-    followup_patterns = ['explored', 'found', 'visited', 'tried', 'been to', 'saw', 'discovered']
-    is_followup = any(pattern in query_lower for pattern in followup_patterns)
+    is_followup = intents.has('marco', 'followup')
 
     # Specific venue/place requests
-    venue_keywords = ['restaurant', 'cafe', 'coffee', 'bar', 'pub', 'food', 'eat', 'drink', 'shop', 'store', 'museum', 'park', 'attraction', 'pizza', 'taco', 'burger', 'sushi', 'italian', 'chinese', 'mexican', 'thai', 'indian', 'french', 'japanese', 'korean', 'vietnamese', 'mediterranean', 'american', 'breakfast', 'lunch', 'dinner', 'snacks', 'dessert', 'bakery', 'ice cream']
-    wants_specific_venues = any(keyword in query_lower for keyword in venue_keywords)
+    wants_specific_venues = intents.has('query', 'venue')
 
     # Neighborhood exploration (only if explicitly mentioned)
-    neighborhood_keywords = ['neighborhood', 'area', 'district', 'explore', 'walk around', 'stroll']
-    wants_neighborhoods = any(keyword in query_lower for keyword in neighborhood_keywords) and not wants_specific_venues
+    wants_neighborhoods = intents.has('query', 'neighborhood') and not wants_specific_venues
 
     # 4. Determine response strategy
     if is_followup:
@@ -325,7 +325,6 @@ def engage_and_explore(query, venues, neighborhoods, city):
     return f"I'm excited to help you explore {city}! What are you most curious about - I can recommend restaurants, attractions, coffee shops, or help with specific interests."
 
 # Simple in-memory vector store + ingestion that prefers Groq.ai embeddings
-GROQ_EMBEDDING_ENDPOINT = "https://api.groq.ai/v1/embeddings"
 
 # Configure logging
 logging.basicConfig(
@@ -340,11 +339,31 @@ class InMemoryIndex:
     def add(self, embedding, meta):
         self.items.append((embedding, meta))
 
-    def search(self, query_emb, top_k=5):
+    def remove_source(self, source):
+        """Drop every item indexed from `source`; returns how many were removed"""
+        kept = [(emb, meta) for emb, meta in self.items if meta.get("source") != source]
+        removed = len(self.items) - len(kept)
+        self.items = kept
+        return removed
+
+    def replace_vectors(self, upgraded):
+        """Swap in new embeddings (content hash -> Embedding) for items indexed with that hash"""
+        changed = 0
+        for i, (emb, meta) in enumerate(self.items):
+            new = upgraded.get(meta.get("hash"))
+            if new is not None:
+                self.items[i] = (new.vector, {**meta, "embedding_model": new.model})
+                changed += 1
+        return changed
+
+    def search(self, query_emb, top_k=5, model=None):
         logging.debug(f"Performing search with top_k={top_k}")
         scores = []
         q_norm = math.sqrt(sum(x * x for x in query_emb))
         for emb, meta in self.items:
+            # vectors from different models are not comparable
+            if model and meta.get("embedding_model", model) != model:
+                continue
             # cosine similarity
             dot = sum(a * b for a, b in zip(query_emb, emb))
             e_norm = math.sqrt(sum(x * x for x in emb))
@@ -473,88 +492,17 @@ class ConversationMemory:
     """Enhanced conversation memory for natural multi-turn travel conversations.
     
     Tracks user interests, topic transitions, and builds context for coherent
-    follow-up responses.
+    follow-up responses. A view over services.conversations.ConversationState;
+    pass `state` to reuse a stored conversation instead of re-parsing history.
     """
     
-    def __init__(self, history: str = None):
+    def __init__(self, history: str = None, state: Optional[ConversationState] = None):
         self.history = history or ""
-        self.user_interests = []  # Topics the user mentioned
-        self.venues_mentioned = []  # Venues discussed
-        self.last_topic = None  # Most recent topic
-        self.topic_transitions = []  # When user changed topics
-        self.conversation_flow = []  # Order of messages
-        self.parse_history()
-    
-    def parse_history(self):
-        """Parse conversation history to build memory."""
-        if not self.history:
-            return
-        
-        lines = [line.strip() for line in self.history.split('\n') if line.strip()]
-        if not lines:
-            return
-        
-        # Interest keywords to track
-        interest_keywords = {
-            'coffee': ['coffee', 'cafe', 'espresso', 'latte', 'cappuccino', 'brew'],
-            'food': ['food', 'restaurant', 'eat', 'dining', 'cuisine', 'breakfast', 'lunch', 'dinner'],
-            'bars': ['bar', 'pub', 'drinks', 'nightlife', 'cocktail', 'beer', 'wine'],
-            'attractions': ['museum', 'park', 'attraction', 'sightseeing', 'landmark', 'tourist'],
-            'transport': ['bus', 'metro', 'train', 'transport', 'subway', 'taxi'],
-            'shopping': ['shop', 'market', 'mall', 'store', 'boutique'],
-            'dark': ['dark', 'black', 'strong', 'bold'],
-            'outdoor': ['outdoor', 'patio', 'terrace', 'garden', 'outside'],
-            'budget': ['cheap', 'budget', 'affordable', 'inexpensive', 'price'],
-            'atmosphere': ['cozy', 'romantic', 'lively', 'quiet', 'vibe', 'ambiance'],
-        }
-        
-        for line in lines:
-            # Detect speaker
-            is_user = line.lower().startswith('user:')
-            is_marco = line.lower().startswith('marco:')
-            
-            if not is_user and not is_marco:
-                continue
-            
-            # Extract text
-            if ':' in line:
-                text = line.split(':', 1)[1].strip().lower()
-            else:
-                text = line.lower()
-            
-            if is_user:
-                # Track user interests
-                for interest, keywords in interest_keywords.items():
-                    if any(kw in text for kw in keywords):
-                        if interest not in self.user_interests:
-                            self.user_interests.append(interest)
-                        self.conversation_flow.append(('interest', interest))
-                
-                # Track topic transitions
-                if self.last_topic and not any(kw in text for kw in interest_keywords.get(self.last_topic, [])):
-                    # User changed topic
-                    self.topic_transitions.append((self.last_topic, text[:50]))
-                
-                # Update last topic
-                for interest, keywords in interest_keywords.items():
-                    if any(kw in text for kw in keywords):
-                        self.last_topic = interest
-                        break
-        
-        # Parse for venue mentions
-        venue_patterns = ['try', 'recommend', 'check out', 'go to', 'visit']
-        for line in lines:
-            if is_marco and any(pattern in line.lower() for pattern in venue_patterns):
-                # Extract potential venue names (simple heuristic)
-                words = line.split()
-                for i, word in enumerate(words):
-                    if word in ['try', 'recommend', 'check', 'go']:
-                        if i + 1 < len(words):
-                            venue = words[i + 1:i + 4]
-                            if venue:
-                                venue_name = ' '.join(venue).rstrip('.,!')
-                                if venue_name not in self.venues_mentioned:
-                                    self.venues_mentioned.append(venue_name)
+        self.state = state if state is not None else ConversationState.from_history(self.history)
+        self.user_interests = self.state.interests  # Topics the user mentioned
+        self.venues_mentioned = self.state.venues_mentioned  # Venues discussed
+        self.last_topic = self.state.last_topic  # Most recent topic
+        self.topic_transitions = self.state.topic_transitions  # When user changed topics
     
     def get_interests_str(self) -> str:
         """Get string representation of user interests."""
@@ -564,7 +512,7 @@ class ConversationMemory:
     
     def should_reference_previous(self) -> bool:
         """Check if we should reference previous conversation."""
-        return len(self.conversation_flow) >= 2
+        return self.state.interest_hits >= 2
     
     def get_followup_context(self) -> str:
         """Build context for follow-up responses."""
@@ -589,89 +537,25 @@ class ConversationMemory:
 
 
 class ConversationAnalyzer:
-    """Analyzes conversation history to understand context and user intent"""
+    """Analyzes conversation history to understand context and user intent
     
-    def __init__(self, history: str = None):
-        self.history = history or ""
-        self.topic = "general"
-        self.topic_depth = 0
-        self.user_frustration = 0
-        self.repeated_response_count = 0
-        self.last_user_query = ""
-        self.specific_intents = []  # Track specific user intents (dark coffee, outdoor, etc.)
-        self.parse_history()
+    Signals come from the last 6 lines (3 exchanges) as folded into a
+    ConversationState; pass `state` to skip re-parsing the history.
+    """
     
-    def parse_history(self):
-        """Analyze conversation to determine current state"""
-        if not self.history:
-            return
-        
-        lines = [line.strip() for line in self.history.split('\n') if line.strip()]
-        if not lines:
-            return
-            
-        # Extract last 6 lines (3 exchanges)
-        recent = lines[-6:]
-        
-        # Analyze topic depth
-        topic_count = {}
-        for line in recent:
-            if line.lower().startswith('user:'):
-                text = line.split(':', 1)[1].strip().lower()
-                self.last_user_query = text
-                
-                # Extract specific intents from the query
-                self._detect_specific_intents(text)
-                
-                # Simple keyword extraction - could be enhanced with NLP
-                for word in text.split():
-                    if len(word) > 3 and word not in ['the', 'and', 'for', 'with', 'what', 'where']:
-                        topic_count[word] = topic_count.get(word, 0) + 1
-        
-        # Determine main topic
-        if topic_count:
-            main_topic = max(topic_count, key=topic_count.get)
-            if topic_count[main_topic] >= 2:  # Repeated topic
-                self.topic = main_topic
-                self.topic_depth = topic_count[main_topic]
-        
-        # Detect frustration
-        frustration_phrases = [
-            "i just told you",
-            "you're not listening",
-            "where do i click",
-            "same response",
-            "repeating yourself"
-        ]
-        self.user_frustration = sum(1 for line in recent 
-                                  if any(phrase in line.lower() for phrase in frustration_phrases))
-        
-        # Detect Marco's repetition
-        marco_lines = [line for line in recent if line.lower().startswith('marco:')]
-        if len(marco_lines) >= 2:
-            last_2 = [line.split(':', 1)[1].strip() for line in marco_lines[-2:]]
-            if last_2[0] == last_2[1]:
-                self.repeated_response_count = 2
+    def __init__(self, history: str = None, state: Optional[ConversationState] = None):
+        self.history = history or ""
+        state = state if state is not None else ConversationState.from_history(self.history)
+        self.topic = state.topic
+        self.topic_depth = state.topic_depth
+        self.user_frustration = state.frustration
+        self.repeated_response_count = state.repeated_response_count
+        self.last_user_query = state.last_user_query
+        self.specific_intents = list(state.specific_intents)  # Track specific user intents (dark coffee, outdoor, etc.)
     
     def _detect_specific_intents(self, text):
         """Detect specific user intents from query text"""
-        intents = []
-        
-        # Coffee-related specific intents
-        if any(kw in text for kw in ['dark', 'black', 'strong', 'bold', 'espresso']):
-            intents.append('dark_coffee')
-        if any(kw in text for kw in ['outdoor', 'patio', 'terrace', 'garden', 'outside seating']):
-            intents.append('outdoor_seating')
-        if any(kw in text for kw in ['budget', 'cheap', 'affordable', 'inexpensive', 'under $']):
-            intents.append('budget_friendly')
-        if any(kw in text for kw in ['cozy', 'romantic', 'quiet', 'intimate', 'peaceful']):
-            intents.append('cozy_atmosphere')
-        if any(kw in text for kw in ['quick', 'fast', 'takeaway', 'takeout', 'grab and go']):
-            intents.append('quick_service')
-        if any(kw in text for kw in ['wheelchair', 'accessible', 'disabled', 'mobility']):
-            intents.append('accessible')
-        
-        self.specific_intents = intents
+        self.specific_intents = detect_specific_intents(text)
     
     def should_escalate(self) -> bool:
         """Determine if Marco should provide concrete information"""
@@ -1012,22 +896,20 @@ async def convert_currency(amount, from_curr, to_curr, session: Optional[aiohttp
 
 
 async def _convert_currency_impl(amount, from_curr, to_curr, session):
+    # answered from the local rate table; the network is only touched on a cold, empty start
+    from city_guides.src.services.exchange_rates import table
     try:
-        url = f"https://api.exchangerate-api.com/v4/latest/{from_curr.upper()}"
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as resp:
-            if resp.status != 200:
-                return f"Error: API request failed with status {resp.status}"
-            data = await resp.json()
-            rate = data["rates"].get(to_curr.upper())
-            if rate:
-                converted = amount * rate
-                return f"{amount} {from_curr.upper()} = {converted:.2f} {to_curr.upper()}"
-            else:
-                return "Currency not supported."
+        if not await table.ensure_rates(session):
+            return "Error: exchange rates are unavailable right now"
+        result = table.convert(amount, from_curr, to_curr)
+        if not result:
+            return "Currency not supported."
+        as_of = datetime.datetime.fromtimestamp(result["as_of"], datetime.timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+        note = f"rates as of {as_of}" + (", may be out of date" if result["stale"] else "")
+        return f"{amount} {result['from']} = {result['converted']:.2f} {result['to']} ({note})"
     except Exception as e:
         return f"Error: {str(e)}"
 
-
 from typing import Optional
 
 # Expanded venue discovery categories
@@ -1043,61 +925,8 @@ VENUE_CATEGORIES = {
 
 def get_poi_type_from_query(query):
     """Determine POI type based on broader travel categories"""
-    q_lower = query.lower()
-
-    if any(kw in q_lower for kw in ['bus', 'metro', 'train', 'transport', 'transit']):
-        return 'transport'
-    elif any(kw in q_lower for kw in ['museum', 'attraction', 'landmark', 'tourist']):
-        return 'attractions'
-    elif any(kw in q_lower for kw in ['hotel', 'hostel', 'stay', 'accommodation']):
-        return 'accommodation'
-    elif any(kw in q_lower for kw in ['shop', 'store', 'market', 'mall']):
-        return 'shopping'
-    elif any(kw in q_lower for kw in ['park', 'hike', 'beach', 'activity']):
-        return 'activities'
-    else:
-        return 'restaurant'  # Default to food for generic queries
-
-async def _fetch_text(url, timeout=8, session: Optional[aiohttp.ClientSession] = None):
-    if session is None:
-        async with get_session() as session:
-            return await _fetch_text_impl(url, timeout, session)
-    else:
-        return await _fetch_text_impl(url, timeout, session)
-
-
-async def _fetch_text_impl(url, timeout, session):
-    try:
-        headers = {"User-Agent": "CityGuidesBot/1.0 (+https://example.com)"}
-        aio_timeout = aiohttp.ClientTimeout(total=timeout) if isinstance(timeout, (int, float)) else timeout
-        async with session.get(url, headers=headers, timeout=aio_timeout) as r:
-            if r.status != 200:
-                return ""
-            text_content = await r.text()
-            soup = BeautifulSoup(text_content, "html.parser")
-            for s in soup(["script", "style", "noscript"]):
-                s.decompose()
-            text = " ".join(
-                p.get_text(separator=" ", strip=True)
-                for p in soup.find_all(["p", "h1", "h2", "h3", "li"])
-            )
-            return text
-    except Exception:
-        return ""
-
-
-def _chunk_text(text, max_chars=1000):
-    if not text:
-        return []
-    parts = []
-    start = 0
-    L = len(text)
-    while start < L:
-        end = min(L, start + max_chars)
-        parts.append(text[start:end])
-        start = end
-    return parts
-
+    # Default to food for generic queries
+    return classify(query).first('poi_type', 'restaurant')
 
 def _shorten(text, n=200):
     if not text:
@@ -1127,86 +956,33 @@ def _get_api_key():
     return os.getenv("GROQ_API_KEY")
 
 
-from typing import Optional
-
-async def _embed_with_groq(text, session: Optional[aiohttp.ClientSession] = None):
-    # call Groq.ai embeddings endpoint (best-effort)
-    key = _get_api_key()
-    if session is None:
-        async with get_session() as session:
-            return await _embed_with_groq_impl(text, key, session)
-    else:
-        return await _embed_with_groq_impl(text, key, session)
-
-
-async def _embed_with_groq_impl(text, key, session):
-    try:
-        if not key:
-            raise RuntimeError("no groq key")
-        headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
-        payload = {"model": "embed-english-v1", "input": text}
-        async with session.post(GROQ_EMBEDDING_ENDPOINT, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=20)) as r:
-            if r.status != 200:
-                return None
-            j = await r.json()
-            if (
-                isinstance(j, dict)
-                and "data" in j
-                and len(j["data"]) > 0
-                and "embedding" in j["data"][0]
-            ):
-                return j["data"][0]["embedding"]
-    except Exception:
-        pass
-    return None
-
-
-def _fallback_embedding(text, dim=128):
-    # deterministic, simple hash-based fallback embedding for demos
-    vec = [0.0] * dim
-    words = (text or "").split()
-    for i, w in enumerate(words):
-        h = 0
-        for c in w:
-            h = (h * 131 + ord(c)) & 0xFFFFFFFF
-        idx = h % dim
-        vec[idx] += 1.0
-    # normalize
-    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
-    return [x / norm for x in vec]
-
-
 from typing import Optional
 
 async def embed_text(text, session: Optional[aiohttp.ClientSession] = None):
-    emb = await _embed_with_groq(text, session=session)
-    if emb and isinstance(emb, list):
-        return emb
-    return _fallback_embedding(text)
+    """Embedding vector for `text` (services/embeddings.py: cached by content hash, batched)"""
+    return (await embeddings.service.embed(text, session=session)).vector
 
 
 from typing import Optional
 
 async def ingest_urls(urls, session: Optional[aiohttp.ClientSession] = None):
-    count = 0
-    for url in urls:
-        txt = await _fetch_text(url, session=session)
-        if not txt:
-            continue
-        chunks = _chunk_text(txt)
-        for i, c in enumerate(chunks):
-            emb = await embed_text(c, session=session)
-            meta = {"source": url, "snippet": c[:500], "chunk_index": i}
-            INDEX.add(emb, meta)
-            count += 1
-    return count
+    """Fetch, chunk and index `urls` concurrently (services/ingestion.py); returns chunks indexed"""
+    from city_guides.src.services.ingestion import pipeline
+    run = await pipeline.ingest(urls, session=session)
+    return run['chunks']
 
 
 from typing import Optional
 
 async def semantic_search(query, top_k=5, session: Optional[aiohttp.ClientSession] = None):
-    q_emb = await embed_text(query, session=session)
-    return INDEX.search(q_emb, top_k=top_k)
+    q = await embeddings.service.embed(query, session=session)
+    return INDEX.search(q.vector, top_k=top_k, model=q.model)
+
+
+async def refresh_fallback_embeddings(session: Optional[aiohttp.ClientSession] = None):
+    """Re-embed fallback vectors through the API and swap them into INDEX; returns how many changed"""
+    upgraded = await embeddings.service.recompute_fallbacks(session=session)
+    return INDEX.replace_vectors(upgraded)
 
 
 from typing import Optional
@@ -1241,8 +1017,7 @@ async def recommend_neighborhoods(query, city, neighborhoods, mode="explorer", w
         weather_context = f"\nCURRENT WEATHER: {w_summary}, {weather.get('temperature_c')}°C."
 
     # Detect if the query is about transport
-    transport_keywords = ["transport", "bus", "public transit", "subway", "metro", "train", "tram"]
-    is_transport_query = any(k in query.lower() for k in transport_keywords)
+    is_transport_query = classify(query).has('query', 'transport')
 
     if mode == "explorer":
         prompt = f"""You are Marco, the legendary explorer! 🗺️
@@ -1468,14 +1243,18 @@ except Exception:
 
 
 async def search_and_reason(
-    query, city=None, mode="explorer", context_venues=None, weather=None, neighborhoods=None, session: Optional[aiohttp.ClientSession] = None, wikivoyage=None, history: str = None
+    query, city=None, mode="explorer", context_venues=None, weather=None, neighborhoods=None, session: Optional[aiohttp.ClientSession] = None, wikivoyage=None, history: str = None,
+    conversation: Optional[ConversationState] = None
 ):
     """Search the web and use Groq to reason about the query.
 
     mode: 'explorer' for themed responses, 'rational' for straightforward responses
     context_venues: optional list of venues already showing in the UI
     neighborhoods: optional list of neighborhoods for recommendation
+    conversation: stored conversation state; used instead of re-parsing `history`
     """
+    if conversation is not None:
+        history = conversation.transcript()
 
     # Check for currency conversion
     if "convert" in query.lower() or "currency" in query.lower():
@@ -1498,22 +1277,7 @@ async def search_and_reason(
                 return "Unable to parse currency conversion request. Please use format like 'convert 100 USD to EUR'."
 
     # Check for weather questions
-    weather_keywords = [
-        "weather",
-        "temperature",
-        "forecast",
-        "wind",
-        "rain",
-        "sunny",
-        "cloudy",
-        "humidity",
-        "umbrella",
-        "jacket",
-        "coat",
-        "wear",
-        "outdoor",
-    ]
-    if any(w in query.lower() for w in weather_keywords):
+    if classify(query).has('weather'):
         # Use provided weather data if available
         if weather:
             icons = {
@@ -1577,7 +1341,7 @@ async def search_and_reason(
     }
 
     # Initialize conversation analyzer early so we can decide whether to escalate
-    conv_analyzer = ConversationAnalyzer(history)
+    conv_analyzer = ConversationAnalyzer(history, state=conversation)
     try:
         print(f"DEBUG early conv_analyzer: topic={conv_analyzer.topic}, frustration={conv_analyzer.user_frustration}, should_escalate={conv_analyzer.should_escalate()}")
     except Exception:
@@ -1742,9 +1506,6 @@ async def search_and_reason(
         ]
         ui_context = "VENUES TO CONSIDER:\n" + "\n".join(ui_lines)
 
-    # Process conversation history and build prompt using ConversationAnalyzer
-    conv_analyzer = ConversationAnalyzer(history)
-
     # Build venue context string if available
     venue_context = create_venue_context_string(context_venues or [])
 
@@ -1755,8 +1516,7 @@ async def search_and_reason(
 
     # Choose prompt depending on conversation state
     # Use the mandatory venues prompt when escalation is requested or when the query is venue-focused
-    venue_keywords = ['coffee', 'food', 'restaurant', 'bar', 'pub', 'cafe', 'eat', 'drink']
-    is_venue_query_ui = any(keyword in (query or "").lower() for keyword in venue_keywords)
+    is_venue_query_ui = classify(query).has('query', 'venue_ui')
     if conv_analyzer.should_escalate() or (context_venues and is_venue_query_ui):
         prompt = build_mandatory_venues_prompt(query, city, context_venues or [], weather, neighborhoods or [])
     else:
@@ -1895,8 +1655,7 @@ async def search_and_reason(
 
         # 2. Skip AI call entirely if we have good venue data for venue-related queries
         if context_venues and len(context_venues) > 0:
-            venue_keywords = ['coffee', 'food', 'restaurant', 'bar', 'pub', 'cafe', 'eat', 'drink']
-            if any(keyword in (query or "").lower() for keyword in venue_keywords):
+            if classify(query).has('query', 'venue_ui'):
                 print(f"DEBUG: Skipping AI call - direct concrete response for venue query: {query}")
                 return produce_concrete_response(query, city, context_venues, conv_analyzer)
 
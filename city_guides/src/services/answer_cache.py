@@ -0,0 +1,291 @@
+# Answer cache - paraphrase-tolerant lookup for RAG chat answers
+#
+# The exact `rag:<sha256>` key (routes/chat.rag_cache_key) only matches a
+# byte-identical query, so "best tacos in Austin", "Best tacos in Austin?" and
+# "where are the best tacos in austin" each paid for DDGS plus Groq. Answers
+# are now also reachable through two fallbacks, tried in order after the
+# exact key misses:
+#
+# - canonical: the query is lowercased, stripped of punctuation, filler words
+#   and the place names already given in the request, plurals folded; the
+#   location is city|state|country (or coordinates rounded to ~1 km when no
+#   city is given). The answer is stored again under `rag:c:<sha256>` of that.
+# - semantic: every location keeps an index of the canonical queries answered
+#   for it (Redis hash `rag:idx:<location>`, mirrored per process). A miss is
+#   embedded and compared with the index; the closest entry at or above
+#   ANSWER_CACHE_THRESHOLD (cosine) is served, provided both queries hit the
+#   same cuisine / POI-type / intent labels (intents.classify) so "best tacos"
+#   never answers "best tapas", and both carry the same content words up to
+#   typos and compounds: an extra qualifier or negation ("halal", "not",
+#   "at night") changes the question, however close the vectors are.
+#
+# Embeddings are hashed character trigrams of the canonical query: local,
+# deterministic and cheap enough for the request path, and they tolerate
+# typos, word order and small rewordings. Only the query text is stored, so
+# every process rebuilds identical vectors. Hits are counted per tier (exact,
+# canonical, semantic) in `snapshot()` for /healthz and in metrics as
+# rag.cache_hit.<tier>.
+
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from city_guides.src.intents import classify
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+ANSWER_CACHE_PER_LOCATION = int(os.getenv("ANSWER_CACHE_PER_LOCATION", "200"))  # indexed queries per location
+ANSWER_CACHE_LOCATIONS = int(os.getenv("ANSWER_CACHE_LOCATIONS", "500"))  # location indexes kept per process
+ANSWER_CACHE_INDEX_REFRESH = float(os.getenv("ANSWER_CACHE_INDEX_REFRESH", "60"))  # seconds before re-reading Redis
+ANSWER_CACHE_TERM_MATCH = float(os.getenv("ANSWER_CACHE_TERM_MATCH", "0.7"))  # cosine for two words to count as one
+EMBEDDING_DIM = 1024
+
+FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'in', 'at', 'near', 'around', 'of', 'to', 'for', 'on', 'me', 'i', 'my', 'we', 'us', 'you',
+    'is', 'are', 'there', 'what', 'where', 'which', 'can', 'could', 'would', 'do', 'does', 'please', 'some', 'any',
+    'find', 'show', 'tell', 'recommend', 'suggest', 'give', 'list', 'about', 'whats', 'wheres', 'im', 'looking',
+    'want', 'like', 'id', 'should', 'go',
+})
+SYNONYMS = {'top': 'best', 'greatest': 'best', 'finest': 'best', 'cheapest': 'cheap', 'inexpensive': 'cheap',
+            'eateries': 'restaurant', 'eatery': 'restaurant', 'spots': 'place', 'spot': 'place'}
+_WORD_RE = re.compile(r"[^\W_]+")
+_SIGNATURE_TABLES = ('cuisine', 'poi_type', 'dream', 'weather', 'fun_fact', 'specific')
+
+
+def _fold(word: str) -> str:
+    word = SYNONYMS.get(word, word)
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def canonical_query(query: str, places: Tuple[str, ...] = ()) -> str:
+    """Query reduced to the words that change the answer"""
+    drop = set(FILLER_WORDS)
+    for place in places:
+        drop.update(_WORD_RE.findall((place or '').lower()))
+    words = []
+    for word in _WORD_RE.findall((query or '').lower().replace("'", '')):
+        if word in drop:
+            continue
+        word = _fold(word)
+        if word not in words:
+            words.append(word)
+    return ' '.join(words)
+
+
+def canonical_location(data: Dict[str, Any]) -> str:
+    parts = [str(data.get(k) or '').strip().lower() for k in ('city', 'state', 'country')]
+    if not parts[0]:
+        try:
+            parts.append(f"{float(data['lat']):.2f},{float(data['lon']):.2f}")
+        except (KeyError, TypeError, ValueError):
+            pass
+    return '|'.join(parts)
+
+
+def embed(text: str) -> Dict[int, float]:
+    """Sparse unit vector of hashed character trigrams (word-bounded)"""
+    counts: Dict[int, float] = {}
+    for word in text.split():
+        padded = f' {word} '
+        for i in range(len(padded) - 2):
+            idx = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest(), 'little')
+            idx %= EMBEDDING_DIM
+            counts[idx] = counts.get(idx, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def _signature(canonical: str) -> Tuple[Tuple[str, ...], ...]:
+    result = classify(canonical)
+    return tuple(tuple(result.labels(t)) for t in _SIGNATURE_TABLES)
+
+
+def _unmatched(words: Tuple[str, ...], vectors, other_vectors) -> str:
+    """Words with no close counterpart on the other side, joined (compounds compare as one word)"""
+    return ''.join(w for w, v in zip(words, vectors)
+                   if not any(cosine(v, o) >= ANSWER_CACHE_TERM_MATCH for o in other_vectors))
+
+
+def same_terms(a: '_Entry', b: '_Entry') -> bool:
+    """Both queries carry the same content words, allowing typos and split/joined compounds"""
+    extra_a = _unmatched(a.words, a.word_vectors, b.word_vectors)
+    extra_b = _unmatched(b.words, b.word_vectors, a.word_vectors)
+    if not extra_a and not extra_b:
+        return True
+    # 'coffeeshop' vs 'coffee shop': what is left over must be the same word
+    return bool(extra_a and extra_b) and cosine(embed(extra_a), embed(extra_b)) >= ANSWER_CACHE_TERM_MATCH
+
+
+class _Entry:
+    __slots__ = ('query', 'vector', 'signature', 'words', 'word_vectors')
+
+    def __init__(self, query: str):
+        self.query = query
+        self.vector = embed(query)
+        self.signature = _signature(query)
+        self.words = tuple(query.split())
+        self.word_vectors = tuple(embed(w) for w in self.words)
+
+
+class _LocationIndex:
+    __slots__ = ('entries', 'loaded')
+
+    def __init__(self):
+        self.entries: 'OrderedDict[str, _Entry]' = OrderedDict()  # canonical key -> entry
+        self.loaded = 0.0
+
+
+class AnswerCache:
+    """Canonical and similarity fallbacks behind the exact RAG answer key"""
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, per_location: int = ANSWER_CACHE_PER_LOCATION,
+                 max_locations: int = ANSWER_CACHE_LOCATIONS):
+        self.threshold = threshold
+        self.per_location = per_location
+        self.max_locations = max_locations
+        self._indexes: 'OrderedDict[str, _LocationIndex]' = OrderedDict()
+        self.stats = {'exact': 0, 'canonical': 0, 'semantic': 0, 'miss': 0, 'stored': 0, 'errors': 0}
+
+    # -- keys ------------------------------------------------------------------------
+
+    @staticmethod
+    def canonical(data: Dict[str, Any]) -> Tuple[str, str]:
+        """(canonical query, location) for a RAG request"""
+        places = tuple(str(data.get(k) or '') for k in ('city', 'state', 'country'))
+        return canonical_query(data.get('query') or '', places), canonical_location(data)
+
+    @staticmethod
+    def canonical_key(query: str, location: str) -> str:
+        return "rag:c:" + hashlib.sha256(f"{query}|{location}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def index_key(location: str) -> str:
+        return "rag:idx:" + hashlib.sha256(location.encode('utf-8')).hexdigest()[:32]
+
+    # -- per-location index -------------------------------------------------------------
+
+    async def _index(self, redis, location: str) -> _LocationIndex:
+        index = self._indexes.get(location)
+        if index is None:
+            index = self._indexes[location] = _LocationIndex()
+            while len(self._indexes) > self.max_locations:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(location)
+        if time.monotonic() - index.loaded >= ANSWER_CACHE_INDEX_REFRESH:
+            index.loaded = time.monotonic()
+            try:
+                stored = await redis.hgetall(self.index_key(location)) or {}
+            except Exception:
+                self.stats['errors'] += 1
+                logger.debug('answer-cache index read failed for %s', location, exc_info=True)
+                stored = {}
+            for key, query in stored.items():
+                key = key.decode() if isinstance(key, bytes) else key
+                if key not in index.entries:
+                    index.entries[key] = _Entry(query.decode() if isinstance(query, bytes) else query)
+            self._trim(index)
+        return index
+
+    def _trim(self, index: _LocationIndex) -> None:
+        while len(index.entries) > self.per_location:
+            index.entries.popitem(last=False)
+
+    def _closest(self, index: _LocationIndex, query: str) -> Tuple[Optional[str], float]:
+        probe = _Entry(query)
+        best_key, best_score = None, 0.0
+        for key, entry in index.entries.items():
+            if entry.signature != probe.signature:
+                continue
+            score = cosine(probe.vector, entry.vector)
+            if score > best_score and score >= self.threshold and same_terms(probe, entry):
+                best_key, best_score = key, score
+        return best_key, best_score
+
+    # -- lookup / store -------------------------------------------------------------------
+
+    def record_exact_hit(self) -> None:
+        self.stats['exact'] += 1
+
+    async def lookup(self, redis, data: Dict[str, Any]) -> Tuple[Optional[bytes], Optional[str]]:
+        """(cached answer, tier) after an exact-key miss; (None, None) when nothing close is cached"""
+        query, location = self.canonical(data)
+        if not query:
+            self.stats['miss'] += 1
+            return None, None
+        try:
+            key = self.canonical_key(query, location)
+            raw = await redis.get(key)
+            if raw:
+                self.stats['canonical'] += 1
+                return raw, 'canonical'
+            index = await self._index(redis, location)
+            match, score = self._closest(index, query)
+            if match is not None and score >= self.threshold:
+                raw = await redis.get(match)
+                if raw:
+                    self.stats['semantic'] += 1
+                    logger.debug('answer-cache semantic hit %.3f: %r ~ %r', score, query, index.entries[match].query)
+                    return raw, 'semantic'
+                # the answer expired; forget it here and in Redis
+                index.entries.pop(match, None)
+                await redis.hdel(self.index_key(location), match)
+        except Exception:
+            self.stats['errors'] += 1
+            logger.debug('answer-cache lookup failed', exc_info=True)
+        self.stats['miss'] += 1
+        return None, None
+
+    async def store(self, redis, data: Dict[str, Any], raw: bytes, ttl: int) -> None:
+        """Make a fresh answer reachable through the canonical key and the location index"""
+        query, location = self.canonical(data)
+        if not query:
+            return
+        key = self.canonical_key(query, location)
+        try:
+            await redis.setex(key, ttl, raw)
+            idx_key = self.index_key(location)
+            await redis.hset(idx_key, key, query)
+            await redis.expire(idx_key, ttl)
+        except Exception:
+            self.stats['errors'] += 1
+            logger.debug('answer-cache store failed', exc_info=True)
+            return
+        index = self._indexes.get(location)
+        if index is not None:
+            index.entries[key] = _Entry(query)
+            index.entries.move_to_end(key)
+            self._trim(index)
+        self.stats['stored'] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        hits = self.stats['exact'] + self.stats['canonical'] + self.stats['semantic']
+        lookups = hits + self.stats['miss']
+        rate = (lambda n: round(n / lookups, 4) if lookups else 0.0)
+        return {
+            **self.stats,
+            'hit_rate': rate(hits),
+            'exact_rate': rate(self.stats['exact']),
+            'canonical_rate': rate(self.stats['canonical']),
+            'semantic_rate': rate(self.stats['semantic']),
+            'threshold': self.threshold,
+            'locations': len(self._indexes),
+        }
+
+
+cache = AnswerCache()
@@ -0,0 +1,243 @@
+# Conversation state - incremental per-conversation memory for Marco
+#
+# Clients send a `conversation_id` instead of replaying the transcript. Each
+# message is folded into a small `ConversationState` once, when it arrives:
+# user interests, last topic and topic transitions, venues Marco suggested,
+# the frustration / repetition signals of the recent window, and a rolling
+# summary of older turns. The prompt is then built from the summary plus the
+# last few messages verbatim, so per-turn CPU and prompt tokens stay flat no
+# matter how long the conversation gets.
+#
+# States live in a near cache (services/near_cache.py): a bounded in-process
+# tier in front of Redis (`near:conversations:<id>`, CONVERSATION_TTL), so any
+# worker can pick up a conversation.
+#
+# semantic.ConversationMemory / ConversationAnalyzer are views over the same
+# state; building one from a history string just folds its lines in order.
+
+import os
+import re
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from city_guides.src.intents import classify
+from city_guides.src.services.near_cache import NearCache
+
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", str(24 * 3600)))  # idle conversations expire
+CONVERSATION_MEMORY_SIZE = int(os.getenv("CONVERSATION_MEMORY_SIZE", "1000"))  # states kept per process
+CONVERSATION_PROMPT_MESSAGES = int(os.getenv("CONVERSATION_PROMPT_MESSAGES", "4"))  # sent verbatim to the LLM
+CONVERSATION_SUMMARY_LINES = int(os.getenv("CONVERSATION_SUMMARY_LINES", "8"))
+
+RECENT_WINDOW = 6  # lines the analyzer signals are computed over (3 exchanges)
+MAX_MESSAGE_CHARS = 1500
+MAX_VENUES = 20
+MAX_TRANSITIONS = 5
+
+FRUSTRATION_PHRASES = ("i just told you", "you're not listening", "where do i click", "same response",
+                       "repeating yourself")
+_TOPIC_STOPWORDS = frozenset({'the', 'and', 'for', 'with', 'what', 'where'})
+_VENUE_CUES = ('try', 'recommend', 'check out', 'go to', 'visit')
+_VENUE_LEAD_WORDS = frozenset({'try', 'recommend', 'check', 'go'})
+_ID_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def detect_specific_intents(text: str) -> List[str]:
+    return classify(text).labels('specific')
+
+
+class ConversationState:
+    """Everything Marco remembers about one conversation, updated one message at a time"""
+
+    def __init__(self, conversation_id: str = ''):
+        self.id = conversation_id
+        self.turns = 0  # user messages folded in
+        self.interests: List[str] = []
+        self.interest_hits = 0
+        self.last_topic: Optional[str] = None
+        self.topic_transitions: List[Tuple[str, str]] = []
+        self.venues_mentioned: List[str] = []
+        self.summary: List[str] = []
+        self.messages: Deque[Dict[str, str]] = deque()  # last CONVERSATION_PROMPT_MESSAGES, verbatim
+        self.recent: Deque[Tuple[str, str]] = deque(maxlen=RECENT_WINDOW)  # (role, lowercased text)
+        # signals over the recent window (ConversationAnalyzer)
+        self.topic = 'general'
+        self.topic_depth = 0
+        self.frustration = 0
+        self.repeated_response_count = 0
+        self.last_user_query = ''
+        self.specific_intents: List[str] = []
+
+    # -- folding -------------------------------------------------------------------
+
+    def add_message(self, role: str, content: str) -> None:
+        """Fold one message ('user' or 'assistant') into the state"""
+        content = (content or '').strip()
+        if not content:
+            return
+        user = role == 'user'
+        text = content.lower()
+        if user:
+            self.turns += 1
+            self._fold_user(text)
+        else:
+            self._fold_assistant(content)
+        self.recent.append(('user' if user else 'marco', text))
+        self._analyze_recent()
+
+        self.messages.append({'role': 'user' if user else 'assistant', 'content': content[:MAX_MESSAGE_CHARS]})
+        while len(self.messages) > CONVERSATION_PROMPT_MESSAGES:
+            self._summarize(self.messages.popleft())
+
+    def add_line(self, line: str) -> None:
+        """Fold one 'User: ...' / 'Marco: ...' transcript line; anything else only counts as recent"""
+        line = line.strip()
+        if not line:
+            return
+        lower = line.lower()
+        if lower.startswith('user:'):
+            self.add_message('user', line.split(':', 1)[1])
+        elif lower.startswith('marco:'):
+            self.add_message('assistant', line.split(':', 1)[1])
+        else:
+            self.recent.append(('other', lower))
+            self._analyze_recent()
+
+    def _fold_user(self, text: str) -> None:
+        matched = classify(text).labels('interest')
+        for interest in matched:
+            if interest not in self.interests:
+                self.interests.append(interest)
+        self.interest_hits += len(matched)
+        if self.last_topic and self.last_topic not in matched:
+            self.topic_transitions = (self.topic_transitions + [(self.last_topic, text[:50])])[-MAX_TRANSITIONS:]
+        if matched:
+            self.last_topic = matched[0]
+
+    def _fold_assistant(self, content: str) -> None:
+        if not any(cue in content.lower() for cue in _VENUE_CUES):
+            return
+        words = content.split()
+        for i, word in enumerate(words):
+            if word in _VENUE_LEAD_WORDS and i + 1 < len(words):
+                venue = ' '.join(words[i + 1:i + 4]).rstrip('.,!')
+                if venue and venue not in self.venues_mentioned:
+                    self.venues_mentioned = (self.venues_mentioned + [venue])[-MAX_VENUES:]
+
+    def _analyze_recent(self) -> None:
+        topic_count: Dict[str, int] = {}
+        self.specific_intents = []
+        self.last_user_query = ''
+        for role, text in self.recent:
+            if role != 'user':
+                continue
+            self.last_user_query = text
+            self.specific_intents = detect_specific_intents(text)
+            for word in text.split():
+                if len(word) > 3 and word not in _TOPIC_STOPWORDS:
+                    topic_count[word] = topic_count.get(word, 0) + 1
+        self.topic, self.topic_depth = 'general', 0
+        if topic_count:
+            main_topic = max(topic_count, key=topic_count.get)
+            if topic_count[main_topic] >= 2:
+                self.topic, self.topic_depth = main_topic, topic_count[main_topic]
+        self.frustration = sum(1 for _, text in self.recent if any(p in text for p in FRUSTRATION_PHRASES))
+        marco = [text for role, text in self.recent if role == 'marco']
+        self.repeated_response_count = 2 if len(marco) >= 2 and marco[-1] == marco[-2] else 0
+
+    def _summarize(self, message: Dict[str, str]) -> None:
+        """Fold a message that left the verbatim window into the rolling summary"""
+        first = re.split(r'(?<=[.!?])\s', message['content'], maxsplit=1)[0][:160]
+        who = 'User asked' if message['role'] == 'user' else 'Marco answered'
+        self.summary = (self.summary + [f"{who}: {first}"])[-CONVERSATION_SUMMARY_LINES:]
+
+    # -- reading -------------------------------------------------------------------
+
+    def context_line(self) -> str:
+        parts = []
+        if self.interests:
+            parts.append(f"interests: {', '.join(self.interests[-3:])}")
+        if self.last_topic:
+            parts.append(f"current topic: {self.last_topic}")
+        if self.venues_mentioned:
+            parts.append(f"venues already discussed: {', '.join(self.venues_mentioned[-3:])}")
+        if self.frustration:
+            parts.append("the user seems frustrated; be concrete")
+        return "; ".join(parts)
+
+    def prompt_messages(self) -> List[Dict[str, str]]:
+        """Summary of older turns (as one system message) plus the last few messages verbatim"""
+        out = []
+        notes = [line for line in (self.context_line(),) if line] + self.summary
+        if notes:
+            out.append({'role': 'system', 'content': "Earlier in this conversation:\n" + "\n".join(notes)})
+        out.extend(dict(m) for m in self.messages)
+        return out
+
+    def transcript(self) -> str:
+        """The verbatim window as 'User:' / 'Marco:' lines (for prompt builders that take a history string)"""
+        return "\n".join(f"{'User' if m['role'] == 'user' else 'Marco'}: {m['content']}" for m in self.messages)
+
+    # -- persistence ---------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id, 'turns': self.turns, 'interests': self.interests, 'interest_hits': self.interest_hits,
+            'last_topic': self.last_topic, 'topic_transitions': self.topic_transitions,
+            'venues_mentioned': self.venues_mentioned, 'summary': self.summary,
+            'messages': list(self.messages), 'recent': list(self.recent),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConversationState':
+        state = cls(data.get('id', ''))
+        state.turns = int(data.get('turns', 0))
+        state.interests = list(data.get('interests') or [])
+        state.interest_hits = int(data.get('interest_hits', 0))
+        state.last_topic = data.get('last_topic')
+        state.topic_transitions = [tuple(t) for t in data.get('topic_transitions') or []]
+        state.venues_mentioned = list(data.get('venues_mentioned') or [])
+        state.summary = list(data.get('summary') or [])
+        state.messages = deque(data.get('messages') or [])
+        state.recent = deque((tuple(r) for r in data.get('recent') or []), maxlen=RECENT_WINDOW)
+        state._analyze_recent()
+        return state
+
+    @classmethod
+    def from_history(cls, history: Optional[str]) -> 'ConversationState':
+        state = cls()
+        for line in (history or '').split('\n'):
+            state.add_line(line)
+        return state
+
+
+def normalize_id(conversation_id: Any) -> Optional[str]:
+    """A usable conversation id: the client's, or a fresh one for ''/'new'; None if malformed"""
+    if conversation_id in (None, '', 'new', True):
+        return uuid.uuid4().hex
+    if isinstance(conversation_id, str) and _ID_RE.match(conversation_id):
+        return conversation_id
+    return None
+
+
+class ConversationStore:
+    """Conversation states by id: in-process tier in front of Redis"""
+
+    def __init__(self, cache: Optional[NearCache] = None):
+        self.cache = cache or NearCache('conversations', maxsize=CONVERSATION_MEMORY_SIZE,
+                                        redis_ttl=CONVERSATION_TTL)
+
+    async def load(self, conversation_id: str) -> ConversationState:
+        data = await self.cache.get(conversation_id)
+        return ConversationState.from_dict(data) if data else ConversationState(conversation_id)
+
+    async def save(self, state: ConversationState) -> None:
+        await self.cache.set(state.id, state.to_dict())
+
+    async def record_turn(self, state: ConversationState, user_text: str, assistant_text: str) -> None:
+        state.add_message('user', user_text)
+        state.add_message('assistant', assistant_text)
+        await self.save(state)
+
+
+store = ConversationStore()
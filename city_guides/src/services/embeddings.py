@@ -0,0 +1,338 @@
+# Embeddings - batched embedding calls behind a persistent vector cache
+#
+# `semantic.embed_text` used to POST one text per request and quietly return
+# `_fallback_embedding` on any failure, and the same chunk or query was
+# embedded again on every ingest and every search. Texts now go through
+# `EmbeddingService`:
+#
+# - cache: vectors are kept by (model, sha256(text)) in an LRU in front of a
+#   SQLite file (city_guides/data/embeddings.sqlite3), packed as float32, so
+#   a restart or a re-ingest costs no API calls.
+# - batching: concurrent misses are queued and sent as one request once
+#   EMBED_BATCH_SIZE texts are waiting or EMBED_BATCH_WINDOW_MS has passed.
+# - fallback: when the API is unavailable the local hash embedding is used,
+#   but it is returned (and cached) under FALLBACK_MODEL, never under the
+#   API model, so callers can keep the two vector spaces apart. Fallback
+#   rows keep their text; they are retried on lookup after
+#   EMBED_FALLBACK_RETRY and can be upgraded in bulk with
+#   `recompute_fallbacks()`.
+
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from city_guides.providers.utils import get_session
+from city_guides.src.metrics import increment, observe_latency
+
+logger = logging.getLogger(__name__)
+
+EMBED_ENDPOINT = os.getenv("EMBED_ENDPOINT", "https://api.groq.ai/v1/embeddings")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "embed-english-v1")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "20"))
+EMBED_TIMEOUT = float(os.getenv("EMBED_TIMEOUT", "20"))
+EMBED_MEMORY_SIZE = int(os.getenv("EMBED_MEMORY_SIZE", "5000"))  # vectors kept in process
+EMBED_FALLBACK_RETRY = int(os.getenv("EMBED_FALLBACK_RETRY", "3600"))  # seconds before a fallback vector is retried
+FALLBACK_MODEL = "fallback-hash-128"
+
+CACHE_FILE = Path(__file__).resolve().parents[2] / "data" / "embeddings.sqlite3"
+
+
+class Embedding(NamedTuple):
+    vector: List[float]
+    model: str  # EMBED_MODEL, or FALLBACK_MODEL when the API could not be used
+
+    @property
+    def fallback(self) -> bool:
+        return self.model == FALLBACK_MODEL
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
+def fallback_embedding(text: str, dim: int = 128) -> List[float]:
+    """Deterministic bag-of-words hash embedding, used when the API is unavailable"""
+    vec = [0.0] * dim
+    for w in (text or "").split():
+        h = 0
+        for c in w:
+            h = (h * 131 + ord(c)) & 0xFFFFFFFF
+        vec[h % dim] += 1.0
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+class VectorStore:
+    """Embeddings by (model, content hash) in SQLite, vectors packed as float32"""
+
+    def __init__(self, path: Path = CACHE_FILE):
+        self.path = Path(path)
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, hash TEXT NOT NULL, source TEXT NOT NULL, vector BLOB NOT NULL,"
+                " text TEXT, created REAL NOT NULL, PRIMARY KEY (model, hash))"
+            )
+            self._db = db
+        return self._db
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, Tuple[Embedding, float]]:
+        """hash -> (embedding, created) for the hashes stored under `model`"""
+        if not hashes:
+            return {}
+        out = {}
+        with self._lock:
+            db = self._conn()
+            for i in range(0, len(hashes), 500):
+                part = hashes[i:i + 500]
+                rows = db.execute(
+                    f"SELECT hash, source, vector, created FROM embeddings WHERE model = ? AND hash IN "
+                    f"({','.join('?' * len(part))})", [model, *part])
+                for h, source, blob, created in rows:
+                    out[h] = (Embedding(array('f', blob).tolist(), source), created)
+        return out
+
+    def put_many(self, model: str, rows: List[Tuple[str, Embedding, str]]) -> None:
+        """Store (hash, embedding, text) rows; the text is kept only for fallback vectors"""
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, source, vector, text, created) VALUES (?, ?, ?, ?, ?, ?)",
+                [(model, h, emb.model, array('f', emb.vector).tobytes(), text if emb.fallback else None, now)
+                 for h, emb, text in rows])
+            db.commit()
+
+    def fallback_rows(self, model: str, limit: int) -> List[Tuple[str, str]]:
+        """(hash, text) of vectors under `model` that came from the fallback"""
+        with self._lock:
+            return self._conn().execute(
+                "SELECT hash, text FROM embeddings WHERE model = ? AND source = ? AND text IS NOT NULL LIMIT ?",
+                (model, FALLBACK_MODEL, limit)).fetchall()
+
+
+class EmbeddingService:
+    """Cached, batched embeddings for one model"""
+
+    def __init__(self, store: Optional[VectorStore] = None, model: str = EMBED_MODEL,
+                 batch_size: int = EMBED_BATCH_SIZE, window_ms: float = EMBED_BATCH_WINDOW_MS,
+                 memory_size: int = EMBED_MEMORY_SIZE):
+        self.store = store or VectorStore()
+        self.model = model
+        self.batch_size = batch_size
+        self.window = window_ms / 1000.0
+        self.memory_size = memory_size
+        self._memory: 'OrderedDict[str, Tuple[Embedding, float]]' = OrderedDict()
+        self._pending: 'OrderedDict[str, Tuple[str, asyncio.Future]]' = OrderedDict()
+        self._flush_task: Optional[asyncio.Task] = None  # pending window timer
+        self._flushing = False
+        self.stats = {'requests': 0, 'memory_hits': 0, 'disk_hits': 0, 'embedded': 0, 'fallback': 0,
+                      'batches': 0, 'api_errors': 0, 'recomputed': 0}
+
+    # -- cache ------------------------------------------------------------------------
+
+    def _remember(self, h: str, emb: Embedding, created: float) -> None:
+        self._memory[h] = (emb, created)
+        self._memory.move_to_end(h)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _usable(emb: Embedding, created: float) -> bool:
+        # fallback vectors are served for a while, then the API gets another chance
+        return not emb.fallback or time.time() - created < EMBED_FALLBACK_RETRY
+
+    async def _cached(self, hashes: List[str]) -> Dict[str, Embedding]:
+        found: Dict[str, Embedding] = {}
+        missing = []
+        for h in hashes:
+            hit = self._memory.get(h)
+            if hit and self._usable(*hit):
+                self._memory.move_to_end(h)
+                found[h] = hit[0]
+            else:
+                missing.append(h)
+        self.stats['memory_hits'] += len(found)
+        if missing:
+            try:
+                rows = await asyncio.to_thread(self.store.get_many, self.model, missing)
+            except Exception:
+                logger.warning('embedding cache read failed', exc_info=True)
+                rows = {}
+            for h, (emb, created) in rows.items():
+                if self._usable(emb, created):
+                    self._remember(h, emb, created)
+                    found[h] = emb
+                    self.stats['disk_hits'] += 1
+        return found
+
+    # -- API --------------------------------------------------------------------------
+
+    async def _call_api(self, texts: List[str], session) -> Optional[List[List[float]]]:
+        key = os.getenv("GROQ_API_KEY")
+        if not key:
+            return None
+        headers = {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+        payload = {"model": self.model, "input": texts}
+        start = time.monotonic()
+        try:
+            async with get_session(session) as client:
+                async with client.post(EMBED_ENDPOINT, json=payload, headers=headers, timeout=EMBED_TIMEOUT) as r:
+                    if r.status != 200:
+                        raise RuntimeError(f"HTTP {r.status}")
+                    data = (await r.json()).get("data") or []
+        except Exception as exc:
+            self.stats['api_errors'] += 1
+            await increment('embed.api_errors')
+            logger.info('embedding batch of %d failed: %s', len(texts), exc)
+            return None
+        await observe_latency('embed.batch_ms', (time.monotonic() - start) * 1000.0)
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        for pos, item in enumerate(data):
+            idx = item.get("index", pos)
+            if isinstance(item.get("embedding"), list) and 0 <= idx < len(texts):
+                vectors[idx] = item["embedding"]
+        if any(v is None for v in vectors):
+            return None
+        return vectors
+
+    async def _embed_batch(self, texts: List[str], session) -> List[Embedding]:
+        """Embed texts with one API call (local fallback on failure) and persist the result"""
+        self.stats['batches'] += 1
+        vectors = await self._call_api(texts, session)
+        if vectors is None:
+            results = [Embedding(fallback_embedding(t), FALLBACK_MODEL) for t in texts]
+            self.stats['fallback'] += len(texts)
+            await increment('embed.fallback', len(texts))
+        else:
+            results = [Embedding(v, self.model) for v in vectors]
+            self.stats['embedded'] += len(texts)
+        rows = [(content_hash(t), emb, t) for t, emb in zip(texts, results)]
+        now = time.time()
+        for h, emb, _ in rows:
+            self._remember(h, emb, now)
+        try:
+            await asyncio.to_thread(self.store.put_many, self.model, rows)
+        except Exception:
+            logger.warning('embedding cache write failed', exc_info=True)
+        return results
+
+    # -- batching ---------------------------------------------------------------------
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        if not self._flushing:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        # drains the queue; texts arriving while a batch is in flight form the next batch
+        self._flushing = True
+        try:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popitem(last=False))
+                try:
+                    # batches mix callers, so they go out on the shared pool rather than anyone's session
+                    results = await self._embed_batch([text for _, (text, _) in batch], None)
+                except Exception as exc:
+                    for _, (_, fut) in batch:
+                        if not fut.done():
+                            fut.set_exception(exc)
+                    continue
+                for (_, (_, fut)), emb in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(emb)
+        finally:
+            self._flushing = False
+
+    def _enqueue(self, h: str, text: str) -> 'asyncio.Future':
+        pending = self._pending.get(h)
+        if pending:
+            return pending[1]  # the same text is already waiting for this batch
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[h] = (text, fut)
+        if self._flushing:
+            return fut
+        if len(self._pending) >= self.batch_size:
+            if self._flush_task:
+                self._flush_task.cancel()
+                self._flush_task = None
+            self._flushing = True
+            asyncio.ensure_future(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later())
+        return fut
+
+    # -- public -----------------------------------------------------------------------
+
+    async def embed_many(self, texts: List[str], session=None) -> List[Embedding]:
+        """Embeddings for `texts`, in order: cache first, the rest through the batch queue.
+
+        `session` is accepted for compatibility; queued batches use the shared pool.
+        """
+        self.stats['requests'] += len(texts)
+        hashes = [content_hash(t) for t in texts]
+        found = await self._cached(list(dict.fromkeys(hashes)))
+        waiting = {h: self._enqueue(h, t) for h, t in zip(hashes, texts) if h not in found}
+        if waiting:
+            done = await asyncio.gather(*waiting.values())
+            found.update(zip(waiting, done))
+        return [found[h] for h in hashes]
+
+    async def embed(self, text: str, session=None) -> Embedding:
+        return (await self.embed_many([text], session=session))[0]
+
+    async def recompute_fallbacks(self, session=None, limit: int = 1000) -> Dict[str, Embedding]:
+        """Re-embed cached fallback vectors through the API; hash -> new embedding for the ones upgraded"""
+        rows = await asyncio.to_thread(self.store.fallback_rows, self.model, limit)
+        upgraded: Dict[str, Embedding] = {}
+        for i in range(0, len(rows), self.batch_size):
+            part = rows[i:i + self.batch_size]
+            vectors = await self._call_api([text for _, text in part], session)
+            if vectors is None:
+                break
+            embs = [Embedding(v, self.model) for v in vectors]
+            await asyncio.to_thread(self.store.put_many, self.model,
+                                    [(h, emb, text) for (h, text), emb in zip(part, embs)])
+            for (h, _), emb in zip(part, embs):
+                self._remember(h, emb, time.time())
+                upgraded[h] = emb
+        self.stats['recomputed'] += len(upgraded)
+        return upgraded
+
+    def snapshot(self) -> Dict[str, Any]:
+        served = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['embedded'] + self.stats['fallback']
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        return {
+            **self.stats,
+            'model': self.model,
+            'hit_rate': round(hits / served, 4) if served else 0.0,
+            'avg_batch': round((self.stats['embedded'] + self.stats['fallback']) / self.stats['batches'], 2)
+            if self.stats['batches'] else 0.0,
+            'pending': len(self._pending),
+            'memory': len(self._memory),
+        }
+
+
+service = EmbeddingService()
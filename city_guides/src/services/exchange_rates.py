@@ -0,0 +1,246 @@
+# Exchange rates - local rate table behind currency conversion
+#
+# Rates are kept as one table against a single base currency
+# (EXCHANGE_RATE_BASE, USD by default); any pair is answered as a cross rate,
+# rate(A -> B) = rates[B] / rates[A], so a conversion is a dict lookup instead
+# of an upstream round trip. The table is refreshed in the background every
+# EXCHANGE_RATE_REFRESH seconds and persisted to city_guides/data/exchange_rates.json,
+# so a cold start answers from the last good table. Every answer carries the
+# table's as-of time and is flagged stale once the table is older than
+# EXCHANGE_RATE_MAX_AGE (e.g. while the rate API is down).
+#
+# The same file holds currency metadata (country -> ISO 4217 code and
+# code -> name) pulled from restcountries once every CURRENCY_META_MAX_AGE, which
+# persistence.get_currency_for_country / get_currency_name consult before
+# making a per-lookup request.
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from city_guides.providers import http_clients
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_RATE_BASE = os.getenv("EXCHANGE_RATE_BASE", "USD").upper()
+EXCHANGE_RATE_URL = os.getenv("EXCHANGE_RATE_URL", "https://api.exchangerate-api.com/v4/latest/{base}")
+EXCHANGE_RATE_REFRESH = int(os.getenv("EXCHANGE_RATE_REFRESH", str(6 * 3600)))  # seconds between refreshes
+EXCHANGE_RATE_MAX_AGE = int(os.getenv("EXCHANGE_RATE_MAX_AGE", str(48 * 3600)))  # older answers are flagged stale
+CURRENCY_META_URL = "https://restcountries.com/v3.1/all"
+CURRENCY_META_MAX_AGE = int(os.getenv("CURRENCY_META_MAX_AGE", str(30 * 86400)))
+
+RATES_FILE = Path(__file__).resolve().parents[2] / "data" / "exchange_rates.json"
+
+
+class ExchangeRateTable:
+    """Base-currency rate table with cross rates, scheduled refresh and on-disk persistence"""
+
+    def __init__(self, path: Path = RATES_FILE, base: str = EXCHANGE_RATE_BASE,
+                 refresh_interval: int = EXCHANGE_RATE_REFRESH, max_age: int = EXCHANGE_RATE_MAX_AGE):
+        self.path = Path(path)
+        self.base = base
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._data: Optional[Dict[str, Any]] = None
+        # remember_country runs in search worker threads while _save dumps in another
+        self._lock = threading.Lock()
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'refreshed': 0, 'failed': 0, 'conversions': 0}
+
+    # -- table -----------------------------------------------------------------------
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = self._load()
+        return self._data
+
+    def _load(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {}
+        try:
+            if self.path.exists():
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            logger.warning("unreadable exchange-rate file %s; starting empty", self.path, exc_info=True)
+        data.setdefault("rates", {})
+        data.setdefault("countries", {})
+        data.setdefault("names", {})
+        return data
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        data = self.data
+        with self._lock:
+            payload = json.dumps(data, ensure_ascii=False, sort_keys=True)
+        tmp.write_text(payload, encoding="utf-8")
+        tmp.replace(self.path)
+
+    def has_rates(self) -> bool:
+        return bool(self.data["rates"])
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        fetched = self.data.get("fetched_at")
+        return None if fetched is None else (now or time.time()) - fetched
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        age = self.age(now)
+        return age is None or age > self.max_age
+
+    def rate(self, from_curr: str, to_curr: str) -> Optional[float]:
+        """Units of `to_curr` per one `from_curr`, derived through the base currency"""
+        rates = self.data["rates"]
+        src, dst = (from_curr or "").upper(), (to_curr or "").upper()
+        if src == dst and src in rates:
+            return 1.0
+        if not rates.get(src) or dst not in rates:
+            return None
+        return rates[dst] / rates[src]
+
+    def convert(self, amount: float, from_curr: str, to_curr: str) -> Optional[Dict[str, Any]]:
+        """Converted amount with the rate used and how current it is; None for unknown currencies"""
+        rate = self.rate(from_curr, to_curr)
+        if rate is None:
+            return None
+        self.stats['conversions'] += 1
+        return {
+            "amount": amount,
+            "from": from_curr.upper(),
+            "to": to_curr.upper(),
+            "rate": rate,
+            "converted": amount * rate,
+            "as_of": self.data.get("as_of") or self.data.get("fetched_at"),
+            "stale": self.is_stale(),
+        }
+
+    # -- currency metadata -------------------------------------------------------------
+
+    def currency_for_country(self, country: str) -> Optional[str]:
+        return self.data["countries"].get((country or "").strip().lower())
+
+    def currency_name(self, code: str) -> Optional[str]:
+        return self.data["names"].get((code or "").strip().upper())
+
+    def remember_country(self, country: str, code: str) -> None:
+        """Record a lookup answered elsewhere; written out with the next refresh"""
+        if country and code:
+            countries = self.data["countries"]
+            with self._lock:
+                countries[country.strip().lower()] = code.upper()
+
+    # -- refresh -----------------------------------------------------------------------
+
+    async def _fetch_json(self, url: str, session=None, params=None) -> Any:
+        if session is None:
+            async with http_clients.get_session() as pooled:
+                return await self._fetch_json(url, pooled, params)
+        async with session.get(url, params=params) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"{url} returned HTTP {resp.status}")
+            return await resp.json(content_type=None)
+
+    async def _refresh(self, session=None) -> bool:
+        try:
+            payload = await self._fetch_json(EXCHANGE_RATE_URL.format(base=self.base), session)
+            rates = {k.upper(): float(v) for k, v in (payload.get("rates") or {}).items() if v}
+            if not rates:
+                raise ValueError("empty rate table")
+            rates[self.base] = 1.0
+            now = time.time()
+            data = self.data
+            with self._lock:
+                data.update(base=self.base, rates=rates, fetched_at=now,
+                            as_of=payload.get("time_last_updated") or now)
+            self.stats['refreshed'] += 1
+        except Exception:
+            self.stats['failed'] += 1
+            logger.warning("exchange-rate refresh failed; serving the %s table",
+                           "stale" if self.has_rates() else "empty", exc_info=True)
+            return False
+        meta_age = time.time() - self.data.get("meta_fetched_at", 0)
+        if meta_age > CURRENCY_META_MAX_AGE or not self.data["names"]:
+            await self._refresh_metadata(session)
+        try:
+            await asyncio.to_thread(self._save)
+        except Exception:
+            logger.warning("could not persist exchange rates to %s", self.path, exc_info=True)
+        return True
+
+    async def _refresh_metadata(self, session=None) -> None:
+        try:
+            countries = await self._fetch_json(CURRENCY_META_URL, session, params={"fields": "name,currencies"})
+        except Exception:
+            logger.info("currency metadata refresh failed", exc_info=True)
+            return
+        by_country: Dict[str, str] = {}
+        names: Dict[str, str] = {}
+        for entry in countries if isinstance(countries, list) else []:
+            currencies = entry.get("currencies") or {}
+            if not isinstance(currencies, dict) or not currencies:
+                continue
+            for code, info in currencies.items():
+                if isinstance(info, dict) and info.get("name"):
+                    names.setdefault(code.upper(), info["name"])
+            first = next(iter(currencies)).upper()
+            for key in ("common", "official"):
+                name = (entry.get("name") or {}).get(key)
+                if name:
+                    by_country[name.strip().lower()] = first
+        data = self.data
+        with self._lock:
+            # Merge under the lock so lookups remembered during the fetch are kept; fetched countries win
+            data.update(countries={**data["countries"], **by_country}, names={**names, **data["names"]},
+                        meta_fetched_at=time.time())
+
+    async def refresh(self, session=None) -> bool:
+        """Fetch a new table (single-flight: concurrent callers share one request)"""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._refresh(session))
+        return await asyncio.shield(self._refreshing)
+
+    async def ensure_rates(self, session=None) -> bool:
+        """Make sure there is a table to answer from (fetches only on a cold, empty start)"""
+        if not self.has_rates():
+            await self.refresh(session)
+        return self.has_rates()
+
+    async def _run(self) -> None:
+        while True:
+            age = self.age()
+            if age is None or age >= self.refresh_interval:
+                # a failed refresh is retried after a tenth of the interval
+                wait = self.refresh_interval if await self.refresh() else self.refresh_interval / 10
+            else:
+                wait = self.refresh_interval - age
+            await asyncio.sleep(max(60.0, wait))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait([self._task], timeout=2.0)
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            'base': self.base,
+            'currencies': len(self.data["rates"]),
+            'countries': len(self.data["countries"]),
+            'as_of': self.data.get("as_of"),
+            'age_seconds': None if age is None else round(age),
+            'stale': self.is_stale(),
+            **self.stats,
+        }
+
+
+table = ExchangeRateTable()
@@ -0,0 +1,292 @@
+# Gazetteer - finds place names inside free text for /api/parse-dream
+#
+# Every place name we know is normalized once (lowercased, accents folded,
+# punctuation dropped) into a phrase index: `services/location.py`
+# (city_mappings, region_mappings, neighborhood_mappings), the seeded city file
+# (`data/seeded_cities.json`, either the fun-fact map or the canonical
+# list-of-cities schema) and the per-country neighborhood files
+# (`data/<continent>/<country>.json`).
+#
+# `extract(text)` tokenizes the query once and looks up its n-grams, longest
+# first, so "tacos in rio de janeiro" finds the city span instead of needing
+# the whole query to resemble one key. Tokens that do not match exactly get a
+# bounded fuzzy pass: a symmetric-delete index (each name and its
+# one-character deletions) proposes candidates, which are verified with
+# Levenshtein distance (1 for short names, 2 for long ones). Lookups are dict
+# hits, so the cost depends on the query length, not on how many names are
+# loaded.
+#
+# Neighborhood names that exist in several cities are resolved against the city
+# found in the same query, and skipped when that leaves them ambiguous.
+
+import json
+import logging
+import re
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from city_guides.src.intents import TABLES, keyword_spans
+from city_guides.src.services.location import (
+    city_mappings,
+    levenshtein_distance,
+    neighborhood_mappings,
+    region_mappings,
+)
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data"
+SEEDED_CITIES_FILE = DATA_DIR / "seeded_cities.json"
+
+MAX_NGRAM = 5  # longest place name, in words, that is indexed
+FUZZY_MIN_CHARS = 5  # shorter tokens are only matched exactly
+FUZZY_MAX_CANDIDATES = 32  # candidates verified per fuzzy lookup
+KIND_ORDER = ('neighborhood', 'city', 'region')
+_TOKEN_RE = re.compile(r"[^\W_]+(?:['’][^\W_]+)*")
+_PAREN_RE = re.compile(r"\(([^)]*)\)")
+
+# words that are never a place on their own (also keeps the fuzzy pass off intent words)
+_COMMON_WORDS = frozenset({
+    'the', 'and', 'for', 'with', 'near', 'best', 'good', 'great', 'trip', 'travel', 'visit', 'things', 'city',
+    'town', 'old', 'new', 'north', 'south', 'east', 'west', 'central', 'center', 'centre', 'downtown', 'area',
+    'quarter', 'district', 'village', 'beach', 'park', 'port', 'place', 'cheap', 'night', 'dream', 'week',
+}) | frozenset(kw for labels in TABLES.values() for kws in labels.values() for kw in kws)
+
+
+def fold(text: str) -> str:
+    """Lowercase with accents stripped ('Belém' -> 'belem')"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize(name: str) -> str:
+    return ' '.join(fold(tok) for tok in _TOKEN_RE.findall(name.lower().replace("'", '').replace('’', '')))
+
+
+def _deletes(key: str) -> Set[str]:
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+class Gazetteer:
+    """Phrase index of place names with exact n-gram lookup and a bounded fuzzy fallback"""
+
+    def __init__(self):
+        self._names: Dict[str, List[Dict[str, Any]]] = {}  # normalized name -> entries
+        self._fuzzy: Dict[str, Set[str]] = {}  # name or one-deletion variant -> names
+        self.max_ngram = 1
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, name: str, kind: str, data: Dict[str, Any], curated: bool = False) -> None:
+        """Index one name; names from data files that are common words are skipped"""
+        key = normalize(name)
+        words = key.split()
+        if not words or len(words) > MAX_NGRAM:
+            return
+        if not curated and len(words) == 1 and (len(key) < 3 or key in _COMMON_WORDS):
+            return
+        entries = self._names.setdefault(key, [])
+        city = (data.get('city') or '').lower()
+        for e in entries:
+            # curated mappings are added first and win over data files for their name
+            if e['kind'] == kind and (e['curated'] or (e['data'].get('city') or '').lower() == city):
+                return
+        entries.append({'kind': kind, 'name': data.get(kind) or name.strip(), 'data': data, 'curated': curated})
+        self.max_ngram = max(self.max_ngram, len(words))
+        if len(key) >= FUZZY_MIN_CHARS:
+            for variant in _deletes(key) | {key}:
+                self._fuzzy.setdefault(variant, set()).add(key)
+
+    # -- lookup ------------------------------------------------------------------------
+
+    def _fuzzy_lookup(self, key: str) -> Tuple[Optional[str], int]:
+        candidates: Set[str] = set()
+        for variant in _deletes(key) | {key}:
+            candidates.update(self._fuzzy.get(variant, ()))
+            if len(candidates) >= FUZZY_MAX_CANDIDATES:
+                break
+        limit = 1 if len(key) < 8 else 2
+        best, best_distance = None, limit + 1
+        for name in sorted(candidates)[:FUZZY_MAX_CANDIDATES]:
+            distance = levenshtein_distance(key, name)
+            if distance < best_distance:
+                best, best_distance = name, distance
+        return best, best_distance
+
+    def _spans(self, text: str) -> List[Dict[str, Any]]:
+        tokens = [(m.start(), m.end(), fold(m.group().replace("'", '').replace('’', '')))
+                  for m in _TOKEN_RE.finditer(text)]
+        covered = [False] * len(tokens)
+        spans = []
+
+        def add(i: int, n: int, key: str, distance: int) -> None:
+            start, end = tokens[i][0], tokens[i + n - 1][1]
+            spans.append({'start': start, 'end': end, 'text': text[start:end], 'key': key, 'distance': distance})
+            covered[i:i + n] = [True] * n
+
+        # exact: leftmost-longest n-gram matches
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self.max_ngram, len(tokens) - i), 0, -1):
+                key = ' '.join(tok for _, _, tok in tokens[i:i + n])
+                if key in self._names:
+                    add(i, n, key, 0)
+                    i += n
+                    break
+            else:
+                i += 1
+        # fuzzy: only words (and word pairs) nothing matched exactly
+        i = 0
+        while i < len(tokens):
+            for n in (2, 1):
+                if i + n > len(tokens) or any(covered[i:i + n]):
+                    continue
+                key = ' '.join(tok for _, _, tok in tokens[i:i + n])
+                if len(key) < FUZZY_MIN_CHARS or (n == 1 and key in _COMMON_WORDS):
+                    continue
+                match, distance = self._fuzzy_lookup(key)
+                if match is not None:
+                    add(i, n, match, distance)
+                    i += n - 1
+                    break
+            i += 1
+        return spans
+
+    def extract(self, text: str) -> Dict[str, Any]:
+        """Place and intent spans in `text`, plus the best city / neighborhood / region"""
+        result: Dict[str, Any] = {'city': None, 'neighborhood': None, 'region': None, 'intents': [], 'spans': []}
+        found = self._spans(text or '')
+        by_kind: Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]] = {k: [] for k in KIND_ORDER}
+        for span in found:
+            for entry in self._names[span['key']]:
+                by_kind[entry['kind']].append((span, entry))
+
+        def pick(kind: str, city: Optional[str] = None):
+            # exact spans before fuzzy ones, then earlier in the query
+            options = sorted(by_kind[kind], key=lambda se: (se[0]['distance'], se[0]['start']))
+            if city is not None and options:
+                # a neighborhood of some other city is not what this query means
+                in_city = [se for se in options if (se[1]['data'].get('city') or '').lower() == city.lower()]
+                return in_city[0] if in_city else None
+            for span, entry in options:
+                same_name = {(e['data'].get('city') or '').lower() for s, e in options if s is span}
+                if len(same_name) == 1:
+                    return span, entry
+            return None
+
+        city = pick('city')
+        hood = pick('neighborhood', city[1]['data'].get('city') if city else None)
+        region = pick('region')
+        for kind, chosen in (('city', city), ('neighborhood', hood), ('region', region)):
+            if chosen is None:
+                continue
+            span, entry = chosen
+            confidence = 'high' if span['distance'] == 0 else 'medium'
+            if kind == 'region':
+                confidence = 'medium'
+            result[kind] = {'name': entry['name'], 'data': entry['data'], 'confidence': confidence}
+            result['spans'].append({'type': kind, 'text': span['text'], 'start': span['start'], 'end': span['end'],
+                                    'value': entry['name'], 'confidence': confidence})
+        # intent words inside a place name ('shore' in Shoreditch) don't count
+        places = [(sp['start'], sp['end']) for sp in found]
+        longest: Dict[Tuple[int, str], Tuple[int, int, str, str]] = {}
+        for start, end, label, kw in keyword_spans(text or '', 'dream'):
+            if any(start < p_end and end > p_start for p_start, p_end in places):
+                continue
+            if (start, label) not in longest or end > longest[start, label][1]:
+                longest[start, label] = (start, end, label, kw)
+        intents: List[str] = []
+        for start, end, label, _ in longest.values():
+            if label not in intents:
+                intents.append(label)
+            result['spans'].append({'type': 'intent', 'text': text[start:end], 'start': start, 'end': end,
+                                    'value': label, 'confidence': 'high'})
+        result['intents'] = [label for label in TABLES['dream'] if label in intents]
+        result['spans'].sort(key=lambda s: (s['start'], s['type']))
+        return result
+
+
+def _country_codes() -> Dict[str, str]:
+    codes = {m['countryName'].lower(): m['country'] for m in city_mappings.values() if m.get('countryName')}
+    codes.update({'usa': 'US', 'uk': 'GB'})
+    return codes
+
+
+def _load_json(path: Path) -> Any:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except Exception:
+        logger.warning('gazetteer: could not read %s', path, exc_info=True)
+        return None
+
+
+def _seeded_cities(path: Path) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    seed = _load_json(path) if path.exists() else None
+    cities = (seed or {}).get('cities') or []
+    if isinstance(cities, dict):
+        # fun-fact format: {"paris": [...facts]}
+        for name in cities:
+            yield name, {'city': name.title()}
+        return
+    for c in cities:
+        if isinstance(c, dict) and c.get('name'):
+            yield c['name'], {'city': c['name'], 'country': (c.get('countryCode') or '').upper(),
+                              'state': c.get('stateCode') or ''}
+
+
+def _neighborhood_files(data_dir: Path) -> Iterable[Tuple[str, str, Dict[str, Any]]]:
+    codes = _country_codes()
+    for path in sorted(data_dir.glob('*/*.json')):
+        doc = _load_json(path)
+        if not isinstance(doc, dict) or not isinstance(doc.get('cities'), dict):
+            continue
+        country = doc.get('country') or ''
+        base = {'country': codes.get(country.lower(), ''), 'countryName': country}
+        for city, hoods in doc['cities'].items():
+            known = city_mappings.get(city.lower()) or city_mappings.get(city.lower().removesuffix(' city'))
+            city_data = dict(known) if known else {**base, 'city': city}
+            yield city, 'city', city_data
+            for hood in hoods if isinstance(hoods, list) else []:
+                name = hood.get('name') if isinstance(hood, dict) else None
+                if not name:
+                    continue
+                data = {**base, 'city': city_data['city'], 'neighborhood': name}
+                if city_data.get('state'):
+                    data['state'] = city_data['state']
+                # "3e Arrondissement (Le Marais)" is found by either part
+                aliases = [name, _PAREN_RE.sub('', name).strip()] + _PAREN_RE.findall(name)
+                for alias in aliases:
+                    yield alias, 'neighborhood', data
+
+
+def build(data_dir: Path = DATA_DIR, seeded_cities: Path = SEEDED_CITIES_FILE) -> Gazetteer:
+    gaz = Gazetteer()
+    for name, data in neighborhood_mappings.items():
+        gaz.add(name, 'neighborhood', data, curated=True)
+    for name, data in city_mappings.items():
+        gaz.add(name, 'city', data, curated=True)
+    for name, data in region_mappings.items():
+        gaz.add(name, 'region', data, curated=True)
+    for name, kind, data in _neighborhood_files(data_dir):
+        gaz.add(name, kind, data)
+    for name, data in _seeded_cities(seeded_cities):
+        gaz.add(name, 'city', data)
+    logger.info('gazetteer: %d place names indexed', len(gaz))
+    return gaz
+
+
+_gazetteer: Optional[Gazetteer] = None
+
+
+def get_gazetteer() -> Gazetteer:
+    """The default gazetteer, built on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = build()
+    return _gazetteer
+
+
+def extract(text: str) -> Dict[str, Any]:
+    return get_gazetteer().extract(text)
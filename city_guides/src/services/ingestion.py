@@ -0,0 +1,316 @@
+# Ingestion - staged, concurrent page ingestion for the semantic index
+#
+# `semantic.ingest_urls` used to fetch one URL at a time, parse it with
+# BeautifulSoup on the event loop, cut the text every 1000 characters
+# mid-word and await one embedding call per chunk. Pages now go through
+# overlapping stages, each with its own bound:
+#
+#   fetch    INGEST_CONCURRENCY pages in flight, at most INGEST_PER_HOST per
+#            host; pages indexed before are revalidated with their ETag /
+#            Last-Modified and a 304 ends there
+#   extract  HTML -> text in a worker thread (lxml when installed)
+#   dedupe   pages and chunks whose content hash was already indexed are skipped
+#   chunk    sentence-aware chunks of up to INGEST_CHUNK_CHARS that repeat the
+#            last INGEST_CHUNK_OVERLAP characters' worth of sentences
+#   embed    each page's new chunks go to services/embeddings.py in one call,
+#            where they are batched with other pages and cached by content hash
+#   index    a page that changed replaces its earlier chunks; validators and
+#            content hashes are only remembered once the page is indexed, so a
+#            failure in any stage is retried on the next run
+#
+# Progress and throughput are counted in `snapshot()` (/healthz) and as
+# ingest.* metrics.
+
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from city_guides.providers.utils import get_session
+from city_guides.src.metrics import increment, observe_latency
+from city_guides.src.services import embeddings
+
+logger = logging.getLogger(__name__)
+
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "8"))
+INGEST_PER_HOST = int(os.getenv("INGEST_PER_HOST", "2"))
+INGEST_EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", "4"))
+INGEST_CHUNK_CHARS = int(os.getenv("INGEST_CHUNK_CHARS", "1000"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "150"))
+INGEST_FETCH_TIMEOUT = float(os.getenv("INGEST_FETCH_TIMEOUT", "8"))
+INGEST_MAX_BYTES = int(os.getenv("INGEST_MAX_BYTES", str(2 * 1024 * 1024)))  # larger pages are skipped
+INGEST_STATE_SIZE = int(os.getenv("INGEST_STATE_SIZE", "5000"))  # pages / chunk hashes remembered
+
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[A-Z0-9])")
+
+
+def extract_text(html: str) -> str:
+    """Readable text of an HTML page (paragraphs, headings, list items)"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, HTML_PARSER)
+    for s in soup(["script", "style", "noscript"]):
+        s.decompose()
+    return " ".join(
+        p.get_text(separator=" ", strip=True)
+        for p in soup.find_all(["p", "h1", "h2", "h3", "li"])
+    )
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    # a "sentence" longer than a chunk (tables, lists) is cut between words
+    parts, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            parts.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        parts.append(current)
+    return parts
+
+
+def chunk_sentences(text: str, max_chars: int = INGEST_CHUNK_CHARS, overlap: int = INGEST_CHUNK_OVERLAP) -> List[str]:
+    """Chunks that end on sentence boundaries; each starts with the tail of the previous one"""
+    text = " ".join((text or "").split())
+    if not text:
+        return []
+    sentences: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        sentences.extend(_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        if current and size + 1 + len(sentence) > max_chars:
+            chunks.append(" ".join(current))
+            # carry whole sentences from the end, up to `overlap` characters
+            tail: List[str] = []
+            tail_size = 0
+            for prev in reversed(current):
+                if tail_size + len(prev) > overlap or tail_size + len(prev) + len(sentence) >= max_chars:
+                    break
+                tail.insert(0, prev)
+                tail_size += len(prev) + 1
+            current, size = tail, tail_size
+        current.append(sentence)
+        size += len(sentence) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class _BoundedSet:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: 'OrderedDict[str, None]' = OrderedDict()
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._items
+
+    def add(self, item: str) -> None:
+        self._items[item] = None
+        self._items.move_to_end(item)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def discard(self, item: str) -> None:
+        self._items.pop(item, None)
+
+
+class IngestionPipeline:
+    """Fetch -> extract -> dedupe -> chunk -> embed -> index, with per-stage bounds"""
+
+    def __init__(self, index=None, embed_many: Optional[Callable[..., Awaitable[List[embeddings.Embedding]]]] = None,
+                 concurrency: int = INGEST_CONCURRENCY, per_host: int = INGEST_PER_HOST,
+                 extract_workers: int = INGEST_EXTRACT_WORKERS, chunk_chars: int = INGEST_CHUNK_CHARS, overlap: int = INGEST_CHUNK_OVERLAP):
+        self._index = index
+        self._embed_many = embed_many
+        self.per_host = per_host
+        self.chunk_chars = chunk_chars
+        self.overlap = overlap
+        self._pages = asyncio.Semaphore(concurrency)
+        self._extract = asyncio.Semaphore(extract_workers)
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        # url -> {'etag', 'last_modified', 'hash', 'chunks'} of the last page indexed from it
+        self._validators: 'OrderedDict[str, Dict[str, Optional[str]]]' = OrderedDict()
+        self._page_hashes = _BoundedSet(INGEST_STATE_SIZE)
+        self._chunk_hashes = _BoundedSet(INGEST_STATE_SIZE * 10)
+        self.stats = {'urls': 0, 'done': 0, 'in_progress': 0, 'indexed_pages': 0, 'not_modified': 0,
+                      'duplicate_pages': 0, 'duplicate_chunks': 0, 'chunks': 0, 'chars': 0, 'errors': 0}
+        self.last_run: Dict[str, Any] = {}
+
+    # -- wiring ------------------------------------------------------------------------
+
+    @property
+    def index(self):
+        if self._index is None:
+            from city_guides.src import semantic
+            self._index = semantic.INDEX
+        return self._index
+
+    @property
+    def embed_many(self) -> Callable[..., Awaitable[List[embeddings.Embedding]]]:
+        return self._embed_many or embeddings.service.embed_many
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or '').lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return self._hosts[host]
+
+    # -- stages --------------------------------------------------------------------------
+
+    async def _fetch(self, url: str, session) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+        """(page HTML, its validators), or None when the server says it is unchanged since it was indexed"""
+        headers = {}
+        known = self._validators.get(url)
+        if known:
+            if known.get('etag'):
+                headers['If-None-Match'] = known['etag']
+            if known.get('last_modified'):
+                headers['If-Modified-Since'] = known['last_modified']
+        start = time.monotonic()
+        async with self._host_slot(url):
+            async with session.get(url, headers=headers, timeout=INGEST_FETCH_TIMEOUT) as resp:
+                if resp.status == 304:
+                    self.stats['not_modified'] += 1
+                    await increment('ingest.not_modified')
+                    return None
+                if resp.status != 200:
+                    raise RuntimeError(f"HTTP {resp.status}")
+                if (resp.content_length or 0) > INGEST_MAX_BYTES:
+                    raise RuntimeError(f"{resp.content_length} bytes")
+                html = await resp.text(errors='replace')
+                validators = {'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified')}
+        await observe_latency('ingest.fetch_ms', (time.monotonic() - start) * 1000.0)
+        self.stats['chars'] += len(html)
+        return html[:INGEST_MAX_BYTES], validators
+
+    def _remember(self, url: str, validators: Dict[str, Optional[str]], digest: str, chunk_hashes: List[str]) -> None:
+        self._validators[url] = {**validators, 'hash': digest, 'chunks': chunk_hashes}
+        self._validators.move_to_end(url)
+        while len(self._validators) > INGEST_STATE_SIZE:
+            self._validators.popitem(last=False)
+
+    def _forget(self, url: str, keep: Iterable[str] = ()) -> None:
+        """Drop what the page indexed from `url` last time (except chunk hashes in `keep`)"""
+        known = self._validators.get(url)
+        if not known or not known.get('hash'):
+            return
+        self.index.remove_source(url)
+        self._page_hashes.discard(known['hash'])
+        keep = set(keep)
+        for digest in known.get('chunks') or ():
+            if digest not in keep:
+                self._chunk_hashes.discard(digest)
+
+    async def _index_chunks(self, url: str, chunks: List[str], session) -> List[str]:
+        """Embed and index the chunks not indexed before; returns the page's chunk hashes"""
+        known = self._validators.get(url) or {}
+        previous = set(known.get('chunks') or ())
+        digests = [_digest(chunk) for chunk in chunks]
+        fresh = []
+        for i, (chunk, digest) in enumerate(zip(chunks, digests)):
+            # chunks this page indexed last time are indexed again below, after its old ones go
+            if digest in self._chunk_hashes and digest not in previous:
+                self.stats['duplicate_chunks'] += 1
+                continue
+            fresh.append((i, chunk, digest))
+
+        embs = await self.embed_many([chunk for _, chunk, _ in fresh], session=session) if fresh else []
+        self._forget(url, keep=digests)
+        added = []
+        for (i, chunk, digest), emb in zip(fresh, embs):
+            if digest in self._chunk_hashes and digest not in previous:
+                # indexed by another page while this one was embedding
+                self.stats['duplicate_chunks'] += 1
+                continue
+            self.index.add(emb.vector, {"source": url, "snippet": chunk[:500], "chunk_index": i, "hash": digest,
+                                        "embedding_model": emb.model})
+            self._chunk_hashes.add(digest)
+            added.append(digest)
+        self.stats['chunks'] += len(added)
+        return added
+
+    async def _ingest_one(self, url: str, session) -> int:
+        async with self._pages:
+            self.stats['in_progress'] += 1
+            try:
+                fetched = await self._fetch(url, session)
+                if fetched is None:
+                    return 0
+                html, validators = fetched
+                async with self._extract:
+                    text = await asyncio.to_thread(extract_text, html)
+                if not text:
+                    return 0
+                digest = _digest(text)
+                if digest in self._page_hashes:
+                    # same content as a page already indexed (mirror, redirect, unchanged page)
+                    self.stats['duplicate_pages'] += 1
+                    await increment('ingest.duplicate_pages')
+                    known = self._validators.get(url)
+                    if known and known.get('hash') == digest:
+                        self._remember(url, validators, digest, known.get('chunks') or [])
+                    elif known:
+                        # changed into a copy of another page: its old chunks are stale
+                        self._forget(url)
+                        self._validators.pop(url, None)
+                    return 0
+                chunks = chunk_sentences(text, self.chunk_chars, self.overlap)
+                chunk_hashes = await self._index_chunks(url, chunks, session)
+                added = len(chunk_hashes)
+                self._page_hashes.add(digest)
+                self._remember(url, validators, digest, chunk_hashes)
+                self.stats['indexed_pages'] += 1
+                await increment('ingest.pages')
+                await increment('ingest.chunks', added)
+                return added
+            except Exception as exc:
+                self.stats['errors'] += 1
+                await increment('ingest.errors')
+                logger.info('ingest of %s failed: %s', url, exc)
+                return 0
+            finally:
+                self.stats['in_progress'] -= 1
+                self.stats['done'] += 1
+
+    # -- entry point ---------------------------------------------------------------------
+
+    async def ingest(self, urls: Iterable[str], session=None) -> Dict[str, Any]:
+        """Ingest `urls` concurrently; returns a summary with the number of chunks indexed"""
+        urls = list(dict.fromkeys(u for u in urls if u))
+        self.stats['urls'] += len(urls)
+        start = time.monotonic()
+        async with get_session(session) as client:
+            counts = await asyncio.gather(*(self._ingest_one(url, client) for url in urls))
+        elapsed = time.monotonic() - start
+        chunks = sum(counts)
+        self.last_run = {
+            'urls': len(urls),
+            'chunks': chunks,
+            'seconds': round(elapsed, 3),
+            'pages_per_s': round(len(urls) / elapsed, 2) if elapsed else None,
+            'chunks_per_s': round(chunks / elapsed, 2) if elapsed else None,
+        }
+        await observe_latency('ingest.run_ms', elapsed * 1000.0)
+        return self.last_run
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats, 'parser': HTML_PARSER, 'last_run': dict(self.last_run)}
+
+
+pipeline = IngestionPipeline()
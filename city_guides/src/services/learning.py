@@ -1,28 +1,52 @@
 # Learning service - handles suggestion weights and tracking
+#
+# Weights are shared by all workers through a near cache (services/near_cache.py):
+# each location stores its learned bonus over the base weight, increments are
+# atomic in Redis, and reads come from the in-process tier. Async callers load
+# the keys they are about to read with `load_location_weights` (one MGET when
+# cold); the sync getters then only look at memory.
+
+import os
+
+from city_guides.src.services.near_cache import NearCache
+
+BASE_WEIGHT = 1.0
+WEIGHT_STEP = 0.1
+RECENT_SEARCHES = 10
+_RECENT_KEY = '__recent__'
+
+_location_weights = NearCache('learning', maxsize=int(os.getenv("LEARNING_CACHE_SIZE", "4096")))
+
+
+async def load_location_weights(locations):
+    """Bring the weights (and recent searches) for these locations into the near tier"""
+    await _location_weights.get_many([loc.lower() for loc in locations] + [_RECENT_KEY])
 
-# Simple in-memory learning storage
-_location_weights = {}
 
 def get_location_weight(location):
     """Get learning weight for a location"""
-    return _location_weights.get(location.lower(), 1.0)
+    return BASE_WEIGHT + _location_weights.peek(location.lower(), 0.0)
 
-def increment_location_weight(location):
+
+async def increment_location_weight(location):
     """Increment weight for successful location"""
     key = location.lower()
-    _location_weights[key] = _location_weights.get(key, 1.0) + 0.1
+    await _location_weights.incr(key, WEIGHT_STEP)
+    recent = [k for k in (await _location_weights.get(_RECENT_KEY)) or [] if k != key]
+    await _location_weights.set(_RECENT_KEY, (recent + [key])[-RECENT_SEARCHES:])
+
 
 def detect_hemisphere_from_searches():
     """Detect user's hemisphere from search patterns"""
     try:
-        recent_searches = list(_location_weights.keys())[-10:]  # Last 10 searches
+        recent_searches = list(_location_weights.peek(_RECENT_KEY, []))  # Last 10 searches
     except:
         recent_searches = []
-    
+
     southern_cities = {'sydney', 'melbourne', 'rio de janeiro', 'cape town'}
     northern_cities = {'paris', 'london', 'new york', 'tokyo'}
-    
+
     southern_count = sum(1 for city in recent_searches if city in southern_cities)
     northern_count = sum(1 for city in recent_searches if city in northern_cities)
-    
+
     return 'southern' if southern_count > northern_count else 'northern'
@@ -105,6 +105,24 @@ region_mappings = {
     'virginia': {'city': 'Richmond', 'country': 'US', 'countryName': 'United States', 'region': 'Virginia'}
 }
 
+# Common neighborhood mappings
+neighborhood_mappings = {
+    'brooklyn': {'city': 'New York', 'neighborhood': 'Brooklyn', 'country': 'US', 'state': 'NY'},
+    'manhattan': {'city': 'New York', 'neighborhood': 'Manhattan', 'country': 'US', 'state': 'NY'},
+    'shoreditch': {'city': 'London', 'neighborhood': 'Shoreditch', 'country': 'GB'},
+    'camden': {'city': 'London', 'neighborhood': 'Camden', 'country': 'GB'},
+    'soho': {'city': 'London', 'neighborhood': 'Soho', 'country': 'GB'},
+    'copacabana': {'city': 'Rio de Janeiro', 'neighborhood': 'Copacabana', 'country': 'BR', 'state': 'RJ'},
+    'ipanema': {'city': 'Rio de Janeiro', 'neighborhood': 'Ipanema', 'country': 'BR', 'state': 'RJ'},
+    'santa teresa': {'city': 'Rio de Janeiro', 'neighborhood': 'Santa Teresa', 'country': 'BR', 'state': 'RJ'},
+    'leblon': {'city': 'Rio de Janeiro', 'neighborhood': 'Leblon', 'country': 'BR', 'state': 'RJ'},
+    'alfama': {'city': 'Lisbon', 'neighborhood': 'Alfama', 'country': 'PT'},
+    'baixa': {'city': 'Lisbon', 'neighborhood': 'Baixa', 'country': 'PT'},
+    'chiado': {'city': 'Lisbon', 'neighborhood': 'Chiado', 'country': 'PT'},
+    'bairro alto': {'city': 'Lisbon', 'neighborhood': 'Bairro Alto', 'country': 'PT'},
+    'belém': {'city': 'Lisbon', 'neighborhood': 'Belém', 'country': 'PT'},
+}
+
 def levenshtein_distance(s1, s2):
     """Calculate Levenshtein distance between two strings"""
     if len(s1) < len(s2):
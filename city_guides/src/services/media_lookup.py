@@ -0,0 +1,410 @@
+# Media lookup - shared cache and quota manager for image-search providers
+#
+# Unsplash, Pixabay and Wikimedia lookups all go through `media_lookup.lookup()`.
+# Results are cached in two tiers keyed on provider, kind, page size and the
+# normalized query: a bounded in-process LRU and Redis (`media:<provider>:...`),
+# so repeated searches for the same destination never reach the upstream API.
+#
+# Every upstream call is charged against a sliding-window quota for that
+# provider key (Pixabay: 100/hour, Unsplash demo apps: 50/hour). When a provider
+# is out of quota the lookup is answered from another provider's cached result
+# for the same query instead of failing, and the caller is told which provider
+# served it. Hits, misses, quota rejections and fallbacks are counted as
+# `media.<provider>.*` metrics and summarized in `snapshot()` for /healthz.
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import aiohttp
+
+from city_guides.providers.utils import get_session
+from city_guides.src.metrics import increment
+from city_guides.src.responses import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MEDIA_CACHE_MEMORY_SIZE = int(os.getenv("MEDIA_CACHE_MEMORY_SIZE", "1000"))  # entries kept per process
+MEDIA_CACHE_MEMORY_TTL = int(os.getenv("MEDIA_CACHE_MEMORY_TTL", "3600"))  # memory tier never outlives this
+MEDIA_HTTP_TIMEOUT = float(os.getenv("MEDIA_HTTP_TIMEOUT", "10"))
+
+# provider -> (requests allowed, window seconds, cache TTL seconds)
+MEDIA_PROVIDERS = {
+    'pixabay': (
+        int(os.getenv("PIXABAY_QUOTA", "100")),
+        int(os.getenv("PIXABAY_QUOTA_WINDOW", "3600")),
+        int(os.getenv("PIXABAY_CACHE_TTL", "86400")),  # Pixabay terms require 24h caching
+    ),
+    'unsplash': (
+        int(os.getenv("UNSPLASH_QUOTA", "50")),
+        int(os.getenv("UNSPLASH_QUOTA_WINDOW", "3600")),
+        int(os.getenv("UNSPLASH_CACHE_TTL", "21600")),
+    ),
+    'wikimedia': (
+        int(os.getenv("WIKIMEDIA_QUOTA", "500")),
+        int(os.getenv("WIKIMEDIA_QUOTA_WINDOW", "3600")),
+        int(os.getenv("WIKIMEDIA_CACHE_TTL", str(7 * 86400))),
+    ),
+}
+
+# Providers whose cached photos may stand in when the requested one is out of quota
+PHOTO_FALLBACKS = {
+    'unsplash': ('pixabay',),
+    'pixabay': ('unsplash',),
+}
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a search query"""
+    return _WS_RE.sub(' ', (query or '').strip().casefold())
+
+
+class SlidingWindowQuota:
+    """At most `limit` calls in any `window` seconds"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._calls: Deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._calls and self._calls[0] <= cutoff:
+            self._calls.popleft()
+
+    def used(self, now: Optional[float] = None) -> int:
+        self._trim(now or time.time())
+        return len(self._calls)
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """Charge one call if the window has room"""
+        now = now or time.time()
+        self._trim(now)
+        if self.limit > 0 and len(self._calls) >= self.limit:
+            return False
+        self._calls.append(now)
+        return True
+
+    def retry_after(self, now: Optional[float] = None) -> float:
+        """Seconds until the next call would be allowed"""
+        now = now or time.time()
+        self._trim(now)
+        if self.limit <= 0 or len(self._calls) < self.limit:
+            return 0.0
+        return max(0.0, self._calls[0] + self.window - now)
+
+
+class MediaLookup:
+    """Two-tier (memory + Redis) cache with per-provider-key quotas for image searches"""
+
+    def __init__(self, providers: Dict[str, Tuple[int, int, int]] = MEDIA_PROVIDERS,
+                 memory_size: int = MEDIA_CACHE_MEMORY_SIZE, memory_ttl: int = MEDIA_CACHE_MEMORY_TTL):
+        self.providers = dict(providers)
+        self.memory_size = memory_size
+        self.memory_ttl = memory_ttl
+        self.redis = None  # falls back to the app's client when unset
+        self._memory: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._quotas: Dict[Tuple[str, str], SlidingWindowQuota] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    # -- keys, quotas and counters -------------------------------------------------
+
+    def cache_key(self, provider: str, query: str, per_page: int, kind: str = 'photos') -> str:
+        norm = normalize_query(query)
+        if len(norm) > 120:
+            norm = hashlib.blake2b(norm.encode('utf-8'), digest_size=16).hexdigest()
+        return f"media:{provider}:{kind}:{per_page}:{norm}"
+
+    def quota(self, provider: str, api_key: str = '') -> SlidingWindowQuota:
+        """Quota window for a provider key (separate keys get separate windows)"""
+        fingerprint = hashlib.blake2b(api_key.encode('utf-8'), digest_size=6).hexdigest() if api_key else ''
+        q = self._quotas.get((provider, fingerprint))
+        if q is None:
+            limit, window, _ = self.providers.get(provider, (0, 3600, 3600))
+            q = self._quotas[(provider, fingerprint)] = SlidingWindowQuota(limit, window)
+        return q
+
+    async def _count(self, provider: str, event: str) -> None:
+        bucket = self.stats.setdefault(provider, {})
+        bucket[event] = bucket.get(event, 0) + 1
+        try:
+            await increment(f'media.{provider}.{event}')
+        except Exception:
+            pass
+
+    async def _redis(self):
+        if self.redis is not None:
+            return self.redis
+        try:
+            from city_guides.src.app import redis_client
+            return redis_client
+        except Exception:
+            return None
+
+    # -- cache tiers ---------------------------------------------------------------
+
+    def _memory_get(self, key: str, now: float) -> Any:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= now:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Any, ttl: int, now: float) -> None:
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = (now + min(ttl, self.memory_ttl), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def cached(self, provider: str, query: str, per_page: int, kind: str = 'photos') -> Tuple[Any, Optional[str]]:
+        """Return (value, tier) from memory or Redis without touching the upstream"""
+        key = self.cache_key(provider, query, per_page, kind)
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None:
+            return value, 'memory'
+        rc = await self._redis()
+        if rc is None:
+            return None, None
+        try:
+            raw = await rc.get(key)
+        except Exception:
+            return None, None
+        if not raw:
+            return None, None
+        try:
+            value = loads(raw)
+        except Exception:
+            return None, None
+        ttl = self.providers.get(provider, (0, 0, 3600))[2]
+        self._memory_put(key, value, ttl, now)
+        return value, 'redis'
+
+    async def store(self, provider: str, query: str, per_page: int, value: Any, kind: str = 'photos') -> None:
+        key = self.cache_key(provider, query, per_page, kind)
+        ttl = self.providers.get(provider, (0, 0, 3600))[2]
+        self._memory_put(key, value, ttl, time.time())
+        rc = await self._redis()
+        if rc is None:
+            return
+        try:
+            await rc.set(key, dumps(value), ex=ttl)
+        except Exception:
+            logger.debug('media cache write failed for %s', key)
+
+    # -- lookup --------------------------------------------------------------------
+
+    async def lookup(self, provider: str, query: str, per_page: int,
+                     fetch: Callable[[], Awaitable[Any]], kind: str = 'photos', api_key: str = '',
+                     fallbacks: Iterable[str] = ()) -> Tuple[Any, Optional[str]]:
+        """Serve a search from cache, the upstream (if quota allows) or a fallback provider's cache.
+
+        `fetch` is only awaited on a miss and only if the provider key has quota
+        left; a None result is not cached. Returns (value, provider that served
+        it), or (None, None) when nothing is available.
+        """
+        value, tier = await self.cached(provider, query, per_page, kind)
+        if value is not None:
+            await self._count(provider, f'cache_hit.{tier}')
+            return value, provider
+
+        key = self.cache_key(provider, query, per_page, kind)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            # Identical lookup already on its way upstream; share its result
+            await self._count(provider, 'cache_hit.inflight')
+            return await asyncio.shield(pending), provider
+
+        if self.quota(provider, api_key).try_acquire():
+            await self._count(provider, 'cache_miss')
+            fut = asyncio.get_running_loop().create_future()
+            self._inflight[key] = fut
+            value = None
+            try:
+                value = await fetch()
+                if value is not None:
+                    await self.store(provider, query, per_page, value, kind)
+            except Exception:
+                await self._count(provider, 'upstream_error')
+                logger.exception('%s %s lookup failed for %r', provider, kind, query)
+            finally:
+                self._inflight.pop(key, None)
+                fut.set_result(value)
+            if value is not None:
+                return value, provider
+        else:
+            await self._count(provider, 'quota_exhausted')
+
+        for alt in fallbacks:
+            value, _ = await self.cached(alt, query, per_page, kind)
+            if value is not None:
+                await self._count(provider, f'fallback.{alt}')
+                return value, alt
+        return None, None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-provider hit/quota summary for /healthz"""
+        now = time.time()
+        quotas: Dict[str, Dict[str, Any]] = {}
+        for (provider, _), q in self._quotas.items():
+            agg = quotas.setdefault(provider, {'used': 0, 'limit': q.limit, 'window': q.window, 'retry_after': 0.0})
+            agg['used'] += q.used(now)
+            agg['retry_after'] = max(agg['retry_after'], round(q.retry_after(now), 1))
+        return {
+            'memory_entries': len(self._memory),
+            'providers': {p: {**self.stats.get(p, {}), 'quota': quotas.get(p)}
+                          for p in sorted(set(self.providers) | set(self.stats))},
+        }
+
+
+media_lookup = MediaLookup()
+
+
+# -- provider fetchers (normalized `{'photos': [...]}` payloads) ------------------
+
+async def _fetch_json(session: aiohttp.ClientSession, url: str, params: Dict[str, Any],
+                      headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    async with session.get(url, params=params, headers=headers,
+                           timeout=aiohttp.ClientTimeout(total=MEDIA_HTTP_TIMEOUT)) as response:
+        if response.status != 200:
+            logger.error('%s returned %s', url, response.status)
+            return None
+        return await response.json()
+
+
+async def fetch_unsplash_photos(query: str, per_page: int, api_key: str,
+                                session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+    params = {
+        'query': query,
+        'per_page': per_page,
+        'orientation': 'landscape',
+        'content_filter': 'high',
+        'order_by': 'relevant'
+    }
+    headers = {
+        'Authorization': f'Client-ID {api_key}',
+        'Accept-Encoding': 'gzip, deflate',
+        'User-Agent': 'TravelLand/1.0'
+    }
+    data = await _fetch_json(session, "https://api.unsplash.com/search/photos", params, headers)
+    if data is None:
+        return None
+    photos = []
+    for photo in data.get('results', []):
+        photos.append({
+            'id': photo['id'],
+            'url': photo['urls']['regular'],
+            'thumb_url': photo['urls']['thumb'],
+            'description': photo.get('description', ''),
+            'alt_description': photo.get('alt_description', ''),
+            'user': {
+                'name': photo['user']['name'],
+                'username': photo['user']['username'],
+                'profile_url': photo['user']['links']['html']
+            },
+            'links': {
+                'unsplash': photo['links']['html']
+            }
+        })
+    return {'photos': photos}
+
+
+async def fetch_pixabay_photos(query: str, per_page: int, api_key: str,
+                               session: aiohttp.ClientSession) -> Optional[Dict[str, Any]]:
+    params = {
+        'key': api_key,
+        'q': query,
+        'per_page': max(3, per_page),  # Pixabay rejects per_page < 3
+        'safesearch': 'true',
+        'image_type': 'photo',
+        'orientation': 'horizontal'
+    }
+    headers = {'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'TravelLand/1.0'}
+    data = await _fetch_json(session, "https://pixabay.com/api/", params, headers)
+    if data is None:
+        return None
+    photos = []
+    for hit in data.get('hits', [])[:per_page]:
+        photos.append({
+            'id': hit['id'],
+            'url': hit['webformatURL'],
+            'thumb_url': hit['previewURL'],
+            'description': hit.get('tags', ''),
+            'user': hit.get('user', 'Pixabay User'),
+            'links': {
+                'pixabay': hit['pageURL']
+            }
+        })
+    return {'photos': photos}
+
+
+def _adapt_photo(photo: Dict[str, Any], source: str, target: str) -> Dict[str, Any]:
+    """Reshape a cached photo from `source` into `target`'s payload shape.
+
+    The frontend reads attribution from provider-specific fields, so the
+    photographer and profile link are mapped across rather than dropped.
+    """
+    if source == target:
+        return photo
+    out = dict(photo, provider=source)
+    if source == 'pixabay' and target == 'unsplash':
+        page = (photo.get('links') or {}).get('pixabay', '')
+        name = photo.get('user') or 'Pixabay User'
+        out['user'] = {'name': name, 'username': name, 'profile_url': page}
+        out['alt_description'] = photo.get('description', '')
+    elif source == 'unsplash' and target == 'pixabay':
+        user = photo.get('user') or {}
+        out['user'] = user.get('name', 'Unsplash User')
+        out['links'] = dict(photo.get('links') or {}, pixabay=user.get('profile_url', ''))
+    return out
+
+
+_PHOTO_FETCHERS = {
+    'unsplash': ('UNSPLASH_KEY', fetch_unsplash_photos),
+    'pixabay': ('PIXABAY_KEY', fetch_pixabay_photos),
+}
+
+
+async def search_photos(provider: str, query: str, per_page: int,
+                        session: Optional[aiohttp.ClientSession] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Cached, quota-aware photo search; returns ({'photos': [...]}, serving provider)"""
+    env_key, fetcher = _PHOTO_FETCHERS[provider]
+    api_key = os.getenv(env_key) or ''
+    fallbacks = PHOTO_FALLBACKS.get(provider, ())
+
+    async def fetch():
+        if not api_key:
+            return None
+        async with get_session(session) as s:
+            return await fetcher(query, per_page, api_key, s)
+
+    if api_key:
+        value, served_by = await media_lookup.lookup(provider, query, per_page, fetch,
+                                                     api_key=api_key, fallbacks=fallbacks)
+    else:
+        # No key: only another provider's cached result can help
+        value, served_by = None, None
+        for alt in fallbacks:
+            value, _ = await media_lookup.cached(alt, query, per_page)
+            if value is not None:
+                served_by = alt
+                break
+    if not value:
+        return {'photos': []}, None
+    if served_by != provider:
+        value = {'photos': [_adapt_photo(p, served_by, provider) for p in value.get('photos', [])]}
+    return value, served_by
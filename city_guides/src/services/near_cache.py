@@ -0,0 +1,282 @@
+# Near cache - per-process LRU in front of Redis, kept coherent across workers
+#
+# With several hypercorn workers (or nodes) each process used to keep its own
+# copy of small, hot shared state, so copies diverged and every worker paid for
+# its own cold misses. A `NearCache(namespace)` keeps recently used values in a
+# bounded in-process LRU (the near tier) and the shared copy in Redis under
+# `near:<namespace>:<key>`:
+#
+# - reads are served from memory and fall back to Redis, one MGET per batch;
+#   absent keys are remembered too, so a cold key costs one round trip
+# - writes (`set`, `incr`, `delete`) go to Redis first and are then announced on
+#   the `near:invalidate` pub/sub channel; every other process drops its local
+#   copy and the next read fetches the new value
+# - near entries expire after NEAR_CACHE_TTL anyway, since pub/sub delivery is
+#   fire-and-forget, and everything is dropped when the subscription
+#   (re)connects, as messages may have been missed in between
+#
+# Without Redis the near tier is the only copy and never expires, which is how
+# the old module-level dicts behaved. `bus.start(redis_client)` is called from
+# app startup; `snapshot()` feeds /healthz.
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from city_guides.src.responses import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+NEAR_CACHE_SIZE = int(os.getenv("NEAR_CACHE_SIZE", "2048"))  # entries per namespace
+NEAR_CACHE_TTL = float(os.getenv("NEAR_CACHE_TTL", "30"))  # seconds a near entry is trusted without a message
+NEAR_CACHE_CHANNEL = os.getenv("NEAR_CACHE_CHANNEL", "near:invalidate")
+
+_MISSING = object()
+
+
+class InvalidationBus:
+    """Publishes and applies near-cache invalidations over one Redis pub/sub channel"""
+
+    def __init__(self, channel: str = NEAR_CACHE_CHANNEL):
+        self.channel = channel
+        self.redis = None
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._caches: Dict[str, 'NearCache'] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'published': 0, 'received': 0, 'resubscribed': 0, 'errors': 0}
+
+    def register(self, cache: 'NearCache') -> None:
+        self._caches[cache.namespace] = cache
+
+    def start(self, redis_client) -> None:
+        self.redis = redis_client
+        if self._task is None and hasattr(redis_client, 'pubsub'):
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            # bounded, so a wedged subscription can't hold up shutdown
+            await asyncio.wait([self._task], timeout=2.0)
+            self._task = None
+        self.redis = None
+
+    async def publish(self, namespace: str, key: Optional[str]) -> None:
+        """Tell the other processes to drop `key` (or the whole namespace when None)"""
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, dumps({'o': self.origin, 'n': namespace, 'k': key}))
+            self.stats['published'] += 1
+        except Exception:
+            self.stats['errors'] += 1
+            logger.debug('near-cache invalidation publish failed', exc_info=True)
+
+    def apply(self, raw: Any) -> None:
+        """Handle one message from the channel"""
+        try:
+            msg = loads(raw)
+        except Exception:
+            return
+        if not isinstance(msg, dict) or msg.get('o') == self.origin:
+            return
+        cache = self._caches.get(msg.get('n'))
+        if cache is not None:
+            self.stats['received'] += 1
+            cache.invalidate_local(msg.get('k'))
+
+    def _drop_all(self) -> None:
+        for cache in self._caches.values():
+            cache.invalidate_local()
+
+    async def _listen(self) -> None:
+        backoff = 1.0
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                # whatever was cached before (re)subscribing may have missed a message
+                self._drop_all()
+                self.stats['resubscribed'] += 1
+                backoff = 1.0
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self.apply(message.get('data'))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats['errors'] += 1
+                logger.warning('near-cache invalidation listener failed; retrying in %.0fs', backoff, exc_info=True)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'listening': bool(self._task is not None and not self._task.done()),
+            **self.stats,
+            'caches': {name: cache.snapshot() for name, cache in sorted(self._caches.items())},
+        }
+
+
+bus = InvalidationBus()
+
+
+class NearCache:
+    """Bounded in-process LRU in front of Redis for one namespace of shared state"""
+
+    def __init__(self, namespace: str, maxsize: int = NEAR_CACHE_SIZE, ttl: float = NEAR_CACHE_TTL,
+                 redis_ttl: Optional[int] = None, invalidation: InvalidationBus = bus):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_ttl = redis_ttl  # expiry of the shared copy; None keeps it
+        self.bus = invalidation
+        self._near: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._generation = 0
+        self.stats = {'near_hit': 0, 'redis_hit': 0, 'miss': 0, 'invalidated': 0, 'errors': 0}
+        invalidation.register(self)
+
+    def redis_key(self, key: str) -> str:
+        return f"near:{self.namespace}:{key}"
+
+    # -- near tier -----------------------------------------------------------------
+
+    def _near_get(self, key: str, now: float) -> Any:
+        entry = self._near.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires <= now:
+            del self._near[key]
+            return _MISSING
+        self._near.move_to_end(key)
+        return value
+
+    def _near_put(self, key: str, value: Any, now: float) -> None:
+        # without Redis this is the only copy, so it must not expire
+        expires = now + self.ttl if self.bus.redis is not None else float('inf')
+        self._near[key] = (expires, value)
+        self._near.move_to_end(key)
+        while len(self._near) > self.maxsize:
+            self._near.popitem(last=False)
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """Near-tier value only (never waits on Redis); for sync callers after `get_many`"""
+        value = self._near_get(key, time.monotonic())
+        return default if value is _MISSING or value is None else value
+
+    def invalidate_local(self, key: Optional[str] = None) -> None:
+        self._generation += 1
+        self.stats['invalidated'] += 1
+        if key is None:
+            self._near.clear()
+        else:
+            self._near.pop(key, None)
+
+    # -- reads ---------------------------------------------------------------------
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values for the keys that exist, near tier first, the rest in one MGET"""
+        now = time.monotonic()
+        found: Dict[str, Any] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            value = self._near_get(key, now)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.stats['near_hit'] += len(found)
+        rc = self.bus.redis
+        if missing and rc is not None:
+            generation = self._generation
+            try:
+                raws = await rc.mget([self.redis_key(k) for k in missing])
+            except Exception:
+                self.stats['errors'] += 1
+                logger.debug('near-cache %s: redis read failed', self.namespace, exc_info=True)
+                raws = None
+            if raws is not None:
+                for key, raw in zip(missing, raws):
+                    value = None
+                    if raw is not None:
+                        try:
+                            value = loads(raw)
+                        except Exception:
+                            value = None
+                    self.stats['redis_hit' if value is not None else 'miss'] += 1
+                    # an invalidation that landed mid-read means this value may already be stale
+                    if generation == self._generation:
+                        self._near_put(key, value, now)
+                    found[key] = value
+        elif missing:
+            self.stats['miss'] += len(missing)
+        return {k: v for k, v in found.items() if v is not None}
+
+    async def get(self, key: str, default: Any = None) -> Any:
+        value = (await self.get_many([key])).get(key)
+        return default if value is None else value
+
+    # -- writes --------------------------------------------------------------------
+
+    async def set(self, key: str, value: Any) -> None:
+        rc = self.bus.redis
+        if rc is not None:
+            try:
+                if self.redis_ttl:
+                    await rc.set(self.redis_key(key), dumps(value), ex=self.redis_ttl)
+                else:
+                    await rc.set(self.redis_key(key), dumps(value))
+            except Exception:
+                self.stats['errors'] += 1
+                logger.debug('near-cache %s: redis write failed', self.namespace, exc_info=True)
+        self._near_put(key, value, time.monotonic())
+        await self.bus.publish(self.namespace, key)
+
+    async def incr(self, key: str, amount: float = 1.0) -> float:
+        """Atomically add to a numeric value shared by all processes; returns the new value"""
+        rc = self.bus.redis
+        value = None
+        if rc is not None:
+            try:
+                value = float(await rc.incrbyfloat(self.redis_key(key), amount))
+                if self.redis_ttl:
+                    await rc.expire(self.redis_key(key), self.redis_ttl)
+            except Exception:
+                self.stats['errors'] += 1
+                logger.debug('near-cache %s: redis increment failed', self.namespace, exc_info=True)
+        if value is None:
+            value = float(self.peek(key, 0.0)) + amount
+        self._near_put(key, value, time.monotonic())
+        await self.bus.publish(self.namespace, key)
+        return value
+
+    async def delete(self, key: str) -> None:
+        rc = self.bus.redis
+        if rc is not None:
+            try:
+                await rc.delete(self.redis_key(key))
+            except Exception:
+                self.stats['errors'] += 1
+        self._near.pop(key, None)
+        await self.bus.publish(self.namespace, key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {'size': len(self._near), 'maxsize': self.maxsize, **self.stats}
+
+
+def snapshot() -> Dict[str, Any]:
+    return bus.snapshot()
@@ -1,20 +1,20 @@
 """
 Pixabay API Service for TravelLand
 Compliant with Pixabay API Terms of Use:
-- 24-hour caching for all responses
+- 24-hour caching for all responses (services/media_lookup.py)
 - Proper attribution with links
-- Rate limiting (100 requests/hour)
+- Rate limiting (100 requests/hour, sliding window per API key)
 - Human-triggered searches only
 """
 
-import aiohttp
-import hashlib
-import time
 import os
 from pathlib import Path
 from typing import Dict, List, Optional
 import logging
 
+from city_guides.providers import http_clients
+from city_guides.src.services.media_lookup import media_lookup
+
 logger = logging.getLogger(__name__)
 
 class PixabayService:
@@ -32,9 +32,6 @@ class PixabayService:
         
         self.api_key = os.getenv('PIXABAY_KEY')
         self.base_url = "https://pixabay.com/api/"
-        self.cache = {}  # In-memory 24-hour cache
-        self.rate_limit_tracker = []
-        self.session = None
         
         if not self.api_key:
             logger.warning("PIXABAY_KEY not found in environment variables")
@@ -42,106 +39,64 @@ class PixabayService:
             logger.info("Pixabay API key loaded successfully")
     
     async def get_session(self):
-        """Create or reuse aiohttp session"""
-        if self.session is None:
-            self.session = aiohttp.ClientSession()
-        return self.session
-    
-    def _generate_cache_key(self, query: str, page: int = 1, per_page: int = 20) -> str:
-        """Generate cache key for search query"""
-        cache_data = f"{query}_{page}_{per_page}"
-        return hashlib.md5(cache_data.encode()).hexdigest()
-    
-    def _is_rate_limited(self) -> bool:
-        """Check if we've hit the 100 requests/hour limit"""
-        current_time = time.time()
-        hour_ago = current_time - 3600
-        
-        # Remove requests older than 1 hour
-        self.rate_limit_tracker = [req_time for req_time in self.rate_limit_tracker if req_time > hour_ago]
-        
-        return len(self.rate_limit_tracker) >= 100
-    
-    def _track_request(self):
-        """Track API request for rate limiting"""
-        self.rate_limit_tracker.append(time.time())
-    
-    def _is_cached(self, cache_key: str) -> Optional[Dict]:
-        """Check if response is cached and not expired (24 hours)"""
-        if cache_key in self.cache:
-            cached_data = self.cache[cache_key]
-            if time.time() - cached_data['timestamp'] < 86400:  # 24 hours
-                return cached_data['data']
-            else:
-                # Remove expired cache
-                del self.cache[cache_key]
-        return None
-    
-    def _cache_response(self, cache_key: str, data: Dict):
-        """Cache API response with timestamp"""
-        self.cache[cache_key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
+        """Shared pooled session (see providers/http_clients.py)"""
+        return http_clients.get_session()
     
     async def search_destination_images(self, query: str, page: int = 1, per_page: int = 20) -> Dict:
         """
         Search for destination images with Pixabay API
-        Implements 24-hour caching and rate limiting
+        Cached (24 hours) and rate limited through the shared media lookup
         """
         if not self.api_key:
             return {"error": "Pixabay API key not configured"}
-        
-        # Check rate limit
-        if self._is_rate_limited():
-            return {"error": "API rate limit exceeded. Please try again later."}
-        
-        # Check cache first
-        cache_key = self._generate_cache_key(query, page, per_page)
-        cached_result = self._is_cached(cache_key)
-        if cached_result:
-            logger.info(f"Cache hit for Pixabay search: {query}")
-            return cached_result
-        
-        # Track request for rate limiting
-        self._track_request()
-        
-        # Prepare API parameters
-        params = {
-            'key': self.api_key,
-            'q': query,
-            'lang': 'en',
-            'image_type': 'photo',
-            'category': 'places',
-            'safesearch': 'true',
-            'page': page,
-            'per_page': min(per_page, 200)  # Pixabay max is 200
-        }
-        
+
+        per_page = min(per_page, 200)  # Pixabay max is 200
+        kind = 'search' if page == 1 else f'search.p{page}'
+        failure: Dict = {}
+
+        async def fetch() -> Optional[Dict]:
+            # Prepare API parameters
+            params = {
+                'key': self.api_key,
+                'q': query,
+                'lang': 'en',
+                'image_type': 'photo',
+                'category': 'places',
+                'safesearch': 'true',
+                'page': page,
+                'per_page': per_page
+            }
+            async with await self.get_session() as session:
+                async with session.get(self.base_url, params=params) as response:
+                    if response.status == 429:
+                        failure['error'] = "API rate limit exceeded. Please try again later."
+                        return None
+
+                    if response.status != 200:
+                        logger.error(f"Pixabay API error: {response.status}")
+                        failure['error'] = f"API request failed with status {response.status}"
+                        return None
+
+                    data = await response.json()
+
+            # Add attribution information
+            processed_data = self._add_attribution_info(data)
+            logger.info(f"Pixabay search successful: {query}, found {len(processed_data.get('hits', []))} images")
+            return processed_data
+
         try:
-            session = await self.get_session()
-            async with session.get(self.base_url, params=params) as response:
-                if response.status == 429:
-                    return {"error": "API rate limit exceeded. Please try again later."}
-                
-                if response.status != 200:
-                    logger.error(f"Pixabay API error: {response.status}")
-                    return {"error": f"API request failed with status {response.status}"}
-                
-                data = await response.json()
-                
-                # Add attribution information
-                processed_data = self._add_attribution_info(data)
-                
-                # Cache the response
-                self._cache_response(cache_key, processed_data)
-                
-                logger.info(f"Pixabay search successful: {query}, found {len(processed_data.get('hits', []))} images")
-                return processed_data
-                
+            result, _ = await media_lookup.lookup('pixabay', query, per_page, fetch, kind=kind, api_key=self.api_key)
         except Exception as e:
             logger.error(f"Error searching Pixabay: {str(e)}")
             return {"error": f"Failed to search images: {str(e)}"}
+
+        if result is not None:
+            return result
+        if failure:
+            return failure
+        if media_lookup.quota('pixabay', self.api_key).retry_after() > 0:
+            return {"error": "API rate limit exceeded. Please try again later."}
+        return {"error": "Failed to search images"}
     
     def _add_attribution_info(self, data: Dict) -> Dict:
         """Add required attribution information to response"""
@@ -229,10 +184,22 @@ class PixabayService:
         return thumbnails
     
     async def close(self):
-        """Close aiohttp session"""
-        if self.session:
-            await self.session.close()
-            self.session = None
+        """Nothing to release: the pooled session is closed by the app on shutdown"""
+
+# Shared instance, created on first use: the constructor reads .env, which app
+# startup has no need to wait for
+_pixabay_service: Optional[PixabayService] = None
+
+
+def get_pixabay_service() -> PixabayService:
+    global _pixabay_service
+    if _pixabay_service is None:
+        _pixabay_service = PixabayService()
+    return _pixabay_service
+
 
-# Global instance
-pixabay_service = PixabayService()
+def __getattr__(name):
+    # `from city_guides.src.services.pixabay import pixabay_service` keeps working
+    if name == "pixabay_service":
+        return get_pixabay_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
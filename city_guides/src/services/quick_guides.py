@@ -0,0 +1,327 @@
+# Quick-guide content store - versioned on-disk guides with background regeneration
+#
+# Layout: one JSON file per neighborhood under
+#   city_guides/src/routes/data/neighborhood_quick_guides/<city_slug>/<neighborhood_slug>.json
+#
+# Each entry carries quality metadata (store version, confidence, whether it was
+# neutralized/validated before persisting). Cache hits are served as stored when
+# they carry the current `neutralized` marker; older entries get the (memoized)
+# tone neutralizer on the way out. Entries that are stale, from an older store
+# version or low-confidence are queued for a bounded background regeneration
+# instead of being rewritten on the request path.
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when the persisted format or the quality pipeline changes so older
+# entries get regenerated in the background.
+STORE_VERSION = 2
+
+QUICK_GUIDE_DIR = Path(__file__).parent.parent / 'routes' / 'data' / 'neighborhood_quick_guides'
+QUICK_GUIDE_MAX_AGE = int(os.getenv("QUICK_GUIDE_MAX_AGE", str(30 * 86400)))  # 30 days
+QUICK_GUIDE_RETRY_AGE = int(os.getenv("QUICK_GUIDE_RETRY_AGE", "86400"))  # retry low-quality entries daily
+QUICK_GUIDE_REGEN_WORKERS = int(os.getenv("QUICK_GUIDE_REGEN_WORKERS", "2"))
+QUICK_GUIDE_REGEN_QUEUE = int(os.getenv("QUICK_GUIDE_REGEN_QUEUE", "200"))
+QUICK_GUIDE_BULK_CONCURRENCY = int(os.getenv("QUICK_GUIDE_BULK_CONCURRENCY", "4"))
+QUICK_GUIDE_BULK_RATE = float(os.getenv("QUICK_GUIDE_BULK_RATE", "2.0"))  # regenerations started per second
+QUICK_GUIDE_NEUTRALIZE_WORKERS = int(os.getenv("QUICK_GUIDE_NEUTRALIZE_WORKERS", "0"))  # 0 = one process per CPU
+
+# Confidence recorded for entries persisted before quality metadata existed
+_SOURCE_CONFIDENCE = {
+    'wikipedia': 'high',
+    'groq': 'medium',
+    'ddgs': 'medium',
+    'geo-enriched': 'medium',
+    'synthesized': 'low',
+    'data-first': 'low',
+}
+_GENERIC_RE = re.compile(r'^.+ is a neighborhood in .+\.$')
+
+Regenerator = Callable[[str, str], Awaitable[None]]
+
+
+def slug(s: str) -> str:
+    """Filesystem slug used for city directories and neighborhood files"""
+    return re.sub(r'[^a-z0-9_-]', '_', (s or '').lower().replace(' ', '_'))
+
+
+def guide_path(city: str, neighborhood: str, base_dir: Optional[Path] = None) -> Path:
+    """Return the JSON file path for a city/neighborhood guide"""
+    return (base_dir or QUICK_GUIDE_DIR) / slug(city) / (slug(neighborhood) + '.json')
+
+
+def assess_quality(text: str, source: Optional[str], confidence: Optional[str] = None) -> Dict:
+    """Compute quality metadata for a quick_guide text"""
+    from city_guides.src.snippet_filters import looks_like_ddgs_disambiguation_text
+
+    text = text or ''
+    src = source or ''
+    return {
+        'confidence': confidence or _SOURCE_CONFIDENCE.get(src, 'low'),
+        'disambiguation': src in ('ddgs', 'synthesized') and (
+            looks_like_ddgs_disambiguation_text(text) or 'missing:' in text.lower()
+        ),
+        'generic': bool(_GENERIC_RE.match(text.strip())),
+        'length': len(text),
+    }
+
+
+def annotate(out_obj: Dict, city: str, neighborhood: str) -> Dict:
+    """Attach store metadata to a quick-guide object before it is persisted"""
+    quality = assess_quality(out_obj.get('quick_guide') or '', out_obj.get('source'), out_obj.get('confidence'))
+    out_obj['confidence'] = quality['confidence']
+    out_obj['city'] = city
+    out_obj['neighborhood'] = neighborhood
+    out_obj['version'] = STORE_VERSION
+    out_obj['quality'] = quality
+    out_obj.setdefault('generated_at', time.time())
+    return out_obj
+
+
+def load_entry(path: Path) -> Optional[Dict]:
+    """Read a stored guide; legacy entries get quality metadata backfilled in memory"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not data.get('quick_guide'):
+        return None
+    if 'quality' not in data:
+        data['quality'] = assess_quality(data.get('quick_guide') or '', data.get('source'), data.get('confidence'))
+        data.setdefault('confidence', data['quality']['confidence'])
+    return data
+
+
+def needs_regeneration(entry: Dict, now: Optional[float] = None) -> bool:
+    """True if an entry is stale, from an older store version or low quality.
+
+    Low-quality entries are retried at most every QUICK_GUIDE_RETRY_AGE seconds so
+    a neighborhood that only ever synthesizes a low-confidence guide is not
+    regenerated on every hit.
+    """
+    now = now or time.time()
+    attempted_at = entry.get('regeneration_attempted_at')
+    if attempted_at and now - float(attempted_at) < QUICK_GUIDE_RETRY_AGE:
+        return False
+    quality = entry.get('quality') or {}
+    if int(entry.get('version') or 1) < STORE_VERSION or quality.get('disambiguation'):
+        return True
+    generated_at = entry.get('generated_at')
+    age = now - float(generated_at) if generated_at else float('inf')
+    if quality.get('generic') or (entry.get('confidence') or quality.get('confidence')) == 'low':
+        return age > QUICK_GUIDE_RETRY_AGE
+    return age > QUICK_GUIDE_MAX_AGE
+
+
+def mark_attempted(path: Path, entry: Dict) -> None:
+    """Record a regeneration attempt that did not produce a new guide"""
+    entry = dict(entry)
+    entry['regeneration_attempted_at'] = time.time()
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+    except OSError:
+        logger.exception('Failed to record regeneration attempt for %s', path)
+
+
+def to_response(entry: Dict, city: str, neighborhood: str) -> Dict:
+    """Build the /api/generate_quick_guide response for a cache hit"""
+    quality = entry.get('quality') or {}
+    resp = {
+        'quick_guide': entry.get('quick_guide'),
+        'source': entry.get('source', 'cache'),
+        'cached': True,
+        'source_url': entry.get('source_url'),
+        'confidence': entry.get('confidence') or quality.get('confidence', 'low'),
+    }
+    if entry.get('generated_at'):
+        resp['generated_at'] = entry.get('generated_at')
+    if entry.get('mapillary_images'):
+        resp['mapillary_images'] = entry.get('mapillary_images')
+    if quality.get('disambiguation'):
+        # Never serve disambiguation/promotional text; the local paragraph is cheap
+        # and the background worker replaces the stored entry.
+        from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+        resp['quick_guide'] = SynthesisEnhancer.generate_neighborhood_paragraph(neighborhood, city)
+        resp['source'] = 'synthesized'
+        resp['source_url'] = None
+        resp['confidence'] = 'low'
+    else:
+        from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+        if entry.get('neutralized') != SynthesisEnhancer.NEUTRALIZER_VERSION:
+            # legacy entry: neutral tone and the 400-char cap until it is regenerated
+            resp['quick_guide'] = SynthesisEnhancer.neutralize_tone(
+                resp.get('quick_guide') or '', neighborhood=neighborhood, city=city, max_length=400)
+    return resp
+
+
+def list_city_guides(city: str, base_dir: Optional[Path] = None) -> List[str]:
+    """Return the neighborhood names stored for a city"""
+    city_dir = (base_dir or QUICK_GUIDE_DIR) / slug(city)
+    if not city_dir.is_dir():
+        return []
+    names = []
+    for path in sorted(city_dir.glob('*.json')):
+        entry = load_entry(path) or {}
+        names.append(entry.get('neighborhood') or path.stem.replace('_', ' '))
+    return names
+
+
+class QuickGuideRegenerationQueue:
+    """Bounded background queue that regenerates quick guides off the request path.
+
+    Duplicate requests for a key already queued or running are ignored and
+    requests are dropped (not awaited) when the queue is full.
+    """
+
+    def __init__(self, workers: int = QUICK_GUIDE_REGEN_WORKERS, maxsize: int = QUICK_GUIDE_REGEN_QUEUE):
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: set = set()
+        self.stats = {'scheduled': 0, 'dropped': 0, 'completed': 0, 'failed': 0}
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def schedule(self, city: str, neighborhood: str, regenerate: Regenerator) -> bool:
+        """Queue a regeneration; returns False if it was deduplicated or dropped"""
+        key = (slug(city), slug(neighborhood))
+        if key in self._pending:
+            return False
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((key, city, neighborhood, regenerate))
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            return False
+        self._pending.add(key)
+        self.stats['scheduled'] += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            key, city, neighborhood, regenerate = await self._queue.get()
+            try:
+                await regenerate(city, neighborhood)
+                self.stats['completed'] += 1
+            except Exception:
+                self.stats['failed'] += 1
+                logger.exception('Quick guide regeneration failed for %s/%s', city, neighborhood)
+            finally:
+                self._pending.discard(key)
+                self._queue.task_done()
+
+    async def join(self) -> None:
+        """Wait until every queued regeneration has finished"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+
+async def regenerate_city(city: str, regenerate: Regenerator, neighborhoods: Optional[Iterable[str]] = None,
+                          concurrency: int = QUICK_GUIDE_BULK_CONCURRENCY, rate: float = QUICK_GUIDE_BULK_RATE,
+                          base_dir: Optional[Path] = None) -> Dict:
+    """Rebuild every stored guide for a city in parallel under a rate budget.
+
+    `concurrency` caps in-flight regenerations and `rate` caps how many start per
+    second, so upstream providers (DDGS, Wikipedia, Groq) are not flooded.
+    """
+    names = list(neighborhoods) if neighborhoods is not None else list_city_guides(city, base_dir)
+    sem = asyncio.Semaphore(max(1, concurrency))
+    interval = 1.0 / rate if rate and rate > 0 else 0.0
+    start_lock = asyncio.Lock()
+    next_start = [time.monotonic()]
+    results = {'city': city, 'total': len(names), 'regenerated': 0, 'failed': []}
+
+    async def _one(name: str):
+        async with sem:
+            if interval:
+                async with start_lock:
+                    delay = next_start[0] - time.monotonic()
+                    next_start[0] = max(next_start[0], time.monotonic()) + interval
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            try:
+                await regenerate(city, name)
+                results['regenerated'] += 1
+            except Exception:
+                logger.exception('Bulk quick guide regeneration failed for %s/%s', city, name)
+                results['failed'].append(name)
+
+    await asyncio.gather(*[_one(n) for n in names])
+    return results
+
+
+def _neutralize_file(job: Tuple[str, bool]) -> str:
+    """Neutralize one stored guide in place; returns 'rewritten', 'skipped' or 'failed'"""
+    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+
+    path, force = job
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get('quick_guide'), str):
+            return 'skipped'
+        if not force and data.get('neutralized') == SynthesisEnhancer.NEUTRALIZER_VERSION:
+            return 'skipped'
+        data['quick_guide'] = SynthesisEnhancer.neutralize_tone(
+            data['quick_guide'], neighborhood=data.get('neighborhood') or '', city=data.get('city') or '')
+        data['neutralized'] = SynthesisEnhancer.NEUTRALIZER_VERSION
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return 'rewritten'
+    except (OSError, ValueError):
+        logger.exception('Failed to neutralize %s', path)
+        return 'failed'
+
+
+def neutralize_stored(base_dir: Optional[Path] = None, workers: int = QUICK_GUIDE_NEUTRALIZE_WORKERS,
+                      force: bool = False) -> Dict:
+    """Re-run tone neutralization over every stored guide, spread across processes.
+
+    Entries already neutralized with the current rules (`neutralized` marker) are
+    skipped unless `force` is set. `workers=1` runs in-process.
+    """
+    start = time.monotonic()
+    paths = [str(p) for p in sorted((base_dir or QUICK_GUIDE_DIR).glob('*/*.json'))]
+    jobs = [(p, force) for p in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) < 2:
+        outcomes = [_neutralize_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            outcomes = list(pool.map(_neutralize_file, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    seconds = time.monotonic() - start
+    return {
+        'total': len(jobs),
+        'rewritten': outcomes.count('rewritten'),
+        'skipped': outcomes.count('skipped'),
+        'failed': [p for p, o in zip(paths, outcomes) if o == 'failed'],
+        'seconds': round(seconds, 3),
+    }
+
+
+regeneration_queue = QuickGuideRegenerationQueue()
@@ -0,0 +1,217 @@
+# Warm-up scheduler - keeps hot cache entries fresh based on observed traffic
+#
+# Request handlers call `record_request(kind, params, cache_key)` for every lookup.
+# Each key keeps an exponentially decayed request frequency; on every tick the
+# scheduler takes the hottest keys, asks Redis how long their cached value has
+# left and refreshes the ones about to expire (or already missing) by calling the
+# registered in-process pipeline for that kind. All refreshes share one global
+# upstream budget (a semaphore plus a per-tick cap).
+#
+# Cache hits are reported through `record_hit`, which counts them as
+# `<kind>.cache_hit.warmed` when the value was written by the scheduler and
+# `<kind>.cache_hit.organic` otherwise.
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from city_guides.src.metrics import increment
+
+logger = logging.getLogger(__name__)
+
+WARMUP_INTERVAL = float(os.getenv("WARMUP_INTERVAL", "60"))  # seconds between ticks
+WARMUP_HALF_LIFE = float(os.getenv("WARMUP_HALF_LIFE", "3600"))  # request-frequency half-life (seconds)
+WARMUP_REFRESH_WINDOW = int(os.getenv("WARMUP_REFRESH_WINDOW", "300"))  # refresh when TTL drops below this
+WARMUP_MIN_SCORE = float(os.getenv("WARMUP_MIN_SCORE", "2.0"))
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "50"))
+WARMUP_MAX_PER_TICK = int(os.getenv("WARMUP_MAX_PER_TICK", "20"))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "3"))
+WARMUP_MAX_KEYS = int(os.getenv("WARMUP_MAX_KEYS", "5000"))
+
+Pipeline = Callable[[Dict[str, Any], str], Awaitable[bool]]
+
+
+class _HotKey:
+    __slots__ = ('kind', 'params', 'cache_key', 'score', 'updated')
+
+    def __init__(self, kind: str, params: Dict[str, Any], cache_key: str, now: float):
+        self.kind = kind
+        self.params = params
+        self.cache_key = cache_key
+        self.score = 0.0
+        self.updated = now
+
+
+class WarmupScheduler:
+    """Learns hot cache keys from decayed request counts and refreshes them before expiry."""
+
+    def __init__(self, half_life: float = WARMUP_HALF_LIFE, max_keys: int = WARMUP_MAX_KEYS,
+                 concurrency: int = WARMUP_CONCURRENCY):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.budget = asyncio.Semaphore(max(1, concurrency))
+        self.redis = None
+        self._pipelines: Dict[str, Pipeline] = {}
+        self._keys: Dict[str, _HotKey] = {}
+        self._warmed: Dict[str, float] = {}  # cache_key -> time written by the scheduler
+        self._inflight: set = set()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {'ticks': 0, 'refreshed': 0, 'failed': 0, 'skipped_fresh': 0}
+
+    def register(self, kind: str, pipeline: Pipeline) -> None:
+        """Register the in-process refresh pipeline for a kind of cache entry.
+
+        The pipeline receives the recorded request params and the cache key,
+        recomputes the value, writes it to the cache and returns True on success.
+        """
+        self._pipelines[kind] = pipeline
+
+    def _decayed(self, hk: _HotKey, now: float) -> float:
+        if self.half_life <= 0:
+            return hk.score
+        return hk.score * 0.5 ** ((now - hk.updated) / self.half_life)
+
+    def record_request(self, kind: str, params: Dict[str, Any], cache_key: str, weight: float = 1.0,
+                       now: Optional[float] = None) -> None:
+        """Count one request for a cache key (hit or miss)"""
+        if not cache_key or kind not in self._pipelines:
+            return
+        now = now or time.time()
+        hk = self._keys.get(cache_key)
+        if hk is None:
+            hk = self._keys[cache_key] = _HotKey(kind, dict(params), cache_key, now)
+            if len(self._keys) > self.max_keys:
+                self._evict(now)
+        hk.score = self._decayed(hk, now) + weight
+        hk.updated = now
+
+    def seed(self, kind: str, params: Dict[str, Any], cache_key: str, weight: Optional[float] = None) -> None:
+        """Pre-populate a key (e.g. from configured popular cities) so it is warmed on cold start.
+
+        The default weight keeps a seed above WARMUP_MIN_SCORE for one half-life;
+        after that only real traffic keeps it hot.
+        """
+        self.record_request(kind, params, cache_key, weight=2 * WARMUP_MIN_SCORE if weight is None else weight)
+
+    def _evict(self, now: float) -> None:
+        # Drop the coldest 10% so eviction cost is amortized
+        drop = max(1, len(self._keys) // 10)
+        coldest = heapq.nsmallest(drop, self._keys.values(), key=lambda hk: self._decayed(hk, now))
+        for hk in coldest:
+            self._keys.pop(hk.cache_key, None)
+            self._warmed.pop(hk.cache_key, None)
+
+    def hot_keys(self, limit: int = WARMUP_TOP_N, min_score: float = WARMUP_MIN_SCORE,
+                 now: Optional[float] = None) -> List[Tuple[float, _HotKey]]:
+        """Return the hottest keys as (decayed score, key) pairs, hottest first"""
+        now = now or time.time()
+        scored = ((self._decayed(hk, now), hk) for hk in self._keys.values())
+        top = heapq.nlargest(limit, scored, key=lambda pair: pair[0])
+        return [(s, hk) for s, hk in top if s >= min_score]
+
+    async def record_hit(self, kind: str, cache_key: str) -> None:
+        """Count a cache hit as warmed or organic"""
+        label = 'warmed' if cache_key in self._warmed else 'organic'
+        try:
+            await increment(f'{kind}.cache_hit.{label}')
+        except Exception:
+            pass
+
+    def is_warmed(self, cache_key: str) -> bool:
+        return cache_key in self._warmed
+
+    def mark_organic(self, cache_key: str) -> None:
+        """Forget that a key was warmed (the request path rewrote it)"""
+        self._warmed.pop(cache_key, None)
+
+    async def _remaining_ttl(self, cache_key: str) -> int:
+        """Seconds until the cached value expires; 0 if missing, large if no expiry"""
+        if self.redis is None:
+            return 0
+        try:
+            ttl = await self.redis.ttl(cache_key)
+        except Exception:
+            return 0
+        if ttl is None or ttl == -2:
+            return 0
+        if ttl == -1:
+            return 1 << 30
+        return int(ttl)
+
+    async def _refresh(self, hk: _HotKey) -> None:
+        pipeline = self._pipelines.get(hk.kind)
+        if pipeline is None:
+            return
+        self._inflight.add(hk.cache_key)
+        try:
+            async with self.budget:
+                ok = await pipeline(hk.params, hk.cache_key)
+            if ok:
+                self._warmed[hk.cache_key] = time.time()
+                self.stats['refreshed'] += 1
+                await increment(f'{hk.kind}.warmup.refreshed')
+            else:
+                self.stats['failed'] += 1
+        except Exception:
+            self.stats['failed'] += 1
+            logger.exception('Warm-up refresh failed for %s %s', hk.kind, hk.params)
+        finally:
+            self._inflight.discard(hk.cache_key)
+
+    async def tick(self, refresh_window: int = WARMUP_REFRESH_WINDOW,
+                   max_refresh: int = WARMUP_MAX_PER_TICK) -> int:
+        """Refresh hot keys that are missing or about to expire; returns the number refreshed"""
+        self.stats['ticks'] += 1
+        due = []
+        for _, hk in self.hot_keys():
+            if len(due) >= max_refresh:
+                break
+            if hk.cache_key in self._inflight:
+                continue
+            if await self._remaining_ttl(hk.cache_key) > refresh_window:
+                self.stats['skipped_fresh'] += 1
+                continue
+            due.append(hk)
+        if due:
+            await asyncio.gather(*[self._refresh(hk) for hk in due])
+        return len(due)
+
+    async def _run(self, interval: float) -> None:
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Warm-up tick failed')
+            await asyncio.sleep(interval)
+
+    def start(self, redis_client, interval: float = WARMUP_INTERVAL) -> None:
+        """Start the background loop (no-op if already running)"""
+        self.redis = redis_client
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Small status payload for /healthz"""
+        return {
+            'running': bool(self._task is not None and not self._task.done()),
+            'tracked_keys': len(self._keys),
+            'warmed_keys': len(self._warmed),
+            **self.stats,
+        }
+
+
+scheduler = WarmupScheduler()
@@ -0,0 +1,287 @@
+# Weather - grid-snapped, cached current weather from Open-Meteo
+#
+# app.py, routes/utils.py and routes/guide.py each had a `get_weather_async`
+# that called Open-Meteo for every request, although a city's weather barely
+# changes within 10-15 minutes and requests for one city arrive with slightly
+# different coordinates. All weather now goes through `WeatherService`:
+#
+# - coordinates are snapped to a WEATHER_GRID-degree grid (~5 km by default),
+#   so nearby requests share one cell and one cache entry
+# - a cell is fresh for WEATHER_TTL seconds (kept in-process and, when Redis is
+#   attached, under `weather:<lat>_<lon>` for the other workers and the warm-up
+#   scheduler); after that it is still served for up to WEATHER_STALE seconds
+#   while one background request revalidates it
+# - concurrent misses are coalesced: waiting cells are collected for
+#   WEATHER_BATCH_WINDOW_MS (or until WEATHER_BATCH_SIZE) and fetched with a
+#   single multi-coordinate Open-Meteo request
+#
+# `/api/weather`, the weather context of RAG chat answers and the 'weather'
+# warm-up pipeline (fed by the cells `get` is asked for) share the singleton
+# `service`.
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from city_guides.providers.utils import get_session
+from city_guides.src.metrics import increment, observe_latency
+from city_guides.src.responses import dumps, loads
+from city_guides.src.services import warmup
+
+logger = logging.getLogger(__name__)
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+WEATHER_GRID = float(os.getenv("WEATHER_GRID", "0.05"))  # degrees per grid cell
+WEATHER_TTL = int(os.getenv("WEATHER_TTL", "600"))  # seconds a cell is fresh
+WEATHER_STALE = int(os.getenv("WEATHER_STALE", "3600"))  # seconds a cell may be served while revalidating
+WEATHER_BATCH_WINDOW_MS = float(os.getenv("WEATHER_BATCH_WINDOW_MS", "25"))
+WEATHER_BATCH_SIZE = int(os.getenv("WEATHER_BATCH_SIZE", "50"))
+WEATHER_MEMORY_SIZE = int(os.getenv("WEATHER_MEMORY_SIZE", "2000"))  # cells kept in process
+
+# current weather and today's sunrise/sunset (small payload)
+_PARAMS = {
+    "current_weather": "true",
+    "daily": "sunrise,sunset",
+    "temperature_unit": "celsius",
+    "windspeed_unit": "kmh",
+    "precipitation_unit": "mm",
+    "timezone": "auto",
+}
+_FIELDS = ('current_weather', 'daily', 'timezone', 'timezone_abbreviation', 'utc_offset_seconds')
+
+Cell = Tuple[float, float]
+
+# WMO weather interpretation codes, by the lowest code of each group
+_CONDITIONS = ((95, 'thunderstorm'), (85, 'snow showers'), (80, 'rain showers'),
+               (71, 'snow'), (61, 'rain'), (51, 'drizzle'), (45, 'fog'), (3, 'overcast'), (1, 'partly cloudy'),
+               (0, 'clear sky'))
+
+
+def snap(lat: Any, lon: Any, grid: float = WEATHER_GRID) -> Optional[Cell]:
+    """Grid cell (centre coordinates) for a point; None when the point is not usable"""
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return round(round(lat / grid) * grid, 4), round(round(lon / grid) * grid, 4)
+
+
+def cache_key(cell: Cell) -> str:
+    return f"weather:{cell[0]}_{cell[1]}"
+
+
+def summarize(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Flat current conditions (temperature_c/_f, wind_kmh/_mph, weathercode) as the Marco prompts expect"""
+    current = (payload or {}).get('current_weather') or {}
+    if current.get('temperature') is None:
+        return None
+    temp, wind = float(current['temperature']), float(current.get('windspeed') or 0.0)
+    return {
+        'temperature_c': round(temp, 1),
+        'temperature_f': round(temp * 9 / 5 + 32, 1),
+        'wind_kmh': round(wind, 1),
+        'wind_mph': round(wind * 0.621371, 1),
+        'weathercode': current.get('weathercode'),
+    }
+
+
+def describe(code: Any) -> str:
+    """Plain-words conditions for a WMO weather code"""
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return 'unknown conditions'
+    if code in (96, 99):
+        return 'thunderstorm with hail'
+    for lowest, words in _CONDITIONS:
+        if code >= lowest:
+            return words
+    return 'unknown conditions'
+
+
+class WeatherService:
+    """Cached current weather per grid cell, with stale-while-revalidate and batched misses"""
+
+    def __init__(self, grid: float = WEATHER_GRID, ttl: int = WEATHER_TTL, stale: int = WEATHER_STALE,
+                 window_ms: float = WEATHER_BATCH_WINDOW_MS, batch_size: int = WEATHER_BATCH_SIZE,
+                 memory_size: int = WEATHER_MEMORY_SIZE):
+        self.grid = grid
+        self.ttl = ttl
+        self.stale = stale
+        self.window = window_ms / 1000.0
+        self.batch_size = batch_size
+        self.memory_size = memory_size
+        self.redis = None
+        self._cells: 'OrderedDict[Cell, Tuple[Dict[str, Any], float]]' = OrderedDict()  # cell -> (payload, fetched)
+        self._waiting: Dict[Cell, asyncio.Future] = {}  # queued or in flight
+        self._queue: List[Cell] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = {'requests': 0, 'fresh': 0, 'redis': 0, 'stale': 0, 'coalesced': 0, 'fetched': 0,
+                      'batches': 0, 'errors': 0}
+
+    def attach(self, redis_client) -> None:
+        self.redis = redis_client
+
+    # -- cache ------------------------------------------------------------------------
+
+    def _remember(self, cell: Cell, payload: Dict[str, Any], fetched: float) -> None:
+        self._cells[cell] = (payload, fetched)
+        self._cells.move_to_end(cell)
+        while len(self._cells) > self.memory_size:
+            self._cells.popitem(last=False)
+
+    async def _from_redis(self, cell: Cell) -> Optional[Tuple[Dict[str, Any], float]]:
+        if self.redis is None:
+            return None
+        try:
+            raw = await self.redis.get(cache_key(cell))
+        except Exception:
+            logger.debug('weather cache read failed', exc_info=True)
+            return None
+        if not raw:
+            return None
+        entry = loads(raw)
+        return entry.get('weather'), float(entry.get('fetched') or 0)
+
+    async def _store(self, cell: Cell, payload: Dict[str, Any], fetched: float) -> None:
+        self._remember(cell, payload, fetched)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(cache_key(cell), dumps({'weather': payload, 'fetched': fetched}), ex=self.ttl)
+        except Exception:
+            logger.debug('weather cache write failed', exc_info=True)
+
+    # -- fetching ---------------------------------------------------------------------
+
+    async def _fetch_batch(self, cells: List[Cell]) -> Dict[Cell, Dict[str, Any]]:
+        """One Open-Meteo request for all `cells`"""
+        params = {
+            "latitude": ",".join(str(c[0]) for c in cells),
+            "longitude": ",".join(str(c[1]) for c in cells),
+            **_PARAMS,
+        }
+        start = time.monotonic()
+        async with get_session() as session:
+            async with session.get(OPEN_METEO_URL, params=params) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+        await observe_latency('weather.fetch_ms', (time.monotonic() - start) * 1000.0)
+        # a single location comes back as an object, several as a list in request order
+        items = data if isinstance(data, list) else [data]
+        if len(items) != len(cells):
+            raise ValueError(f"expected {len(cells)} locations, got {len(items)}")
+        return {cell: {f: item.get(f) for f in _FIELDS} for cell, item in zip(cells, items)}
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        while self._queue:
+            cells, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+            self.stats['batches'] += 1
+            try:
+                results = await self._fetch_batch(cells)
+                error = None
+            except Exception as exc:
+                results, error = {}, exc
+                self.stats['errors'] += 1
+                await increment('weather.errors')
+                logger.info('weather batch of %d cells failed: %s', len(cells), exc)
+            now = time.time()
+            for cell in cells:
+                fut = self._waiting.pop(cell, None)
+                payload = results.get(cell)
+                if payload is not None:
+                    self.stats['fetched'] += 1
+                    await self._store(cell, payload, now)
+                if fut is not None and not fut.done():
+                    if payload is None and error is not None:
+                        fut.set_exception(error)
+                    else:
+                        fut.set_result(payload)
+
+    def _request(self, cell: Cell) -> asyncio.Future:
+        """Future for a cell's fresh payload; joins the queued or in-flight request when there is one"""
+        fut = self._waiting.get(cell)
+        if fut is not None:
+            self.stats['coalesced'] += 1
+            return fut
+        fut = self._waiting[cell] = asyncio.get_running_loop().create_future()
+        self._queue.append(cell)
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        return fut
+
+    def _revalidate(self, cell: Cell) -> None:
+        fut = self._request(cell)
+        # nobody awaits a background revalidation; keep its failure out of the loop's error log
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    # -- public -----------------------------------------------------------------------
+
+    async def get(self, lat: Any, lon: Any) -> Optional[Dict[str, Any]]:
+        """Current weather payload for a point (compact Open-Meteo fields), or None"""
+        cell = snap(lat, lon, self.grid)
+        if cell is None:
+            return None
+        self.stats['requests'] += 1
+        # hot cells are refreshed by the 'weather' warm-up pipeline before they go stale
+        warmup.scheduler.record_request('weather', {'lat': cell[0], 'lon': cell[1]}, cache_key(cell))
+        now = time.time()
+        entry = self._cells.get(cell)
+        if entry is None or now - entry[1] >= self.ttl:
+            shared = await self._from_redis(cell)
+            if shared and shared[0] and (entry is None or shared[1] > entry[1]):
+                self._remember(cell, *shared)
+                entry = shared
+                self.stats['redis'] += 1
+                await increment('weather.cache_hit.redis')
+        if entry is not None:
+            age = now - entry[1]
+            if age < self.ttl:
+                self.stats['fresh'] += 1
+                await increment('weather.cache_hit')
+                return entry[0]
+            if age < self.stale:
+                self.stats['stale'] += 1
+                await increment('weather.cache_hit.stale')
+                self._revalidate(cell)
+                return entry[0]
+        await increment('weather.cache_miss')
+        try:
+            return await self._request(cell)
+        except Exception:
+            return None
+
+    async def refresh(self, lat: Any, lon: Any) -> bool:
+        """Fetch a cell now (warm-up pipeline); True when fresh weather was stored"""
+        cell = snap(lat, lon, self.grid)
+        if cell is None:
+            return False
+        try:
+            return bool(await self._request(cell))
+        except Exception:
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        served = self.stats['fresh'] + self.stats['stale']  # 'redis' hits are counted as fresh too
+        return {
+            **self.stats,
+            'hit_rate': round(served / self.stats['requests'], 4) if self.stats['requests'] else 0.0,
+            'cells': len(self._cells),
+            'waiting': len(self._waiting),
+            'grid': self.grid,
+            'ttl': self.ttl,
+        }
+
+
+service = WeatherService()
+
+
+async def get_weather(lat: Any, lon: Any) -> Optional[Dict[str, Any]]:
+    return await service.get(lat, lon)
@@ -6,12 +6,13 @@ No OSM venue counting - uses real travel content from the web.
 """
 
 import asyncio
-import aiohttp
 import json
 import re
 from typing import List, Dict, Any
 from urllib.parse import urlparse
 
+from city_guides.providers import http_clients
+
 # Import existing providers
 try:
     from city_guides.providers.ddgs_provider import ddgs_search
@@ -139,7 +140,7 @@ async def fetch_wikipedia_categories(city: str, state: str = "", country: str =
                 categories.extend(topic_matches)
 
         # Also fetch actual Wikipedia categories
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             params = {
                 'action': 'query',
                 'titles': title,
@@ -821,8 +822,6 @@ async def fetch_wikipedia_full_content(city: str, state: str = "", country: str
     """Fetch full Wikipedia article content for better category extraction.
     Uses state/country for disambiguation of small towns."""
     try:
-        import aiohttp
-        
         # Try variations with state/country for disambiguation
         search_variations = []
         if state and country:
@@ -835,7 +834,7 @@ async def fetch_wikipedia_full_content(city: str, state: str = "", country: str
             url = f"https://en.wikipedia.org/w/api.php?action=query&prop=extracts&explaintext&exlimit=1&titles={search_title}&format=json"
             headers = {'User-Agent': 'TravelLand/1.0 (Educational)'}
             
-            async with aiohttp.ClientSession() as session:
+            async with http_clients.get_session() as session:
                 async with session.get(url, headers=headers) as resp:
                     if resp.status == 200:
                         data = await resp.json()
@@ -857,8 +856,6 @@ async def fetch_wikipedia_full_content(city: str, state: str = "", country: str
 async def simple_wikipedia_fetch(city: str, state: str = "", country: str = "") -> str:
     """Simple Wikipedia summary fetch with state/country support."""
     try:
-        import aiohttp
-        
         # Try with state first for better accuracy
         if state:
             url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{city}, {state}"
@@ -866,7 +863,7 @@ async def simple_wikipedia_fetch(city: str, state: str = "", country: str = "")
             url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{city}"
             
         headers = {'User-Agent': 'TravelLand/1.0 (Educational)'}
-        async with aiohttp.ClientSession() as session:
+        async with http_clients.get_session() as session:
             async with session.get(url, headers=headers) as resp:
                 if resp.status == 200:
                     data = await resp.json()
@@ -943,7 +940,7 @@ async def extract_from_wikipedia_sections(city: str, state: str = "") -> List[Di
             if state:
                 title += f", {state}"
                 
-            async with aiohttp.ClientSession() as session:
+            async with http_clients.get_session() as session:
                 # Get full page content with sections
                 params = {
                     'action': 'parse',
@@ -4,6 +4,8 @@ Provides stronger snippet extraction, language normalization, and safer trimming
 """
 
 import re
+import zlib
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 # No persistence imports needed - this module is self-contained
@@ -21,6 +23,10 @@ class SynthesisEnhancer:
         'de': r'[äöüß]',      # German
     }
 
+    # Bump when the tone rules change; persisted quick guides record the version
+    # they were neutralized with so they are not neutralized twice
+    NEUTRALIZER_VERSION = 1
+
     # Common non-English phrases to detect
     NON_ENGLISH_PHRASES = [
         'ubicado en', 'situado en', 'localizado',  # Spanish
@@ -246,105 +252,40 @@ class SynthesisEnhancer:
         """
         Remove first-person tone and personalize output to include neighborhood/city when provided.
         This is a lightweight neutralizer (not an LLM). It removes obvious first-person pronouns
-        and replaces possessives with neutral forms.
+        and replaces possessives with neutral forms. Results are memoized per
+        (text, neighborhood, city, max_length).
         """
-        if not text:
-            base = ''
-        else:
-            base = text.strip()
+        return _neutralize_cached(text or '', neighborhood, city, max_length)
 
-        # Remove first-person pronouns/phrases (simple heuristics)
-        # Remove standalone 'I'/'We' at sentence starts and common contractions
-        base = re.sub(r"\bI\b", "", base)
-        base = re.sub(r"\bI'm\b", "", base, flags=re.IGNORECASE)
-        base = re.sub(r"\bI've\b", "", base, flags=re.IGNORECASE)
-        base = re.sub(r"\bWe\b", "", base)
-        base = re.sub(r"\bWe're\b", "", base, flags=re.IGNORECASE)
-        base = re.sub(r"\bWe've\b", "", base, flags=re.IGNORECASE)
-
-        # Replace possessives 'my'/'our' with neutral 'the'
-        base = re.sub(r"\bmy\b", "the", base, flags=re.IGNORECASE)
-        base = re.sub(r"\bour\b", "the", base, flags=re.IGNORECASE)
-
-        # Collapse extra whitespace created by removals
-        base = re.sub(r"\s{2,}", " ", base).strip()
+    @staticmethod
+    def _neutralize(text: str, neighborhood: Optional[str], city: Optional[str], max_length: int) -> str:
+        # Remove first-person pronouns/contractions and turn 'my'/'our' into 'the' (one pass),
+        # then collapse the whitespace the removals leave behind
+        base = _WHITESPACE_RE.sub(" ", _PRONOUN_RE.sub(_neutral_pronoun, text.strip())).strip()
 
         # Ensure neighborhood/city are present and avoid overly generic closing lines
         if neighborhood:
             base = SynthesisEnhancer.ensure_includes_term(base, base, neighborhood, fallback_sentence=f"{neighborhood} is a neighborhood in {city or ''}.")
 
-
         # Replace generic praise clauses with a neutral paraphrase even if keywords exist
-        low = (text or '').lower()
+        low = text.lower()
         has_food = 'food' in low or 'restaurant' in low or 'dining' in low
-        has_atmos = 'atmosphere' in low or 'atmospheric' in low or 'atmos' in low
-        has_unforgettable = 'unforgettable' in low or 'amazing' in low or 'incredible' in low
-
-        # If original is overly generic and praises 'local food and atmosphere', rewrite it
-        if has_food and has_atmos:
-            templates_fa = [
-                "The neighborhood offers notable local food and a lively atmosphere.",
-                "The area features local eateries and a strong neighborhood atmosphere.",
-                "Visitors will find local dining options and a vibrant atmosphere.",
-            ]
-            idx = abs(hash((neighborhood or '') + (city or '') + base)) % len(templates_fa)
-            replacement = templates_fa[idx]
-            # Remove common superlatives then append replacement
-            base = re.sub(r"\b(unforgettable|amazing|incredible|fantastic|wonderful)\b[\.\!\,\s]*", "", base, flags=re.IGNORECASE)
-            # Try to remove trailing generic clause fragments
-            base = re.sub(r"(the\s+local\s+food\s+and\s+atmosphere[\.,!]*)", '', base, flags=re.IGNORECASE)
-            base = base.strip()
-            # Remove orphan leading verb fragments left after pronoun removal (e.g., 'loved walking... when visited...')
-            base = re.sub(r'^[a-z]+[^\.\n]*?(?:when|while|as|during)[^\.\n]*[\.]?', '', base, flags=re.IGNORECASE).strip()
-            # Remove leading or trailing isolated copula fragments like 'were.' or 'was.'
-            base = re.sub(r'^\s*(?:were|was|is|are)[\.\,\s]*', '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'\b(?:were|was|is|are)[\.\,\s]*$', '', base, flags=re.IGNORECASE).strip()
-            if base:
-                base = base.rstrip('. ,') + '. ' + replacement
-            else:
-                base = replacement
-        elif has_food and not has_atmos:
-            templates_f = [
-                "The area has local eateries and dining options.",
-                "Local dining options are a notable feature of the neighborhood.",
-            ]
-            idx = abs(hash((neighborhood or '') + (city or '') + base)) % len(templates_f)
-            replacement = templates_f[idx]
-            base = re.sub(r"\b(unforgettable|amazing|incredible)\b[\.\!\,\s]*", "", base, flags=re.IGNORECASE)
-            base = re.sub(r"(the\s+local\s+food[\.,!]*)", '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'^[a-z]+[^\.\n]*?(?:when|while|as|during)[^\.\n]*[\.]?', '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'^\s*(?:were|was|is|are)[\.\,\s]*', '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'\b(?:were|was|is|are)[\.\,\s]*$', '', base, flags=re.IGNORECASE).strip()
-            base = (base.rstrip('. ,') + '. ' + replacement) if base else replacement
-        elif has_atmos and not has_food:
-            templates_a = [
-                "The neighborhood is noted for its atmosphere and local character.",
-                "The area has a distinctive local atmosphere worth exploring.",
-            ]
-            idx = abs(hash((neighborhood or '') + (city or '') + base)) % len(templates_a)
-            replacement = templates_a[idx]
-            base = re.sub(r"\b(unforgettable|amazing|incredible)\b[\.\!\,\s]*", "", base, flags=re.IGNORECASE)
-            base = re.sub(r"(the\s+local\s+atmosphere[\.,!]*)", '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'^[a-z]+[^\.\n]*?(?:when|while|as|during)[^\.\n]*[\.]?', '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'^\s*(?:were|was|is|are)[\.\,\s]*', '', base, flags=re.IGNORECASE).strip()
-            base = re.sub(r'\b(?:were|was|is|are)[\.\,\s]*$', '', base, flags=re.IGNORECASE).strip()
+        has_atmos = 'atmos' in low
+        seed = (neighborhood or '') + '|' + (city or '') + '|' + base
+
+        if has_food or has_atmos:
+            kind = 'food_atmosphere' if has_food and has_atmos else 'food' if has_food else 'atmosphere'
+            replacement = _pick(_PRAISE_TEMPLATES[kind], seed)
+            # Drop superlatives and the generic clause itself, then orphan fragments left after
+            # pronoun removal (e.g. 'loved walking... when visited...') and dangling copulas
+            base = _PRAISE_RE[kind].sub('', base).strip()
+            base = _ORPHAN_LEAD_RE.sub('', base).strip()
+            base = _COPULA_LEAD_RE.sub('', base).strip()
+            base = _COPULA_TRAIL_RE.sub('', base).strip()
             base = (base.rstrip('. ,') + '. ' + replacement) if base else replacement
-        else:
+        elif len(base) < 40:
             # Provide a cautious, varied phrasing if original lacked specifics
-            templates = [
-                "Walking through {neighborhood} in {city} reveals a lively local character.",
-                "{neighborhood} in {city} is known for its local atmosphere and points of interest.",
-                "Visitors to {neighborhood} in {city} will find a mix of local sights and neighborhood charm.",
-                "{neighborhood} in {city} features a variety of local streets and notable spots to explore.",
-            ]
-            seed = (neighborhood or '') + '|' + (city or '') + '|' + (base or '')
-            idx = abs(hash(seed)) % len(templates)
-            try:
-                summary = templates[idx].format(neighborhood=neighborhood or '', city=city or '')
-            except Exception:
-                summary = f"{neighborhood} is a neighborhood in {city or ''}."
-            if len(base) < 40:
-                base = summary
+            base = _pick(_SUMMARY_TEMPLATES, seed).format(neighborhood=neighborhood or '', city=city or '')
 
         # Final safe trim
         return SynthesisEnhancer.safe_trim(base, max_length)
@@ -362,3 +303,58 @@ class SynthesisEnhancer:
             return f"Source: {url}"
         else:
             return "Source: OpenStreetMap"
+
+
+# --- Tone neutralizer rules, compiled once ---
+NEUTRALIZER_VERSION = SynthesisEnhancer.NEUTRALIZER_VERSION
+NEUTRALIZE_CACHE_SIZE = 2048
+
+# 'I'/'We' only capitalized (as before); contractions and possessives in any case.
+# Contractions come first so "I'm" goes as a whole instead of leaving "'m" behind.
+_PRONOUN_RE = re.compile(r"\b(?:(?i:I'm|I've|We're|We've)|I|We|(?i:my|our))\b")
+_WHITESPACE_RE = re.compile(r"\s{2,}")
+_SUPERLATIVES = r"\b(?:unforgettable|amazing|incredible{})\b[\.\!\,\s]*"
+_PRAISE_RE = {
+    'food_atmosphere': re.compile(_SUPERLATIVES.format('|fantastic|wonderful') + r"|the\s+local\s+food\s+and\s+atmosphere[\.,!]*", re.IGNORECASE),
+    'food': re.compile(_SUPERLATIVES.format('') + r"|the\s+local\s+food[\.,!]*", re.IGNORECASE),
+    'atmosphere': re.compile(_SUPERLATIVES.format('') + r"|the\s+local\s+atmosphere[\.,!]*", re.IGNORECASE),
+}
+_ORPHAN_LEAD_RE = re.compile(r'^[a-z]+[^\.\n]*?(?:when|while|as|during)[^\.\n]*[\.]?', re.IGNORECASE)
+_COPULA_LEAD_RE = re.compile(r'^\s*(?:were|was|is|are)[\.\,\s]*', re.IGNORECASE)
+_COPULA_TRAIL_RE = re.compile(r'\b(?:were|was|is|are)[\.\,\s]*$', re.IGNORECASE)
+
+_PRAISE_TEMPLATES = {
+    'food_atmosphere': (
+        "The neighborhood offers notable local food and a lively atmosphere.",
+        "The area features local eateries and a strong neighborhood atmosphere.",
+        "Visitors will find local dining options and a vibrant atmosphere.",
+    ),
+    'food': (
+        "The area has local eateries and dining options.",
+        "Local dining options are a notable feature of the neighborhood.",
+    ),
+    'atmosphere': (
+        "The neighborhood is noted for its atmosphere and local character.",
+        "The area has a distinctive local atmosphere worth exploring.",
+    ),
+}
+_SUMMARY_TEMPLATES = (
+    "Walking through {neighborhood} in {city} reveals a lively local character.",
+    "{neighborhood} in {city} is known for its local atmosphere and points of interest.",
+    "Visitors to {neighborhood} in {city} will find a mix of local sights and neighborhood charm.",
+    "{neighborhood} in {city} features a variety of local streets and notable spots to explore.",
+)
+
+
+def _neutral_pronoun(match) -> str:
+    return 'the' if match.group(0).lower() in ('my', 'our') else ''
+
+
+def _pick(options, seed: str) -> str:
+    # crc32 rather than hash(): the same guide gets the same template in every process
+    return options[zlib.crc32(seed.encode('utf-8')) % len(options)]
+
+
+@lru_cache(maxsize=NEUTRALIZE_CACHE_SIZE)
+def _neutralize_cached(text: str, neighborhood: Optional[str], city: Optional[str], max_length: int) -> str:
+    return SynthesisEnhancer._neutralize(text, neighborhood, city, max_length)
@@ -5,9 +5,10 @@ This module provides comprehensive quality scoring for venues to ensure
 only high-quality venues are presented to users.
 """
 
+import heapq
 import re
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
 
 # Quality scoring constants
 QUALITY_WEIGHTS = {
@@ -28,43 +29,7 @@ def is_venue_closed_or_disused(venue: Dict[str, Any]) -> bool:
     
     Returns True if venue appears to be permanently closed.
     """
-    tags = venue.get('tags', {})
-    if isinstance(tags, str):
-        # Parse string tags to dict if needed
-        tags_dict = {}
-        for tag in tags.split(','):
-            if '=' in tag:
-                k, v = tag.split('=', 1)
-                tags_dict[k.strip()] = v.strip()
-        tags = tags_dict
-    
-    # Check for explicit closed/disused/demolished tags
-    closed_indicators = [
-        'disused:amenity', 'disused:shop', 'disused:tourism',
-        'demolished:building', 'demolished:amenity',
-        'was:amenity', 'was:shop', 'was:tourism',
-        'abandoned:amenity', 'abandoned:building',
-        'removed:amenity', 'removed:building'
-    ]
-    
-    for indicator in closed_indicators:
-        if indicator in tags:
-            return True
-    
-    # Check for status tags indicating closure
-    status_tags = ['status', 'condition', 'operational_status']
-    for tag in status_tags:
-        if tag in tags:
-            value = tags[tag].lower()
-            if any(word in value for word in ['closed', 'disused', 'demolished', 'abandoned', 'removed', 'inactive']):
-                return True
-    
-    # Check for opening hours indicating permanent closure
-    hours = tags.get('opening_hours', '').lower()
-    if hours and any(indicator in hours for indicator in ['closed', 'demolished', 'removed']):
-        return True
-    
-    return False
+    return _venue_features(venue)[0]
 
 
 def calculate_venue_quality_score(venue: Dict[str, Any]) -> float:
@@ -77,248 +42,258 @@ def calculate_venue_quality_score(venue: Dict[str, Any]) -> float:
     Returns:
         Quality score between 0.0 and 1.0 (0.0 if venue is closed)
     """
-    # First check if venue is closed/disused - automatic 0.0 score
-    if is_venue_closed_or_disused(venue):
-        logging.debug(f"Venue '{venue.get('name', 'Unknown')}' appears to be closed/disused")
-        return 0.0
-    
-    score = 0.0
-    weights = QUALITY_WEIGHTS
-    
-    # 1. Address Completeness (25%)
-    address_score = _calculate_address_score(venue)
-    score += address_score * weights['address_completeness']
-    
-    # 2. Contact Information (20%)
-    contact_score = _calculate_contact_score(venue)
-    score += contact_score * weights['contact_info']
-    
-    # 3. Opening Hours (15%)
-    hours_score = _calculate_hours_score(venue)
-    score += hours_score * weights['opening_hours']
-    
-    # 4. Website (15%)
-    website_score = _calculate_website_score(venue)
-    score += website_score * weights['website']
-    
-    # 5. Description/Tags (15%)
-    description_score = _calculate_description_score(venue)
-    score += description_score * weights['description']
-    
-    # 6. Coordinates (10%)
-    coordinates_score = _calculate_coordinates_score(venue)
-    score += coordinates_score * weights['coordinates']
-    
-    return round(score, 2)
-
+    closed, row = _venue_features(venue)
+    return 0.0 if closed else _weighted_score(row)
+
+
+# === Batch scoring ===
+# Scoring a city-level search used to run the six sub-scorers (and the closed
+# check) per venue, each re-reading and re-parsing the venue dict, and again for
+# insights. Features are now extracted once per venue into a component row that
+# the score, the insights and the top-N selection (a heap instead of sorting
+# every leftover venue) all share.
+
+# Component order of a score row, with the QUALITY_WEIGHTS key each one uses
+QUALITY_COMPONENTS = (
+    ('address', 'address_completeness'),
+    ('contact', 'contact_info'),
+    ('hours', 'opening_hours'),
+    ('website', 'website'),
+    ('description', 'description'),
+    ('coordinates', 'coordinates'),
+)
+
+_CLOSED_KEYS = frozenset([
+    'disused:amenity', 'disused:shop', 'disused:tourism',
+    'demolished:building', 'demolished:amenity',
+    'was:amenity', 'was:shop', 'was:tourism',
+    'abandoned:amenity', 'abandoned:building',
+    'removed:amenity', 'removed:building'
+])
+_STATUS_KEYS = ('status', 'condition', 'operational_status')
+_CLOSED_STATUS_RE = re.compile(r'closed|disused|demolished|abandoned|removed|inactive')
+_CLOSED_HOURS_RE = re.compile(r'closed|demolished|removed')
+_COORDINATE_ADDRESS_RE = re.compile(r'^-?\d+\.?\d*\s*,\s*-?\d+\.?\d*$')
+_TIME_RANGE_RE = re.compile(r'\d{1,2}:\d{2}')
+_ROUND_THE_CLOCK = frozenset(['24/7', '24h', '24 hr', ''])
+
+
+class VenueScores(NamedTuple):
+    """Quality scores for a venue batch, in input order"""
+    scores: List[float]
+    components: List[Tuple[float, ...]]  # one row per venue, in QUALITY_COMPONENTS order
+
+
+def _parse_tag_string(tags: str) -> Dict[str, str]:
+    tags_dict = {}
+    for tag in tags.split(','):
+        if '=' in tag:
+            k, v = tag.split('=', 1)
+            tags_dict[k.strip()] = v.strip()
+    return tags_dict
+
+
+def _venue_features(venue: Dict[str, Any]) -> Tuple[bool, Tuple[float, ...]]:
+    """(closed, component row) for one venue; 'k=v,...' string tags are parsed once for all components"""
+    raw_tags = venue.get('tags', {})
+    if isinstance(raw_tags, dict):
+        tags = raw_tags
+    elif isinstance(raw_tags, str):
+        tags = _parse_tag_string(raw_tags)
+    else:
+        tags = {}
+
+    # closed / disused
+    closed = not _CLOSED_KEYS.isdisjoint(tags)
+    if not closed:
+        for key in _STATUS_KEYS:
+            if key in tags and _CLOSED_STATUS_RE.search(str(tags[key]).lower()):
+                closed = True
+                break
+    if not closed:
+        closed = bool(_CLOSED_HOURS_RE.search(str(tags.get('opening_hours', '')).lower()))
 
-def _calculate_address_score(venue: Dict[str, Any]) -> float:
-    """Calculate address quality score (0.0 to 1.0)."""
-    address = venue.get('address', '')
-    display_address = venue.get('display_address', '')
-    
-    # Check if address is just coordinates (poor quality)
-    if address and re.match(r'^-?\d+\.?\d*\s*,\s*-?\d+\.?\d*$', address.strip()):
-        return 0.0
-    
-    # Check if display address exists and is meaningful
-    if display_address and len(display_address) > 10 and not display_address.startswith('📍'):
-        return 1.0
-    
-    # Check if raw address exists and is meaningful
-    if address and len(address) > 10:
-        return 0.8
-    
-    # Check for coordinate-only fallback
     lat = venue.get('lat')
     lon = venue.get('lon')
-    if lat and lon:
-        return 0.3  # Better than nothing, but poor
-    
-    return 0.0
-
 
-def _calculate_contact_score(venue: Dict[str, Any]) -> float:
-    """Calculate contact information quality score."""
-    tags = venue.get('tags', {})
-    if isinstance(tags, str):
-        # Parse string tags
-        tags_dict = {}
-        for tag in tags.split(','):
-            if '=' in tag:
-                k, v = tag.split('=', 1)
-                tags_dict[k.strip()] = v.strip()
-    elif isinstance(tags, dict):
-        tags_dict = tags
+    # address
+    address = venue.get('address', '')
+    display_address = venue.get('display_address', '')
+    if address and _COORDINATE_ADDRESS_RE.match(address.strip()):
+        address_score = 0.0
+    elif display_address and len(display_address) > 10 and not display_address.startswith('📍'):
+        address_score = 1.0
+    elif address and len(address) > 10:
+        address_score = 0.8
+    elif lat and lon:
+        address_score = 0.3
     else:
-        tags_dict = {}
-    
-    # Check for phone number
-    phone = tags_dict.get('phone') or tags_dict.get('contact:phone')
-    if phone and len(str(phone)) >= 7:
-        return 1.0
-    
-    # Check for email
-    email = tags_dict.get('email') or tags_dict.get('contact:email')
-    if email and '@' in str(email):
-        return 0.5
-    
-    return 0.0
+        address_score = 0.0
 
+    # contact
+    phone = tags.get('phone') or tags.get('contact:phone')
+    if phone and len(str(phone)) >= 7:
+        contact_score = 1.0
+    else:
+        email = tags.get('email') or tags.get('contact:email')
+        contact_score = 0.5 if email and '@' in str(email) else 0.0
 
-def _calculate_hours_score(venue: Dict[str, Any]) -> float:
-    """Calculate opening hours quality score."""
+    # opening hours
     opening_hours = venue.get('opening_hours', '')
-    
     if not opening_hours:
-        return 0.0
-    
-    # Check for meaningful hours (not just "24/7" or empty)
-    if opening_hours.strip() in ['24/7', '24h', '24 hr', '']:
-        return 0.3
-    
-    # Check for actual time ranges
-    if re.search(r'\d{1,2}:\d{2}', opening_hours):
-        return 1.0
-    
-    return 0.2
-
+        hours_score = 0.0
+    elif opening_hours.strip() in _ROUND_THE_CLOCK:
+        hours_score = 0.3
+    elif _TIME_RANGE_RE.search(opening_hours):
+        hours_score = 1.0
+    else:
+        hours_score = 0.2
 
-def _calculate_website_score(venue: Dict[str, Any]) -> float:
-    """Calculate website quality score."""
+    # website (tag fallback only for dict tags)
     website = venue.get('website', '')
-    tags = venue.get('tags', {})
-    
-    if isinstance(tags, dict):
-        website = website or tags.get('website') or tags.get('contact:website')
-    
-    if website and ('http' in str(website) or '.' in str(website)):
-        return 1.0
-    
-    return 0.0
-
-
-def _calculate_description_score(venue: Dict[str, Any]) -> float:
-    """Calculate description and tags quality score."""
-    tags = venue.get('tags', {})
-    name = venue.get('name', '')
-    
-    if isinstance(tags, str):
-        # Count meaningful tags
-        tag_count = len([t for t in tags.split(',') if '=' in t and len(t) > 3])
-        if tag_count >= 3:
-            return 1.0
-        elif tag_count >= 1:
-            return 0.5
-        else:
-            return 0.0
-    elif isinstance(tags, dict):
-        # Count meaningful tag keys
-        meaningful_tags = 0
-        for key, value in tags.items():
+    if isinstance(raw_tags, dict):
+        website = website or raw_tags.get('website') or raw_tags.get('contact:website')
+    website_score = 1.0 if website and ('http' in str(website) or '.' in str(website)) else 0.0
+
+    # description / tags
+    if isinstance(raw_tags, str):
+        meaningful = len([t for t in raw_tags.split(',') if '=' in t and len(t) > 3])
+    elif isinstance(raw_tags, dict):
+        meaningful = 0
+        for key, value in raw_tags.items():
             if key and value and len(str(key)) > 2 and len(str(value)) > 1:
-                meaningful_tags += 1
-        
-        if meaningful_tags >= 3:
-            return 1.0
-        elif meaningful_tags >= 1:
-            return 0.5
-        else:
-            return 0.0
-    
-    # If no tags, check if name is meaningful
-    if name and len(name) > 3 and name.lower() not in ['unknown', 'unnamed', '']:
-        return 0.3
-    
-    return 0.0
-
+                meaningful += 1
+                if meaningful == 3:  # all the score distinguishes
+                    break
+    else:
+        meaningful = None
+    if meaningful is None:
+        name = venue.get('name', '')
+        description_score = 0.3 if name and len(name) > 3 and name.lower() not in ('unknown', 'unnamed', '') else 0.0
+    else:
+        description_score = 1.0 if meaningful >= 3 else 0.5 if meaningful >= 1 else 0.0
 
-def _calculate_coordinates_score(venue: Dict[str, Any]) -> float:
-    """Calculate coordinates quality score."""
-    lat = venue.get('lat')
-    lon = venue.get('lon')
-    
+    # coordinates
     try:
         lat_val = float(lat) if lat is not None else None
         lon_val = float(lon) if lon is not None else None
-        
-        # Valid coordinates range check
-        if lat_val is not None and lon_val is not None:
-            if -90 <= lat_val <= 90 and -180 <= lon_val <= 180:
-                return 1.0
-    
+        coordinates_ok = (lat_val is not None and lon_val is not None
+                          and -90 <= lat_val <= 90 and -180 <= lon_val <= 180)
     except (ValueError, TypeError):
-        pass
-    
-    return 0.0
+        coordinates_ok = False
 
+    return closed, (address_score, contact_score, hours_score, website_score, description_score,
+                    1.0 if coordinates_ok else 0.0)
 
-def filter_high_quality_venues(venues: List[Dict[str, Any]], min_score: float = None) -> List[Dict[str, Any]]:
+
+def _weighted_score(row: Tuple[float, ...]) -> float:
+    """QUALITY_WEIGHTS sum of a component row, added in the original order so results are bit-identical"""
+    address, contact, hours, website, description, coordinates = row
+    weights = QUALITY_WEIGHTS
+    return round(address * weights['address_completeness'] + contact * weights['contact_info']
+                 + hours * weights['opening_hours'] + website * weights['website']
+                 + description * weights['description'] + coordinates * weights['coordinates'], 2)
+
+
+def score_venues(venues: List[Dict[str, Any]]) -> VenueScores:
+    """Score a whole venue list in one feature pass"""
+    features = [_venue_features(v) for v in venues]
+    rows = [row for _, row in features]
+    scores = [0.0 if closed else _weighted_score(row) for closed, row in features]
+    return VenueScores(scores, rows)
+
+
+def top_venues(venues: List[Dict[str, Any]], n: int, scores: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    """The n best-scoring venues, best first (ties keep input order) without sorting the whole list"""
+    if scores is None:
+        scores = score_venues(venues).scores
+    return [venues[i] for i in heapq.nlargest(n, range(len(venues)), key=scores.__getitem__)]
+
+
+def select_quality_venues(venues: List[Dict[str, Any]], min_score: float = None,
+                          minimum: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
-    Filter venues to only include high-quality ones.
-    
-    Args:
-        venues: List of venue dictionaries
-        min_score: Minimum quality score (defaults to MINIMUM_QUALITY_SCORE)
-    
-    Returns:
-        List of high-quality venues
+    Venues scoring at least min_score, topped up to `minimum` with the best of the rest.
+
+    Sets `quality_score` on every venue. Returns (selected, topped_up) where
+    `topped_up` are the below-threshold venues appended to `selected`.
     """
     if min_score is None:
         min_score = MINIMUM_QUALITY_SCORE
-    
-    high_quality = []
-    for venue in venues:
-        score = calculate_venue_quality_score(venue)
+
+    scores = score_venues(venues).scores
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    selected = []
+    rest = []
+    for i, (venue, score) in enumerate(zip(venues, scores)):
         venue['quality_score'] = score
         if score >= min_score:
-            high_quality.append(venue)
+            selected.append(venue)
         else:
-            logging.debug(f"Filtered out venue '{venue.get('name', 'Unknown')}' with quality score {score}")
-    
-    return high_quality
+            rest.append(i)
+            if debug:
+                logging.debug("Filtered out venue '%s' with quality score %s", venue.get('name', 'Unknown'), score)
 
+    topped_up = []
+    if len(selected) < minimum and rest:
+        topped_up = [venues[i] for i in heapq.nlargest(minimum - len(selected), rest, key=scores.__getitem__)]
+        selected.extend(topped_up)
+    return selected, topped_up
 
-def get_venue_quality_insights(venue: Dict[str, Any]) -> Dict[str, Any]:
+
+def filter_high_quality_venues(venues: List[Dict[str, Any]], min_score: float = None) -> List[Dict[str, Any]]:
     """
-    Get detailed quality insights for a venue.
+    Filter venues to only include high-quality ones.
+    
+    Args:
+        venues: List of venue dictionaries
+        min_score: Minimum quality score (defaults to MINIMUM_QUALITY_SCORE)
     
     Returns:
-        Dictionary with quality breakdown and improvement suggestions
+        List of high-quality venues
     """
+    return select_quality_venues(venues, min_score)[0]
+
+
+def quality_insights(score: float, components: Tuple[float, ...]) -> Dict[str, Any]:
+    """Quality breakdown and improvement suggestions from a score and its component row"""
     insights = {
-        'overall_score': calculate_venue_quality_score(venue),
-        'components': {},
+        'overall_score': score,
+        'components': {name: value for (name, _), value in zip(QUALITY_COMPONENTS, components)},
         'improvements': []
     }
-    
-    # Calculate individual component scores
-    insights['components']['address'] = _calculate_address_score(venue)
-    insights['components']['contact'] = _calculate_contact_score(venue)
-    insights['components']['hours'] = _calculate_hours_score(venue)
-    insights['components']['website'] = _calculate_website_score(venue)
-    insights['components']['description'] = _calculate_description_score(venue)
-    insights['components']['coordinates'] = _calculate_coordinates_score(venue)
-    
+    parts = insights['components']
+
     # Generate improvement suggestions
-    if insights['components']['address'] < 0.8:
+    if parts['address'] < 0.8:
         insights['improvements'].append("Add complete street address")
     
-    if insights['components']['contact'] < 1.0:
+    if parts['contact'] < 1.0:
         insights['improvements'].append("Add phone number or email")
     
-    if insights['components']['hours'] < 1.0:
+    if parts['hours'] < 1.0:
         insights['improvements'].append("Add detailed opening hours")
     
-    if insights['components']['website'] < 1.0:
+    if parts['website'] < 1.0:
         insights['improvements'].append("Add official website")
     
-    if insights['components']['description'] < 1.0:
+    if parts['description'] < 1.0:
         insights['improvements'].append("Add more descriptive tags")
     
     return insights
 
 
+def get_venue_quality_insights(venue: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get detailed quality insights for a venue.
+    
+    Returns:
+        Dictionary with quality breakdown and improvement suggestions
+    """
+    batch = score_venues([venue])
+    return quality_insights(batch.scores[0], batch.components[0])
+
+
 def is_venue_acceptable(venue: Dict[str, Any], min_score: float = None) -> bool:
     """Check if a venue meets minimum quality standards."""
     return calculate_venue_quality_score(venue) >= (min_score or MINIMUM_QUALITY_SCORE)
@@ -326,9 +301,10 @@ def is_venue_acceptable(venue: Dict[str, Any], min_score: float = None) -> bool:
 
 def enhance_venue_with_quality_data(venue: Dict[str, Any]) -> Dict[str, Any]:
     """Add quality score and insights to venue data."""
+    batch = score_venues([venue])
     venue_copy = venue.copy()
-    venue_copy['quality_score'] = calculate_venue_quality_score(venue)
-    venue_copy['quality_insights'] = get_venue_quality_insights(venue)
+    venue_copy['quality_score'] = batch.scores[0]
+    venue_copy['quality_insights'] = quality_insights(batch.scores[0], batch.components[0])
     return venue_copy
 
 
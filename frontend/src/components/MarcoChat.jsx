@@ -10,7 +10,6 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
     return saved ? JSON.parse(saved) : [];
   });
   const [input, setInput] = useState(initialInput || ''); // allow initial input
-  const [sessionId, setSessionId] = useState(localStorage.getItem('marco_session_id') || null);
   const [loading, setLoading] = useState(false);
   const [userLocation, setUserLocation] = useState(null);
   const [loadingMessage, setLoadingMessage] = useState('');
@@ -98,10 +97,6 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
     ]
   };
 
-  useEffect(() => {
-    if (sessionId) localStorage.setItem('marco_session_id', sessionId);
-  }, [sessionId]);
-
   // Context-aware loading messages
   const getContextualLoadingMessage = (query) => {
     const lower = query.toLowerCase();
@@ -200,12 +195,9 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
     }
 
     try {
-      // Build conversation history from messages (exclude initial message and venue cards)
-      const history = messages
-        .filter(m => m.role && (m.role === 'user' || m.role === 'assistant') && m.text)
-        .slice(-6) // Last 6 messages for context
-        .map(m => ({ role: m.role, content: m.text }));
-      
+      // The server keeps the conversation; we only hold its id (one per city)
+      const conversationKey = `marco_conversation_id:${city || ''}`;
+
       // Use the RAG chat endpoint
       const payload = {
         query: text,
@@ -213,7 +205,7 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
         neighborhood: neighborhood,
         category: category,
         venues: [],
-        history: history, // Send conversation history
+        conversation_id: localStorage.getItem(conversationKey) || 'new',
         max_results: 8
       };
 
@@ -239,9 +231,9 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
         suggestions: suggestions.slice(0, 4) // Add top 4 suggestions
       }]);
       
-      // Update session ID if provided
-      if (data.session_id) {
-        setSessionId(data.session_id);
+      // Remember the conversation id so follow-ups continue it
+      if (data.conversation_id) {
+        localStorage.setItem(conversationKey, data.conversation_id);
       }
     } catch (error) {
       console.error('Chat error:', error);
@@ -256,7 +248,7 @@ export default function MarcoChat({ city, neighborhood, venues, category, initia
     } finally {
       setLoading(false);
     }
-  }, [city, neighborhood, category, sessionId, thinkingMessages, quickResponses, generateSuggestions]);
+  }, [city, neighborhood, category, thinkingMessages, quickResponses, generateSuggestions]);
 
   // Auto-send initialInput if provided
   useEffect(() => {
@@ -0,0 +1,113 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src import app as quart_app_module
+from city_guides.src.routes import chat as chat_routes
+from city_guides.src.services import answer_cache
+from city_guides.src.services.answer_cache import AnswerCache, canonical_query
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.hashes = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+    async def expire(self, key, ttl):
+        pass
+
+
+def test_canonical_query_drops_filler_and_places():
+    places = ('Austin', 'TX', 'US')
+    assert canonical_query('Best tacos in Austin?', places) == 'best taco'
+    assert canonical_query('where are the best TACOS in austin', places) == 'best taco'
+    assert canonical_query("what's a good café near the river", places) == 'good café river'
+
+
+@pytest.mark.asyncio
+async def test_lookup_tiers_and_guards():
+    redis, cache = FakeRedis(), AnswerCache(threshold=0.85)
+    base = {'city': 'Austin', 'state': 'TX', 'country': 'US'}
+    await cache.store(redis, {**base, 'query': 'best coffee shops downtown'}, b'{"answer":"coffee"}', 60)
+
+    raw, tier = await cache.lookup(redis, {**base, 'query': 'Where is the best coffee shop downtown?'})
+    assert (raw, tier) == (b'{"answer":"coffee"}', 'canonical')
+    raw, tier = await cache.lookup(redis, {**base, 'query': 'top coffee shops downtown please', 'lat': 30.1})
+    assert tier == 'canonical'  # 'top' folds to 'best'; coordinates are ignored when a city is given
+    raw, tier = await cache.lookup(redis, {**base, 'query': 'best coffeeshops downtown'})
+    assert tier == 'semantic'
+
+    # other places, other intents and unrelated wording miss
+    assert (await cache.lookup(redis, {'city': 'Dallas', 'query': 'best coffee shops downtown'}))[1] is None
+    assert (await cache.lookup(redis, {**base, 'query': 'best tea shops downtown'}))[1] is None
+    assert (await cache.lookup(redis, {**base, 'query': 'museums downtown'}))[1] is None
+
+    # a fresh process finds the indexed query through Redis
+    other = AnswerCache(threshold=0.85)
+    assert (await other.lookup(redis, {**base, 'query': 'best coffeeshops downtown'}))[1] == 'semantic'
+    snap = cache.snapshot()
+    assert (snap['canonical'], snap['semantic'], snap['miss']) == (2, 1, 3)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('cached, asked, typo', [
+    ('best restaurants downtown', 'best halal restaurants downtown', 'best restaurants downtwn'),
+    ('best restaurants downtown', 'best vegan restaurants downtown', 'best restaurants downtwn'),
+    ('restaurants that are expensive', 'restaurants that are not expensive', 'restaurants that are expensiv'),
+    ('is it safe to walk downtown', 'is it safe to walk at night downtown', 'is it safe to walk downtwn'),
+])
+async def test_extra_qualifier_or_negation_is_a_different_question(cached, asked, typo):
+    redis, cache = FakeRedis(), AnswerCache(threshold=0.85)
+    base = {'city': 'Austin', 'state': 'TX', 'country': 'US'}
+    await cache.store(redis, {**base, 'query': cached}, b'{"answer":"cached"}', 60)
+    # the vectors alone are close enough to hit
+    probe, entry = answer_cache._Entry(cache.canonical({**base, 'query': asked})[0]), answer_cache._Entry(
+        cache.canonical({**base, 'query': cached})[0])
+    assert answer_cache.cosine(probe.vector, entry.vector) >= 0.85
+    assert await cache.lookup(redis, {**base, 'query': asked}) == (None, None)
+    assert (await cache.lookup(redis, {**base, 'query': typo}))[1] == 'semantic'  # typos still hit
+
+
+@pytest.mark.asyncio
+async def test_rag_endpoint_serves_paraphrases_from_cache(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(answer_cache, 'cache', AnswerCache())
+    calls = []
+
+    class FakeRecommender:
+        async def call_groq_chat(self, messages, timeout=None):
+            calls.append(messages)
+            return {'choices': [{'message': {'content': 'Try Taqueria Sol on East 6th.'}}]}
+
+    async def fake_ddgs(query, **kwargs):
+        return [{'title': 'Tacos', 'body': 'Taco places'}]
+
+    monkeypatch.setattr(quart_app_module, 'recommender', FakeRecommender())
+    monkeypatch.setattr(quart_app_module, 'ddgs_search', fake_ddgs)
+    monkeypatch.setattr(quart_app_module, 'redis_client', redis)
+    monkeypatch.setattr(chat_routes, 'should_call_groq', lambda *a: True)
+
+    await chat_routes.build_rag_response({'query': 'best tacos in Austin', 'city': 'Austin'})
+    for query in ('best tacos in Austin', 'Best tacos in Austin?', 'where are the best tacos in austin'):
+        payload, status = await chat_routes.build_rag_response({'query': query, 'city': 'Austin'})
+        assert status == 200 and 'Taqueria' in payload.value['answer']
+    assert len(calls) == 1
+    snap = answer_cache.cache.snapshot()
+    assert (snap['exact'], snap['canonical']) == (1, 2)
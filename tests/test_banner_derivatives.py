@@ -0,0 +1,101 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+
+import pytest
+
+from city_guides.providers import image_provider
+from city_guides.src.services import media_lookup as ml
+
+
+class _FakeContent:
+    def __init__(self, body):
+        self.body = body
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.body), size):
+            yield self.body[i:i + size]
+
+
+class _FakeResponse:
+    status = 200
+
+    def __init__(self, body):
+        self.content = _FakeContent(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeSession:
+    def __init__(self, body):
+        self.body = body
+        self.downloads = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.downloads.append(url)
+        return _FakeResponse(self.body)
+
+
+@pytest.fixture
+def banner_env(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_provider, '_CACHE_FILE', tmp_path / 'banner_cache.json')
+    monkeypatch.setattr(image_provider, '_BANNERS_DIR', tmp_path / 'banners')
+    monkeypatch.setattr(image_provider, '_INCOMING_DIR', tmp_path / 'banners' / '.incoming')
+    monkeypatch.setattr(image_provider, '_cache_data', {})
+    monkeypatch.setattr(image_provider, '_cache_mtime', None)
+    monkeypatch.setattr(ml, 'media_lookup', ml.MediaLookup(memory_size=0))
+    monkeypatch.setenv('BANNER_STORE_LOCAL', '1')
+    meta = {'remote_url': 'https://upload.wikimedia.org/lisbon.jpg', 'attribution': 'Wikimedia'}
+
+    async def fake_fetch(city, session=None):
+        return dict(meta)
+
+    monkeypatch.setattr(image_provider, 'fetch_banner_from_wikipedia', fake_fetch)
+    return tmp_path, meta
+
+
+def test_immutable_banner_names():
+    assert image_provider.is_immutable_banner('lisbon-0123456789ab-960.webp')
+    assert image_provider.is_immutable_banner('lisbon-0123456789ab.jpg')
+    assert not image_provider.is_immutable_banner('lisbon.jpg')
+
+
+@pytest.mark.asyncio
+async def test_original_served_content_hashed_without_pillow(banner_env, monkeypatch):
+    tmp_path, meta = banner_env
+    monkeypatch.setattr(image_provider, '_pil', lambda: None)
+    session = FakeSession(b'not really a jpeg')
+
+    banner = await image_provider.get_banner_for_city('Lisbon', session=session)
+    assert image_provider.is_immutable_banner(banner['url'].rsplit('/', 1)[-1])
+    assert banner['srcset'] == {'image/jpeg': banner['url']}
+    assert not list((tmp_path / 'banners' / '.incoming').iterdir())
+
+    # Expired record with an unchanged remote image is refreshed without a download
+    image_provider._store_record('lisbon', dict(image_provider._load_cache()['lisbon'],
+                                                generated_at='2000-01-01T00:00:00'))
+    again = await image_provider.get_banner_for_city('Lisbon', session=session)
+    assert again['url'] == banner['url']
+    assert len(session.downloads) == 1
+
+
+@pytest.mark.asyncio
+async def test_derivatives_built_once_per_width_and_format(banner_env):
+    Image = pytest.importorskip('PIL.Image')
+    buf = io.BytesIO()
+    Image.new('RGB', (1200, 600), (200, 80, 40)).save(buf, format='JPEG')
+    session = FakeSession(buf.getvalue())
+
+    banner = await image_provider.get_banner_for_city('Lisbon', session=session)
+    assert banner['width'] == 1200 and banner['height'] == 600
+    jpeg = banner['srcset']['image/jpeg'].split(', ')
+    assert [entry.rsplit(' ', 1)[-1] for entry in jpeg] == ['480w', '960w', '1200w']
+    assert banner['url'].endswith('-1200.jpg')
+    with Image.open(banner_env[0] / 'banners' / jpeg[0].split(' ')[0].rsplit('/', 1)[-1]) as small:
+        assert small.size == (480, 240)
@@ -0,0 +1,47 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import BENCHMARKS
+from benchmarks import cases  # noqa: F401
+from benchmarks import fixtures
+from benchmarks.runner import compare, measure_allocations, run_benchmark
+
+
+def test_fixture_is_a_large_city_response():
+    elements = fixtures.overpass_response()['elements']
+    assert len(elements) >= 2000
+    assert any('center' in e for e in elements) and any(not e['tags'].get('name') for e in elements)
+
+
+def test_every_case_sets_up_and_runs():
+    assert len(BENCHMARKS) == 8
+    for name, setup in BENCHMARKS.items():
+        setup()()
+
+
+def test_run_benchmark_reports_time_and_allocations():
+    result = run_benchmark(lambda: (lambda: [str(i) for i in range(100)]), round_time=0.001, rounds=3)
+    assert result['ns_per_op'] > 0 and result['relative'] > 0
+    assert result['alloc_blocks'] >= 100 and result['peak_bytes'] > 0
+
+
+def test_allocations_exclude_unretained_work():
+    assert measure_allocations(lambda: sum(range(1000)))['alloc_blocks'] == 1  # just the result
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = {'benchmarks': {
+        'a': {'relative': 10.0, 'peak_bytes': 1000},
+        'b': {'relative': 10.0, 'peak_bytes': 1000, 'threshold': 0.5},
+    }}
+    results = {
+        'a': {'relative': 13.0, 'peak_bytes': 1000},
+        'b': {'relative': 13.0, 'peak_bytes': 1000},
+        'c': {'relative': 1.0, 'peak_bytes': 1},
+    }
+    report = compare(results, baseline, threshold=0.25)
+    assert report['a']['status'] == 'regressed' and report['a']['regressed'] == ['time']
+    assert report['b']['status'] == 'ok'  # per-benchmark threshold
+    assert report['c'] == {'status': 'new'}
+    assert compare({'a': {'relative': 10.0, 'peak_bytes': 2000}}, baseline)['a']['regressed'] == ['memory']
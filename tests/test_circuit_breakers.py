@@ -0,0 +1,188 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+
+import pytest
+
+from city_guides.providers import circuit_breakers as cb
+from city_guides.providers import multi_provider as mp
+
+
+def test_breaker_trips_on_error_rate_and_probes_after_cooldown():
+    b = cb.CircuitBreaker('test', window=10, min_calls=4, error_rate=0.5, cooldown=10, max_cooldown=40)
+    for ok in (True, False, True):
+        (b.record_success if ok else b.record_failure)(0.1, now=100)
+    assert b.state == cb.CLOSED  # below min_calls
+    b.record_failure(0.1, 'boom', now=100)
+    assert b.state == cb.OPEN and b.trips == 1
+    assert not b.allow(now=105) and b.rejected == 1
+
+    # Half-open: one probe at a time; a failed probe doubles the cool-down
+    assert b.allow(now=111) and b.state == cb.HALF_OPEN
+    assert not b.allow(now=111)
+    b.record_failure(0.1, 'still down', now=111)
+    assert b.state == cb.OPEN and b.cooldown == 20
+    assert not b.allow(now=125)
+    assert b.allow(now=132)
+    b.record_success(0.1, now=132)
+    assert b.state == cb.CLOSED and b.cooldown == 10
+    assert b.snapshot()['trips'] == 2
+
+
+def test_breaker_trips_on_slow_calls():
+    b = cb.CircuitBreaker('slow', min_calls=3, slow_rate=0.6, slow_call=5.0)
+    for _ in range(3):
+        b.record_success(6.0)
+    assert b.state == cb.OPEN
+
+
+def test_adaptive_timeout_follows_tail_latency(monkeypatch):
+    monkeypatch.setattr(cb, 'ADAPTIVE_TIMEOUT_MIN', 1.0)
+    b = cb.CircuitBreaker('lat', min_calls=5)
+    assert b.timeout(12.0) == 12.0  # not enough samples yet
+    for s in (0.4, 0.5, 0.6, 0.5, 1.5):
+        b.record_success(s)
+    assert b.timeout(12.0) == pytest.approx(3.0)
+    for _ in range(5):
+        b.record_success(0.1)
+    assert b.timeout(12.0) == pytest.approx(3.0)  # p95 still the slow outlier
+    assert b.timeout(2.0) == 2.0
+
+
+def test_adaptive_timeout_grows_back_after_a_slowdown():
+    b = cb.CircuitBreaker('slower', error_rate=1.1)  # keep it closed; only the timeout is under test
+    for _ in range(50):
+        b.record_success(0.5)
+    assert b.timeout(12.0) == 2.0
+    outcomes = []
+    for _ in range(10):  # provider now answers in 3s
+        t = b.timeout(12.0)
+        if 3.0 > t:
+            b.record_failure(t, 'timeout', timed_out=True)
+        else:
+            b.record_success(3.0)
+        outcomes.append(3.0 <= t)
+    assert outcomes[:3] == [False] * 3 and all(outcomes[3:])
+
+    b._open(None)
+    assert b.allow(now=time.monotonic() + b.cooldown + 1) and b.state == cb.HALF_OPEN
+    assert b.timeout(12.0) == 12.0  # the probe gets the ceiling
+
+
+@pytest.mark.asyncio
+async def test_discover_returns_at_soft_deadline_once_primary_answers(monkeypatch):
+    cb.reset()
+    monkeypatch.setattr(mp, 'POI_SOFT_DEADLINE', 0.2)
+    monkeypatch.setattr(mp, 'opentripmap_provider', None)
+
+    class FakeOverpass:
+        @staticmethod
+        async def async_discover_pois(city, poi_type, limit, local_only, bbox=None, session=None):
+            return [{'id': 'osm:1', 'name': 'Fast Museum', 'lat': 1.0, 'lon': 2.0, 'tags': {}}]
+
+        @staticmethod
+        def discover_pois(*a, **k):
+            return []
+
+        @staticmethod
+        async def geoapify_discover_pois(bbox, neighborhood, poi_type, limit, session=None):
+            await asyncio.sleep(1.0)
+            return [{'id': 'geo:1', 'name': 'Slow Museum', 'lat': 1.0, 'lon': 2.0}]
+
+    monkeypatch.setattr(mp, 'overpass_provider', FakeOverpass)
+    started = time.monotonic()
+    results = await mp.async_discover_pois('Paris', 'museum', limit=10, bbox=(0, 0, 5, 5))
+    assert time.monotonic() - started < 0.8
+    assert [r['name'] for r in results] == ['Fast Museum']
+
+    # The late geoapify call finishes in the background and still feeds its breaker
+    await asyncio.gather(*mp._late_provider_tasks)
+    snap = cb.snapshot()
+    assert set(snap) == {'overpass', 'geoapify'}
+    assert cb.breaker('geoapify')._latencies
+    cb.reset()
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_skips_provider(monkeypatch):
+    cb.reset()
+    monkeypatch.setattr(mp, 'opentripmap_provider', None)
+    calls = []
+
+    class FakeOverpass:
+        @staticmethod
+        async def async_discover_pois(city, poi_type, limit, local_only, bbox=None, session=None):
+            calls.append(city)
+            return []
+
+        @staticmethod
+        def discover_pois(*a, **k):
+            return []
+
+    monkeypatch.setattr(mp, 'overpass_provider', FakeOverpass)
+    cb.breaker('overpass')._open(None)
+    assert await mp.async_discover_pois('Paris', 'museum', bbox=(0, 0, 5, 5)) == []
+    assert calls == [] and cb.snapshot()['overpass']['rejected'] == 1
+    cb.reset()
+
+
+class SlowGeoapifyOverpass:
+    @staticmethod
+    async def async_discover_pois(city, poi_type, limit, local_only, bbox=None, session=None):
+        return [{'id': 'osm:1', 'name': 'Fast Museum', 'lat': 1.0, 'lon': 2.0, 'tags': {}}]
+
+    @staticmethod
+    def discover_pois(*a, **k):
+        return []
+
+    @staticmethod
+    async def geoapify_discover_pois(bbox, neighborhood, poi_type, limit, session=None):
+        await asyncio.sleep(5.0)
+        return []
+
+
+def _half_open(name):
+    b = cb.breaker(name)
+    b._open(None)
+    b.opened_at -= b.cooldown + 1  # cool-down over: the next call is the probe
+    return b
+
+
+def test_late_probe_on_a_temporary_loop_frees_its_breaker(monkeypatch):
+    """_search_impl runs the fan-out on a new_event_loop() that it closes afterwards"""
+    import gc
+
+    cb.reset()
+    monkeypatch.setattr(mp, 'POI_SOFT_DEADLINE', 0.05)
+    monkeypatch.setattr(mp, 'opentripmap_provider', None)
+    monkeypatch.setattr(mp, 'overpass_provider', SlowGeoapifyOverpass)
+
+    # cancelled before the loop closes (the persistence path)
+    geo = _half_open('geoapify')
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(mp.async_discover_pois('Paris', 'museum', limit=10, bbox=(0, 0, 5, 5)))
+        assert geo.state == cb.HALF_OPEN and geo._probe_inflight
+        assert loop.run_until_complete(mp.cancel_late_provider_tasks()) == 1
+    finally:
+        loop.close()
+    assert not geo._probe_inflight and not mp._late_provider_tasks
+    assert geo.allow()
+
+    # loop closed with the call still pending: the slot is freed once the task is collected
+    geo = _half_open('geoapify')
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(mp.async_discover_pois('Paris', 'museum', limit=10, bbox=(0, 0, 5, 5)))
+    loop.close()
+    assert geo._probe_inflight
+    loop = asyncio.new_event_loop()  # the next fan-out prunes the dead task (probe still rejected)
+    try:
+        loop.run_until_complete(mp.async_discover_pois('Paris', 'museum', limit=10, bbox=(0, 0, 5, 5)))
+    finally:
+        loop.close()
+    gc.collect()
+    assert not geo._probe_inflight and not mp._late_provider_tasks
+    cb.reset()
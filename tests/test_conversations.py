@@ -0,0 +1,112 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src import app as quart_app_module
+from city_guides.src.routes import chat as chat_routes
+from city_guides.src.semantic import ConversationAnalyzer, ConversationMemory
+from city_guides.src.services import conversations
+from city_guides.src.services.conversations import ConversationState, ConversationStore
+from city_guides.src.services.near_cache import InvalidationBus, NearCache
+
+HISTORY = """User: any good coffee near the river?
+Marco: You could try Café Lumen Riverside. It opens at 7.
+User: I want dark strong coffee please
+Marco: Same answer as before.
+Marco: Same answer as before.
+User: i just told you, something with a patio"""
+
+
+def test_incremental_fold_matches_history_views():
+    state = ConversationState()
+    for line in HISTORY.split('\n'):
+        state.add_line(line)
+    memory, analyzer = ConversationMemory(HISTORY), ConversationAnalyzer(HISTORY)
+
+    assert memory.user_interests == state.interests == ['coffee', 'dark', 'outdoor']
+    assert memory.venues_mentioned == ['Café Lumen Riverside']
+    assert memory.should_reference_previous()
+    assert analyzer.user_frustration == 1 and analyzer.repeated_response_count == 2
+    assert analyzer.specific_intents == ['outdoor_seating']
+    assert analyzer.get_response_strategy() == 'address_specific_intent'
+    assert ConversationAnalyzer(state=ConversationState.from_dict(state.to_dict())).topic == analyzer.topic == 'coffee'
+
+
+def test_prompt_stays_flat_as_the_conversation_grows():
+    state = ConversationState('c1')
+    sizes = []
+    for i in range(60):
+        state.add_message('user', f'question {i} about museums in the old town. More detail here.')
+        state.add_message('assistant', f'Answer {i}: visit the museum quarter. Lots more text follows.')
+        sizes.append(sum(len(m['content']) for m in state.prompt_messages()))
+    assert state.turns == 60 and len(state.messages) == conversations.CONVERSATION_PROMPT_MESSAGES
+    assert len(state.summary) == conversations.CONVERSATION_SUMMARY_LINES
+    assert sizes[-1] <= sizes[10] + 10
+    assert state.prompt_messages()[0]['role'] == 'system'
+
+
+def test_normalize_id():
+    assert len(conversations.normalize_id('new')) == 32
+    assert conversations.normalize_id('abc12345') == 'abc12345'
+    assert conversations.normalize_id('no spaces allowed') is None
+
+
+@pytest.mark.asyncio
+async def test_rag_endpoint_keeps_state_by_conversation_id(monkeypatch):
+    store = ConversationStore(NearCache('conversations-test', invalidation=InvalidationBus()))
+    monkeypatch.setattr(conversations, 'store', store)
+    sent = []
+
+    class FakeRecommender:
+        async def call_groq_chat(self, messages, timeout=None):
+            sent.append(messages)
+            return {'choices': [{'message': {'content': f'Reply {len(sent)}: try Bar Nuvola tonight.'}}]}
+
+    async def fake_ddgs(query, **kwargs):
+        return [{'title': 'Bars', 'body': 'Nice bars'}]
+
+    monkeypatch.setattr(quart_app_module, 'recommender', FakeRecommender())
+    monkeypatch.setattr(quart_app_module, 'ddgs_search', fake_ddgs)
+    monkeypatch.setattr(quart_app_module, 'redis_client', None)
+    monkeypatch.setattr(chat_routes, 'should_call_groq', lambda *a: True)
+
+    first, status = await chat_routes.build_rag_response({'query': 'cocktail bars', 'city': 'Rome',
+                                                          'conversation_id': 'new'})
+    assert status == 200
+    cid = first['conversation_id']
+    second, _ = await chat_routes.build_rag_response({'query': 'which one is quieter?', 'city': 'Rome',
+                                                      'conversation_id': cid})
+    assert second['conversation_id'] == cid
+    roles = [m['role'] for m in sent[1]]
+    assert roles == ['system', 'system', 'user', 'assistant', 'user']
+    assert 'bars' in sent[1][1]['content']  # interests carried in the summary message
+    assert (await store.load(cid)).turns == 2
+
+    bad, status = await chat_routes.build_rag_response({'query': 'hi', 'conversation_id': '../etc'})
+    assert status == 400
+
+
+@pytest.mark.asyncio
+async def test_search_and_reason_uses_the_loaded_conversation(monkeypatch):
+    from city_guides.src import semantic
+    store = ConversationStore(NearCache('conversations-test', invalidation=InvalidationBus()))
+    await store.record_turn(await store.load('abc12345'), 'any good coffee near the river?',
+                            'You could try Café Lumen Riverside.')
+    seen = {}
+
+    class Stop(Exception):
+        pass
+
+    def fake_analyzer(history, state=None):
+        seen.update(history=history, state=state)
+        raise Stop
+
+    monkeypatch.setattr(semantic, 'ConversationAnalyzer', fake_analyzer)
+    conversation = await store.load('abc12345')
+    with pytest.raises(Stop):
+        await semantic.search_and_reason('which one opens earliest?', 'Rome', history='User: ignored',
+                                         conversation=conversation)
+    assert seen['state'] is conversation and seen['state'].turns == 1
+    assert seen['history'] == 'User: any good coffee near the river?\nMarco: You could try Café Lumen Riverside.'
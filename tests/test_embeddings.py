@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.providers import http_clients
+from city_guides.src import semantic
+from city_guides.src.services import embeddings
+from city_guides.src.services.embeddings import FALLBACK_MODEL, EmbeddingService, VectorStore
+
+
+class FakeResponse:
+    def __init__(self, status, payload=None):
+        self.status = status
+        self._payload = payload
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeEmbeddingSession:
+    """Embeds each input as [len(text), 1.0]; `up=False` makes every call fail"""
+
+    def __init__(self, up=True):
+        self.up = up
+        self.batches = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.batches.append(list(json['input']))
+        if not self.up:
+            return FakeResponse(503)
+        data = [{'index': i, 'embedding': [float(len(t)), 1.0]} for i, t in enumerate(json['input'])]
+        return FakeResponse(200, {'data': list(reversed(data))})
+
+
+class ClosedSession:
+    def post(self, *args, **kwargs):
+        raise RuntimeError('Session is closed')
+
+
+@pytest.fixture
+def groq_key(monkeypatch):
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+
+
+def _shared_pool(monkeypatch, session):
+    # queued batches always go out on http_clients' shared pool
+    monkeypatch.setattr(http_clients, 'get_session', lambda: session)
+    return session
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_batch_and_are_cached(tmp_path, groq_key, monkeypatch):
+    session = _shared_pool(monkeypatch, FakeEmbeddingSession())
+    service = EmbeddingService(VectorStore(tmp_path / 'e.sqlite3'), batch_size=16, window_ms=20)
+
+    texts = ['tram', 'ferry boat', 'tram', 'night bus']
+    results = await asyncio.gather(*(service.embed(t, session=session) for t in texts))
+
+    assert len(session.batches) == 1 and sorted(session.batches[0]) == ['ferry boat', 'night bus', 'tram']
+    assert [r.vector[0] for r in results] == [4.0, 10.0, 4.0, 9.0]
+    assert all(r.model == service.model for r in results)
+
+    # a new process (empty memory) is served from disk without calling the API
+    restarted = EmbeddingService(VectorStore(tmp_path / 'e.sqlite3'))
+    again = await restarted.embed_many(['ferry boat', 'tram'], session=session)
+    assert len(session.batches) == 1
+    assert [r.vector for r in again] == [[10.0, 1.0], [4.0, 1.0]]
+    assert restarted.snapshot()['disk_hits'] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_size_flushes_without_waiting(tmp_path, groq_key, monkeypatch):
+    session = _shared_pool(monkeypatch, FakeEmbeddingSession())
+    service = EmbeddingService(VectorStore(tmp_path / 'e.sqlite3'), batch_size=3, window_ms=10_000)
+    out = await asyncio.wait_for(service.embed_many([f'text {i}' for i in range(7)], session=session), 2)
+    assert len(out) == 7
+    assert [len(b) for b in session.batches] == [3, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_fallback_vectors_are_flagged_and_recomputed(tmp_path, groq_key, monkeypatch):
+    down = _shared_pool(monkeypatch, FakeEmbeddingSession(up=False))
+    service = EmbeddingService(VectorStore(tmp_path / 'e.sqlite3'))
+    emb = await service.embed('harbour market at dawn', session=down)
+    assert emb.fallback and emb.model == FALLBACK_MODEL and len(emb.vector) == 128
+
+    # the index never compares fallback vectors with API vectors
+    index = semantic.InMemoryIndex()
+    index.add(emb.vector, {'hash': embeddings.content_hash('harbour market at dawn'), 'embedding_model': emb.model})
+    assert index.search([1.0, 1.0], model=service.model) == []
+
+    upgraded = await service.recompute_fallbacks(session=FakeEmbeddingSession())
+    assert index.replace_vectors(upgraded) == 1
+    assert index.search([22.0, 1.0], model=service.model)[0]['score'] == pytest.approx(1.0)
+    assert not (await service.embed('harbour market at dawn', session=down)).fallback
+
+
+@pytest.mark.asyncio
+async def test_a_callers_closed_session_is_never_reused(tmp_path, groq_key, monkeypatch):
+    pool = _shared_pool(monkeypatch, FakeEmbeddingSession())
+    service = EmbeddingService(VectorStore(tmp_path / 'e.sqlite3'), window_ms=1)
+    assert not (await service.embed('old town walk', session=ClosedSession())).fallback
+    assert not (await service.embed('harbour ferry')).fallback
+    assert pool.batches == [['old town walk'], ['harbour ferry']]
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src import persistence
+from city_guides.src.services import exchange_rates
+
+RATES = {'base': 'USD', 'time_last_updated': 1760745600, 'rates': {'USD': 1, 'EUR': 0.8, 'GBP': 0.5, 'JPY': 150}}
+COUNTRIES = [{'name': {'common': 'Japan', 'official': 'Japan'}, 'currencies': {'JPY': {'name': 'Japanese yen'}}},
+             {'name': {'common': 'Fiji'}, 'currencies': {'FJD': {'name': 'Fijian dollar'}}}]
+
+
+class _Resp:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self, content_type=None):
+        await asyncio.sleep(0)
+        return self.body
+
+
+class FakeSession:
+    def __init__(self, status=200):
+        self.status = status
+        self.calls = []
+
+    def get(self, url, params=None):
+        self.calls.append(url)
+        return _Resp(self.status, COUNTRIES if 'restcountries' in url else RATES)
+
+
+@pytest.mark.asyncio
+async def test_cross_rates_persist_and_survive_outages(tmp_path):
+    path = tmp_path / 'rates.json'
+    table = exchange_rates.ExchangeRateTable(path=path)
+    session = FakeSession()
+    assert await asyncio.gather(table.refresh(session), table.refresh(session)) == [True, True]
+    assert len([u for u in session.calls if 'exchangerate' in u]) == 1  # single flight
+
+    assert table.rate('EUR', 'GBP') == pytest.approx(0.625)
+    result = table.convert(100, 'gbp', 'jpy')
+    assert result['converted'] == pytest.approx(30000) and result['as_of'] == 1760745600
+    assert not result['stale'] and table.convert(1, 'EUR', 'XXX') is None
+    assert table.currency_for_country('japan') == 'JPY' and table.currency_name('FJD') == 'Fijian dollar'
+
+    # cold start from the persisted copy, with the API down
+    restarted = exchange_rates.ExchangeRateTable(path=path, max_age=0)
+    assert await restarted.refresh(FakeSession(status=503)) is False
+    stale = restarted.convert(10, 'USD', 'EUR')
+    assert stale['converted'] == pytest.approx(8) and stale['stale']
+
+
+@pytest.mark.asyncio
+async def test_convert_currency_answers_from_the_table(tmp_path, monkeypatch):
+    from city_guides.src import semantic
+    table = exchange_rates.ExchangeRateTable(path=tmp_path / 'rates.json')
+    monkeypatch.setattr(exchange_rates, 'table', table)
+    session = FakeSession()
+    answer = await semantic.convert_currency(100, 'EUR', 'USD', session=session)
+    assert answer == '100 EUR = 125.00 USD (rates as of 2025-10-18 00:00 UTC)'
+    await semantic.convert_currency(5, 'USD', 'GBP', session=session)
+    assert len([u for u in session.calls if 'exchangerate' in u]) == 1
+
+
+def test_currency_helpers_use_the_local_table(tmp_path, monkeypatch):
+    table = exchange_rates.ExchangeRateTable(path=tmp_path / 'rates.json')
+    table.data.update(countries={'fiji': 'FJD'}, names={'FJD': 'Fijian dollar'})
+    monkeypatch.setattr(exchange_rates, 'table', table)
+    assert persistence.get_currency_for_country('Fiji') == 'FJD'
+    assert persistence.get_currency_name('fjd') == 'Fijian dollar'
+    assert persistence.get_currency_name('EUR') == 'Euro'
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src.app import app as quart_app
+from city_guides.src.services import gazetteer
+from city_guides.src.services.gazetteer import Gazetteer
+
+
+def _summary(text):
+    found = gazetteer.extract(text)
+    return {kind: found[kind]['name'] if found[kind] else None for kind in ('city', 'neighborhood', 'region')}
+
+
+def test_places_are_found_inside_free_text():
+    assert _summary('tacos in rio de janeiro tonight')['city'] == 'Rio de Janeiro'
+    assert _summary('nightlife in Shoreditch, London') == {'city': 'London', 'neighborhood': 'Shoreditch', 'region': None}
+    assert _summary('coffee in Belem')['neighborhood'] == 'Belém'
+    assert _summary('le marais bars')['neighborhood'] == '3e Arrondissement (Le Marais)'  # from data/europe/france.json
+    assert _summary('romantic sunset in the swiss alps')['region'] == 'Swiss Alps'
+    # a neighborhood of another city is not attached to the city that was asked about
+    assert _summary('soho in new york')['neighborhood'] is None
+
+
+def test_fuzzy_fallback_and_intent_spans():
+    found = gazetteer.extract('Barcelonna beaches near the shore')
+    assert found['city']['name'] == 'Barcelona' and found['city']['confidence'] == 'medium'
+    assert found['intents'] == ['beaches']
+    assert [(s['type'], s['text']) for s in found['spans']] == [
+        ('city', 'Barcelonna'), ('intent', 'beaches'), ('intent', 'shore')]
+    # intent words inside a place name are not intents
+    assert gazetteer.extract('Shoreditch')['intents'] == []
+    assert gazetteer.extract('best cafes')['city'] is None
+
+
+def test_lookup_cost_does_not_grow_with_the_gazetteer():
+    gaz = Gazetteer()
+    for i in range(30000):
+        gaz.add(f'placeville {i:05d} x{i}', 'city', {'city': f'Place {i}'})
+    gaz.add('Springfield', 'city', {'city': 'Springfield'})
+    start = time.perf_counter()
+    for _ in range(200):
+        found = gaz.extract('weekend trip to springfeld for food and museums')
+    assert found['city']['name'] == 'Springfield'
+    assert (time.perf_counter() - start) / 200 < 0.01
+
+
+@pytest.mark.asyncio
+async def test_parse_dream_endpoint():
+    async with quart_app.test_client() as client:
+        resp = await client.post('/api/parse-dream', json={'query': 'Brooklyn pizza and museums'})
+        data = await resp.get_json()
+    assert resp.status_code == 200
+    assert (data['city'], data['neighborhood'], data['intent']) == ('New York', 'Brooklyn', 'culture')
+    assert data['confidence'] == 'very_high'
+    assert {s['type'] for s in data['spans']} == {'neighborhood', 'intent'}
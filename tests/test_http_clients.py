@@ -0,0 +1,113 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from city_guides.providers import http_clients
+from city_guides.providers.utils import get_session
+
+
+@pytest_asyncio.fixture
+async def upstream():
+    state = {'calls': 0, 'agents': []}
+
+    async def flaky(request):
+        state['calls'] += 1
+        state['agents'].append(request.headers.get('User-Agent'))
+        if state['calls'] == 1:
+            return web.Response(status=503)
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/flaky', flaky)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f'http://127.0.0.1:{port}', state
+    await http_clients.close()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_profile_retries_and_records_per_host_stats(upstream, monkeypatch):
+    base, state = upstream
+    monkeypatch.setitem(http_clients.PROFILES, 'local', http_clients.HttpProfile(
+        'local', ('127.0.0.1',), timeout=5, retries=2, backoff=0, user_agent='Test/1.0'))
+
+    async with get_session() as session:
+        async with session.get(base + '/flaky') as resp:
+            assert resp.status == 200
+            assert await resp.json() == {'ok': True}
+    assert state['calls'] == 2
+    assert state['agents'] == ['Test/1.0', 'Test/1.0']
+
+    # The pooled session survives `async with` and is reused
+    assert not session.closed
+    assert http_clients.get_session() is session
+
+    stats = http_clients.snapshot()['127.0.0.1']
+    assert stats['profile'] == 'local'
+    assert stats['requests'] == 2 and stats['retries'] == 1 and stats['errors'] == 1
+    assert stats['p50_ms'] is not None
+
+
+@pytest.mark.asyncio
+async def test_foreign_loop_gets_one_private_session(upstream):
+    base, _ = upstream
+    shared = http_clients.get_session()
+
+    async def in_temp_loop():
+        async with http_clients.get_session() as private:
+            assert private is not shared
+        # Reused by every caller on the loop until the loop tears it down
+        assert http_clients.get_session() is private and not private.closed
+        await http_clients.close_loop_session()
+        return private.closed
+
+    closed = await asyncio.get_running_loop().run_in_executor(None, asyncio.run, in_temp_loop())
+    assert closed
+    assert not shared.closed
+
+
+@pytest.mark.asyncio
+async def test_session_of_a_closed_loop_is_released(upstream):
+    shared = http_clients.get_session()
+
+    async def leave_open():
+        return http_clients.get_session()
+
+    private = await asyncio.get_running_loop().run_in_executor(None, asyncio.run, leave_open())
+    assert not private.closed
+    assert http_clients.get_session() is shared
+    assert private.closed
+
+
+@pytest.mark.asyncio
+async def test_host_cap_is_shared_across_sessions(monkeypatch):
+    profile = http_clients.HttpProfile('capped', ('capped.test',), max_concurrency=1)
+    monkeypatch.setattr(http_clients, '_gates', {})
+    gate = http_clients._gate('capped.test', profile)
+    assert http_clients._gate('capped.test', profile) is gate
+
+    await gate.acquire()
+
+    def other_loop():
+        async def contend():
+            try:
+                await asyncio.wait_for(gate.acquire(), 0.05)
+            except asyncio.TimeoutError:
+                return False
+            gate.release()
+            return True
+        return asyncio.run(contend())
+
+    assert not await asyncio.get_running_loop().run_in_executor(None, other_loop)
+    gate.release()
+    assert await asyncio.get_running_loop().run_in_executor(None, other_loop)
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src import semantic
+from city_guides.src.services import ingestion
+from city_guides.src.services.embeddings import Embedding
+from city_guides.src.services.ingestion import IngestionPipeline, chunk_sentences
+
+
+class FakeResponse:
+    def __init__(self, status, html='', headers=None):
+        self.status = status
+        self._html = html
+        self.headers = headers or {}
+        self.content_length = len(html)
+
+    async def text(self, errors='strict'):
+        return self._html
+
+
+class FakeRequest:
+    def __init__(self, session, url, headers):
+        self.session, self.url, self.headers = session, url, headers
+
+    async def __aenter__(self):
+        s = self.session
+        s.requests.append((self.url, dict(self.headers)))
+        s.active += 1
+        s.peak = max(s.peak, s.active)
+        await asyncio.sleep(0.01)
+        s.active -= 1
+        page = s.pages[self.url]
+        if page.get('etag') and self.headers.get('If-None-Match') == page['etag']:
+            return FakeResponse(304)
+        return FakeResponse(200, page['html'], {'ETag': page.get('etag')} if page.get('etag') else {})
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+
+    def get(self, url, headers=None, timeout=None):
+        return FakeRequest(self, url, headers or {})
+
+
+class ListIndex:
+    def __init__(self):
+        self.items = []
+
+    def add(self, emb, meta):
+        self.items.append(meta)
+
+    def remove_source(self, source):
+        before = len(self.items)
+        self.items = [m for m in self.items if m['source'] != source]
+        return before - len(self.items)
+
+
+async def fake_embed_many(texts, session=None):
+    return [Embedding([float(len(t))], 'fake') for t in texts]
+
+
+def _page(body):
+    return f"<html><script>var x = 1;</script><body><h1>Guide</h1><p>{body}</p></body></html>"
+
+
+def test_chunks_end_on_sentences_and_overlap():
+    sentences = [f"Sentence number {i} talks about the old town." for i in range(40)]
+    chunks = chunk_sentences(" ".join(sentences), max_chars=200, overlap=60)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 200
+        assert chunk.endswith('.')
+    for prev, nxt in zip(chunks, chunks[1:]):
+        # the next chunk starts with the previous chunk's last sentence
+        assert prev.endswith(nxt.split('. ')[0] + '.')
+    # a sentence longer than a chunk is cut between words
+    long = chunk_sentences("word " * 100, max_chars=50, overlap=0)
+    assert all(len(c) <= 50 for c in long) and ' '.join(long).split() == ['word'] * 100
+
+
+@pytest.mark.asyncio
+async def test_pipeline_bounds_hosts_and_indexes_chunks():
+    pages = {f"https://a.example/{i}": {'html': _page(f"Page {i} is about tram line {i}.")} for i in range(6)}
+    pages.update({f"https://b.example/{i}": {'html': _page(f"Other page {i} covers ferry {i}.")} for i in range(6)})
+    session = FakeSession(pages)
+    index = ListIndex()
+    pipeline = IngestionPipeline(index=index, embed_many=fake_embed_many, concurrency=8, per_host=2)
+
+    run = await pipeline.ingest(list(pages), session=session)
+
+    assert run['urls'] == 12 and run['chunks'] == 12
+    assert 2 < session.peak <= 4  # concurrent, but at most two requests per host
+    assert {m['source'] for m in index.items} == set(pages)
+    assert all('var x' not in m['snippet'] for m in index.items)
+    snap = pipeline.snapshot()
+    assert snap['indexed_pages'] == 12 and snap['in_progress'] == 0 and snap['errors'] == 0
+
+
+@pytest.mark.asyncio
+async def test_revalidation_and_duplicate_content_are_skipped():
+    html = _page("The harbour market opens at dawn. Fishermen sell the morning catch.")
+    pages = {
+        'https://a.example/market': {'html': html, 'etag': '"v1"'},
+        'https://mirror.example/market': {'html': html},
+        'https://a.example/missing': {'html': ''},
+    }
+    session = FakeSession(pages)
+    index = ListIndex()
+    pipeline = IngestionPipeline(index=index, embed_many=fake_embed_many)
+
+    first = await pipeline.ingest(['https://a.example/market', 'https://a.example/missing'], session=session)
+    assert first['chunks'] == 1
+
+    second = await pipeline.ingest(['https://a.example/market', 'https://mirror.example/market'], session=session)
+    assert second['chunks'] == 0
+    revalidation = [h for url, h in session.requests if url == 'https://a.example/market'][-1]
+    assert revalidation.get('If-None-Match') == '"v1"'
+    snap = pipeline.snapshot()
+    assert snap['not_modified'] == 1 and snap['duplicate_pages'] == 1
+    assert len(index.items) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_page_is_not_remembered_and_changed_page_replaces_its_chunks():
+    url = 'https://a.example/guide'
+    pages = {url: {'html': _page("The tram runs all night. Tickets cost two euros."), 'etag': '"v1"'}}
+    session = FakeSession(pages)
+    index = ListIndex()
+    failing = True
+
+    async def flaky_embed_many(texts, session=None):
+        if failing:
+            raise RuntimeError('embedding service down')
+        return await fake_embed_many(texts, session=session)
+
+    pipeline = IngestionPipeline(index=index, embed_many=flaky_embed_many, chunk_chars=30, overlap=0)
+    assert (await pipeline.ingest([url], session=session))['chunks'] == 0
+    # nothing indexed, so no validators or hashes were kept: the next run fetches and indexes it
+    failing = False
+    assert (await pipeline.ingest([url], session=session))['chunks'] == 2
+    assert 'If-None-Match' not in session.requests[1][1]
+    assert (await pipeline.ingest([url], session=session))['chunks'] == 0  # 304
+
+    pages[url] = {'html': _page("The tram runs all night. Tickets now cost three euros."), 'etag': '"v2"'}
+    await pipeline.ingest([url], session=session)
+    assert [m['snippet'] for m in index.items] == ['Guide The tram runs all night.', 'Tickets now cost three euros.']
+    assert pipeline.snapshot()['errors'] == 1
+
+
+def test_index_remove_source():
+    index = semantic.InMemoryIndex()
+    index.add([1.0], {'source': 'a'})
+    index.add([1.0], {'source': 'b'})
+    assert index.remove_source('a') == 1 and [m['source'] for _, m in index.items] == ['b']
+
+
+@pytest.mark.asyncio
+async def test_ingest_urls_delegates_to_pipeline(monkeypatch):
+    index = ListIndex()
+    monkeypatch.setattr(ingestion, 'pipeline', IngestionPipeline(index=index, embed_many=fake_embed_many))
+    session = FakeSession({'https://c.example/': {'html': _page("Cable cars climb the hills.")}})
+    assert await semantic.ingest_urls(['https://c.example/'], session=session) == 1
+    assert index.items[0]['source'] == 'https://c.example/'
@@ -0,0 +1,34 @@
+import os
+import random
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from city_guides.src.intents import TABLES, classify
+from city_guides.src.marco_response_enhancer import analyze_user_intent
+from city_guides.src.semantic import get_poi_type_from_query
+
+
+def test_one_pass_matches_substring_loops():
+    keywords = sorted({kw for labels in TABLES.values() for kws in labels.values() for kw in kws})
+    rng = random.Random(7)
+    for _ in range(500):
+        words = [rng.choice(keywords + ['the', 'near', 'x']) for _ in range(rng.randint(0, 6))]
+        text = rng.choice([' ', '', '-']).join(words)
+        result = classify(text)
+        for table, labels in TABLES.items():
+            expected = [label for label, kws in labels.items() if any(kw in text for kw in kws)]
+            assert result.labels(table) == expected, (text, table)
+
+
+def test_call_sites_share_the_tables():
+    assert get_poi_type_from_query('Cheap HOSTELS downtown') == 'accommodation'
+    assert get_poi_type_from_query('somewhere nice') == 'restaurant'
+    result = classify('best sushi bars near the beach? fun fact too')
+    assert result.first('cuisine') == 'japanese' and result.has('food')
+    assert result.labels('dream') == ['nightlife', 'beaches']
+    assert result.has('fun_fact', 'direct') and not result.has('weather')
+    assert result.matched('marco', 'venue') == ['bar', 'sushi']
+
+    intent = analyze_user_intent('how do I take the metro to the museum', [])
+    assert intent['type'] == 'attraction' and intent['is_transport_request']
+    assert intent['specific_keywords'] == ['museum']
@@ -0,0 +1,60 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gzip
+
+import pytest
+
+from city_guides.src import responses
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def test_etag_matching_and_encoding_negotiation():
+    etag = responses.etag_for(b'{"a":1}')
+    assert etag.startswith('W/"')
+    assert responses.etag_matches(etag, etag)
+    assert responses.etag_matches(etag, '"other", ' + etag[2:])
+    assert not responses.etag_matches(etag, 'W/"other"')
+    assert responses.negotiate_encoding('gzip, deflate') == 'gzip'
+    assert responses.negotiate_encoding('gzip;q=0, identity') is None
+    assert responses.negotiate_encoding(None) is None
+
+
+def test_raw_json_parses_lazily():
+    raw = responses.RawJSON(responses.dumps({'answer': 'café'}))
+    assert raw.body == '{"answer":"café"}'.encode('utf-8')
+    assert raw.value == {'answer': 'café'}
+
+
+@pytest.mark.asyncio
+async def test_neighborhoods_cache_hit_is_compressed_and_revalidated(monkeypatch):
+    import city_guides.src.app as app_module
+
+    fake = FakeRedis()
+    hoods = [{'name': 'Centro %d' % i, 'bbox': [0, 0, 1, 1]} for i in range(100)]
+    fake.store['neighborhoods:1.0_2.0:en'] = responses.dumps(hoods)
+    monkeypatch.setattr(app_module, 'redis_client', fake)
+
+    client = app_module.app.test_client()
+    url = '/api/neighborhoods?lat=1.0&lon=2.0'
+    resp = await client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    body = responses.loads(gzip.decompress(await resp.get_data()))
+    assert body == {'cached': True, 'neighborhoods': hoods}
+
+    etag = resp.headers['ETag']
+    resp = await client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert await resp.get_data() == b''
@@ -0,0 +1,72 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+import aiohttp
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+import load_test
+from load_test_stubs import StandInServer, diff_counts
+from city_guides.providers import http_clients
+
+
+@pytest_asyncio.fixture
+async def stubs(monkeypatch):
+    server = await StandInServer(latency_ms={n: 0 for n in ('overpass', 'nominatim', 'geoapify',
+                                                            'wikipedia', 'groq', 'ddgs')},
+                                 error_rate={'groq': 1.0}, seed=1).start()
+    monkeypatch.setattr(http_clients, 'UPSTREAM_OVERRIDES', http_clients._parse_overrides(server.overrides()))
+    yield server
+    await http_clients.close()
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_profiled_session_is_redirected_to_stand_ins(stubs):
+    before = stubs.counts()
+    async with http_clients.get_session() as session:
+        async with session.post('https://overpass-api.de/api/interpreter', data={'data': '[out:json];'}) as resp:
+            body = await resp.json()
+        assert resp.status == 200 and body['elements']
+        async with session.get('https://en.wikipedia.org/w/api.php', params={'action': 'query'}) as resp:
+            assert (await resp.json())['query']['pages']
+        async with session.post('https://api.groq.com/openai/v1/chat/completions', json={}) as resp:
+            assert resp.status == 503  # injected; groq profile does not retry POSTs
+
+    delta = diff_counts(before, stubs.counts())
+    assert delta == {'overpass': {'calls': 1}, 'wikipedia': {'calls': 1}, 'groq': {'calls': 1, 'errors': 1}}
+    # Stats stay keyed by the real upstream host
+    assert 'overpass-api.de' in http_clients.snapshot()
+
+
+@pytest.mark.asyncio
+async def test_run_phase_reports_latency_percentiles():
+    async def ok(request):
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_post('/api/search', ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    try:
+        async with aiohttp.ClientSession() as session:
+            result = await load_test.run_phase(session, base, load_test.ENDPOINTS['search'], rate=50, duration=0.2)
+    finally:
+        await runner.cleanup()
+    assert result['requests'] == 10 and result['status'] == {'200': 10}
+    lat = result['latency_ms']
+    assert lat['p50'] <= lat['p95'] <= lat['p99'] <= lat['max']
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert load_test.percentile(values, 50) == 50
+    assert load_test.percentile(values, 99) == 99
+    assert load_test.percentile([7.0], 95) == 7.0
+    assert load_test.percentile([], 50) is None
@@ -0,0 +1,82 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src.services import media_lookup as ml
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def test_sliding_window_quota():
+    q = ml.SlidingWindowQuota(limit=2, window=10)
+    assert q.try_acquire(now=100) and q.try_acquire(now=101)
+    assert not q.try_acquire(now=105)
+    assert q.retry_after(now=105) == pytest.approx(5)
+    assert q.try_acquire(now=110.5)  # first call left the window
+    assert q.used(now=110.5) == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_caches_by_normalized_query_across_tiers():
+    redis = FakeRedis()
+    lookup = ml.MediaLookup(providers={'pixabay': (10, 3600, 86400)}, memory_size=10)
+    lookup.redis = redis
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return {'photos': [{'id': 1}]}
+
+    first, served = await lookup.lookup('pixabay', 'Paris  Old Town', 3, fetch)
+    again, _ = await lookup.lookup('pixabay', 'paris old town', 3, fetch)
+    assert served == 'pixabay' and first == again and len(calls) == 1
+    assert 'media:pixabay:photos:3:paris old town' in redis.store
+
+    # Another process (empty memory tier) is served from Redis
+    other = ml.MediaLookup(providers={'pixabay': (10, 3600, 86400)})
+    other.redis = redis
+    value, _ = await other.lookup('pixabay', 'PARIS OLD TOWN', 3, fetch)
+    assert value == first and len(calls) == 1
+    assert other.stats['pixabay'] == {'cache_hit.redis': 1}
+
+
+@pytest.mark.asyncio
+async def test_exhausted_quota_falls_back_to_cached_provider(monkeypatch):
+    lookup = ml.MediaLookup(providers={'unsplash': (1, 3600, 3600), 'pixabay': (10, 3600, 3600)})
+    lookup.redis = FakeRedis()
+    monkeypatch.setattr(ml, 'media_lookup', lookup)
+    monkeypatch.setenv('UNSPLASH_KEY', 'u-key')
+    monkeypatch.setenv('PIXABAY_KEY', 'p-key')
+
+    pixabay_photo = {'id': 7, 'url': 'https://img/7', 'thumb_url': 'https://img/7t', 'description': 'rome',
+                     'user': 'anna', 'links': {'pixabay': 'https://pixabay.com/7'}}
+    await lookup.store('pixabay', 'rome', 3, {'photos': [pixabay_photo]})
+
+    async def unsplash_fetch(query, per_page, api_key, session):
+        return {'photos': [{'id': query}]}
+
+    monkeypatch.setattr(ml, '_PHOTO_FETCHERS', {'unsplash': ('UNSPLASH_KEY', unsplash_fetch),
+                                                'pixabay': ('PIXABAY_KEY', unsplash_fetch)})
+    await ml.search_photos('unsplash', 'paris', 3, session=object())  # uses the only call in the window
+
+    result, served = await ml.search_photos('unsplash', 'Rome', 3, session=object())
+    assert served == 'pixabay'
+    photo = result['photos'][0]
+    assert photo['provider'] == 'pixabay'
+    assert photo['user'] == {'name': 'anna', 'username': 'anna', 'profile_url': 'https://pixabay.com/7'}
+    assert lookup.stats['unsplash']['quota_exhausted'] == 1
+    assert lookup.stats['unsplash']['fallback.pixabay'] == 1
+
+    snapshot = lookup.snapshot()['providers']['unsplash']['quota']
+    assert snapshot['used'] == 1 and snapshot['limit'] == 1 and snapshot['retry_after'] > 0
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src.services import learning
+from city_guides.src.services.near_cache import InvalidationBus, NearCache
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.redis.subscribers.append(self)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        if self.queue.empty():
+            await asyncio.sleep(0.01)
+            return None
+        return self.queue.get_nowait()
+
+    async def aclose(self):
+        self.redis.subscribers.remove(self)
+
+
+class FakeRedis:
+    """One shared store standing in for Redis, with fan-out pub/sub"""
+
+    def __init__(self):
+        self.store = {}
+        self.subscribers = []
+        self.mgets = 0
+
+    async def mget(self, keys):
+        self.mgets += 1
+        return [self.store.get(k) for k in keys]
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def incrbyfloat(self, key, amount):
+        self.store[key] = str(float(self.store.get(key, 0)) + amount).encode()
+        return float(self.store[key])
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+    async def publish(self, channel, data):
+        for sub in self.subscribers:
+            sub.queue.put_nowait({'type': 'message', 'data': data})
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+async def _until(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('condition not reached')
+
+
+@pytest.mark.asyncio
+async def test_writes_invalidate_other_workers():
+    redis = FakeRedis()
+    buses = [InvalidationBus(), InvalidationBus()]
+    a, b = (NearCache('weights', invalidation=bus) for bus in buses)
+    for bus in buses:
+        bus.start(redis)
+    await _until(lambda: len(redis.subscribers) == 2)
+    try:
+        assert await b.get_many(['paris', 'rome']) == {}
+        assert await b.get_many(['paris', 'rome']) == {}
+        assert redis.mgets == 1  # absent keys are cached near too
+
+        await a.incr('paris', 0.5)
+        await _until(lambda: buses[1].stats['received'] == 1)
+        assert await b.get('paris') == 0.5
+        assert buses[0].stats['received'] == 0  # own messages are skipped
+
+        await b.set('rome', ['x'])
+        await _until(lambda: buses[0].stats['received'] == 1)
+        assert await a.get('rome') == ['x']
+        assert a.peek('rome') == ['x'] and b.peek('missing', 7) == 7
+    finally:
+        for bus in buses:
+            await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_near_tier_is_bounded_and_local_without_redis():
+    cache = NearCache('local-only', maxsize=2, invalidation=InvalidationBus())
+    assert await cache.incr('a', 1.0) == 1.0
+    assert await cache.incr('a', 1.0) == 2.0
+    await cache.set('b', 1)
+    await cache.set('c', 1)
+    assert cache.peek('a') is None and cache.peek('c') == 1
+
+
+@pytest.mark.asyncio
+async def test_learning_weights_are_shared(monkeypatch):
+    bus = InvalidationBus()
+    monkeypatch.setattr(learning, '_location_weights', NearCache('learning-test', invalidation=bus))
+    bus.redis = FakeRedis()
+    for city in ('Sydney', 'Melbourne', 'Paris'):
+        await learning.increment_location_weight(city)
+    await learning.increment_location_weight('sydney')
+
+    learning._location_weights.invalidate_local()  # as another worker would see it
+    await learning.load_location_weights(['sydney', 'paris', 'tokyo'])
+    assert learning.get_location_weight('Sydney') == pytest.approx(1.2)
+    assert learning.get_location_weight('tokyo') == 1.0
+    assert learning.detect_hemisphere_from_searches() == 'southern'
@@ -0,0 +1,31 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from city_guides.providers import multi_provider as mp
+
+
+def test_tourist_matcher_matches_substrings_like_any():
+    for name in ['plaka', 'ano plaka', 'chelsea heights', 'le marais nord', 'nowhere', 'montmartre']:
+        expected = any(t in name for t in mp.TOURIST_NEIGHBORHOODS)
+        assert bool(mp._TOURIST_NEIGHBORHOOD_RE.search(name)) == expected
+
+
+def test_rank_prefers_curated_and_tourist_names():
+    nbs = [
+        {'name': 'Industrial Estate 40', 'source': 'osm'},
+        {'name': 'Πλάκα', 'source': 'osm'},
+        {'name': 'Old Town', 'source': 'geonames'},
+        {'name': 'Sukhumvit', 'source': 'curated', 'curated_priority': 1000},
+    ]
+    ranked = [n['name'] for n in mp._rank_neighborhoods_by_relevance(nbs, None)]
+    assert ranked == ['Sukhumvit', 'Πλάκα', 'Old Town', 'Industrial Estate 40']
+
+
+def test_transliteration_is_memoized():
+    mp._transliterate_name.cache_clear()
+    assert mp._transliterate_name('Πλάκα') == 'Plaka'
+    assert mp._transliterate_name('Πλάκα') == 'Plaka'
+    assert mp._transliterate_name.cache_info().hits >= 1
+    assert mp._norm_name('Gràcia, Barcelona') == 'gracia barcelona'
+    assert mp.NEIGHBORHOOD_DESCRIPTIONS['plaka'] == mp._get_neighborhood_description('plaka')
@@ -0,0 +1,124 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from city_guides.providers import opentripmap_provider as otm
+
+
+class _FakeResponse:
+    def __init__(self, session, xid):
+        self.session = session
+        self.xid = xid
+        self.status = 200
+
+    async def __aenter__(self):
+        self.session.active += 1
+        self.session.peak = max(self.session.peak, self.session.active)
+        await asyncio.sleep(0.01)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.session.active -= 1
+
+    async def json(self):
+        return {'xid': self.xid, 'url': f'https://example.org/{self.xid}', 'address': {'road': 'Main St'}}
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    def get(self, url, params=None, timeout=None):
+        xid = url.rsplit('/', 1)[-1]
+        self.calls.append(xid)
+        return _FakeResponse(self, xid)
+
+
+@pytest.mark.asyncio
+async def test_details_fetched_concurrently_and_cached(tmp_path):
+    fetcher = otm.XidDetailFetcher(cache_dir=tmp_path, concurrency=4, rate=0)
+    session = FakeSession()
+    xids = [f'N{i}' for i in range(10)]
+
+    details = await fetcher.get_many(xids + ['N0'], session)
+    assert sorted(session.calls) == sorted(xids)  # duplicate xid fetched once
+    assert 1 < session.peak <= 4
+    assert details['N3']['url'] == 'https://example.org/N3'
+
+    # A fresh fetcher (new process) is served from the on-disk cache
+    fresh = otm.XidDetailFetcher(cache_dir=tmp_path, concurrency=4, rate=0)
+    again = await fresh.get_many(xids, FakeSession())
+    assert again == details
+    assert fresh.stats['disk_hits'] == len(xids)
+
+
+@pytest.mark.asyncio
+async def test_summary_only_returns_immediately_and_fills_lazily(tmp_path, monkeypatch):
+    fetcher = otm.XidDetailFetcher(cache_dir=tmp_path, concurrency=2, rate=0)
+    monkeypatch.setattr(otm, 'detail_fetcher', fetcher)
+    monkeypatch.setattr(otm, 'OPENTRIPMAP_KEY', 'test-key')
+    monkeypatch.setattr(otm.http_clients, 'get_session', FakeSession)
+    monkeypatch.setattr(otm.http_clients, 'serving_loop', asyncio.get_running_loop)
+
+    features = [{'properties': {'xid': 'W1', 'name': 'Old Bridge'}, 'geometry': {'coordinates': [2.0, 1.0]}}]
+    request_session = FakeSession()
+    entries = await otm._entries_for_features(features, request_session, summary_only=True)
+    assert entries[0]['name'] == 'Old Bridge' and entries[0]['address'] == ''
+    assert request_session.calls == []
+
+    await asyncio.gather(*fetcher._background)
+    entries = await otm._entries_for_features(features, request_session, summary_only=True)
+    assert entries[0]['address'] == 'Main St'
+    assert entries[0]['osm_url'] == 'https://example.org/W1'
+
+
+def test_summary_fill_outlives_a_temporary_loop(tmp_path, monkeypatch):
+    fetcher = otm.XidDetailFetcher(cache_dir=tmp_path, concurrency=2, rate=0)
+    monkeypatch.setattr(otm, 'detail_fetcher', fetcher)
+    monkeypatch.setattr(otm, 'OPENTRIPMAP_KEY', 'test-key')
+    monkeypatch.setattr(otm.http_clients, 'get_session', FakeSession)
+    features = [{'properties': {'xid': f'W{i}', 'name': f'Place {i}'}, 'geometry': {'coordinates': [2.0, 1.0]}}
+                for i in range(3)]
+
+    def on_temporary_loop(coro):
+        # as persistence._search_impl runs providers from a worker thread
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    serving = asyncio.new_event_loop()
+    thread = threading.Thread(target=serving.run_forever, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setattr(otm.http_clients, 'serving_loop', lambda: serving)
+        entries = on_temporary_loop(otm._entries_for_features(features, FakeSession(), summary_only=True))
+        assert all(e['address'] == '' for e in entries)
+        concurrent.futures.wait(list(fetcher._background), timeout=5)
+        entries = on_temporary_loop(otm._entries_for_features(features, FakeSession(), summary_only=True))
+        assert all(e['address'] == 'Main St' for e in entries)
+    finally:
+        serving.call_soon_threadsafe(serving.stop)
+        thread.join(timeout=5)
+        serving.close()
+
+    # with no serving loop the summary call waits (briefly) for the details itself
+    monkeypatch.setattr(otm.http_clients, 'serving_loop', lambda: None)
+    fresh = [{'properties': {'xid': 'W9', 'name': 'Quay'}, 'geometry': {'coordinates': [2.0, 1.0]}}]
+    entries = on_temporary_loop(otm._entries_for_features(fresh, FakeSession(), summary_only=True))
+    assert entries[0]['address'] == 'Main St'
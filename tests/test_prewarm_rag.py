@@ -1,6 +1,8 @@
 import json
 import pytest
 from city_guides.src import app as quart_app_module
+from city_guides.src.routes import chat as chat_routes
+from city_guides.src.services import warmup
 
 
 class FakeRedis:
@@ -15,54 +17,55 @@ class FakeRedis:
         self.store[key] = value
         self.set_calls.append((key, ttl, value))
 
-    async def expire(self, key, ttl):
-        # no-op for test
-        return True
-
-
-class DummyResp:
-    def __init__(self, status=200, payload=None):
-        self.status = status
-        self._payload = payload or {"answer": "prewarm"}
-
-    async def __aenter__(self):
-        return self
-
-    async def __aexit__(self, exc_type, exc, tb):
-        return False
-
-    async def json(self):
-        return self._payload
-
-
-class FakeSession:
-    def __init__(self):
-        self.posts = []
-
-    def post(self, url, json=None, timeout=None):
-        self.posts.append((url, json, timeout))
-        return DummyResp()
+    async def ttl(self, key):
+        return 3600 if key in self.store else -2
 
 
 @pytest.mark.asyncio
-async def test_prewarm_rag_sets_cache(monkeypatch, tmp_path):
-    # Use a small seed file
-    seed_path = quart_app_module.Path(quart_app_module.Path(__file__).parents[1] / 'city_guides' / 'data' / 'seeded_cities.json')
-    assert seed_path.exists(), 'seed file missing for test'
-
+async def test_prewarm_rag_runs_in_process(monkeypatch):
     fake_redis = FakeRedis()
-    fake_session = FakeSession()
+    calls = []
+
+    async def fake_build_rag_response(data, use_cache=True):
+        calls.append((data, use_cache))
+        await fake_redis.setex(chat_routes.rag_cache_key(data), 60, json.dumps({"answer": "prewarm"}))
+        return {"answer": "prewarm"}, 200
+
+    monkeypatch.setattr(chat_routes, 'build_rag_response', fake_build_rag_response)
+    scheduler = warmup.WarmupScheduler()
+    scheduler.register('rag', quart_app_module.prewarm_rag_entry)
+    scheduler.redis = fake_redis
+    monkeypatch.setattr(warmup, 'scheduler', scheduler)
+    monkeypatch.setattr(quart_app_module, 'POPULAR_CITIES', [])
+
+    # Seed from the top seeded city only, then run one scheduler tick
+    await quart_app_module.seed_warmup(top_n=1)
+    refreshed = await scheduler.tick()
+
+    assert refreshed == 1
+    params, use_cache = calls[0]
+    assert use_cache is False, 'warm-up must bypass the cache and recompute'
+    key, ttl, value = fake_redis.set_calls[0]
+    assert key.startswith('rag:'), 'Cache key should start with rag:'
+    assert json.loads(value)['answer'] == 'prewarm'
+    assert scheduler.is_warmed(key)
 
-    # Monkeypatch global redis_client and aiohttp_session
-    monkeypatch.setattr(quart_app_module, 'redis_client', fake_redis)
-    monkeypatch.setattr(quart_app_module, 'aiohttp_session', fake_session)
+    # The freshly warmed key is not refreshed again until its TTL runs low
+    assert await scheduler.tick() == 0
 
-    # Run prewarm for top 1 city to keep it fast
-    await quart_app_module.prewarm_rag_responses(top_n=1)
 
-    # Verify at least one cache set occurred
-    assert len(fake_redis.set_calls) > 0
-    key, ttl, value = fake_redis.set_calls[0]
-    assert key.startswith('rag:'), 'Cache key should start with rag:'
-    parsed = json.loads(value)
-    assert 'answer' in parsed
+def test_hot_keys_follow_decayed_frequency():
+    scheduler = warmup.WarmupScheduler(half_life=60)
+
+    async def noop(params, key):
+        return True
+
+    scheduler.register('search', noop)
+    now = 1000.0
+    for _ in range(5):
+        scheduler.record_request('search', {'query': 'Paris'}, 'k:paris', now=now - 600)
+    for _ in range(3):
+        scheduler.record_request('search', {'query': 'Rome'}, 'k:rome', now=now)
+    hot = scheduler.hot_keys(limit=2, min_score=0.0, now=now)
+    # Rome's recent traffic outweighs Paris' older (decayed) burst
+    assert [hk.cache_key for _, hk in hot] == ['k:rome', 'k:paris']
@@ -0,0 +1,141 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from city_guides.src.services import quick_guides
+
+
+def test_annotate_and_needs_regeneration():
+    out = {'quick_guide': 'Analco is a historic quarter with craft shops and cafes.', 'source': 'ddgs', 'confidence': 'medium'}
+    quick_guides.annotate(out, 'Guadalajara', 'Analco')
+    assert out['version'] == quick_guides.STORE_VERSION
+    assert out['quality']['confidence'] == 'medium'
+    assert not quick_guides.needs_regeneration(out)
+
+    legacy = {'quick_guide': 'Analco is a neighborhood in Guadalajara.', 'source': 'data-first', 'generated_at': time.time()}
+    assert quick_guides.needs_regeneration(legacy)
+    # A recent failed attempt suppresses immediate retries
+    legacy['regeneration_attempted_at'] = time.time()
+    assert not quick_guides.needs_regeneration(legacy)
+
+    stale = dict(out, generated_at=time.time() - quick_guides.QUICK_GUIDE_MAX_AGE - 1)
+    assert quick_guides.needs_regeneration(stale)
+
+
+def test_cache_hit_returns_immediately_and_schedules_regeneration(monkeypatch, tmp_path):
+    monkeypatch.setattr(quick_guides, 'QUICK_GUIDE_DIR', tmp_path)
+    path = quick_guides.guide_path('Guadalajara, Mexico', 'Analco')
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps({'quick_guide': 'Analco is a neighborhood in Guadalajara, Mexico.', 'source': 'data-first'}))
+
+    scheduled = []
+    monkeypatch.setattr(quick_guides.regeneration_queue, 'schedule', lambda city, nb, fn: scheduled.append((city, nb)) or True)
+
+    from city_guides.src.app import app
+
+    async def _run():
+        client = app.test_client()
+        resp = await client.post('/api/generate_quick_guide', json={'city': 'Guadalajara, Mexico', 'neighborhood': 'Analco'})
+        return await resp.get_json()
+
+    data = asyncio.run(_run())
+    assert data['cached'] is True
+    assert data['source'] == 'data-first'
+    assert data['confidence'] == 'low'
+    assert scheduled == [('Guadalajara, Mexico', 'Analco')]
+
+
+@pytest.mark.asyncio
+async def test_regeneration_queue_dedups_and_bulk_respects_concurrency():
+    queue = quick_guides.QuickGuideRegenerationQueue(workers=1, maxsize=10)
+    calls = []
+
+    async def regen(city, nb):
+        calls.append(nb)
+        await asyncio.sleep(0.01)
+
+    assert queue.schedule('Rome', 'Monti', regen)
+    assert not queue.schedule('Rome', 'Monti', regen)
+    await queue.join()
+    await queue.close()
+    assert calls == ['Monti'] and queue.stats['completed'] == 1
+
+    in_flight = {'now': 0, 'max': 0}
+
+    async def bulk_regen(city, nb):
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        await asyncio.sleep(0.01)
+        in_flight['now'] -= 1
+
+    result = await quick_guides.regenerate_city('Rome', bulk_regen, neighborhoods=['a', 'b', 'c', 'd', 'e'], concurrency=2, rate=0)
+    assert result['regenerated'] == 5 and not result['failed']
+    assert in_flight['max'] == 2
+
+
+def test_neutralize_stored_rewrites_once(tmp_path):
+    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+
+    for nb in ('Analco', 'Mexicaltzingo', 'Santa Tere'):
+        path = quick_guides.guide_path('Guadalajara', nb, base_dir=tmp_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({'quick_guide': f'I loved walking around {nb}. My favourite spot is the market.',
+                                    'city': 'Guadalajara', 'neighborhood': nb}))
+
+    summary = quick_guides.neutralize_stored(base_dir=tmp_path, workers=2)
+    assert summary['total'] == 3 and summary['rewritten'] == 3 and summary['failed'] == []
+    entry = json.loads(quick_guides.guide_path('Guadalajara', 'Analco', base_dir=tmp_path).read_text())
+    assert entry['neutralized'] == SynthesisEnhancer.NEUTRALIZER_VERSION
+    assert 'I loved' not in entry['quick_guide'] and 'the favourite spot' in entry['quick_guide']
+
+    again = quick_guides.neutralize_stored(base_dir=tmp_path, workers=1)
+    assert again['rewritten'] == 0 and again['skipped'] == 3
+
+
+def test_cache_hit_neutralizes_entries_without_the_current_marker():
+    from city_guides.src.synthesis_enhancer import SynthesisEnhancer
+
+    text = 'I loved walking around Analco. My favourite spot is the market. ' * 20
+    legacy = quick_guides.to_response({'quick_guide': text, 'source': 'ddgs'}, 'Guadalajara', 'Analco')
+    assert 'I loved' not in legacy['quick_guide'] and len(legacy['quick_guide']) <= 400
+
+    current = {'quick_guide': text, 'source': 'ddgs', 'neutralized': SynthesisEnhancer.NEUTRALIZER_VERSION}
+    assert quick_guides.to_response(current, 'Guadalajara', 'Analco')['quick_guide'] == text
+
+
+def test_bulk_regeneration_is_an_admin_action(monkeypatch):
+    from city_guides.src.app import app
+    from city_guides.src.routes import admin, guide
+
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_regenerate_city(city, regenerate, neighborhoods=None, **kwargs):
+        started.set()
+        await release.wait()
+        return {'city': city, 'regenerated': 0, 'failed': []}
+
+    monkeypatch.setattr(quick_guides, 'regenerate_city', fake_regenerate_city)
+    monkeypatch.setattr(admin, 'ADMIN_TOKEN', 'sekrit')
+    body = {'city': 'Rome', 'neighborhoods': ['Monti']}
+
+    async def _run():
+        client = app.test_client()
+        denied = await client.post('/api/quick_guides/regenerate', json=body)
+        headers = {'Authorization': 'Bearer sekrit'}
+        first = await client.post('/api/quick_guides/regenerate', json=body, headers=headers)
+        await started.wait()
+        second = await client.post('/api/quick_guides/regenerate', json=body, headers=headers)
+        task = guide._bulk_jobs['Rome']
+        release.set()
+        await task
+        return denied.status_code, first.status_code, second.status_code
+
+    assert asyncio.run(_run()) == (403, 202, 409)
+    assert 'Rome' not in guide._bulk_jobs
@@ -0,0 +1,68 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src import app as quart_app_module
+from city_guides.src.routes import search as search_routes
+from city_guides.src.services import warmup
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+def test_cache_key_separates_limit_state_and_country():
+    base = {'query': 'Portland', 'category': 'food', 'state': 'Oregon', 'country': 'US'}
+    key = search_routes.search_cache_key(base)
+    assert key != search_routes.search_cache_key(dict(base, state='Maine'))
+    assert key != search_routes.search_cache_key(dict(base, country='CA'))
+    assert key != search_routes.search_cache_key(dict(base, limit=50))
+    assert key == search_routes.search_cache_key(dict(base, limit='10'))  # _search_impl's default
+
+
+@pytest.mark.asyncio
+async def test_cached_search_recomputes_open_now(monkeypatch):
+    fake_redis = FakeRedis()
+    builds = []
+    flags = iter([False, True])
+
+    async def fake_build(payload):
+        builds.append(payload)
+        return {'venues': [{'name': 'Night Bar', 'lat': 45.52, 'lon': -122.68, 'opening_hours': 'Mo-Su 18:00-02:00',
+                            'open_now': None, 'tz': 'America/Los_Angeles'},
+                           {'name': 'Old Entry', 'lat': 45.52, 'lon': -122.68, 'opening_hours': 'Mo-Su 09:00-17:00',
+                            'open_now': True}]}
+
+    def no_lookup(lat, lon):
+        raise AssertionError('cache hits use the stored tz')
+
+    monkeypatch.setattr(quart_app_module, 'redis_client', fake_redis)
+    monkeypatch.setattr(search_routes, 'build_search_response', fake_build)
+    monkeypatch.setattr(search_routes, 'SEARCH_CACHE_ENABLED', True)
+    monkeypatch.setattr(warmup, 'scheduler', warmup.WarmupScheduler())
+    monkeypatch.setattr('city_guides.src.persistence._timezone_for', no_lookup)
+    monkeypatch.setattr('city_guides.src.persistence._compute_open_now',
+                        lambda lat, lon, hours, tz: (next(flags) if tz else no_lookup(lat, lon), None))
+
+    client = quart_app_module.app.test_client()
+    payload = {'query': 'Portland', 'category': 'nightlife', 'state': 'Oregon'}
+    first = await client.post('/api/search', json=payload)
+    assert first.status_code == 200 and len(fake_redis.store) == 1
+    second = await client.post('/api/search', json=payload)
+    assert len(builds) == 1  # served from the cache
+    assert (await second.get_json())['venues'][0]['open_now'] is False
+
+    third = await client.post('/api/search', json=payload)
+    venues = (await third.get_json())['venues']
+    assert venues[0]['open_now'] is True
+    assert venues[1]['open_now'] is True  # cached before tz was stored: kept as is
+    assert len(builds) == 1
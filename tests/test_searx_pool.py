@@ -0,0 +1,67 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+import pytest
+
+from city_guides.providers.search_provider import SearxInstancePool
+
+
+class _FakeResponse:
+    def __init__(self, behaviour):
+        self.delay, self.status, self.payload = behaviour
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def json(self, content_type=None):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, behaviours):
+        self.behaviours = behaviours
+        self.calls = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        inst = url.rsplit('/search', 1)[0]
+        self.calls.append(inst)
+        return _FakeResponse(self.behaviours[inst])
+
+
+@pytest.mark.asyncio
+async def test_race_takes_first_good_response_and_caches():
+    session = FakeSession({
+        'https://slow': (0.5, 200, {'results': [{'title': 'slow'}]}),
+        'https://dead': (0.0, 503, {}),
+        'https://fast': (0.01, 200, {'results': [{'title': 'fast'}]}),
+    })
+    pool = SearxInstancePool(instances=['https://slow', 'https://dead', 'https://fast'], race_width=3, timeout=2)
+
+    results = await pool.search('tacos in Austin', session=session)
+    assert results == [{'title': 'fast'}]
+    assert pool.snapshot()['https://dead']['backoff_s'] > 0
+
+    # Cached: no new upstream calls
+    calls = len(session.calls)
+    assert await pool.search('tacos in Austin', session=session) == results
+    assert len(session.calls) == calls
+
+    # The failing instance is skipped and the fast one ranks first
+    assert pool.pick(3)[0] == 'https://fast'
+    assert 'https://dead' not in pool.pick(3)
+
+
+@pytest.mark.asyncio
+async def test_all_failing_returns_empty_without_caching():
+    session = FakeSession({'https://a': (0.0, 500, {}), 'https://b': (0.0, 429, {})})
+    pool = SearxInstancePool(instances=['https://a', 'https://b'], race_width=2, timeout=1)
+    assert await pool.search('museums', session=session) == []
+    assert pool.stats['exhausted'] == 1
+    assert pool._cache_get('museums') is None
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'tools')))
+
+import startup_profile
+from city_guides.src.data.seeded_facts import SeededFacts
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io_helper
+import time:      3000 |       3120 |   city_guides.src.persistence
+import time:       500 |        500 |   aiohttp.helpers
+import time:      2000 |       5620 | city_guides.src.app
+"""
+
+
+def test_app_import_leaves_heavy_subsystems_unloaded():
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    code = ("import sys, city_guides.src.app; "
+            "print(sorted(m for m in ('bs4', 'PIL', 'redis') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True)
+    assert out.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_seed_data_loads_on_first_use():
+    facts = SeededFacts()
+    assert facts._seed_data is None
+    facts.get_all_cities()
+    assert facts._seed_data is not None
+
+
+def test_parse_and_report_importtime():
+    rows = startup_profile.parse_importtime(SAMPLE)
+    assert [r['module'] for r in rows] == ['_io_helper', 'city_guides.src.persistence', 'aiohttp.helpers',
+                                           'city_guides.src.app']
+    assert rows[1] == {'module': 'city_guides.src.persistence', 'self_us': 3000, 'cumulative_us': 3120, 'depth': 1}
+
+    slower = [dict(r, self_us=r['self_us'] * 2) for r in rows]
+    assert startup_profile.merge_fastest([slower, rows])[1]['self_us'] == 3000
+
+    packages = startup_profile.by_package(rows)
+    assert packages[0] == {'package': 'city_guides.src', 'self_us': 5000, 'modules': 2}
+
+    text = startup_profile.report(rows, 'city_guides.src.app', top=2)
+    assert text.startswith('import city_guides.src.app: 5.6 ms, 4 modules')
+    assert text.index('city_guides.src.persistence') < text.index('city_guides.src.app\n')
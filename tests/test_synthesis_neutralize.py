@@ -11,3 +11,19 @@ def test_neutralize_analco_sample():
     # Should not contain first-person pronouns 'I' or 'We' and should mention neighborhood
     assert 'I ' not in neutral and 'We ' not in neutral
     assert 'Analco' in neutral
+
+
+def test_neutralize_is_single_pass_deterministic_and_memoized():
+    from city_guides.src import synthesis_enhancer
+
+    sample = "I'm sure our guide loved the local food here. We've been twice."
+    first = SynthesisEnhancer.neutralize_tone(sample, neighborhood='Gràcia', city='Barcelona')
+    # contractions go as a whole and possessives become neutral
+    assert "'m" not in first and "'ve" not in first and 'the guide' in first
+    assert 'Gràcia' in first
+    hits = synthesis_enhancer._neutralize_cached.cache_info().hits
+    assert SynthesisEnhancer.neutralize_tone(sample, neighborhood='Gràcia', city='Barcelona') == first
+    assert synthesis_enhancer._neutralize_cached.cache_info().hits == hits + 1
+    # template choice does not depend on the process hash seed
+    synthesis_enhancer._neutralize_cached.cache_clear()
+    assert SynthesisEnhancer.neutralize_tone(sample, neighborhood='Gràcia', city='Barcelona') == first
@@ -0,0 +1,64 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from city_guides.src import persistence
+from city_guides.src.persistence import (
+    VENUE_FLAG_HISTORIC,
+    VENUE_FLAG_NIGHTLIFE,
+    VENUE_FLAG_SHOPPING,
+    VENUE_FLAG_TRANSPORT,
+    VenueEnrichmentCache,
+    compute_category_flags,
+    filter_venues_by_category,
+    parse_venue_tags,
+)
+
+
+def test_category_flags_match_search_filters():
+    assert compute_category_flags({'amenity': 'bar', 'drink:beer': 'yes'}, 'Crown Pub') & VENUE_FLAG_NIGHTLIFE
+    assert compute_category_flags('amenity=bar,drink=beer') & VENUE_FLAG_NIGHTLIFE
+    # Strong name alone is not enough without beverage tags
+    assert not compute_category_flags({'amenity': 'cafe'}, 'Club Sandwich') & VENUE_FLAG_NIGHTLIFE
+    assert not compute_category_flags({'amenity': 'library', 'bar': 'yes'}, 'Reading Bar') & VENUE_FLAG_NIGHTLIFE
+
+    assert compute_category_flags({'shop': 'clothes', 'name': 'Boutique Lou'}) & VENUE_FLAG_SHOPPING
+    assert not compute_category_flags({'shop': 'bakery', 'cuisine': 'french'}) & VENUE_FLAG_SHOPPING
+
+    assert compute_category_flags({'historic': 'castle'}, 'Castillo') & VENUE_FLAG_HISTORIC
+    assert not compute_category_flags({'historic': 'yes', 'highway': 'traffic_signals'}, 'Sign') & VENUE_FLAG_HISTORIC
+
+    assert compute_category_flags({'railway': 'station'}) & VENUE_FLAG_TRANSPORT
+    assert compute_category_flags('public_transport=platform') & VENUE_FLAG_TRANSPORT
+
+
+def test_parse_venue_tags_formats():
+    assert parse_venue_tags('amenity=cafe, wifi') == {'amenity': 'cafe', 'wifi': 'yes'}
+    assert parse_venue_tags(['cuisine=thai']) == {'cuisine': 'thai'}
+    assert parse_venue_tags(None) == {}
+
+
+def test_enrichment_computed_once_per_venue(monkeypatch):
+    calls = []
+    real = persistence.enrich_venue_data
+    monkeypatch.setattr(persistence, 'enrich_venue_data', lambda v, c='': calls.append(v['id']) or real(v, c))
+
+    cache = VenueEnrichmentCache(maxsize=10)
+    venue = {'id': 'n1', 'provider': 'osm', 'name': 'Bar Uno', 'type': 'bar',
+             'tags': {'amenity': 'bar', 'opening_hours': '24/7'}, 'lat': 1.0, 'lon': 2.0}
+    first = cache.get(venue, 'Lima')
+    second = cache.get(dict(venue), 'Lima')
+    assert first is second
+    assert calls == ['n1']
+    assert first['budget'] == 'mid' and first['price_range'] == '$$'
+    assert first['opening_hours'] == '24/7' and first['tag_dict']['amenity'] == 'bar'
+
+    # Changed upstream data invalidates the entry
+    cache.get(dict(venue, name='Bar Dos'), 'Lima')
+    assert calls == ['n1', 'n1']
+
+
+def test_filter_venues_by_category_passthrough():
+    venues = [{'id': 1, 'category_flags': VENUE_FLAG_HISTORIC}, {'id': 2, 'category_flags': 0}]
+    assert [v['id'] for v in filter_venues_by_category(venues, 'historic sites')] == [1]
+    assert filter_venues_by_category(venues, 'food') is venues
@@ -0,0 +1,52 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from city_guides.src import venue_quality
+from city_guides.src.venue_quality import (
+    calculate_venue_quality_score, get_venue_quality_insights, score_venues, select_quality_venues, top_venues,
+)
+
+
+def _venue(i, **extra):
+    venue = {'id': f'v{i}', 'name': f'Venue {i}', 'lat': 48.85, 'lon': 2.35, 'tags': {'amenity': 'cafe'}}
+    venue.update(extra)
+    return venue
+
+
+VENUES = [
+    _venue(0, address='12 rue de Rivoli, 75004 Paris', opening_hours='Mo-Fr 09:00-18:00', website='https://a.fr',
+           tags={'amenity': 'cafe', 'phone': '+33 1 23 45 67', 'cuisine': 'french'}),
+    _venue(1, address='48.85, 2.35'),
+    _venue(2, tags='amenity=bar,phone=+33123456,website=b.fr,email=x@y.z', opening_hours='24/7'),
+    _venue(3, tags={'disused:shop': 'yes', 'phone': '+33 1 23 45 67'}, address='1 place du Marché, Paris'),
+    _venue(4, tags=None, name='Unknown', lat='not a number'),
+    _venue(5, display_address='5 avenue Foch, Paris', tags={'status': 'Closed permanently'}),
+    _venue(6, address='3 rue Oberkampf, 75011 Paris', opening_hours='sunrise-sunset',
+           tags={'amenity': 'restaurant', 'contact:email': 'hi@resto.fr', 'cuisine': 'thai'}),
+]
+
+
+def test_batch_scores_match_single_venue_scoring():
+    batch = score_venues(VENUES)
+    assert batch.scores == [calculate_venue_quality_score(v) for v in VENUES]
+    assert batch.scores[0] == 0.95 and batch.scores[3] == 0.0 and batch.scores[5] == 0.0  # 3 and 5 are closed
+    assert batch.components[1][0] == 0.0  # coordinates-only address gets no address credit
+    assert batch.scores[4] == 0.07  # unusable tags and coordinates do not break scoring
+    insights = get_venue_quality_insights(VENUES[6])
+    assert insights['components'] == dict(zip(('address', 'contact', 'hours', 'website', 'description', 'coordinates'),
+                                              batch.components[6]))
+    assert 'Add phone number or email' in insights['improvements']
+
+
+def test_select_tops_up_with_best_of_the_rest():
+    venues = [dict(v) for v in VENUES]
+    selected, topped_up = select_quality_venues(venues, min_score=0.7, minimum=4)
+    assert [v['id'] for v in selected] == ['v0', 'v6', 'v2', 'v1']
+    assert [v['id'] for v in topped_up] == ['v6', 'v2', 'v1']
+    assert all('quality_score' in v for v in venues)
+    assert [v['id'] for v in venue_quality.filter_high_quality_venues(venues, 0.5)] == ['v0', 'v2', 'v6']
+    # same order as a full stable sort, ties included
+    scores = score_venues(venues).scores
+    expected = sorted(venues, key=lambda v: v['quality_score'], reverse=True)[:5]
+    assert top_venues(venues, 5, scores) == expected
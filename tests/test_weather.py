@@ -0,0 +1,112 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from city_guides.src.services import weather as weather_module
+from city_guides.src.services.weather import WeatherService, describe, snap, summarize
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self._payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self):
+        return self._payload
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeOpenMeteo:
+    """Answers multi-location requests with temperature = call number"""
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, params=None, **kwargs):
+        lats = params['latitude'].split(',')
+        self.calls.append(lats)
+        items = [{'latitude': float(lat), 'current_weather': {'temperature': float(len(self.calls)), 'windspeed': 10.0,
+                                                              'weathercode': 61},
+                  'timezone': 'UTC'} for lat in lats]
+        return FakeResponse(items if len(items) > 1 else items[0])
+
+
+@pytest.fixture
+def open_meteo(monkeypatch):
+    fake = FakeOpenMeteo()
+
+    @asynccontextmanager
+    async def fake_session(session=None):
+        yield fake
+
+    monkeypatch.setattr(weather_module, 'get_session', fake_session)
+    return fake
+
+
+def test_nearby_points_share_a_cell():
+    assert snap(48.8566, 2.3522) == snap(48.8611, 2.3400)
+    assert snap(48.8566, 2.3522) != snap(48.95, 2.3522)
+    assert snap(None, 2.0) is None and snap(91, 0) is None
+    assert describe(63) == 'rain' and describe(0) == 'clear sky' and describe(99) == 'thunderstorm with hail'
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_request(open_meteo):
+    service = WeatherService(window_ms=10)
+    points = [(48.8566, 2.3522), (48.8611, 2.3400), (51.5072, -0.1276), (40.7128, -74.0060)]
+    results = await asyncio.gather(*(service.get(lat, lon) for lat, lon in points))
+
+    assert len(open_meteo.calls) == 1 and len(open_meteo.calls[0]) == 3  # Paris twice, one cell
+    assert all(r['current_weather']['temperature'] == 1.0 for r in results)
+    assert summarize(results[0]) == {'temperature_c': 1.0, 'temperature_f': 33.8, 'wind_kmh': 10.0,
+                                     'wind_mph': 6.2, 'weathercode': 61}
+
+    # served from the cell cache afterwards
+    await service.get(48.857, 2.352)
+    assert len(open_meteo.calls) == 1
+    assert service.snapshot()['fresh'] == 1 and service.snapshot()['coalesced'] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_cell_is_served_while_revalidating(open_meteo):
+    service = WeatherService(ttl=0.05, stale=60, window_ms=1)
+    first = await service.get(35.68, 139.69)
+    await asyncio.sleep(0.06)
+
+    stale = await service.get(35.68, 139.69)
+    assert stale is first  # answered immediately from the old entry
+    assert service.snapshot()['stale'] == 1
+    await asyncio.sleep(0.02)  # background refresh lands
+
+    fresh = await service.get(35.68, 139.69)
+    assert fresh['current_weather']['temperature'] == 2.0
+    assert len(open_meteo.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_weather_route_uses_the_service(monkeypatch):
+    from city_guides.src.app import app as quart_app
+
+    seen = []
+
+    async def fake_get(lat, lon):
+        seen.append((lat, lon))
+        return {'current_weather': {'temperature': 21.0}}
+
+    monkeypatch.setattr(weather_module.service, 'get', fake_get)
+    client = quart_app.test_client()
+    resp = await client.post('/api/weather', json={'lat': 41.39, 'lon': 2.17})
+    assert resp.status_code == 200
+    assert (await resp.get_json())['weather']['current_weather']['temperature'] == 21.0
+    assert seen == [(41.39, 2.17)]
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test against local stand-in upstreams.
+
+Starts the stand-in servers from tools/load_test_stubs.py, launches the app
+under hypercorn pointed at them (or uses --app-url), then drives each
+endpoint in turn at a fixed arrival rate:
+
+    python tools/load_test.py --rate 5 --duration 30 --out load_report.json
+    python tools/load_test.py --endpoints search,chat_rag --latency overpass=2000 --error-rate groq=0.1
+
+Arrivals are open-loop: request i is scheduled at start + i/rate whether or not
+earlier requests finished, and latency is measured from the scheduled time, so
+queueing inside the app shows up in the percentiles instead of silently
+lowering the offered rate.
+
+The JSON report has, per endpoint: requests, status counts, throughput,
+p50/p95/p99 latency and the upstream calls (and injected errors) made while
+that endpoint was under load. Endpoints run one after another so upstream
+counts can be attributed; ``unrouted`` lists hosts the app tried to reach
+outside the stand-ins.
+
+The started app runs from a temporary copy of city_guides/ so its on-disk
+caches (banners, quick guides, provider caches) don't pick up fixture data.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).parent))
+from load_test_stubs import StandInServer, diff_counts  # noqa: E402
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# (city, neighborhood, category); requests cycle through these so runs are reproducible
+WORKLOAD = [
+    ("Paris", "Le Marais", "restaurants"),
+    ("Lisbon", "Alfama", "museums"),
+    ("Tbilisi", "Sololaki", "cafes"),
+    ("Kraków", "Kazimierz", "historic"),
+    ("Valencia", "El Carmen", "restaurants"),
+    ("Ljubljana", "Trnovo", "parks"),
+    ("Porto", "Ribeira", "cafes"),
+    ("Sofia", "Oborishte", "museums"),
+]
+
+
+def _search(i, city, neighborhood, category):
+    return "POST", "/api/search", {"json": {"query": city, "category": category}}
+
+
+def _neighborhoods(i, city, neighborhood, category):
+    return "GET", "/api/neighborhoods", {"params": {"city": city}}
+
+
+def _chat_rag(i, city, neighborhood, category):
+    return "POST", "/api/chat/rag", {"json": {"query": f"What should I do in {neighborhood}?", "city": city}}
+
+
+def _quick_guide(i, city, neighborhood, category):
+    return "POST", "/api/generate_quick_guide", {"json": {"city": city, "neighborhood": neighborhood}}
+
+
+ENDPOINTS = {
+    "search": _search,
+    "neighborhoods": _neighborhoods,
+    "chat_rag": _chat_rag,
+    "quick_guide": _quick_guide,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float], statuses: Dict[str, int], elapsed: float) -> dict:
+    lat = sorted(latencies_ms)
+    completed = sum(statuses.values())
+    ok = sum(n for code, n in statuses.items() if code.isdigit() and int(code) < 400)
+    return {
+        "requests": completed,
+        "ok": ok,
+        "errors": completed - ok,
+        "status": dict(sorted(statuses.items())),
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _round(percentile(lat, 50)),
+            "p95": _round(percentile(lat, 95)),
+            "p99": _round(percentile(lat, 99)),
+            "max": _round(lat[-1] if lat else None),
+            "mean": _round(sum(lat) / len(lat) if lat else None),
+        },
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+async def run_phase(session: aiohttp.ClientSession, base_url: str, build, rate: float, duration: float,
+                    concurrency: int = 64, timeout: float = 30.0) -> dict:
+    """Drive one endpoint open-loop at ``rate`` req/s for ``duration`` seconds"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    slots = asyncio.Semaphore(concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def one(i: int, scheduled: float) -> None:
+        method, path, kwargs = build(i, *WORKLOAD[i % len(WORKLOAD)])
+        async with slots:
+            try:
+                async with session.request(method, base_url + path, timeout=client_timeout, **kwargs) as resp:
+                    await resp.read()
+                    key = str(resp.status)
+            except asyncio.TimeoutError:
+                key = "timeout"
+            except aiohttp.ClientError as e:
+                key = type(e).__name__
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        statuses[key] = statuses.get(key, 0) + 1
+
+    total = max(1, int(rate * duration))
+    start = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i, scheduled)))
+    await asyncio.gather(*tasks)
+    return summarize(latencies, statuses, time.perf_counter() - start)
+
+
+def _parse_map(raw: str) -> Dict[str, float]:
+    out = {}
+    for item in (raw or "").split(","):
+        name, sep, value = item.partition("=")
+        if sep:
+            out[name.strip()] = float(value)
+    return out
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(session: aiohttp.ClientSession, base_url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app exited with code {proc.returncode} before becoming ready")
+        try:
+            async with session.get(base_url + "/healthz", timeout=aiohttp.ClientTimeout(total=2)) as resp:
+                if resp.status == 200:
+                    return
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError(f"app not ready after {timeout:.0f}s")
+
+
+def start_app(stubs: StandInServer, port: int, log_path: Optional[str], workdir: Path) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        **stubs.app_env(),
+        # Stand-ins don't check keys, but the providers skip themselves without one
+        "GROQ_API_KEY": os.getenv("GROQ_API_KEY", "load-test"),
+        "GEOAPIFY_API_KEY": os.getenv("GEOAPIFY_API_KEY", "load-test"),
+        "DISABLE_PREWARM": "true",
+    }
+    log = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "city_guides.src.app:app", "--bind", f"127.0.0.1:{port}"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def run(args) -> dict:
+    stubs = await StandInServer(
+        latency_ms=_parse_map(args.latency), jitter=args.jitter,
+        error_rate=_parse_map(args.error_rate), seed=args.seed,
+    ).start(port=args.stub_port, proxy_port=args.stub_port + 1 if args.stub_port else 0)
+    if args.app_url:
+        print("app must run with: " + " ".join(f"{k}={v}" for k, v in stubs.app_env().items()), file=sys.stderr)
+    proc = None
+    scratch = None
+    report = {
+        "config": {
+            "rate": args.rate, "duration": args.duration, "concurrency": args.concurrency,
+            "latency_ms": {n: s.latency_ms for n, s in stubs.stand_ins.items()},
+            "jitter": args.jitter,
+            "error_rate": {n: s.error_rate for n, s in stubs.stand_ins.items() if s.error_rate},
+        },
+        "endpoints": {},
+    }
+    try:
+        async with aiohttp.ClientSession() as session:
+            base_url = args.app_url
+            if not base_url:
+                port = _free_port()
+                workdir = PROJECT_ROOT
+                if not args.in_place:
+                    scratch = tempfile.mkdtemp(prefix="travelland-load-")
+                    workdir = Path(scratch)
+                    shutil.copytree(PROJECT_ROOT / "city_guides", workdir / "city_guides",
+                                    ignore=shutil.ignore_patterns("__pycache__", ".cache", "node_modules"))
+                proc = start_app(stubs, port, args.app_log, workdir)
+                base_url = f"http://127.0.0.1:{port}"
+                await _wait_ready(session, base_url, proc, args.startup_timeout)
+            report["config"]["app_url"] = base_url
+
+            for name in args.endpoints.split(","):
+                name = name.strip()
+                before = stubs.counts()
+                result = await run_phase(session, base_url, ENDPOINTS[name], args.rate, args.duration,
+                                         args.concurrency, args.timeout)
+                # let background work started by the phase (late provider calls) land in its counts
+                await asyncio.sleep(args.settle)
+                result["upstream"] = diff_counts(before, stubs.counts())
+                report["endpoints"][name] = result
+                print(f"{name}: {result['requests']} req, {result['throughput_rps']} req/s, "
+                      f"p95 {result['latency_ms']['p95']} ms, errors {result['errors']}", file=sys.stderr)
+        report["upstream_totals"] = stubs.counts()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        await stubs.stop()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second per endpoint")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (seconds)")
+    parser.add_argument("--latency", default="", help="stand-in latency overrides, e.g. overpass=2000,groq=800 (ms)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter (0.2 = +/-20%%)")
+    parser.add_argument("--error-rate", default="", help="injected 503 probability, e.g. overpass=0.1")
+    parser.add_argument("--seed", type=int, default=None, help="seed for latency/error injection")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds to wait after each phase")
+    parser.add_argument("--app-url", default="", help="drive an already running app instead of starting one")
+    parser.add_argument("--stub-port", type=int, default=0,
+                        help="fixed stand-in port (proxy on port+1), for an app started with --app-url")
+    parser.add_argument("--app-log", default="", help="file for the started app's output")
+    parser.add_argument("--in-place", action="store_true",
+                        help="run the started app from the repo instead of a scratch copy (writes its caches)")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    unknown = [e for e in args.endpoints.split(",") if e.strip() not in ENDPOINTS]
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(unknown)}")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
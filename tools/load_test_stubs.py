@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the upstream APIs TravelLand calls (Overpass, Nominatim,
+Geoapify, Wikipedia, Groq, DDGS), used by tools/load_test.py.
+
+One aiohttp server hosts every stand-in under its own path prefix
+(``/overpass/api/interpreter``, ``/wikipedia/w/api.php``, ...). The app is
+pointed at it through ``HTTP_UPSTREAM_OVERRIDES`` (see
+``city_guides.providers.http_clients``) and ``DDGS_ENDPOINT``. Responses are
+replayed from ``tools/load_test_fixtures/<upstream>.json``; each fixture is a
+list of routes ``{"path": prefix, "method"?: "POST", "params"?: {...},
+"status"?: 200, "body": ...}`` and the first match wins.
+
+Each stand-in can add latency (mean milliseconds plus relative jitter) and
+inject errors (a 503 with the given probability). Calls, injected errors
+and requests without a matching fixture are counted per upstream.
+
+A small catch-all proxy counts requests that escape the stand-ins (sync
+``requests`` calls and anything else honouring HTTP(S)_PROXY) and refuses
+them, so a load run never reaches the real services.
+"""
+
+import asyncio
+import json
+import random
+from pathlib import Path
+from typing import Dict, Optional
+
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).parent / "load_test_fixtures"
+UPSTREAMS = ("overpass", "nominatim", "geoapify", "wikipedia", "groq", "ddgs")
+
+# Typical production latencies (ms), so an unconfigured run looks like the real thing
+DEFAULT_LATENCY_MS = {
+    "overpass": 800,
+    "nominatim": 150,
+    "geoapify": 120,
+    "wikipedia": 100,
+    "groq": 600,
+    "ddgs": 300,
+}
+
+
+class StandIn:
+    """Fixture routes, fault settings and counters for one upstream"""
+
+    def __init__(self, name: str, routes: list, latency_ms: float = 0.0, jitter: float = 0.2,
+                 error_rate: float = 0.0):
+        self.name = name
+        self.routes = routes
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = 0
+        self.errors = 0
+        self.unmatched = 0
+
+    def match(self, method: str, path: str, params) -> Optional[dict]:
+        for route in self.routes:
+            if route.get("method") and route["method"] != method:
+                continue
+            if not path.startswith(route["path"]):
+                continue
+            if any(params.get(k) != v for k, v in (route.get("params") or {}).items()):
+                continue
+            return route
+        return None
+
+    def delay(self, rng: random.Random) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        spread = self.latency_ms * self.jitter
+        return max(0.0, rng.uniform(self.latency_ms - spread, self.latency_ms + spread)) / 1000.0
+
+    def counts(self) -> Dict[str, int]:
+        return {"calls": self.calls, "errors": self.errors, "unmatched": self.unmatched}
+
+
+def load_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> Dict[str, list]:
+    out = {}
+    for name in UPSTREAMS:
+        path = Path(fixtures_dir) / f"{name}.json"
+        out[name] = json.loads(path.read_text(encoding="utf-8"))["routes"] if path.exists() else []
+    return out
+
+
+class StandInServer:
+    """All stand-ins plus the escape proxy, bound to 127.0.0.1 (free ports unless given)"""
+
+    def __init__(self, fixtures_dir: Path = FIXTURES_DIR, latency_ms: Optional[Dict[str, float]] = None,
+                 jitter: float = 0.2, error_rate: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        routes = load_fixtures(fixtures_dir)
+        latency = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+        errors = error_rate or {}
+        self.stand_ins = {
+            name: StandIn(name, routes[name], latency.get(name, 0.0), jitter, errors.get(name, 0.0))
+            for name in UPSTREAMS
+        }
+        self.unrouted: Dict[str, int] = {}
+        self.base_url = ""
+        self.proxy_url = ""
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self._proxy: Optional[asyncio.AbstractServer] = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        stand_in = self.stand_ins.get(request.match_info["upstream"])
+        if stand_in is None:
+            raise web.HTTPNotFound()
+        stand_in.calls += 1
+        delay = stand_in.delay(self._rng)
+        if delay:
+            await asyncio.sleep(delay)
+        if stand_in.error_rate and self._rng.random() < stand_in.error_rate:
+            stand_in.errors += 1
+            return web.json_response({"error": "injected failure"}, status=503)
+        route = stand_in.match(request.method, "/" + request.match_info["tail"], request.query)
+        if route is None:
+            stand_in.unmatched += 1
+            return web.json_response({"error": "no fixture"}, status=404)
+        return web.json_response(route.get("body"), status=route.get("status", 200))
+
+    async def _handle_proxy(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line = (await asyncio.wait_for(reader.readline(), timeout=5)).decode("latin-1").split()
+            target = line[1] if len(line) > 1 else "?"
+            host = target.split("://", 1)[-1].split("/", 1)[0].rsplit(":", 1)[0] if target != "?" else "?"
+            self.unrouted[host] = self.unrouted.get(host, 0) + 1
+            writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0, proxy_port: int = 0) -> "StandInServer":
+        app = web.Application()
+        app.router.add_route("*", "/{upstream}/{tail:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.base_url = f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+        self._proxy = await asyncio.start_server(self._handle_proxy, host, proxy_port)
+        self.proxy_url = f"http://{host}:{self._proxy.sockets[0].getsockname()[1]}"
+        return self
+
+    async def stop(self) -> None:
+        if self._proxy is not None:
+            self._proxy.close()
+            await self._proxy.wait_closed()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def overrides(self) -> str:
+        """Value for HTTP_UPSTREAM_OVERRIDES (http_clients profile name -> stand-in base URL)"""
+        return ",".join(f"{name}={self.base_url}/{name}" for name in UPSTREAMS if name != "ddgs")
+
+    def ddgs_endpoint(self) -> str:
+        return f"{self.base_url}/ddgs/search"
+
+    def app_env(self) -> Dict[str, str]:
+        """Environment that keeps an app process on the stand-ins"""
+        return {
+            "HTTP_UPSTREAM_OVERRIDES": self.overrides(),
+            "DDGS_ENDPOINT": self.ddgs_endpoint(),
+            "HTTP_PROXY": self.proxy_url,
+            "HTTPS_PROXY": self.proxy_url,
+            "NO_PROXY": "127.0.0.1,localhost",
+        }
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        out = {name: s.counts() for name, s in self.stand_ins.items()}
+        out["unrouted"] = dict(self.unrouted)
+        return out
+
+
+def diff_counts(before: dict, after: dict) -> dict:
+    """Per-upstream counter deltas between two ``counts()`` snapshots"""
+    out = {}
+    for name, stats in after.items():
+        prev = before.get(name, {})
+        delta = {k: v - prev.get(k, 0) for k, v in stats.items()}
+        out[name] = {k: v for k, v in delta.items() if v}
+    return {k: v for k, v in out.items() if v}
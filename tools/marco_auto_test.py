@@ -1,13 +1,16 @@
 import asyncio
 from city_guides.src import semantic
+from city_guides.src.services.conversations import ConversationState
 
 async def run():
     # Simulate a frustrated conversation history
     history = "User: I want coffee recommendations\nMarco: I'm ready to explore\nUser: Any specific coffee shops? You're not listening"
     q = "Any specific coffee shops?"
     city = "London"
+    # Fold it into conversation state once, as the chat endpoint stores it
+    conversation = ConversationState.from_history(history)
     # Provide no context_venues to force fallback to local data or enrichment
-    resp = await semantic.search_and_reason(q, city=city, mode='explorer', context_venues=[], weather=None, neighborhoods=None, session=None, wikivoyage=None, history=history)
+    resp = await semantic.search_and_reason(q, city=city, mode='explorer', context_venues=[], weather=None, neighborhoods=None, session=None, wikivoyage=None, conversation=conversation)
     print('--- FINAL RESPONSE ---')
     print(resp)
 
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
+"""Re-run tone neutralization over stored quick guides.
+
+By default rewrites the quick-guide store (city_guides/src/routes/data/neighborhood_quick_guides),
+skipping entries already neutralized with the current rules. `--results` walks results/**/*.json
+instead. Files are processed in parallel across `--workers` processes (default: one per CPU).
+"""
+import argparse
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import sys
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 from city_guides.src.persistence import get_synthesis_enhancer
+from city_guides.src.services import quick_guides
 
 SE = get_synthesis_enhancer()
 
@@ -37,32 +46,53 @@ def neutralize_in_obj(obj, city=None, neighborhood=None):
     return changed
 
 
-def main():
+def neutralize_file(path):
+    """Neutralize every quick_guide in one JSON file; returns the number updated (-1 if unreadable)"""
+    f = Path(path)
+    try:
+        data = json.loads(f.read_text(encoding='utf-8'))
+    except Exception:
+        return -1
+    changed = neutralize_in_obj(data)
+    if changed > 0:
+        f.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
+    return changed
+
+
+def neutralize_results(workers=None):
     base = Path('results')
     if not base.exists():
         print('No results/ directory found')
         return
 
-    files = list(base.glob('**/*.json'))
-    total_files = 0
-    total_changed = 0
-    modified_files = []
-
-    for f in files:
-        try:
-            data = json.loads(f.read_text(encoding='utf-8'))
-        except Exception:
-            continue
-        changed = neutralize_in_obj(data)
-        if changed > 0:
-            f.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding='utf-8')
-            modified_files.append((str(f), changed))
-            total_changed += changed
-        total_files += 1
+    files = [str(f) for f in base.glob('**/*.json')]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        counts = list(pool.map(neutralize_file, files, chunksize=8))
 
+    modified_files = [(p, c) for p, c in zip(files, counts) if c > 0]
+    total_files = sum(1 for c in counts if c >= 0)
+    total_changed = sum(c for _, c in modified_files)
     print(f'Processed {total_files} JSON files under results/; modified {len(modified_files)} files; total quick_guides updated: {total_changed}')
     for p, c in modified_files:
         print(f'- {p}: {c} updates')
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--results', action='store_true', help='walk results/**/*.json instead of the quick-guide store')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 = one per CPU)')
+    parser.add_argument('--force', action='store_true', help='re-neutralize entries already marked with the current rules')
+    args = parser.parse_args()
+
+    if args.results:
+        neutralize_results(args.workers or None)
+        return
+
+    summary = quick_guides.neutralize_stored(workers=args.workers, force=args.force)
+    print(f"Processed {summary['total']} stored guides in {summary['seconds']}s; "
+          f"rewritten {summary['rewritten']}, skipped {summary['skipped']}, failed {len(summary['failed'])}")
+    for p in summary['failed']:
+        print(f'- failed: {p}')
+
 if __name__ == '__main__':
     main()
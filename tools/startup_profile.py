@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of app startup.
+
+Imports the app in a fresh interpreter under ``python -X importtime`` and
+prints where the time went, sorted, plus a per-package rollup:
+
+    python tools/startup_profile.py                    # top 25 modules by self time
+    python tools/startup_profile.py --sort cumulative --top 40
+    python tools/startup_profile.py --filter city_guides --repeat 5
+    python tools/startup_profile.py --module city_guides.src.routes.search --json profile.json
+
+``self`` is time spent executing a module's own body, ``cumulative`` includes
+the modules it imported first. With ``--repeat`` each module's fastest run is
+kept, which hides disk-cache and scheduler noise. Bytecode is compiled before
+the first run so compile time (e.g. under PYTHONDONTWRITEBYTECODE) is not
+counted as import time.
+"""
+
+import argparse
+import compileall
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of ``-X importtime`` output as {module, self_us, cumulative_us, depth}, in import order"""
+    rows = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append({
+                "module": m.group(4),
+                "self_us": int(m.group(1)),
+                "cumulative_us": int(m.group(2)),
+                "depth": len(m.group(3)) // 2,
+            })
+    return rows
+
+
+def profile_once(module: str) -> List[Dict]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.getenv("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def merge_fastest(runs: List[List[Dict]]) -> List[Dict]:
+    """Keep each module's fastest self/cumulative time across runs (first run's order)"""
+    best: Dict[str, Dict] = {}
+    for rows in runs:
+        for r in rows:
+            seen = best.get(r["module"])
+            if seen is None:
+                best[r["module"]] = dict(r)
+            else:
+                seen["self_us"] = min(seen["self_us"], r["self_us"])
+                seen["cumulative_us"] = min(seen["cumulative_us"], r["cumulative_us"])
+    return list(best.values())
+
+
+def by_package(rows: List[Dict]) -> List[Dict]:
+    """Self time summed per top-level package (city_guides is split one level further)"""
+    totals: Dict[str, Dict] = {}
+    for r in rows:
+        parts = r["module"].split(".")
+        key = ".".join(parts[:2]) if parts[0] == "city_guides" and len(parts) > 1 else parts[0]
+        t = totals.setdefault(key, {"package": key, "self_us": 0, "modules": 0})
+        t["self_us"] += r["self_us"]
+        t["modules"] += 1
+    return sorted(totals.values(), key=lambda t: t["self_us"], reverse=True)
+
+
+def report(rows: List[Dict], module: str, sort: str = "self", top: int = 25, name_filter: str = "") -> str:
+    total = next((r["cumulative_us"] for r in rows if r["module"] == module), sum(r["self_us"] for r in rows))
+    shown = [r for r in rows if r["module"].startswith(name_filter)] if name_filter else rows
+    shown = sorted(shown, key=lambda r: r[f"{sort}_us"], reverse=True)[:top]
+    lines = [f"import {module}: {total / 1000:.1f} ms, {len(rows)} modules", "",
+             f"{'self ms':>9} {'cum ms':>9} {'% total':>8}  module"]
+    for r in shown:
+        lines.append(f"{r['self_us'] / 1000:>9.1f} {r['cumulative_us'] / 1000:>9.1f} "
+                     f"{100 * r[f'{sort}_us'] / max(total, 1):>7.1f}%  {r['module']}")
+    lines += ["", f"{'self ms':>9} {'modules':>8}  package"]
+    for p in by_package(rows)[:top]:
+        lines.append(f"{p['self_us'] / 1000:>9.1f} {p['modules']:>8}  {p['package']}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="city_guides.src.app", help="module whose import is profiled")
+    parser.add_argument("--sort", choices=("self", "cumulative"), default="self")
+    parser.add_argument("--top", type=int, default=25, help="rows per table")
+    parser.add_argument("--filter", default="", help="only list modules starting with this prefix")
+    parser.add_argument("--repeat", type=int, default=3, help="runs; each module's fastest is reported")
+    parser.add_argument("--json", dest="json_out", default="", help="also write the rows here")
+    args = parser.parse_args(argv)
+
+    compileall.compile_dir(str(PROJECT_ROOT / "city_guides"), quiet=2)
+    rows = merge_fastest([profile_once(args.module) for _ in range(max(1, args.repeat))])
+    print(report(rows, args.module, args.sort, args.top, args.filter))
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps({"module": args.module, "rows": rows}, indent=2) + "\n",
+                                       encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())